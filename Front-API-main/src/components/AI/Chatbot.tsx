@@ -51,6 +51,8 @@ const Chatbot = ({ isOpen, onClose }: ChatbotProps) => {
   const [_error, setError] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
+  // La conversación se guarda en el servidor; solo se reenvía su identificador
+  const sessionIdRef = useRef<string | null>(null);
 
   // Función para detectar y limpiar planos ASCII de la respuesta
   const processResponse = (response: string): { cleanedContent: string; layoutData?: LayoutData } => {
@@ -144,7 +146,7 @@ const Chatbot = ({ isOpen, onClose }: ChatbotProps) => {
         return;
       }
 
-      const response = await fetch(`${API_BASE_URL}/chatbot/chat`, {
+      const response = await fetch(`${API_BASE_URL}/chatbot/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -152,11 +154,12 @@ const Chatbot = ({ isOpen, onClose }: ChatbotProps) => {
         },
         body: JSON.stringify({
           message: messageText.trim(),
-          context: null
+          context: null,
+          session_id: sessionIdRef.current
         })
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         if (response.status === 401) {
           throw new Error('Sesión expirada. Por favor, inicia sesión nuevamente.');
         }
@@ -167,22 +170,57 @@ const Chatbot = ({ isOpen, onClose }: ChatbotProps) => {
         throw new Error(errorData.detail || 'Error al procesar el mensaje');
       }
 
-      const data = await response.json();
-
-      // Procesar y limpiar la respuesta (eliminar planos ASCII)
-      const { cleanedContent, layoutData } = processResponse(data.response);
-
-      const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        role: 'assistant',
-        content: cleanedContent,
-        timestamp: new Date(data.timestamp),
-        suggestions: data.suggestions,
-        spacesFound: data.spaces_mentioned,
-        layoutData: layoutData
+      // La respuesta llega como Server-Sent Events: fragmentos "token" y un "done" final
+      const assistantId = (Date.now() + 1).toString();
+      let content = '';
+      const updateAssistant = (changes: Partial<Message>) => {
+        setMessages(prev => {
+          const exists = prev.some(m => m.id === assistantId);
+          if (!exists) {
+            return [...prev, { id: assistantId, role: 'assistant', content: '', timestamp: new Date(), ...changes }];
+          }
+          return prev.map(m => (m.id === assistantId ? { ...m, ...changes } : m));
+        });
       };
 
-      setMessages(prev => [...prev, assistantMessage]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || '';
+        for (const event of events) {
+          const lines = event.split('\n');
+          const type = lines.find(line => line.startsWith('event: '))?.slice(7);
+          const data = lines
+            .filter(line => line.startsWith('data: '))
+            .map(line => line.slice(6))
+            .join('\n');
+          if (!type || !data) continue;
+          const payload = JSON.parse(data);
+
+          if (type === 'token') {
+            content += payload.text;
+            updateAssistant({ content });
+          } else if (type === 'done') {
+            sessionIdRef.current = payload.session_id ?? null;
+            // Procesar y limpiar la respuesta completa (eliminar planos ASCII)
+            const { cleanedContent, layoutData } = processResponse(content);
+            updateAssistant({
+              content: cleanedContent,
+              timestamp: new Date(payload.timestamp),
+              suggestions: payload.suggestions,
+              spacesFound: payload.spaces_mentioned,
+              layoutData: layoutData
+            });
+          } else if (type === 'error') {
+            throw new Error(payload.detail || 'Error al procesar el mensaje');
+          }
+        }
+      }
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Error desconocido';
       setError(errorMessage);
@@ -320,7 +358,7 @@ const Chatbot = ({ isOpen, onClose }: ChatbotProps) => {
               ))}
 
               {/* Loading indicator */}
-              {isLoading && (
+              {isLoading && messages[messages.length - 1]?.role === 'user' && (
                 <div className="flex justify-start">
                   <div className="flex items-center gap-2 bg-white dark:bg-slate-800 rounded-2xl px-4 py-3 shadow-sm border border-slate-200 dark:border-slate-700">
                     <Loader2 className="h-4 w-4 animate-spin text-violet-600" />
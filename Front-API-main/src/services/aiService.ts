@@ -1,11 +1,24 @@
 import apiClient, { handleApiError } from './apiClient';
 
+export interface AIPredictionDay {
+  fecha: string;
+  predicted_usage: number;
+  lower: number;
+  upper: number;
+  horas_pico: number[];
+}
+
 export interface AIPrediction {
   entity_type: string;
   entity_id: number;
+  nombre?: string | null;
   predicted_usage: number;
+  lower?: number;
+  upper?: number;
+  confidence?: number;
   period: string;
   factors: string[];
+  daily?: AIPredictionDay[];
 }
 
 export interface PredictionsResponse {
@@ -18,6 +18,32 @@ export interface EfficiencyMetrics {
   bottlenecks: string[];
 }
 
+export interface SpaceUtilizationBucket {
+  inicio: string;
+  ocupacion: number;
+  uso: number | null;
+}
+
+export interface SpaceUtilization {
+  bucket: 'hour' | 'day' | 'week';
+  start_date: string;
+  end_date: string;
+  spaces: Array<{
+    space_id: number;
+    nombre: string;
+    tipo: string;
+    capacidad: number;
+    ocupacion_media: number;
+    horas_ocupadas: number;
+    hora_pico: number | null;
+    uso_medio: number | null;
+    buckets: SpaceUtilizationBucket[];
+  }>;
+  heatmap: { buckets: string[]; space_ids: number[]; values: number[][] };
+  weekly_profile: number[][];
+  generated_at: string;
+}
+
 class AnalyticsService {
   /**
    * Get usage analytics
@@ -53,9 +79,17 @@ class AnalyticsService {
   /**
    * Get space utilization report
    */
-  async getSpaceUtilization(spaceId?: number) {
+  async getSpaceUtilization(
+    spaceId?: number,
+    bucket: 'hour' | 'day' | 'week' = 'day',
+    startDate?: string,
+    endDate?: string
+  ): Promise<SpaceUtilization> {
     try {
-      const params = spaceId ? { space_id: spaceId } : {};
+      const params: any = { bucket };
+      if (spaceId) params.space_id = spaceId;
+      if (startDate) params.start_date = startDate;
+      if (endDate) params.end_date = endDate;
       const response = await apiClient.get('/analytics/space-utilization', { params });
       return response.data;
     } catch (error) {
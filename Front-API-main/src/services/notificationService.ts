@@ -31,7 +31,9 @@ class NotificationService {
    */
   async getUnread(): Promise<Notification[]> {
     try {
-      const response = await apiClient.get('/notifications/unread');
+      const response = await apiClient.get('/notifications', {
+        params: { unread_only: true },
+      });
       return response.data;
     } catch (error) {
       throw new Error(handleApiError(error));
@@ -55,7 +57,9 @@ class NotificationService {
    */
   async markAllAsRead(): Promise<void> {
     try {
-      await apiClient.put('/notifications/read-all');
+      await apiClient.put('/notifications/read', {
+        before: new Date().toISOString(),
+      });
     } catch (error) {
       throw new Error(handleApiError(error));
     }
@@ -77,8 +81,8 @@ class NotificationService {
    */
   async getUnreadCount(): Promise<number> {
     try {
-      const unread = await this.getUnread();
-      return unread.length;
+      const response = await apiClient.get('/notifications/unread-count');
+      return response.data.unread;
     } catch (error) {
       return 0;
     }
@@ -1,2 +1,2 @@
 # API v1 module
-from . import auth, spaces, resources, assignments, analytics, notifications, chatbot
+from . import auth, spaces, resources, assignments, analytics, notifications, chatbot, jobs
@@ -1,16 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 
 from app.db.session import get_db
 from app.db.crud import SpaceCRUD, ResourceCRUD, AssignmentCRUD, UsageDataCRUD
 from app.schemas.analytics import (
-    UsageAnalytics, EfficiencyMetrics, PredictionResult,
-    SimulationRequest, SimulationResult
+    UsageAnalytics, EfficiencyMetrics, PredictionResult, PatternAnalysisResult,
+    SpaceUtilizationResult, SimulationRequest, SimulationResult
 )
 from app.api.v1.auth import get_current_active_user, require_role
-from app.services.ai_gemini import generate_predictions, analyze_usage_patterns, simulate_scenario
+from app.services.ai_gemini import narrate_forecast
+from app.services.pattern_analysis import usage_patterns
+from app.services.forecaster import HISTORY_DAYS, UsageSeries, forecaster
+from app.services.occupancy import BUCKET_HOURS, MAX_BUCKETS, align, occupancy_engine
+from app.services.rate_limit import ai_limiter
+from app.services.jobs import report_progress
+from app.services.simulator import (
+    SEMESTER_DAYS, demand_from_bookings, inventory_from, scenario_simulator, synthetic_demand
+)
+from app.db.versions import table_versions
+from app.db.space_metrics import space_metrics
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -82,27 +92,14 @@ async def get_efficiency_metrics(
     
     Calculates overall efficiency scores and provides recommendations.
     """
-    all_spaces = await SpaceCRUD.get_all(db)
-    all_resources = await ResourceCRUD.get_all(db)
-    active_assignments = await AssignmentCRUD.get_active(db)
-    
-    total_capacity = sum(s.capacidad for s in all_spaces)
-    used_capacity = 0
-    
-    space_assignment_count = {}
-    for assignment in active_assignments:
-        sid = assignment.space_id
-        space_assignment_count[sid] = space_assignment_count.get(sid, 0) + 1
-    
-    for space in all_spaces:
-        assignments = space_assignment_count.get(space.id, 0)
-        used_capacity += min(assignments, space.capacidad)
+    await space_metrics.ensure_loaded(db)
     
+    total_capacity = space_metrics.total_capacity
+    used_capacity = space_metrics.used_capacity
     space_efficiency = (used_capacity / total_capacity * 100) if total_capacity > 0 else 0
     
-    available_resources = sum(1 for r in all_resources if r.estado == "disponible")
-    assigned_resources = len(set(a.resource_id for a in active_assignments))
-    resource_efficiency = (assigned_resources / len(all_resources) * 100) if all_resources else 0
+    assigned_resources = space_metrics.assigned_resources
+    resource_efficiency = (assigned_resources / space_metrics.resource_count * 100) if space_metrics.resource_count else 0
     
     overall_efficiency = (space_efficiency + resource_efficiency) / 2
     
@@ -119,11 +116,11 @@ async def get_efficiency_metrics(
         recommendations.append("El sistema está funcionando con buena eficiencia")
     
     metrics_by_space = []
-    for space in all_spaces[:10]:
-        assignments = space_assignment_count.get(space.id, 0)
+    for space_id, space in space_metrics.first_spaces(10):
+        assignments = space_metrics.assignments_of(space_id)
         utilization = (assignments / space.capacidad * 100) if space.capacidad > 0 else 0
         metrics_by_space.append({
-            "space_id": space.id,
+            "space_id": space_id,
             "nombre": space.nombre,
             "capacidad": space.capacidad,
             "asignaciones": assignments,
@@ -144,58 +141,152 @@ async def get_efficiency_metrics(
 @router.get("/predictions", response_model=PredictionResult, summary="Get usage predictions")
 async def get_predictions(
     days_ahead: int = Query(7, ge=1, le=90, description="Number of days to predict"),
+    use_ai: bool = Query(False, description="Have Gemini write the insights"),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """
-    Get AI-powered usage predictions.
+    Get usage predictions per space and resource.
     
-    Uses Gemini AI to analyze historical data and predict future usage patterns.
+    Forecasts are computed locally from the last 8 weeks of usage data, blending
+    seasonal-naive, Holt-Winters (weekly seasonality) and day-of-week profiles,
+    with 95% intervals per day. Results are cached for the current day.
     
     - **days_ahead**: Number of days to predict (default: 7, max: 90)
+    - **use_ai**: Use Gemini only to narrate the insights (default: false)
     
     Accepts both GET and POST methods for compatibility.
     """
-    start_date = datetime.utcnow() - timedelta(days=30)
-    end_date = datetime.utcnow()
+    today = datetime.utcnow().date()
+    cache_key = (days_ahead, use_ai, table_versions.get("usage_data"), table_versions.get("spaces"))
+    result = forecaster.cached(cache_key, today)
+    
+    if result is None:
+        start = today - timedelta(days=HISTORY_DAYS)
+        rows = await UsageDataCRUD.get_series(db, datetime.combine(start, time.min), datetime.utcnow())
+        series = UsageSeries.from_rows(rows, start, HISTORY_DAYS)
+        
+        names = {}
+        if series.keys:
+            names.update({("space", s.id): s.nombre for s in await SpaceCRUD.get_all(db, limit=None)})
+            names.update({("resource", r.id): r.nombre for r in await ResourceCRUD.get_all(db, limit=None)})
+        
+        result = forecaster.forecast(series, days_ahead, names)
+        result["model_used"] = "local-forecast"
+        
+        if use_ai and result["predictions"]:
+            async with ai_limiter.guard("ai_analytics", current_user.id, "narrate_forecast"):
+                insights = await narrate_forecast(result)
+            if insights:
+                result["insights"] = insights
+                result["model_used"] = "local-forecast+gemini"
+        
+        forecaster.store(cache_key, today, result)
     
-    all_spaces = await SpaceCRUD.get_all(db)
-    all_resources = await ResourceCRUD.get_all(db)
-    usage_data = await UsageDataCRUD.get_by_date_range(db, start_date, end_date)
+    return PredictionResult(
+        predictions=result["predictions"],
+        confidence=result["confidence"],
+        insights=result["insights"],
+        model_used=result["model_used"],
+        generated_at=datetime.utcnow()
+    )
+
+
+@router.get("/patterns", response_model=PatternAnalysisResult, summary="Detect usage patterns and anomalies")
+async def get_usage_patterns(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Detect usage patterns, trends and anomalies over the last 8 weeks of usage data.
     
-    data = {
-        "spaces": [
-            {
-                "id": s.id,
-                "nombre": s.nombre,
-                "tipo": s.tipo,
-                "capacidad": s.capacidad
-            } for s in all_spaces
-        ],
-        "resources": [
-            {
-                "id": r.id,
-                "nombre": r.nombre,
-                "tipo": r.tipo
-            } for r in all_resources
-        ],
-        "historical_usage": [
-            {
-                "space_id": u.space_id,
-                "resource_id": u.resource_id,
-                "fecha": u.fecha.isoformat() if u.fecha else None,
-                "uso": u.uso
-            } for u in usage_data
-        ],
-        "prediction_days": days_ahead
-    }
-    
-    result = await generate_predictions(data)
+    Runs locally and incrementally: each call only reads the usage rows added
+    since the previous one and folds them into the running aggregates.
     
-    return PredictionResult(
-        predictions=result.get("predictions", []),
-        confidence=result.get("confidence", 0.0),
-        model_used=result.get("model_used", "gemini-2.0-flash"),
+    Returns:
+    - **patterns**: peak-hour/weekday usage profiles and chronically under-used spaces
+    - **trends**: weekly usage trends, overall and per space/resource
+    - **anomalies**: days whose usage deviates from the expected trend and season
+    """
+    usage_patterns.advance_to(datetime.utcnow().date())
+    rows = await UsageDataCRUD.get_new_rows(
+        db, usage_patterns.last_id, datetime.combine(usage_patterns.window_start, time.min)
+    )
+    added = usage_patterns.ingest(rows)
+    
+    all_spaces = await SpaceCRUD.get_all(db, limit=None)
+    all_resources = await ResourceCRUD.get_all(db, limit=None)
+    names = {("space", s.id): s.nombre for s in all_spaces}
+    names.update({("resource", r.id): r.nombre for r in all_resources})
+    
+    result = usage_patterns.analyze(names=names, space_ids=[s.id for s in all_spaces])
+    return PatternAnalysisResult(**result, rows_ingested=added, analyzed_at=datetime.utcnow())
+
+
+@router.get("/space-utilization", response_model=SpaceUtilizationResult, summary="Get space utilization")
+async def get_space_utilization(
+    space_id: Optional[int] = Query(None, description="Only this space"),
+    bucket: str = Query("day", pattern="^(hour|day|week)$", description="Bucket size: hour, day or week"),
+    start_date: Optional[datetime] = Query(None, description="Start of the period"),
+    end_date: Optional[datetime] = Query(None, description="End of the period"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Get time-bucketed occupancy per space from assignments and usage data.
+    
+    - **space_id**: Restrict to one space (optional)
+    - **bucket**: hour, day or week (default: day; weeks start on Monday)
+    - **start_date**: Period start (default: 30 days before end_date)
+    - **end_date**: Period end (default: now); the period may span at most 800 days
+    
+    Occupancy is the share of each bucket covered by non-cancelled
+    assignments (overlapping ones counted once); ``uso`` is the mean UsageData
+    value of the bucket. Returns the series per space, a spaces × buckets
+    heatmap and a weekday × hour occupancy profile.
+    """
+    end = align((end_date or datetime.utcnow()).replace(tzinfo=None), bucket, up=True)
+    start = align((start_date.replace(tzinfo=None) if start_date else end - timedelta(days=30)), bucket)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must be before end_date"
+        )
+    if (end - start) / timedelta(hours=BUCKET_HOURS[bucket]) > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many buckets; use a larger bucket or a shorter period (max {MAX_BUCKETS})"
+        )
+    last_day = (end - timedelta(microseconds=1)).date()
+    if (last_day - start.date()).days + 1 > occupancy_engine.max_days:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Period too long; at most {occupancy_engine.max_days} days per request"
+        )
+    
+    if space_id is not None:
+        space = await SpaceCRUD.get_by_id(db, space_id)
+        if not space:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Space with id {space_id} not found"
+            )
+        spaces = [space]
+    else:
+        spaces = await SpaceCRUD.get_all(db, limit=None)
+    
+    occupancy_engine.validate((table_versions.get("assignments"), table_versions.get("usage_data")))
+    missing = occupancy_engine.missing_days(start.date(), last_day, space_id)
+    if missing:
+        first, last = missing[0], missing[-1]
+        lo = datetime.combine(first, time.min)
+        hi = datetime.combine(last + timedelta(days=1), time.min)
+        intervals = await AssignmentCRUD.get_intervals(db, lo, hi, room_id=space_id)
+        usage = await UsageDataCRUD.get_series(db, lo, hi, space_id=space_id)
+        occupancy_engine.add(intervals, usage, first, last, space_id)
+    
+    return SpaceUtilizationResult(
+        **occupancy_engine.report(spaces, start, end, bucket),
         generated_at=datetime.utcnow()
     )
 
@@ -212,55 +303,49 @@ async def run_simulation(
     Requires admin or estudiante role.
     
     - **scenario_name**: Name/description of the scenario
-    - **parameters**: Scenario parameters (e.g., new spaces, resource changes)
-    - **fecha_inicio**: Simulation start date (optional)
-    - **fecha_fin**: Simulation end date (optional)
+    - **parameters**: Scenario parameters:
+      - **changes**: list of changes, e.g. `{"type": "add_space", "tipo": "aula", "capacidad": 40}`,
+        `{"type": "remove_space", "space_id": 3}`, `{"type": "increase_capacity", "space_id": 1, "amount": 0.2}`,
+        `{"type": "set_capacity", "space_id": 1, "capacidad": 25}`,
+        `{"type": "close_space", "space_id": 2, "desde": "2026-03-01", "hasta": "2026-03-15"}`
+      - **demand_growth**: extra demand as a fraction, for both inventories (default 0)
+      - **replications**: Monte Carlo replications (default 20)
+      - **seed**: random seed (default 42)
+    - **fecha_inicio**: Start of the demand period to replay (default: one semester before fecha_fin)
+    - **fecha_fin**: End of the demand period (default: now)
+
+    The assignments of the period are replayed against the current and the
+    modified inventory; without assignments a synthetic weekday demand is used.
     """
-    all_spaces = await SpaceCRUD.get_all(db)
-    all_resources = await ResourceCRUD.get_all(db)
-    all_assignments = await AssignmentCRUD.get_all(db)
-    
-    current_data = {
-        "spaces": [
-            {
-                "id": s.id,
-                "nombre": s.nombre,
-                "tipo": s.tipo,
-                "capacidad": s.capacidad,
-                "estado": s.estado
-            } for s in all_spaces
-        ],
-        "resources": [
-            {
-                "id": r.id,
-                "nombre": r.nombre,
-                "tipo": r.tipo,
-                "estado": r.estado
-            } for r in all_resources
-        ],
-        "assignments": [
-            {
-                "id": a.id,
-                "space_id": a.space_id,
-                "resource_id": a.resource_id,
-                "estado": a.estado
-            } for a in all_assignments
-        ]
-    }
-    
-    scenario = {
-        "scenario_name": request.scenario_name,
-        "parameters": request.parameters,
-        "fecha_inicio": request.fecha_inicio.isoformat() if request.fecha_inicio else None,
-        "fecha_fin": request.fecha_fin.isoformat() if request.fecha_fin else None
-    }
-    
-    result = await simulate_scenario(scenario, current_data)
+    end = (request.fecha_fin or datetime.utcnow()).replace(tzinfo=None)
+    start = (request.fecha_inicio or end - timedelta(days=SEMESTER_DAYS)).replace(tzinfo=None)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="fecha_inicio must be before fecha_fin"
+        )
+
+    all_spaces = await SpaceCRUD.get_all(db, limit=None)
+    inventory = inventory_from(
+        {"id": s.id, "tipo": s.tipo, "capacidad": s.capacidad, "estado": s.estado} for s in all_spaces
+    )
+    demand = demand_from_bookings(await AssignmentCRUD.get_demand(db, start, end), inventory, start, end)
+    if not len(demand):
+        demand = synthetic_demand(inventory, start, end)
+
+    try:
+        result = await scenario_simulator.run(inventory, demand, request.parameters, start, progress=report_progress)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid simulation parameters: {e}"
+        )
+    result["results"]["periodo"] = {"inicio": start.isoformat(), "fin": end.isoformat()}
     
     return SimulationResult(
-        scenario_name=result.get("scenario_name", request.scenario_name),
-        results=result.get("results", {}),
-        impact_analysis=result.get("impact_analysis", {}),
-        recommendations=result.get("recommendations", []),
+        scenario_name=request.scenario_name,
+        results=result["results"],
+        impact_analysis=result["impact_analysis"],
+        recommendations=result["recommendations"],
         simulated_at=datetime.utcnow()
     )
@@ -9,8 +9,11 @@ from app.schemas.assignment import (
     OptimizationRequest, OptimizationResult
 )
 from app.api.v1.auth import get_current_active_user, require_role
+from app.core.responses import FastJSONResponse
+from app.core.query_budget import query_budget
 from app.services.optimizer import optimizer
 from app.services.ai_gemini import optimize_space_allocation
+from app.services.rate_limit import ai_limiter
 
 router = APIRouter(prefix="/assignments", tags=["Assignments"])
 
@@ -31,10 +34,10 @@ async def get_assignments(
     - **active_only**: Filter only active assignments
     """
     if active_only:
-        assignments = await AssignmentCRUD.get_active(db)
+        rows = await AssignmentCRUD.get_rows(db, limit=None, estado="activo")
     else:
-        assignments = await AssignmentCRUD.get_all(db, skip=skip, limit=limit)
-    return assignments
+        rows = await AssignmentCRUD.get_rows(db, skip=skip, limit=limit)
+    return FastJSONResponse(rows)
 
 
 @router.get("/{assignment_id}", response_model=AssignmentResponse, summary="Get assignment by ID")
@@ -162,6 +165,7 @@ async def delete_assignment(
 
 
 @router.post("/optimize", response_model=OptimizationResult, summary="Optimize space-resource assignments")
+@query_budget(3)
 async def optimize_assignments(
     request: OptimizationRequest,
     use_ai: bool = Query(False, description="Use AI (Gemini) for optimization"),
@@ -181,19 +185,17 @@ async def optimize_assignments(
     - **use_ai**: Use AI (Gemini) for enhanced optimization (default: false)
     """
     if request.space_ids:
-        spaces = []
-        for sid in request.space_ids:
-            space = await SpaceCRUD.get_by_id(db, sid)
-            if space:
-                spaces.append({
-                    "id": space.id,
-                    "nombre": space.nombre,
-                    "tipo": space.tipo,
-                    "capacidad": space.capacidad,
-                    "ubicacion": space.ubicacion,
-                    "caracteristicas": space.caracteristicas or {},
-                    "estado": space.estado
-                })
+        spaces = [
+            {
+                "id": space.id,
+                "nombre": space.nombre,
+                "tipo": space.tipo,
+                "capacidad": space.capacidad,
+                "ubicacion": space.ubicacion,
+                "caracteristicas": space.caracteristicas or {},
+                "estado": space.estado
+            } for space in await SpaceCRUD.get_by_ids(db, request.space_ids)
+        ]
     else:
         all_spaces = await SpaceCRUD.get_all(db)
         spaces = [
@@ -209,18 +211,16 @@ async def optimize_assignments(
         ]
     
     if request.resource_ids:
-        resources = []
-        for rid in request.resource_ids:
-            resource = await ResourceCRUD.get_by_id(db, rid)
-            if resource:
-                resources.append({
-                    "id": resource.id,
-                    "nombre": resource.nombre,
-                    "tipo": resource.tipo,
-                    "estado": resource.estado,
-                    "categoria_id": resource.categoria_id,
-                    "caracteristicas": resource.caracteristicas if resource.caracteristicas else {}
-                })
+        resources = [
+            {
+                "id": resource.id,
+                "nombre": resource.nombre,
+                "tipo": resource.tipo,
+                "estado": resource.estado,
+                "categoria_id": resource.categoria_id,
+                "caracteristicas": resource.caracteristicas if resource.caracteristicas else {}
+            } for resource in await ResourceCRUD.get_by_ids(db, request.resource_ids)
+        ]
     else:
         all_resources = await ResourceCRUD.get_all(db)
         resources = [
@@ -251,7 +251,8 @@ async def optimize_assignments(
             "existing_assignments": existing_assignments,
             "criteria": request.criterios
         }
-        result = await optimize_space_allocation(data)
+        async with ai_limiter.guard("ai_optimize", current_user.id, "optimize_space_allocation"):
+            result = await optimize_space_allocation(data)
     else:
         result = optimizer.optimize_assignments(
             spaces=spaces,
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.db.crud import UserCRUD
+from app.core.query_budget import query_budget
 from app.core.security import (
     verify_password, 
     create_access_token, 
@@ -19,6 +20,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=Token, summary="Register new user", status_code=201)
+@query_budget(4)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
@@ -75,6 +77,7 @@ async def register(
 
 
 @router.post("/login", response_model=Token, summary="User login")
+@query_budget(1)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
@@ -117,6 +120,7 @@ async def login(
 
 
 @router.post("/refresh", response_model=Token, summary="Refresh access token")
+@query_budget(1)
 async def refresh_token(
     request: RefreshRequest,
     db: AsyncSession = Depends(get_db)
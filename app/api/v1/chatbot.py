@@ -1,20 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Tuple
+from datetime import datetime, timedelta, time
 import json
 import logging
 import asyncio
 import math
 from concurrent.futures import ThreadPoolExecutor
 
-import google.generativeai as genai
-
 from app.db.session import get_db
-from app.db.crud import SpaceCRUD
+from app.db.crud import SpaceCRUD, AssignmentCRUD
+from app.db.space_metrics import space_metrics
 from app.config import settings
-from app.api.v1.auth import get_current_active_user
+from app.api.v1.auth import get_current_active_user, require_role
+from app.core.http_cache import conditional
+from app.services.reservation_engine import reservation_ranker
+from app.services.request_parser import request_parser, ParsedRequest
+from app.services.ai_json import generate_json, parse_metrics
+from app.services.ai_client import ai_client, generate_content, stream_text
+from app.services.space_matcher import space_matcher
+from app.services.chat_sessions import chat_sessions
+from app.services.rate_limit import ai_limiter
+from app.services.circuit_breaker import AIUnavailableError, ai_breaker, last_good
+from app.services.reference_data import reference_data, CACHE_CONTROL as REFERENCE_CACHE_CONTROL
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,15 +32,41 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chatbot", tags=["Chatbot IA"])
 
 # Modelo de Gemini a usar
-GEMINI_MODEL = "gemini-2.0-flash"
+GEMINI_MODEL = settings.GEMINI_MODEL
 
 # Thread pool para ejecutar llamadas síncronas a Gemini
 executor = ThreadPoolExecutor(max_workers=3)
 
 
+def ai_rate_limit(group: str, function: str):
+    """
+    Dependencia que aplica los límites de IA: bucket por usuario y global del
+    grupo, más el tope de llamadas simultáneas de la función. El cupo se libera
+    cuando termina la respuesta (incluido el streaming).
+    """
+    async def dependency(current_user = Depends(get_current_active_user)):
+        async with ai_limiter.guard(group, current_user.id, function):
+            yield
+    return dependency
+
+
+def _ai_unavailable(error: AIUnavailableError) -> HTTPException:
+    """503 para cuando la IA falla o el circuito está abierto y no hay alternativa local"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"El servicio de IA no está disponible en este momento: {error}",
+        headers={"Retry-After": str(error.retry_after or ai_breaker.retry_after())}
+    )
+
+
+def _request_key(request: BaseModel) -> str:
+    return json.dumps(request.model_dump(), sort_keys=True, default=str)
+
+
 class ChatMessage(BaseModel):
     message: str
     context: Optional[str] = None
+    session_id: Optional[str] = None  # Continuar una conversación guardada en el servidor
 
 
 class ChatResponse(BaseModel):
@@ -39,6 +75,7 @@ class ChatResponse(BaseModel):
     timestamp: str
     model_used: str
     spaces_mentioned: List[dict] = []
+    session_id: Optional[str] = None
 
 
 class GeminiTestResponse(BaseModel):
@@ -90,6 +127,9 @@ class ScheduledClass(BaseModel):
     estudiantes: int
     equipamiento_disponible: List[str] = []
     notas: Optional[str] = None
+    
+    class Config:
+        coerce_numbers_to_str = True
 
 
 class ScheduleConflict(BaseModel):
@@ -100,6 +140,18 @@ class ScheduleConflict(BaseModel):
     sugerencia: str
 
 
+class ScheduleClassesAIResult(BaseModel):
+    """Estructura esperada de la respuesta de IA al programar clases"""
+    success: bool = False
+    mensaje: str = "Programación completada"
+    clases_programadas: List[ScheduledClass] = []
+    conflictos: List[ScheduleConflict] = []
+    espacios_utilizados: List[dict] = []
+    resumen: dict = {}
+    recomendaciones: List[str] = []
+    horario_generado: Optional[dict] = None
+
+
 class ScheduleClassesResponse(BaseModel):
     """Respuesta de la programación de clases"""
     success: bool
@@ -143,18 +195,15 @@ async def test_gemini_connection():
     logger.info(f"API Key configurada: {settings.GEMINI_API_KEY[:10]}...")
     
     try:
-        # Configurar Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        
-        # Crear modelo
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        # Modelo compartido (cliente configurado una sola vez por proceso)
+        model = ai_client.get_model(GEMINI_MODEL)
         result["model_available"] = True
         
         # Hacer una petición de prueba simple (ejecutar en thread pool para async)
         loop = asyncio.get_event_loop()
         response = await loop.run_in_executor(
             executor,
-            lambda: model.generate_content("Di 'Hola, estoy funcionando correctamente' en español")
+            lambda: generate_content("test", model, "Di 'Hola, estoy funcionando correctamente' en español")
         )
         
         if response and response.text:
@@ -175,7 +224,111 @@ async def test_gemini_connection():
     return GeminiTestResponse(**result)
 
 
-@router.post("/chat", response_model=ChatResponse, summary="Chat con el asistente IA")
+@router.get("/parse-metrics", summary="Métricas de decodificación de respuestas IA")
+async def get_parse_metrics(current_user = Depends(get_current_active_user)):
+    """
+    Contadores por endpoint de las respuestas JSON de la IA: decodificadas al primer
+    intento, reparadas tras reintento y fallidas, junto con la tasa de fallo.
+    """
+    return {
+        "endpoints": parse_metrics.snapshot(),
+        "failure_rate": round(parse_metrics.failure_rate(), 4)
+    }
+
+
+@router.get("/rate-limit-metrics", summary="Métricas de limitación de solicitudes IA")
+async def get_rate_limit_metrics(current_user = Depends(get_current_active_user)):
+    """
+    Llamadas admitidas y rechazadas (por usuario, globales o por concurrencia) en
+    cada grupo de endpoints de IA, y llamadas en curso por función.
+    """
+    return ai_limiter.snapshot()
+
+
+@router.get("/ai-status", summary="Estado del circuito de la IA")
+async def get_ai_status(current_user = Depends(get_current_active_user)):
+    """
+    Estado del circuit breaker que protege las llamadas a Gemini (`closed`, `open`
+    o `half_open`), tasa de fallos en la ventana reciente y contadores de llamadas.
+    Mientras está abierto, los endpoints responden con resultados locales o en caché.
+    """
+    return ai_breaker.snapshot()
+
+
+# Reglas fijas del asistente: van como system instruction del modelo (handle cacheado)
+CHAT_SYSTEM_INSTRUCTION = """Eres un asistente virtual inteligente del Sistema de Gestión de Espacios Físicos "SpaceIQ".
+Tu rol es ayudar a los usuarios a:
+1. Encontrar espacios disponibles según sus necesidades
+2. Proporcionar información sobre las características y equipos de los espacios
+3. Dar recomendaciones basadas en capacidad, tipo de espacio y equipamiento
+4. Responder preguntas sobre el sistema
+
+Al inicio de la conversación recibes el catálogo de espacios (una línea por espacio) y, en mensajes
+posteriores, solo los espacios que cambiaron desde entonces.
+
+Reglas:
+- Responde siempre en español
+- Sé conciso pero informativo
+- Si el usuario pregunta por un espacio específico, proporciona detalles completos
+- Si no tienes información suficiente, indícalo claramente
+- Sugiere opciones alternativas cuando sea apropiado
+- IMPORTANTE: NO generes planos ASCII, diagramas de texto, ni representaciones visuales con caracteres. Si el usuario pregunta sobre distribución de espacios, recomiéndale usar el "Asistente IA" en el menú lateral donde hay herramientas gráficas especializadas para eso.
+- Al final de tu respuesta, incluye 2-3 sugerencias de preguntas relacionadas"""
+
+
+async def _summarize_turns(previous_summary: str, turns: list) -> str:
+    """Resume los turnos más antiguos de una sesión de chat con la IA"""
+    model = ai_client.get_model(GEMINI_MODEL)
+    conversation = "\n".join(f"Usuario: {q}\nAsistente: {a}" for q, a in turns)
+    prompt = f"""Resume en español, en máximo 6 viñetas breves, la siguiente conversación entre un usuario y el asistente de gestión de espacios. Conserva necesidades, espacios mencionados, fechas y decisiones.
+
+{f"Resumen previo:{chr(10)}{previous_summary}{chr(10)}" if previous_summary else ""}
+Conversación:
+{conversation}"""
+    loop = asyncio.get_event_loop()
+    response = await ai_breaker.call(lambda: loop.run_in_executor(
+        executor,
+        lambda: generate_content("summarize", model, prompt, generation_config={"max_output_tokens": 300})
+    ))
+    return response.text.strip()
+
+
+def _extract_suggestions(response_text: str) -> List[str]:
+    """Sugerencias de preguntas incluidas al final de la respuesta, o genéricas si no hay"""
+    suggestions = []
+    if "sugerencias" in response_text.lower() or "preguntas" in response_text.lower():
+        # Intentar extraer las sugerencias
+        lines = response_text.split('\n')
+        for line in lines:
+            if line.strip().startswith(('-', '•', '*', '1.', '2.', '3.')):
+                suggestion = line.strip().lstrip('-•*0123456789. ')
+                if len(suggestion) > 10 and '?' in suggestion:
+                    suggestions.append(suggestion)
+    
+    # Si no encontró sugerencias, agregar unas genéricas
+    if not suggestions:
+        suggestions = [
+            "¿Qué espacios tienen proyector disponible?",
+            "¿Cuál es el espacio con mayor capacidad?",
+            "¿Qué espacios están disponibles ahora?"
+        ]
+    return suggestions[:3]
+
+
+def _find_spaces_mentioned(response_text: str, all_spaces: list) -> List[dict]:
+    """Espacios cuyo nombre aparece en la respuesta (una sola pasada, sin distinguir tildes)"""
+    return [
+        {
+            "id": space.id,
+            "nombre": space.nombre,
+            "tipo": space.tipo,
+            "disponible": space.estado == "disponible"
+        }
+        for space in space_matcher.find(response_text, all_spaces)
+    ]
+
+
+@router.post("/chat", response_model=ChatResponse, summary="Chat con el asistente IA", dependencies=[Depends(ai_rate_limit("chat", "chat"))])
 async def chat_with_assistant(
     chat_message: ChatMessage,
     db: AsyncSession = Depends(get_db),
@@ -189,6 +342,9 @@ async def chat_with_assistant(
     - Recomendaciones de espacios según necesidades
     - Información sobre equipos y características
     - Consultas generales sobre el sistema
+    
+    La conversación se guarda en el servidor: envíe el `session_id` devuelto en los
+    mensajes siguientes para continuarla sin reenviar el contexto.
     """
     if not settings.GEMINI_API_KEY:
         raise HTTPException(
@@ -200,111 +356,53 @@ async def chat_with_assistant(
         # Obtener información de espacios para contexto
         all_spaces = await SpaceCRUD.get_all(db)
         
-        # Crear resumen de espacios para el contexto
-        spaces_summary = []
-        for space in all_spaces[:20]:  # Limitar a 20 espacios para el contexto
-            spaces_summary.append({
-                "id": space.id,
-                "nombre": space.nombre,
-                "tipo": space.tipo,
-                "capacidad": space.capacidad,
-                "ubicacion": space.ubicacion,
-                "estado": space.estado,
-                "disponible": space.estado == "disponible",
-                "caracteristicas": space.caracteristicas if space.caracteristicas else []
-            })
-        
-        # Configurar Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        
-        # Obtener nombre del usuario
-        user_name = current_user.nombre_completo or current_user.username
-        
-        # Crear el prompt con contexto
-        system_context = f"""Eres un asistente virtual inteligente del Sistema de Gestión de Espacios Físicos "SpaceIQ".
-Tu rol es ayudar a los usuarios a:
-1. Encontrar espacios disponibles según sus necesidades
-2. Proporcionar información sobre las características y equipos de los espacios
-3. Dar recomendaciones basadas en capacidad, tipo de espacio y equipamiento
-4. Responder preguntas sobre el sistema
-
-Información actual de espacios disponibles (total: {len(all_spaces)}):
-{json.dumps(spaces_summary, indent=2, ensure_ascii=False)}
-
-El usuario actual es: {user_name} ({current_user.email})
-
-Reglas:
-- Responde siempre en español
-- Sé conciso pero informativo
-- Si el usuario pregunta por un espacio específico, proporciona detalles completos
-- Si no tienes información suficiente, indícalo claramente
-- Sugiere opciones alternativas cuando sea apropiado
-- IMPORTANTE: NO generes planos ASCII, diagramas de texto, ni representaciones visuales con caracteres. Si el usuario pregunta sobre distribución de espacios, recomiéndale usar el "Asistente IA" en el menú lateral donde hay herramientas gráficas especializadas para eso.
-- Al final de tu respuesta, incluye 2-3 sugerencias de preguntas relacionadas
-
-Contexto adicional del usuario: {chat_message.context or 'Ninguno'}
-"""
-        
-        full_prompt = f"{system_context}\n\nPregunta del usuario: {chat_message.message}"
-        
-        # Generar respuesta (ejecutar en thread pool para async)
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(full_prompt)
-        )
-        
-        if not response or not response.text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No se pudo obtener respuesta del modelo de IA"
+        # Modelo compartido con las reglas del asistente como system instruction
+        model = ai_client.get_model(GEMINI_MODEL, system_instruction=CHAT_SYSTEM_INSTRUCTION)
+        session = chat_sessions.get_or_create(chat_message.session_id, current_user.id)
+        user_label = f"{current_user.nombre_completo or current_user.username} ({current_user.email})"
+        
+        async with session.lock:
+            contents, turn_message = await chat_sessions.prepare_turn(
+                session,
+                chat_message.message,
+                all_spaces,
+                user_label,
+                context=chat_message.context,
+                summarizer=_summarize_turns
             )
-        
-        response_text = response.text
-        
-        # Extraer sugerencias del texto (si las incluyó)
-        suggestions = []
-        if "sugerencias" in response_text.lower() or "preguntas" in response_text.lower():
-            # Intentar extraer las sugerencias
-            lines = response_text.split('\n')
-            for line in lines:
-                if line.strip().startswith(('-', '•', '*', '1.', '2.', '3.')):
-                    suggestion = line.strip().lstrip('-•*0123456789. ')
-                    if len(suggestion) > 10 and '?' in suggestion:
-                        suggestions.append(suggestion)
-        
-        # Si no encontró sugerencias, agregar unas genéricas
-        if not suggestions:
-            suggestions = [
-                "¿Qué espacios tienen proyector disponible?",
-                "¿Cuál es el espacio con mayor capacidad?",
-                "¿Qué espacios están disponibles ahora?"
-            ]
-        
-        # Buscar espacios mencionados en la respuesta
-        spaces_mentioned = []
-        for space in all_spaces:
-            if space.nombre.lower() in response_text.lower():
-                spaces_mentioned.append({
-                    "id": space.id,
-                    "nombre": space.nombre,
-                    "tipo": space.tipo,
-                    "disponible": space.estado == "disponible"
-                })
+            
+            # Generar respuesta (ejecutar en thread pool para async)
+            loop = asyncio.get_event_loop()
+            response = await ai_breaker.call(lambda: loop.run_in_executor(
+                executor,
+                lambda: generate_content("chat", model, contents)
+            ))
+            
+            if not response or not response.text:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="No se pudo obtener respuesta del modelo de IA"
+                )
+            
+            response_text = response.text
+            chat_sessions.record_turn(session, turn_message, response_text)
         
         logger.info(f"Chat response generated for user {current_user.email}")
         
         return ChatResponse(
             response=response_text,
-            suggestions=suggestions[:3],
+            suggestions=_extract_suggestions(response_text),
             timestamp=datetime.utcnow().isoformat(),
             model_used="gemini-2.0-flash",
-            spaces_mentioned=spaces_mentioned
+            spaces_mentioned=_find_spaces_mentioned(response_text, all_spaces),
+            session_id=session.id
         )
         
     except HTTPException:
         raise
+    except AIUnavailableError as e:
+        logger.warning(f"Chat sin IA disponible: {e}")
+        raise _ai_unavailable(e)
     except Exception as e:
         logger.error(f"Error en chat: {e}")
         raise HTTPException(
@@ -313,7 +411,106 @@ Contexto adicional del usuario: {chat_message.context or 'Ninguno'}
         )
 
 
-@router.post("/quick-search", summary="Búsqueda rápida de espacios con IA")
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream", summary="Chat con el asistente IA (streaming SSE)", dependencies=[Depends(ai_rate_limit("chat", "chat_stream"))])
+async def chat_with_assistant_stream(
+    chat_message: ChatMessage,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Igual que `/chat`, pero la respuesta se envía como Server-Sent Events a medida
+    que el modelo la genera.
+    
+    Eventos:
+    - **token**: `{"text": "..."}` con cada fragmento de texto generado
+    - **done**: `{"suggestions": [...], "spaces_mentioned": [...], "session_id": "...", "model_used": "...", "timestamp": "..."}`
+    - **error**: `{"detail": "..."}` si la generación falla a mitad del stream
+    """
+    if not settings.GEMINI_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de IA no configurado. Contacte al administrador."
+        )
+    
+    all_spaces = await SpaceCRUD.get_all(db)
+    model = ai_client.get_model(GEMINI_MODEL, system_instruction=CHAT_SYSTEM_INSTRUCTION)
+    session = chat_sessions.get_or_create(chat_message.session_id, current_user.id)
+    user_label = f"{current_user.nombre_completo or current_user.username} ({current_user.email})"
+    user_email = current_user.email
+    # Los espacios ya están cargados; liberar la conexión mientras dura la generación
+    await db.close()
+    
+    async def event_stream():
+        async with session.lock:
+            chunks = []
+            try:
+                contents, turn_message = await chat_sessions.prepare_turn(
+                    session,
+                    chat_message.message,
+                    all_spaces,
+                    user_label,
+                    context=chat_message.context,
+                    summarizer=_summarize_turns
+                )
+                async for text in stream_text(model, contents, executor):
+                    if await request.is_disconnected():
+                        return
+                    chunks.append(text)
+                    yield _sse("token", {"text": text})
+            except Exception as e:
+                logger.error(f"Error en chat stream: {e}")
+                yield _sse("error", {"detail": f"Error al procesar el mensaje: {str(e)}"})
+                return
+            
+            response_text = "".join(chunks)
+            chat_sessions.record_turn(session, turn_message, response_text)
+        
+        logger.info(f"Chat stream completed for user {user_email}")
+        yield _sse("done", {
+            "suggestions": _extract_suggestions(response_text),
+            "spaces_mentioned": _find_spaces_mentioned(response_text, all_spaces),
+            "session_id": session.id,
+            "model_used": GEMINI_MODEL,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/chat/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Finalizar una sesión de chat")
+async def delete_chat_session(
+    session_id: str,
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Elimina la memoria de una conversación del usuario actual.
+    
+    - **session_id**: ID devuelto por `/chat` o `/chat/stream`
+    """
+    if not chat_sessions.delete(session_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sesión no encontrada"
+        )
+
+
+class QuickSearchAIResult(BaseModel):
+    """Estructura esperada de la respuesta de IA en la búsqueda rápida"""
+    matching_spaces: List[dict] = []
+    search_interpretation: str = ""
+    alternative_suggestions: List[str] = []
+
+
+@router.post("/quick-search", summary="Búsqueda rápida de espacios con IA", dependencies=[Depends(ai_rate_limit("ai", "quick_search"))])
 async def quick_search(
     query: str,
     db: AsyncSession = Depends(get_db),
@@ -349,8 +546,7 @@ async def quick_search(
                 "caracteristicas": space.caracteristicas if space.caracteristicas else []
             })
         
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        model = ai_client.get_model(GEMINI_MODEL)
         
         prompt = f"""Analiza la siguiente consulta de búsqueda y encuentra los espacios más relevantes.
 
@@ -376,34 +572,20 @@ Responde ÚNICAMENTE con un JSON válido con esta estructura:
 Ordena por relevance_score descendente. Máximo 5 resultados."""
 
         # Ejecutar en thread pool para async
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(prompt)
+        ai_result = await generate_json(
+            model, prompt, QuickSearchAIResult, endpoint="quick-search", executor=executor
         )
         
-        if response and response.text:
-            # Limpiar la respuesta de posibles marcadores de código
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            result = json.loads(text.strip())
-            result["query"] = query
-            result["total_spaces_searched"] = len(all_spaces)
-            result["model_used"] = "gemini-2.0-flash"
-            result["timestamp"] = datetime.utcnow().isoformat()
-            return result
-        
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="No se pudo procesar la búsqueda"
-        )
+        result = ai_result.model_dump()
+        result["query"] = query
+        result["total_spaces_searched"] = len(all_spaces)
+        result["model_used"] = "gemini-2.0-flash"
+        result["timestamp"] = datetime.utcnow().isoformat()
+        return result
         
+    except AIUnavailableError as e:
+        logger.warning(f"Quick search sin IA, usando ranking local: {e}")
+        return _local_quick_search(query, spaces_data)
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing JSON response: {e}")
         raise HTTPException(
@@ -418,6 +600,46 @@ Ordena por relevance_score descendente. Máximo 5 resultados."""
         )
 
 
+def _local_quick_search(query: str, spaces_data: List[dict]) -> dict:
+    """Búsqueda con el parser y el ranking locales, con la misma forma que la respuesta de la IA"""
+    parsed = request_parser.parse(query)
+    ranked = reservation_ranker.rank(
+        [s for s in spaces_data if s["disponible"]],
+        capacidad_minima=parsed.capacidad or 1,
+        equipamiento=parsed.equipamiento,
+        tipo_espacio=parsed.tipo_espacio
+    )[:5]
+    
+    criterios = []
+    if parsed.capacidad:
+        criterios.append(f"capacidad para {parsed.capacidad} personas")
+    if parsed.tipo_espacio:
+        criterios.append(f"tipo {parsed.tipo_espacio}")
+    if parsed.equipamiento:
+        criterios.append(f"con {', '.join(parsed.equipamiento)}")
+    
+    return {
+        "matching_spaces": [
+            {
+                "id": r.space["id"],
+                "nombre": r.space["nombre"],
+                "relevance_score": r.score,
+                "reason": reservation_ranker.explain(r)
+            }
+            for r in ranked
+        ],
+        "search_interpretation": (
+            f"Búsqueda local: {'; '.join(criterios)}" if criterios
+            else "Búsqueda local: sin criterios reconocidos, se listan los espacios disponibles"
+        ),
+        "alternative_suggestions": [],
+        "query": query,
+        "total_spaces_searched": len(spaces_data),
+        "model_used": "local-ranking",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 # ==================== RESERVA INTELIGENTE CON IA ====================
 
 class SmartReservationRequest(BaseModel):
@@ -448,7 +670,19 @@ class SmartReservationResponse(BaseModel):
     timestamp: str = ""
 
 
-@router.post("/smart-reservation", response_model=SmartReservationResponse, summary="Reserva inteligente con IA")
+class SmartReservationAIResult(BaseModel):
+    """Estructura esperada de la respuesta de IA en la reserva inteligente"""
+    espacio_seleccionado_id: Optional[int] = None
+    puntuacion: Optional[float] = None
+    eficiencia_uso: Optional[float] = None
+    razon_seleccion: str = ""
+    requerimientos_extraidos: dict = {}
+    alternativas_ids: List[int] = []
+    advertencias: List[str] = []
+    recomendaciones_adicionales: str = ""
+
+
+@router.post("/smart-reservation", response_model=SmartReservationResponse, summary="Reserva inteligente con IA", dependencies=[Depends(ai_rate_limit("ai", "smart_reservation"))])
 async def create_smart_reservation(
     request: SmartReservationRequest,
     db: AsyncSession = Depends(get_db),
@@ -464,13 +698,12 @@ async def create_smart_reservation(
     - "Necesito un aula para 20 estudiantes con proyector para el lunes de 8 a 10am"
     - "Busco un laboratorio de informática con capacidad para 30 personas"
     - "Requiero un auditorio grande para una conferencia el viernes"
-    """
     
-    if not settings.GEMINI_API_KEY:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="El servicio de IA no está configurado"
-        )
+    Si la solicitud trae `capacidad_minima`, `fecha_preferida` y `hora_inicio_preferida`
+    (directamente o extraídos de `descripcion` por el parser local), el espacio se elige
+    con el ranking local sin llamar a la IA. La IA solo se usa para las descripciones
+    que el parser no logra interpretar.
+    """
     
     try:
         # 1. Obtener todos los espacios disponibles
@@ -484,6 +717,23 @@ async def create_smart_reservation(
                 timestamp=datetime.utcnow().isoformat()
             )
         
+        user_name = current_user.nombre_completo or current_user.username
+        
+        # Completar los campos vacíos con lo que el parser local extrae de la descripción
+        request = _apply_parsed_request(request, request_parser.parse(request.descripcion))
+        
+        # Requerimientos estructurados completos: ranking local, sin IA
+        slot = _structured_slot(request)
+        if slot:
+            return await _local_smart_reservation(request, db, available_spaces, slot, user_name)
+        logger.info(f"Descripción no resuelta localmente, se consulta a la IA: {request.descripcion[:100]}")
+        
+        if not settings.GEMINI_API_KEY:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El servicio de IA no está configurado"
+            )
+        
         # 2. Pre-filtrar espacios por capacidad si se especifica (optimización)
         capacidad_solicitada = request.capacidad_minima
         capacidad_max = request.capacidad_maxima
@@ -526,8 +776,6 @@ async def create_smart_reservation(
             })
         
         # 3. Construir el prompt para la IA
-        user_name = current_user.nombre_completo or current_user.username
-        
         prompt = f"""Eres un asistente experto en gestión de espacios universitarios. Tu tarea es analizar los requerimientos del usuario y seleccionar el MEJOR espacio disponible, OPTIMIZANDO EL USO DE LA CAPACIDAD.
 
 ⚠️ REGLA CRÍTICA DE OPTIMIZACIÓN DE CAPACIDAD:
@@ -581,31 +829,12 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
 }}"""
 
         # 4. Llamar a Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
+        model = ai_client.get_model(GEMINI_MODEL)
         
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(prompt)
-        )
-        
-        if not response or not response.text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No se pudo obtener respuesta de la IA"
-            )
-        
-        # 5. Parsear respuesta de la IA
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        ai_result = json.loads(text.strip())
+        # 5. Parsear y validar la respuesta de la IA
+        ai_result = (await generate_json(
+            model, prompt, SmartReservationAIResult, endpoint="smart-reservation", executor=executor
+        )).model_dump()
         logger.info(f"Respuesta IA: {ai_result}")
         
         # 6. Obtener el espacio seleccionado
@@ -646,8 +875,6 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
         # 8. Crear la reserva si se solicita y hay un espacio seleccionado
         reserva_creada = None
         if request.crear_reserva and selected_space:
-            from app.db.crud import AssignmentCRUD
-            
             # Determinar fechas
             fecha_str = ai_result.get("requerimientos_extraidos", {}).get("fecha_solicitada") or request.fecha_preferida
             hora_inicio = ai_result.get("requerimientos_extraidos", {}).get("hora_inicio") or request.hora_inicio_preferida or "08:00"
@@ -663,48 +890,21 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
                 fecha_base = datetime.utcnow()
             
             # Parsear horas
-            try:
-                hora_inicio_parts = hora_inicio.replace("am", "").replace("pm", "").replace("AM", "").replace("PM", "").strip().split(":")
-                hora_inicio_h = int(hora_inicio_parts[0])
-                hora_inicio_m = int(hora_inicio_parts[1]) if len(hora_inicio_parts) > 1 else 0
-                if "pm" in hora_inicio.lower() and hora_inicio_h < 12:
-                    hora_inicio_h += 12
-                
-                hora_fin_parts = hora_fin.replace("am", "").replace("pm", "").replace("AM", "").replace("PM", "").strip().split(":")
-                hora_fin_h = int(hora_fin_parts[0])
-                hora_fin_m = int(hora_fin_parts[1]) if len(hora_fin_parts) > 1 else 0
-                if "pm" in hora_fin.lower() and hora_fin_h < 12:
-                    hora_fin_h += 12
-            except:
-                hora_inicio_h, hora_inicio_m = 8, 0
-                hora_fin_h, hora_fin_m = 10, 0
+            hora_inicio_t = request_parser.parse_time(str(hora_inicio)) or time(8, 0)
+            hora_fin_t = request_parser.parse_time(str(hora_fin)) or time(10, 0)
             
-            fecha_inicio = fecha_base.replace(hour=hora_inicio_h, minute=hora_inicio_m, second=0, microsecond=0)
-            fecha_fin_dt = fecha_base.replace(hour=hora_fin_h, minute=hora_fin_m, second=0, microsecond=0)
+            fecha_inicio = datetime.combine(fecha_base.date(), hora_inicio_t)
+            fecha_fin_dt = datetime.combine(fecha_base.date(), hora_fin_t)
             
             # Crear la reserva/asignación
-            assignment = await AssignmentCRUD.create(
+            reserva_creada = await _create_reservation(
                 db,
-                room_id=selected_space.id,
-                resource_id=1,  # ID de recurso por defecto
-                fecha=fecha_inicio,
-                fecha_fin=fecha_fin_dt,
-                estado="activo",
+                selected_space,
+                fecha_inicio,
+                fecha_fin_dt,
+                user_name,
                 notas=f"Reserva inteligente por IA para {user_name}: {request.descripcion[:200]}"
             )
-            await db.commit()
-            
-            reserva_creada = {
-                "id": assignment.id,
-                "espacio_id": selected_space.id,
-                "espacio_nombre": selected_space.nombre,
-                "fecha_inicio": fecha_inicio.isoformat(),
-                "fecha_fin": fecha_fin_dt.isoformat(),
-                "estado": "activo",
-                "creado_por": user_name
-            }
-            
-            logger.info(f"Reserva creada: {reserva_creada}")
         
         # 9. Construir respuesta
         recomendaciones = ai_result.get("recomendaciones_adicionales", "")
@@ -734,6 +934,11 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
             timestamp=datetime.utcnow().isoformat()
         )
         
+    except HTTPException:
+        raise
+    except AIUnavailableError as e:
+        logger.warning(f"Reserva inteligente sin IA, usando ranking local: {e}")
+        return await _local_smart_reservation(request, db, available_spaces, slot, user_name)
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing AI response: {e}")
         raise HTTPException(
@@ -748,6 +953,170 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
         )
 
 
+def _apply_parsed_request(request: SmartReservationRequest, parsed: ParsedRequest) -> SmartReservationRequest:
+    """Rellena los campos no enviados con los extraídos de la descripción"""
+    update = {}
+    if not request.capacidad_minima and parsed.capacidad:
+        update["capacidad_minima"] = parsed.capacidad
+    if not request.fecha_preferida and parsed.fecha:
+        update["fecha_preferida"] = parsed.fecha.isoformat()
+    if not request.hora_inicio_preferida and parsed.hora_inicio:
+        update["hora_inicio_preferida"] = parsed.hora_inicio.strftime("%H:%M")
+        if not request.hora_fin_preferida and parsed.hora_fin:
+            update["hora_fin_preferida"] = parsed.hora_fin.strftime("%H:%M")
+    if not request.equipamiento_requerido and parsed.equipamiento:
+        update["equipamiento_requerido"] = parsed.equipamiento
+    if not request.tipo_espacio_preferido and parsed.tipo_espacio:
+        update["tipo_espacio_preferido"] = parsed.tipo_espacio
+    return request.model_copy(update=update) if update else request
+
+
+def _structured_slot(request: SmartReservationRequest) -> Optional[Tuple[datetime, datetime]]:
+    """Franja solicitada si los campos estructurados bastan para decidir sin IA"""
+    if not (request.capacidad_minima and request.fecha_preferida and request.hora_inicio_preferida):
+        return None
+    try:
+        inicio = datetime.strptime(f"{request.fecha_preferida} {request.hora_inicio_preferida}", "%Y-%m-%d %H:%M")
+        if request.hora_fin_preferida:
+            fin = datetime.strptime(f"{request.fecha_preferida} {request.hora_fin_preferida}", "%Y-%m-%d %H:%M")
+        else:
+            fin = inicio + timedelta(hours=2)
+    except ValueError:
+        return None
+    if fin <= inicio:
+        return None
+    return inicio, fin
+
+
+async def _create_reservation(
+    db: AsyncSession,
+    space,
+    fecha_inicio: datetime,
+    fecha_fin: datetime,
+    user_name: str,
+    notas: str
+) -> dict:
+    """Crea la asignación de una reserva inteligente y devuelve su resumen"""
+    assignment = await AssignmentCRUD.create(
+        db,
+        room_id=space.id,
+        resource_id=1,  # ID de recurso por defecto
+        fecha=fecha_inicio,
+        fecha_fin=fecha_fin,
+        estado="activo",
+        notas=notas
+    )
+    await db.commit()
+    
+    reserva_creada = {
+        "id": assignment.id,
+        "espacio_id": space.id,
+        "espacio_nombre": space.nombre,
+        "fecha_inicio": fecha_inicio.isoformat(),
+        "fecha_fin": fecha_fin.isoformat(),
+        "estado": "activo",
+        "creado_por": user_name
+    }
+    logger.info(f"Reserva creada: {reserva_creada}")
+    return reserva_creada
+
+
+async def _local_smart_reservation(
+    request: SmartReservationRequest,
+    db: AsyncSession,
+    available_spaces: list,
+    slot: Optional[Tuple[datetime, datetime]],
+    user_name: str
+) -> SmartReservationResponse:
+    """
+    Selecciona y reserva el espacio con el ranking local (capacidad, equipamiento, tipo, disponibilidad).
+    Sin franja (`slot` None, solo cuando la IA no está disponible) se sugiere el espacio sin reservarlo.
+    """
+    spaces_by_id = {s.id: s for s in available_spaces}
+    capacidad = request.capacidad_minima or 1
+    
+    occupied = set()
+    if slot:
+        fecha_inicio, fecha_fin = slot
+        overlapping = await AssignmentCRUD.get_overlapping(
+            db, fecha_inicio, fecha_fin, room_ids=list(spaces_by_id)
+        )
+        occupied = {a.room_id for a in overlapping}
+    
+    ranked = reservation_ranker.rank(
+        [
+            {
+                "id": s.id,
+                "nombre": s.nombre,
+                "tipo": s.tipo,
+                "capacidad": s.capacidad,
+                "ubicacion": s.ubicacion,
+                "caracteristicas": s.caracteristicas or []
+            }
+            for s in available_spaces
+        ],
+        capacidad_minima=capacidad,
+        equipamiento=request.equipamiento_requerido,
+        tipo_espacio=request.tipo_espacio_preferido,
+        capacidad_maxima=request.capacidad_maxima,
+        occupied_space_ids=occupied
+    )
+    
+    if slot:
+        analisis = (
+            f"Ranking local: {len(ranked)} espacios libres de {len(available_spaces)} disponibles "
+            f"para {capacidad} personas entre {fecha_inicio.strftime('%Y-%m-%d %H:%M')} "
+            f"y {fecha_fin.strftime('%H:%M')}"
+        )
+    else:
+        analisis = (
+            f"Ranking local (IA no disponible): {len(ranked)} espacios de {len(available_spaces)} disponibles "
+            f"para {capacidad} personas. Indique fecha y hora para crear la reserva"
+        )
+    if occupied:
+        analisis += f"\n⚠️ {len(occupied)} espacios ocupados en esa franja"
+    
+    if not ranked:
+        return SmartReservationResponse(
+            success=False,
+            message="No se encontró un espacio que cumpla los requisitos",
+            analisis_ia=analisis,
+            model_used="local-ranking",
+            timestamp=datetime.utcnow().isoformat()
+        )
+    
+    best = ranked[0]
+    selected_space_dict = {**best.space, "puntuacion": best.score}
+    alternativas = [r.space for r in ranked[1:4]]
+    
+    reserva_creada = None
+    if request.crear_reserva and slot:
+        reserva_creada = await _create_reservation(
+            db,
+            spaces_by_id[best.space["id"]],
+            fecha_inicio,
+            fecha_fin,
+            user_name,
+            notas=f"Reserva inteligente para {user_name}: {request.descripcion[:200]}"
+        )
+    
+    if best.equipamiento_faltante:
+        analisis += f"\n⚠️ Equipamiento no disponible: {', '.join(best.equipamiento_faltante)}"
+    
+    return SmartReservationResponse(
+        success=True,
+        message="Reserva creada exitosamente" if reserva_creada else "Espacio encontrado",
+        espacio_seleccionado=selected_space_dict,
+        alternativas=alternativas,
+        reserva_creada=reserva_creada,
+        analisis_ia=analisis,
+        razon_seleccion=reservation_ranker.explain(best),
+        eficiencia_uso=best.eficiencia,
+        model_used="local-ranking",
+        timestamp=datetime.utcnow().isoformat()
+    )
+
+
 # ==================== OPTIMIZACIÓN DE ESPACIOS CON IA ====================
 
 class OptimizationSuggestionsResponse(BaseModel):
@@ -761,7 +1130,15 @@ class OptimizationSuggestionsResponse(BaseModel):
     timestamp: str = ""
 
 
-@router.get("/optimize-suggestions", response_model=OptimizationSuggestionsResponse, summary="Obtener sugerencias de optimización con IA")
+class OptimizationSuggestionsAIResult(BaseModel):
+    """Estructura esperada de la respuesta de IA en las sugerencias de optimización"""
+    suggestions: List[str] = []
+    detailed_analysis: List[dict] = []
+    optimization_score: Optional[float] = None
+    estimated_improvement: Optional[float] = None
+
+
+@router.get("/optimize-suggestions", response_model=OptimizationSuggestionsResponse, summary="Obtener sugerencias de optimización con IA", dependencies=[Depends(ai_rate_limit("ai", "optimize_suggestions"))])
 async def get_optimization_suggestions(
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -779,46 +1156,30 @@ async def get_optimization_suggestions(
         )
     
     try:
-        # Obtener todos los espacios y asignaciones
-        all_spaces = await SpaceCRUD.get_all(db, limit=200)
+        # Métricas agregadas desde el almacén incremental; solo la muestra se lee de la BD
+        await space_metrics.ensure_loaded(db)
+        sample_spaces = await SpaceCRUD.get_all(db, limit=30)
         
-        from app.db.crud import AssignmentCRUD
-        active_assignments = await AssignmentCRUD.get_active(db)
-        
-        # Preparar datos de espacios
         spaces_info = []
-        spaces_with_assignments = set()
-        
-        for assignment in active_assignments:
-            spaces_with_assignments.add(assignment.space_id)
-        
-        type_counts = {}
-        total_capacity = 0
-        occupied_count = 0
-        
-        for space in all_spaces:
-            tipo = space.tipo or "Sin tipo"
-            type_counts[tipo] = type_counts.get(tipo, 0) + 1
-            total_capacity += space.capacidad or 0
-            
-            is_assigned = space.id in spaces_with_assignments
-            if is_assigned or space.estado != "disponible":
-                occupied_count += 1
-            
+        for space in sample_spaces:
             features = space.caracteristicas if isinstance(space.caracteristicas, list) else []
             spaces_info.append({
                 "id": space.id,
                 "nombre": space.nombre,
-                "tipo": tipo,
+                "tipo": space.tipo or "Sin tipo",
                 "capacidad": space.capacidad,
                 "estado": space.estado,
-                "en_uso": is_assigned,
+                "en_uso": space_metrics.assignments_of(space.id) > 0,
                 "caracteristicas": features,
                 "ubicacion": space.ubicacion or "No especificada"
             })
         
+        type_counts = space_metrics.type_counts
+        total_capacity = space_metrics.total_capacity
+        occupied_count = space_metrics.occupied
+        
         # Calcular métricas
-        total_spaces = len(all_spaces)
+        total_spaces = space_metrics.space_count
         utilization_rate = (occupied_count / total_spaces * 100) if total_spaces > 0 else 0
         avg_capacity = (total_capacity / total_spaces) if total_spaces > 0 else 0
         
@@ -836,7 +1197,7 @@ DISTRIBUCIÓN POR TIPO:
 {json.dumps(type_counts, indent=2, ensure_ascii=False)}
 
 DETALLES DE LOS ESPACIOS (muestra):
-{json.dumps(spaces_info[:30], indent=2, ensure_ascii=False)}
+{json.dumps(spaces_info, indent=2, ensure_ascii=False)}
 
 INSTRUCCIONES:
 Genera un análisis de optimización con sugerencias ESPECÍFICAS basadas en los datos reales.
@@ -873,44 +1234,25 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
 Las sugerencias deben ser en español, específicas, accionables y basadas en los datos proporcionados."""
 
         # Llamar a Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(prompt)
-        )
-        
-        if not response or not response.text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No se pudo obtener respuesta de la IA"
-            )
+        model = ai_client.get_model(GEMINI_MODEL)
         
         # Parsear respuesta
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        ai_result = json.loads(text.strip())
+        ai_result = await generate_json(
+            model, prompt, OptimizationSuggestionsAIResult, endpoint="optimize-suggestions", executor=executor
+        )
         logger.info(f"Respuesta de optimización IA: {ai_result}")
         
         return OptimizationSuggestionsResponse(
             success=True,
-            suggestions=ai_result.get("suggestions", []),
-            detailed_analysis=ai_result.get("detailed_analysis", []),
-            optimization_score=ai_result.get("optimization_score", utilization_rate / 100),
-            estimated_improvement=ai_result.get("estimated_improvement", 15.0),
+            suggestions=ai_result.suggestions,
+            detailed_analysis=ai_result.detailed_analysis,
+            optimization_score=ai_result.optimization_score if ai_result.optimization_score is not None else utilization_rate / 100,
+            estimated_improvement=ai_result.estimated_improvement if ai_result.estimated_improvement is not None else 15.0,
             model_used=GEMINI_MODEL,
             timestamp=datetime.utcnow().isoformat()
         )
         
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, AIUnavailableError) as e:
         logger.error(f"Error parsing AI optimization response: {e}")
         # Retornar sugerencias básicas basadas en métricas
         basic_suggestions = []
@@ -975,6 +1317,17 @@ class ElementoDistribucion(BaseModel):
     columnas: Optional[int] = None
 
 
+class SpaceLayoutAIResult(BaseModel):
+    """Estructura esperada de la respuesta de IA en el análisis de distribución"""
+    es_viable: Optional[bool] = None
+    viabilidad_detalle: Optional[str] = None
+    distribucion_optima: Optional[List[dict]] = None
+    dimensiones_sugeridas: Optional[dict] = None
+    recomendaciones: List[str] = []
+    advertencias: List[str] = []
+    alternativas_si_no_viable: List[dict] = []
+
+
 class SpaceLayoutResponse(BaseModel):
     """Respuesta del análisis de distribución"""
     es_viable: bool
@@ -1007,53 +1360,7 @@ class SpaceLayoutResponse(BaseModel):
     timestamp: str = ""
 
 
-# Constantes de referencia para cálculos de espacio
-# IMPORTANTE: 
-# - PC/Computador: YA INCLUYE escritorio y silla (estación de trabajo completa)
-# - Pupitre: YA INCLUYE mesa y silla (todo en uno)
-# - Proyector: Va en el TECHO, no ocupa espacio en el suelo
-# - Pantalla/Pizarra: Va en la PARED, espacio frontal mínimo para visibilidad
-ESPACIO_REFERENCIA = {
-    # Estación de trabajo completa (PC + escritorio + silla + espacio circulación)
-    "computador": {"area": 2.5, "min_separacion": 0.8, "incluye": ["escritorio", "silla"], "descripcion": "Estación completa con escritorio y silla"},
-    "pc": {"area": 2.5, "min_separacion": 0.8, "incluye": ["escritorio", "silla"], "descripcion": "Estación completa con escritorio y silla"},
-    
-    # Mobiliario educativo individual
-    "pupitre": {"area": 1.0, "min_separacion": 0.5, "incluye": ["mesa", "silla"], "descripcion": "Pupitre unipersonal (mesa+silla integradas)"},
-    "silla": {"area": 0.5, "min_separacion": 0.3, "descripcion": "Silla individual sin mesa"},
-    "escritorio_estudiante": {"area": 1.2, "min_separacion": 0.5, "descripcion": "Mesa individual sin silla"},
-    "mesa_trabajo": {"area": 2.0, "min_separacion": 0.6, "descripcion": "Mesa de trabajo compartida"},
-    
-    # Equipo audiovisual (mayoría NO ocupa espacio en suelo)
-    "proyector": {"area": 0.0, "min_separacion": 0, "ubicacion": "techo", "descripcion": "Proyector en techo - no ocupa suelo"},
-    "pantalla": {"area": 0.5, "min_separacion": 2.0, "ubicacion": "pared", "descripcion": "Pantalla en pared - espacio frontal para visibilidad"},
-    "televisor": {"area": 0.3, "min_separacion": 1.5, "ubicacion": "pared", "descripcion": "TV en pared o soporte"},
-    "video_beam": {"area": 0.0, "min_separacion": 0, "ubicacion": "techo", "descripcion": "Video beam en techo"},
-    
-    # Espacio instructor/docente
-    "escritorio_profesor": {"area": 2.5, "min_separacion": 1.0, "descripcion": "Escritorio docente con silla"},
-    "pizarra": {"area": 0.0, "min_separacion": 2.5, "ubicacion": "pared", "descripcion": "Pizarra en pared - requiere espacio frontal"},
-    
-    # Laboratorio
-    "mesa_laboratorio": {"area": 3.5, "min_separacion": 1.0, "descripcion": "Mesa de laboratorio para 2 personas"},
-    "equipo_laboratorio": {"area": 1.5, "min_separacion": 0.8, "descripcion": "Equipo de laboratorio en mesa"},
-    
-    # Estacionamiento (m² por espacio - dimensiones reales)
-    "vehiculo": {"area": 11.25, "min_separacion": 0.6, "descripcion": "Espacio vehicular estándar 2.5m x 4.5m"},
-    "motocicleta": {"area": 1.4, "min_separacion": 0.3, "descripcion": "Espacio moto 0.7m x 2m"},
-    "vehiculo_discapacitado": {"area": 15.75, "min_separacion": 0.6, "descripcion": "Espacio PMR 3.5m x 4.5m"},
-    
-    # Oficina
-    "escritorio_oficina": {"area": 3.5, "min_separacion": 0.8, "descripcion": "Puesto de trabajo oficina completo"},
-    "archivador": {"area": 0.6, "min_separacion": 0.5, "descripcion": "Archivador vertical"},
-    
-    # Auditorio/Sala de eventos
-    "butaca": {"area": 0.6, "min_separacion": 0.1, "descripcion": "Butaca fija de auditorio"},
-    "silla_plegable": {"area": 0.5, "min_separacion": 0.2, "descripcion": "Silla plegable para eventos"},
-}
-
-
-@router.post("/analyze-space-layout", response_model=SpaceLayoutResponse, summary="Analizar distribución de espacio")
+@router.post("/analyze-space-layout", response_model=SpaceLayoutResponse, summary="Analizar distribución de espacio", dependencies=[Depends(ai_rate_limit("ai", "analyze_space_layout"))])
 async def analyze_space_layout(
     request: SpaceLayoutRequest,
     db: AsyncSession = Depends(get_db),
@@ -1081,17 +1388,9 @@ async def analyze_space_layout(
         # 1. Calcular área utilizable (descontando pasillos y circulación)
         area_total = request.metros_cuadrados
         
-        # Factor de utilización según tipo de espacio
-        factores_utilizacion = {
-            "aula": 0.70,  # 70% utilizable, 30% pasillos/circulación
-            "laboratorio": 0.65,
-            "parqueadero": 0.75,  # Incluye carriles de circulación
-            "auditorio": 0.80,
-            "oficina": 0.65,
-            "sala_conferencias": 0.75,
-        }
-        
-        factor = factores_utilizacion.get(request.tipo_espacio.lower(), 0.70)
+        # Factor de utilización según tipo de espacio (70% en aulas: 30% pasillos/circulación)
+        factor = reference_data.factor(request.tipo_espacio)
+        elementos_ref = reference_data.elementos
         area_utilizable = area_total * factor
         
         # 2. Calcular área requerida por elementos
@@ -1102,8 +1401,8 @@ async def analyze_space_layout(
             tipo = elemento.get("tipo", "").lower()
             cantidad = elemento.get("cantidad", 0)
             
-            if tipo in ESPACIO_REFERENCIA:
-                area_unitaria = ESPACIO_REFERENCIA[tipo]["area"]
+            if tipo in elementos_ref:
+                area_unitaria = elementos_ref[tipo]["area"]
             else:
                 # Área por defecto si no está en referencia
                 area_unitaria = 2.0
@@ -1132,32 +1431,32 @@ async def analyze_space_layout(
         # Para parqueaderos
         if request.tipo_espacio.lower() == "parqueadero":
             if request.espacios_vehiculos:
-                area_vehiculos = request.espacios_vehiculos * ESPACIO_REFERENCIA["vehiculo"]["area"]
+                area_vehiculos = request.espacios_vehiculos * elementos_ref["vehiculo"]["area"]
                 area_requerida += area_vehiculos
                 elementos_detalle.append({
                     "tipo": "espacio_vehiculo",
                     "cantidad": request.espacios_vehiculos,
-                    "area_unitaria": ESPACIO_REFERENCIA["vehiculo"]["area"],
+                    "area_unitaria": elementos_ref["vehiculo"]["area"],
                     "area_total": area_vehiculos
                 })
             
             if request.espacios_motos:
-                area_motos = request.espacios_motos * ESPACIO_REFERENCIA["motocicleta"]["area"]
+                area_motos = request.espacios_motos * elementos_ref["motocicleta"]["area"]
                 area_requerida += area_motos
                 elementos_detalle.append({
                     "tipo": "espacio_motocicleta",
                     "cantidad": request.espacios_motos,
-                    "area_unitaria": ESPACIO_REFERENCIA["motocicleta"]["area"],
+                    "area_unitaria": elementos_ref["motocicleta"]["area"],
                     "area_total": area_motos
                 })
             
             if request.espacios_discapacitados:
-                area_disc = request.espacios_discapacitados * ESPACIO_REFERENCIA["vehiculo_discapacitado"]["area"]
+                area_disc = request.espacios_discapacitados * elementos_ref["vehiculo_discapacitado"]["area"]
                 area_requerida += area_disc
                 elementos_detalle.append({
                     "tipo": "espacio_discapacitado",
                     "cantidad": request.espacios_discapacitados,
-                    "area_unitaria": ESPACIO_REFERENCIA["vehiculo_discapacitado"]["area"],
+                    "area_unitaria": elementos_ref["vehiculo_discapacitado"]["area"],
                     "area_total": area_disc
                 })
         
@@ -1238,31 +1537,12 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
 IMPORTANTE: NO generes planos ASCII ni representaciones visuales de texto. El sistema tiene visualización gráfica."""
 
         # 5. Llamar a Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(prompt)
-        )
-        
-        if not response or not response.text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No se pudo obtener respuesta de la IA"
-            )
+        model = ai_client.get_model(GEMINI_MODEL)
         
         # 6. Parsear respuesta
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        ai_result = json.loads(text.strip())
+        ai_result = (await generate_json(
+            model, prompt, SpaceLayoutAIResult, endpoint="analyze-space-layout", executor=executor
+        )).model_dump(exclude_none=True)
         logger.info(f"Respuesta de análisis de espacio IA: {ai_result}")
         
         # 7. Construir respuesta
@@ -1285,7 +1565,7 @@ IMPORTANTE: NO generes planos ASCII ni representaciones visuales de texto. El si
             timestamp=datetime.utcnow().isoformat()
         )
         
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, AIUnavailableError) as e:
         logger.error(f"Error parsing AI space layout response: {e}")
         
         # Respuesta básica sin IA
@@ -1319,48 +1599,40 @@ IMPORTANTE: NO generes planos ASCII ni representaciones visuales de texto. El si
         )
 
 
-@router.get("/space-reference-data", summary="Obtener datos de referencia de espacios")
+@router.get("/space-reference-data", summary="Obtener datos de referencia de espacios", dependencies=[Depends(conditional(lambda request: reference_data.etag, REFERENCE_CACHE_CONTROL))])
 async def get_space_reference_data(
     current_user = Depends(get_current_active_user)
 ):
     """
     Retorna los datos de referencia para cálculos de espacio.
     Útil para que el frontend muestre información de ayuda al usuario.
+    El cuerpo se serializa una vez por versión; con `If-None-Match` se responde 304.
     """
-    return {
-        "elementos_referencia": ESPACIO_REFERENCIA,
-        "tipos_espacio": [
-            {"id": "aula", "nombre": "Aula de clases", "factor_utilizacion": 0.70},
-            {"id": "laboratorio", "nombre": "Laboratorio de cómputo", "factor_utilizacion": 0.65},
-            {"id": "parqueadero", "nombre": "Parqueadero", "factor_utilizacion": 0.75},
-            {"id": "auditorio", "nombre": "Auditorio", "factor_utilizacion": 0.80},
-            {"id": "oficina", "nombre": "Oficina", "factor_utilizacion": 0.65},
-            {"id": "sala_conferencias", "nombre": "Sala de conferencias", "factor_utilizacion": 0.75},
-        ],
-        "normativas": {
-            "aula": {
-                "m2_por_estudiante_minimo": 1.5,
-                "ancho_pasillo_minimo": 1.2,
-                "distancia_pizarra_primera_fila": 2.0
-            },
-            "laboratorio": {
-                "m2_por_puesto_minimo": 2.0,
-                "separacion_equipos": 0.8,
-                "ventilacion_requerida": True
-            },
-            "parqueadero": {
-                "ancho_vehiculo_estandar": 2.5,
-                "largo_vehiculo_estandar": 5.0,
-                "ancho_discapacitado": 3.6,
-                "ancho_carril_circulacion": 6.0
-            }
-        }
-    }
+    return Response(
+        content=reference_data.body,
+        media_type="application/json",
+        headers={"ETag": reference_data.etag, "Cache-Control": REFERENCE_CACHE_CONTROL}
+    )
+
+
+@router.post("/space-reference-data/reload", summary="Recargar datos de referencia desde archivo")
+async def reload_space_reference_data(
+    current_user = Depends(require_role(["admin"]))
+):
+    """
+    Recarga los datos de referencia desde `REFERENCE_DATA_FILE` sin reiniciar el servidor.
+    El archivo tiene la misma forma que la respuesta de `/space-reference-data`.
+    """
+    try:
+        version = reference_data.reload()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"version": version, "source": reference_data.source}
 
 
 # ==================== PROGRAMADOR DE CLASES CON IA ====================
 
-@router.post("/schedule-classes", response_model=ScheduleClassesResponse, summary="Programar múltiples clases con IA")
+@router.post("/schedule-classes", response_model=ScheduleClassesResponse, summary="Programar múltiples clases con IA", dependencies=[Depends(ai_rate_limit("ai", "schedule_classes"))])
 async def schedule_classes(
     request: ScheduleClassesRequest,
     db: AsyncSession = Depends(get_db),
@@ -1431,9 +1703,8 @@ async def schedule_classes(
                 materias_por_semestre[sem] = []
             materias_por_semestre[sem].append(m["materia"])
         
-        # Configurar Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
+        # Obtener el modelo compartido
+        model = ai_client.get_model(GEMINI_MODEL)
         
         prompt = f"""Eres un sistema experto en programación académica. Tu tarea es asignar espacios físicos a las siguientes materias evitando cualquier conflicto.
 
@@ -1518,49 +1789,27 @@ RESPONDE ÚNICAMENTE CON UN JSON VÁLIDO con esta estructura exacta:
 Si hay conflictos que no puedes resolver, márcalos claramente pero intenta programar las demás materias.
 Si no hay suficientes espacios, indica cuáles materias no pudieron ser programadas y por qué."""
 
-        # Ejecutar en thread pool para async
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(prompt)
+        # Ejecutar en thread pool y validar contra ScheduledClass / ScheduleConflict
+        ai_result = await generate_json(
+            model, prompt, ScheduleClassesAIResult, endpoint="schedule-classes", executor=executor
         )
-        
-        if not response or not response.text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No se pudo obtener respuesta del modelo de IA"
-            )
-        
-        # Limpiar respuesta
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        ai_result = json.loads(text.strip())
-        logger.info(f"Programación de clases generada: {len(ai_result.get('clases_programadas', []))} clases")
+        logger.info(f"Programación de clases generada: {len(ai_result.clases_programadas)} clases")
         
         # Construir respuesta
-        return ScheduleClassesResponse(
-            success=ai_result.get("success", False),
-            mensaje=ai_result.get("mensaje", "Programación completada"),
-            clases_programadas=[
-                ScheduledClass(**clase) for clase in ai_result.get("clases_programadas", [])
-            ],
-            conflictos=[
-                ScheduleConflict(**conf) for conf in ai_result.get("conflictos", [])
-            ],
-            espacios_utilizados=ai_result.get("espacios_utilizados", []),
-            resumen=ai_result.get("resumen", {}),
-            recomendaciones=ai_result.get("recomendaciones", []),
-            horario_generado=ai_result.get("horario_generado"),
+        result = ScheduleClassesResponse(
+            **ai_result.model_dump(),
             model_used=GEMINI_MODEL,
             timestamp=datetime.utcnow().isoformat()
         )
-        
+        last_good.put("schedule-classes", result, key=_request_key(request))
+        return result
+        
+    except AIUnavailableError as e:
+        cached = last_good.get("schedule-classes", _request_key(request))
+        if not cached:
+            raise _ai_unavailable(e)
+        logger.warning(f"Programación de clases sin IA, se devuelve el último resultado: {e}")
+        return cached[0]
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing AI schedule response: {e}")
         raise HTTPException(
@@ -1620,6 +1869,34 @@ class HorarioItem(BaseModel):
     equipamiento: List[str] = []
 
 
+class GeneratedHorarioItem(HorarioItem):
+    """HorarioItem tal como lo devuelve la IA: campos opcionales y números aceptados como texto"""
+    materia: str = ""
+    semestre: str = ""
+    programa: str = ""
+    docente: str = "Por asignar"
+    dia: str = ""
+    hora_inicio: str = ""
+    hora_fin: str = ""
+    espacio: str = ""
+    
+    class Config:
+        coerce_numbers_to_str = True
+
+
+class GenerateScheduleAIResult(BaseModel):
+    """Estructura esperada de la respuesta de IA al generar horarios"""
+    success: bool = True
+    message: str = "Horario generado exitosamente"
+    horarios: List[GeneratedHorarioItem] = []
+    conflictos: List[str] = []
+    estadisticas: dict = {}
+    horario_por_dia: dict = {}
+    horario_por_semestre: dict = {}
+    espacios_asignados: List[dict] = []
+    recomendaciones: List[str] = []
+
+
 class GenerateScheduleResponse(BaseModel):
     """Respuesta del generador de horarios - formato esperado por frontend"""
     success: bool
@@ -1635,7 +1912,7 @@ class GenerateScheduleResponse(BaseModel):
     timestamp: str = ""
 
 
-@router.post("/generate-schedule", response_model=GenerateScheduleResponse, summary="Generar horario académico con IA")
+@router.post("/generate-schedule", response_model=GenerateScheduleResponse, summary="Generar horario académico con IA", dependencies=[Depends(ai_rate_limit("ai", "generate_schedule"))])
 async def generate_schedule(
     request: GenerateScheduleRequest,
     db: AsyncSession = Depends(get_db),
@@ -1736,9 +2013,8 @@ async def generate_schedule(
                 grupos_estudiantes[key] = []
             grupos_estudiantes[key].append(m['nombre_materia'])
         
-        # Configurar Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
+        # Obtener el modelo compartido
+        model = ai_client.get_model(GEMINI_MODEL)
         
         prompt = f"""Eres un experto sistema de programación académica universitaria. Tu tarea es crear un horario óptimo para las siguientes materias.
 
@@ -1831,63 +2107,35 @@ IMPORTANTE:
 - El campo "conflictos" debe ser un array de strings descriptivos"""
 
         # Ejecutar en thread pool
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            executor,
-            lambda: model.generate_content(prompt)
+        # Ejecutar en thread pool y validar contra HorarioItem
+        ai_result = await generate_json(
+            model, prompt, GenerateScheduleAIResult, endpoint="generate-schedule", executor=executor
         )
-        
-        if not response or not response.text:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="No se pudo obtener respuesta del modelo de IA"
-            )
-        
-        # Limpiar respuesta
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        ai_result = json.loads(text.strip())
-        logger.info(f"Horario generado: {len(ai_result.get('horarios', []))} bloques de clase")
-        
-        # Convertir horarios a formato esperado
-        horarios_formateados = []
-        for clase in ai_result.get("horarios", []):
-            horarios_formateados.append(HorarioItem(
-                materia=clase.get("materia", ""),
-                semestre=str(clase.get("semestre", "")),
-                programa=clase.get("programa", ""),
-                docente=clase.get("docente", "Por asignar"),
-                dia=clase.get("dia", ""),
-                hora_inicio=clase.get("hora_inicio", ""),
-                hora_fin=clase.get("hora_fin", ""),
-                espacio=clase.get("espacio", ""),
-                espacio_id=clase.get("espacio_id"),
-                capacidad_espacio=clase.get("capacidad_espacio"),
-                estudiantes=clase.get("estudiantes"),
-                equipamiento=clase.get("equipamiento", [])
-            ))
+        logger.info(f"Horario generado: {len(ai_result.horarios)} bloques de clase")
         
         # Construir respuesta
-        return GenerateScheduleResponse(
-            success=ai_result.get("success", True),
-            message=ai_result.get("message", "Horario generado exitosamente"),
-            horarios=horarios_formateados,
-            conflictos=ai_result.get("conflictos", []),
-            estadisticas=ai_result.get("estadisticas", {}),
-            horario_por_dia=ai_result.get("horario_por_dia", {}),
-            horario_por_semestre=ai_result.get("horario_por_semestre", {}),
-            espacios_asignados=ai_result.get("espacios_asignados", []),
-            recomendaciones=ai_result.get("recomendaciones", []),
+        result = GenerateScheduleResponse(
+            success=ai_result.success,
+            message=ai_result.message,
+            horarios=[HorarioItem(**clase.model_dump()) for clase in ai_result.horarios],
+            conflictos=ai_result.conflictos,
+            estadisticas=ai_result.estadisticas,
+            horario_por_dia=ai_result.horario_por_dia,
+            horario_por_semestre=ai_result.horario_por_semestre,
+            espacios_asignados=ai_result.espacios_asignados,
+            recomendaciones=ai_result.recomendaciones,
             model_used=GEMINI_MODEL,
             timestamp=datetime.utcnow().isoformat()
         )
-        
+        last_good.put("generate-schedule", result, key=_request_key(request))
+        return result
+        
+    except AIUnavailableError as e:
+        cached = last_good.get("generate-schedule", _request_key(request))
+        if not cached:
+            raise _ai_unavailable(e)
+        logger.warning(f"Generación de horario sin IA, se devuelve el último resultado: {e}")
+        return cached[0]
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing AI schedule response: {e}")
         raise HTTPException(
@@ -0,0 +1,150 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from typing import List
+
+from app.db.session import get_db
+from app.db.crud import JobCRUD
+from app.schemas.job import JobCreate, JobResponse, OptimizationJobParams, PredictionJobParams
+from app.schemas.assignment import OptimizationRequest
+from app.schemas.analytics import SimulationRequest
+from app.api.v1.auth import get_current_active_user
+from app.api.v1 import assignments, analytics, chatbot
+from app.services.jobs import job_queue
+from app.services.rate_limit import ai_limiter
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+# Long-running endpoints that can be executed as background jobs. Each handler
+# calls the regular endpoint function with the worker's own session. Calling
+# the function directly skips the route's ai_rate_limit dependency, so AI job
+# types are charged to their bucket on submit (ai_group) and hold the same
+# concurrency slot as the endpoint while they run.
+
+async def _run_optimization(db: AsyncSession, user, parametros: dict):
+    params = OptimizationJobParams(**parametros)
+    request = OptimizationRequest(**params.model_dump(exclude={"use_ai"}))
+    return await assignments.optimize_assignments(request, use_ai=params.use_ai, db=db, current_user=user)
+
+
+async def _run_predictions(db: AsyncSession, user, parametros: dict):
+    params = PredictionJobParams(**parametros)
+    return await analytics.get_predictions(
+        days_ahead=params.days_ahead, use_ai=params.use_ai, db=db, current_user=user
+    )
+
+
+async def _run_simulation(db: AsyncSession, user, parametros: dict):
+    return await analytics.run_simulation(SimulationRequest(**parametros), db=db, current_user=user)
+
+
+async def _run_generate_schedule(db: AsyncSession, user, parametros: dict):
+    request = chatbot.GenerateScheduleRequest(**parametros)
+    async with ai_limiter.concurrency("generate_schedule", "ai"):
+        return await chatbot.generate_schedule(request, db=db, current_user=user)
+
+
+async def _run_schedule_classes(db: AsyncSession, user, parametros: dict):
+    request = chatbot.ScheduleClassesRequest(**parametros)
+    async with ai_limiter.concurrency("schedule_classes", "ai"):
+        return await chatbot.schedule_classes(request, db=db, current_user=user)
+
+
+job_queue.register(
+    "optimize_assignments", _run_optimization, OptimizationJobParams,
+    titulo="Optimización de asignaciones", roles=["admin", "estudiante"]
+)
+job_queue.register("predictions", _run_predictions, PredictionJobParams, titulo="Predicciones de uso")
+job_queue.register(
+    "simulate", _run_simulation, SimulationRequest,
+    titulo="Simulación de escenario", roles=["admin", "estudiante"]
+)
+job_queue.register(
+    "generate_schedule", _run_generate_schedule, chatbot.GenerateScheduleRequest,
+    titulo="Generación de horario", ai_group="ai"
+)
+job_queue.register(
+    "schedule_classes", _run_schedule_classes, chatbot.ScheduleClassesRequest,
+    titulo="Programación de clases", ai_group="ai"
+)
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED, summary="Submit background job")
+async def create_job(
+    job_data: JobCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Queue a long-running operation and return immediately with its job id.
+    
+    - **tipo**: optimize_assignments, predictions, simulate, generate_schedule, schedule_classes
+    - **parametros**: Same body (and query parameters) as the synchronous endpoint
+    
+    AI job types count against the same rate limits as their endpoints (429 when exceeded).
+    Poll `GET /jobs/{id}` for the result, or wait for the completion notification.
+    """
+    job_type = job_queue.get_type(job_data.tipo)
+    if not job_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job type '{job_data.tipo}'. Available: {', '.join(job_queue.types)}"
+        )
+    
+    if job_type.roles and current_user.rol not in job_type.roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operation not permitted for this role"
+        )
+    
+    try:
+        parametros = job_queue.validate(job_data.tipo, job_data.parametros)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False)
+        )
+    
+    if job_type.ai_group:
+        await ai_limiter.check(job_type.ai_group, current_user.id)
+    
+    job = await job_queue.submit(db, current_user.id, job_data.tipo, parametros)
+    return job
+
+
+@router.get("", response_model=List[JobResponse], summary="Get user jobs")
+async def get_jobs(
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(50, ge=1, le=100, description="Maximum records to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    List the current user's jobs, newest first.
+    
+    - **skip**: Number of records to skip (default: 0)
+    - **limit**: Maximum number of records to return (default: 50, max: 100)
+    """
+    jobs = await JobCRUD.get_by_user(db, current_user.id, skip, limit)
+    return jobs
+
+
+@router.get("/{job_id}", response_model=JobResponse, summary="Get job status")
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Get the status, progress and result of a job.
+    
+    - **job_id**: Job ID returned by `POST /jobs`
+    """
+    job = await JobCRUD.get_by_id(db, job_id)
+    if not job or (job.user_id != current_user.id and current_user.rol != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id {job_id} not found"
+        )
+    return job
@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+import asyncio
+import json
 
 from app.db.session import get_db
 from app.db.crud import NotificationCRUD, NotificationSettingsCRUD
 from app.schemas.notification import (
-    NotificationCreate, NotificationResponse,
+    NotificationCreate, NotificationResponse, UnreadCountResponse,
+    NotificationBulkRead, NotificationBulkReadResponse,
     NotificationSettingsBase, NotificationSettingsUpdate, NotificationSettingsResponse
 )
 from app.api.v1.auth import get_current_active_user, require_role
+from app.services.notifications import notification_service
+from app.services import pubsub
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
+# Seconds between SSE comments that keep idle connections open through proxies
+STREAM_KEEPALIVE_SECONDS = 15
+
 
 @router.get("", response_model=List[NotificationResponse], summary="Get user notifications")
 async def get_notifications(
@@ -28,12 +37,59 @@ async def get_notifications(
     - **limit**: Maximum number of records to return (default: 50, max: 100)
     - **unread_only**: Filter only unread notifications
     """
-    notifications = await NotificationCRUD.get_by_user(db, current_user.id, skip, limit)
+    notifications = await NotificationCRUD.get_by_user(
+        db, current_user.id, skip, limit, unread_only=unread_only
+    )
+    return notifications
+
+
+@router.get("/unread-count", response_model=UnreadCountResponse, summary="Get unread notification count")
+async def get_unread_count(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Get the number of unread notifications for the current user.
     
-    if unread_only:
-        notifications = [n for n in notifications if not n.leida]
+    Served from an in-process per-user counter; intended for badge polling.
+    """
+    unread = await notification_service.get_unread_count(db, current_user.id)
+    return UnreadCountResponse(unread=unread)
+
+
+@router.get("/stream", summary="Stream new notifications (SSE)")
+async def stream_notifications(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Push new notifications for the current user as Server-Sent Events.
     
-    return notifications
+    Each notification arrives as a `notification` event whose data is the
+    notification JSON. A comment line is sent every few seconds as keep-alive.
+    """
+    user_id = current_user.id
+    # Authentication is the only DB work; give the connection back to the pool
+    # so idle listeners hold no database resources.
+    await db.close()
+
+    async def event_stream():
+        async with pubsub.hub.subscribe(pubsub.user_channel(user_id)) as queue:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: notification\ndata: {json.dumps(message, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("", response_model=NotificationResponse, status_code=status.HTTP_201_CREATED, summary="Create notification")
@@ -53,9 +109,42 @@ async def create_notification(
     - **tipo**: Notification type (info, warning, error, success)
     """
     notification = await NotificationCRUD.create(db, **notification_data.model_dump())
+    await notification_service.publish_created(db, notification)
     return notification
 
 
+@router.put("/read", response_model=NotificationBulkReadResponse, summary="Mark notifications as read in bulk")
+async def mark_many_as_read(
+    bulk_data: NotificationBulkRead,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Mark several of the current user's notifications as read in one update.
+    
+    - **ids**: Notification IDs to mark as read (optional)
+    - **before**: Mark every notification created at or before this timestamp (optional)
+    
+    At least one of the two must be provided; when both are given, both apply.
+    """
+    if bulk_data.ids is None and bulk_data.before is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide notification ids or a 'before' timestamp"
+        )
+    
+    updated = await notification_service.mark_notifications_read(
+        db,
+        current_user.id,
+        notification_ids=bulk_data.ids,
+        before=bulk_data.before
+    )
+    return NotificationBulkReadResponse(
+        message=f"{updated} notifications marked as read",
+        updated=updated
+    )
+
+
 @router.put("/{notification_id}/read", summary="Mark notification as read")
 async def mark_as_read(
     notification_id: int,
@@ -65,9 +154,9 @@ async def mark_as_read(
     """
     Mark a notification as read.
     
-    - **notification_id**: Notification ID to mark as read
+    - **notification_id**: Notification ID to mark as read (404 if it belongs to another user)
     """
-    success = await NotificationCRUD.mark_as_read(db, notification_id)
+    success = await notification_service.mark_notification_read(db, notification_id, current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
@@ -7,12 +7,14 @@ from app.db.crud import ResourceCRUD, CategoryCRUD
 from app.schemas.resource import ResourceCreate, ResourceUpdate, ResourceResponse
 from app.schemas.category import CategoryResponse
 from app.api.v1.auth import get_current_active_user, require_role
+from app.core.http_cache import response_cache
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
 
-@router.get("", response_model=List[ResourceResponse], summary="Get all resources")
+@router.get("", response_model=List[ResourceResponse], summary="Get all resources", dependencies=[Depends(response_cache.conditional("resources"))])
 async def get_resources(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
     db: AsyncSession = Depends(get_db),
@@ -23,13 +25,18 @@ async def get_resources(
     
     - **skip**: Number of records to skip (default: 0)
     - **limit**: Maximum number of records to return (default: 100, max: 1000)
+
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 while no resource changed.
     """
-    resources = await ResourceCRUD.get_all(db, skip=skip, limit=limit)
-    return resources
+    etag, cached = response_cache.lookup(request, "resources")
+    if cached:
+        return cached
+    return response_cache.store(request, etag, await ResourceCRUD.get_rows(db, skip=skip, limit=limit))
 
 
-@router.get("/categories", response_model=List[CategoryResponse], summary="Get all resource categories")
+@router.get("/categories", response_model=List[CategoryResponse], summary="Get all resource categories", dependencies=[Depends(response_cache.conditional("categories"))])
 async def get_categories(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
@@ -38,8 +45,11 @@ async def get_categories(
     
     Categories are used to organize and classify resources.
     """
+    etag, cached = response_cache.lookup(request, "categories")
+    if cached:
+        return cached
     categories = await CategoryCRUD.get_all(db)
-    return categories
+    return response_cache.store(request, etag, [CategoryResponse.model_validate(c) for c in categories])
 
 
 @router.get("/{resource_id}", response_model=ResourceResponse, summary="Get resource by ID")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
@@ -6,12 +6,16 @@ from app.db.session import get_db
 from app.db.crud import SpaceCRUD
 from app.schemas.space import SpaceCreate, SpaceUpdate, SpaceResponse, SpaceAvailable
 from app.api.v1.auth import get_current_active_user, require_role
+from app.core.http_cache import response_cache
+from app.core.query_budget import query_budget
 
 router = APIRouter(prefix="/spaces", tags=["Spaces"])
 
 
-@router.get("", response_model=List[SpaceResponse], summary="Get all spaces")
+@router.get("", response_model=List[SpaceResponse], summary="Get all spaces", dependencies=[Depends(response_cache.conditional("spaces"))])
+@query_budget(1)
 async def get_spaces(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
     db: AsyncSession = Depends(get_db),
@@ -22,12 +26,17 @@ async def get_spaces(
     
     - **skip**: Number of records to skip (default: 0)
     - **limit**: Maximum number of records to return (default: 100, max: 1000)
+
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 while no space changed.
     """
-    spaces = await SpaceCRUD.get_all(db, skip=skip, limit=limit)
-    return spaces
+    etag, cached = response_cache.lookup(request, "spaces")
+    if cached:
+        return cached
+    return response_cache.store(request, etag, await SpaceCRUD.get_rows(db, skip=skip, limit=limit))
 
 
 @router.get("/available", response_model=List[SpaceAvailable], summary="Get available spaces")
+@query_budget(1)
 async def get_available_spaces(
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -50,8 +59,10 @@ async def get_available_spaces(
     ]
 
 
-@router.get("/{space_id}", response_model=SpaceResponse, summary="Get space by ID")
+@router.get("/{space_id}", response_model=SpaceResponse, summary="Get space by ID", dependencies=[Depends(response_cache.conditional("spaces"))])
+@query_budget(1)
 async def get_space(
+    request: Request,
     space_id: int,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -61,16 +72,20 @@ async def get_space(
     
     - **space_id**: Unique space identifier
     """
+    etag, cached = response_cache.lookup(request, "spaces")
+    if cached:
+        return cached
     space = await SpaceCRUD.get_by_id(db, space_id)
     if not space:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Space with id {space_id} not found"
         )
-    return space
+    return response_cache.store(request, etag, SpaceResponse.model_validate(space))
 
 
 @router.post("", response_model=SpaceResponse, status_code=status.HTTP_201_CREATED, summary="Create new space")
+@query_budget(2)
 async def create_space(
     space_data: SpaceCreate,
     db: AsyncSession = Depends(get_db),
@@ -93,6 +108,7 @@ async def create_space(
 
 
 @router.put("/{space_id}", response_model=SpaceResponse, summary="Update space")
+@query_budget(3)
 async def update_space(
     space_id: int,
     space_data: SpaceUpdate,
@@ -125,6 +141,7 @@ async def update_space(
 
 
 @router.delete("/{space_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete space")
+@query_budget(2)
 async def delete_space(
     space_id: int,
     db: AsyncSession = Depends(get_db),
@@ -10,8 +10,34 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     GEMINI_API_KEY: Optional[str] = None
+    GEMINI_MODEL: str = "gemini-2.0-flash"
+    AI_WARMUP: bool = True
+    CHAT_SESSIONS_MAX: int = 500
+    CHAT_TOKEN_BUDGET: int = 4000
+    RATE_LIMIT_ENABLED: bool = True
+    AI_RATE_LIMIT_PER_MINUTE: int = 20
+    AI_RATE_LIMIT_BURST: int = 10
+    AI_GLOBAL_RATE_LIMIT_PER_MINUTE: int = 120
+    AI_MAX_CONCURRENCY: int = 3
+    AI_CALL_TIMEOUT: float = 30.0
+    AI_SLOW_CALL_SECONDS: float = 15.0
+    AI_BREAKER_FAILURE_RATE: float = 0.5
+    AI_BREAKER_OPEN_SECONDS: float = 30.0
+    SIMULATION_REPLICATIONS: int = 20
+    SIMULATION_WORKERS: int = 0  # 0 = one process per CPU
+    SPACE_METRICS_RECONCILE_SECONDS: float = 300.0
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    METRICS_ENABLED: bool = True  # request/SQL/AI instrumentation
+    METRICS_TOKEN: Optional[str] = None  # GET /metrics is served only when set, to "Authorization: Bearer <token>"
+    QUERY_BUDGET_STRICT: bool = False  # raise instead of logging when a @query_budget handler exceeds its budget
+    REFERENCE_DATA_FILE: Optional[str] = None  # JSON with the shape of /chatbot/space-reference-data
     DEBUG: bool = True
     APP_NAME: str = "Sistema de Gestión Inteligente de Espacios Físicos"
+    JOB_WORKERS: int = 2
+    JOB_HEARTBEAT_SECONDS: float = 15.0
+    JOB_STALE_SECONDS: float = 90.0  # en_proceso jobs without a heartbeat for this long are failed
 
     class Config:
         env_file = ".env"
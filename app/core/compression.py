@@ -0,0 +1,221 @@
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import gzip
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.routes import route_path
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/problem+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/csv",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "text/xml",
+})
+
+# Event streams must reach the client as soon as each event is written; compressing them
+# would either buffer events or depend on every proxy honouring flushes.
+STREAMING_TYPES = frozenset({"text/event-stream", "application/x-ndjson", "application/jsonl"})
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best of ``br`` and ``gzip`` accepted by the client (q > 0), preferring brotli when available."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    candidates = [(accepted.get(name, wildcard), -i, name) for i, name in enumerate(offered)]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+class _StreamCompressor:
+    """Incremental compressor flushed after every chunk, so streamed bodies are not held back."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionStats:
+    """Per route path: responses, compressed responses, bytes before and after compression."""
+
+    def __init__(self):
+        self.routes: Dict[str, List[int]] = {}
+
+    def reset(self) -> None:
+        self.routes.clear()
+
+    def record(self, path: str, compressed: bool, original: int, sent: int) -> None:
+        entry = self.routes.setdefault(path, [0, 0, 0, 0])
+        entry[0] += 1
+        entry[1] += int(compressed)
+        entry[2] += original
+        entry[3] += sent
+
+    def bytes_saved(self) -> int:
+        return sum(original - sent for _, _, original, sent in self.routes.values())
+
+    def largest(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """(path, bytes before, bytes sent) of the ``n`` routes with the most response bytes."""
+        ranked = sorted(self.routes.items(), key=lambda item: -item[1][2])
+        return [(path, entry[2], entry[3]) for path, entry in ranked[:n]]
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression.
+
+    A response is compressed when the client accepts an encoding, it has
+    no Content-Encoding yet, its media type is in ``content_types`` and
+    its body is at least ``minimum_size`` bytes. Single-message bodies
+    are compressed in one call. Streamed bodies are compressed chunk by
+    chunk with a flush after each one. SSE and NDJSON are never touched.
+    A strong ETag is made weak on compressed responses, since the bytes
+    differ from the identity representation.
+
+    Bytes before and after compression are recorded per route template
+    in ``stats``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        content_types: FrozenSet[str] = COMPRESSIBLE_TYPES,
+        stats: CompressionStats = compression_stats
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = content_types
+        self.stats = stats
+
+    def _record(self, scope: Scope, compressed: bool, original: int, sent: int) -> None:
+        self.stats.record(route_path(scope), compressed, original, sent)
+
+    def _compressible(self, headers: Headers) -> bool:
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return (
+            "content-encoding" not in headers
+            and media_type in self.content_types
+            and media_type not in STREAMING_TYPES
+        )
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    @staticmethod
+    def _encoded_headers(message: Message, encoding: str) -> MutableHeaders:
+        headers = MutableHeaders(raw=message["headers"])
+        headers["Content-Encoding"] = encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+        totals = [0, 0]
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                passthrough = not self._compressible(Headers(raw=message["headers"]))
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if passthrough:
+                totals[0] += len(body)
+                totals[1] += len(body)
+                await send(message)
+                if not more_body:
+                    self._record(scope, False, *totals)
+                return
+
+            if compressor is None and not more_body:
+                # Whole body in one message: compress it if it is worth it
+                if len(body) < self.minimum_size:
+                    await send(start)
+                    await send(message)
+                    self._record(scope, False, len(body), len(body))
+                    return
+                compressed = self._compress(encoding, body)
+                headers = self._encoded_headers(start, encoding)
+                headers["Content-Length"] = str(len(compressed))
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed})
+                self._record(scope, True, len(body), len(compressed))
+                return
+
+            if compressor is None:
+                compressor = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = self._encoded_headers(start, encoding)
+                del headers["Content-Length"]
+                await send(start)
+            chunk = compressor.compress(body, final=not more_body)
+            totals[0] += len(body)
+            totals[1] += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            if not more_body:
+                self._record(scope, True, *totals)
+
+        await self.app(scope, receive, send_compressed)
+
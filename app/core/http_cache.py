@@ -0,0 +1,119 @@
+from typing import Any, Callable, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import uuid
+
+from fastapi import Depends, Request, Response
+
+from app.core.responses import dumps
+from app.core.security import oauth2_scheme, verify_token_type
+from app.db.versions import table_versions
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class NotModified(Exception):
+    """Raised by ``conditional`` when the client already holds the current representation."""
+
+    def __init__(self, etag: str, cache_control: str = CACHE_CONTROL):
+        self.etag = etag
+        self.cache_control = cache_control
+
+
+def conditional(etag_of: Callable[[Request], str], cache_control: str = CACHE_CONTROL) -> Callable:
+    """
+    Route dependency answering ``If-None-Match`` with 304 when it matches
+    ``etag_of(request)``. Only the JWT is checked; declare it in the route's
+    ``dependencies`` so it runs before ``get_db`` and
+    ``get_current_active_user``.
+    """
+    async def check(request: Request, token: str = Depends(oauth2_scheme)) -> None:
+        verify_token_type(token, "access")
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return
+        etag = etag_of(request)
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            raise NotModified(etag, cache_control)
+
+    return check
+
+
+class ResponseCache:
+    """
+    ETag revalidation and serialized bodies for read-mostly GET endpoints.
+
+    The ETag of a response is a hash of the process boot id, the request
+    path and query, and the versions of the tables the response is built
+    from. Since those versions are bumped by the CRUD write methods, an
+    ``If-None-Match`` can be answered with 304 by comparing counters, before
+    the user or any row is loaded; only the JWT is checked. Other requests
+    are served from an LRU of serialized bodies keyed by the same ETag, so
+    an unchanged catalogue is neither queried nor re-serialized.
+
+    Like every cache built on ``table_versions``, this assumes a single
+    worker: a write made by another process is not seen here. The boot id
+    keeps a restarted process from validating ETags issued by the old one.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.boot = uuid.uuid4().hex
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @staticmethod
+    def key(request: Request) -> str:
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def etag(self, key: str, tables: Tuple[str, ...]) -> str:
+        versions = ",".join(f"{table}:{table_versions.get(table)}" for table in tables)
+        digest = hashlib.blake2b(f"{self.boot}|{key}|{versions}".encode(), digest_size=12).hexdigest()
+        return f'"{digest}"'
+
+    def conditional(self, *tables: str) -> Callable:
+        """``conditional`` for a response built from ``tables``."""
+        return conditional(lambda request: self.etag(self.key(request), tables))
+
+    def lookup(self, request: Request, *tables: str) -> Tuple[str, Optional[Response]]:
+        """
+        Current ETag for the request and the cached response, if any. Table
+        versions are bumped after the writing transaction commits and the
+        ETag is taken before the data is read, so the rows read are never
+        older than the ETag they are stored under; a write racing with the
+        read only leaves an entry that the next request misses.
+        """
+        key = self.key(request)
+        etag = self.etag(key, tables)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == etag:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return etag, self._response(etag, entry[1])
+        self.stats["misses"] += 1
+        return etag, None
+
+    def store(self, request: Request, etag: str, content: Any) -> Response:
+        body = dumps(content)
+        key = self.key(request)
+        self._entries[key] = (etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return self._response(etag, body)
+
+    @staticmethod
+    def _response(etag: str, body: bytes) -> Response:
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,255 @@
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.routes import route_path
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+AI_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}  # labels -> bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return int(sum(series[:-1])) if series else 0
+
+    def total(self, **labels: str) -> float:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[-1] if series else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', _number(bound)),))} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {int(cumulative)}")
+        return lines
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# A collector returns (name, type, help, [(labels, value), ...]) families read at scrape time
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Labels, float]]]]]
+
+
+class Metrics:
+    """
+    In-process request instrumentation exposed at GET /metrics.
+
+    MetricsMiddleware times every request by route template, method and
+    status. SQLAlchemy cursor events, registered once on the Engine
+    class, count the queries and DB time of the request that issued them.
+    The count goes into a per-route histogram, so an N+1 regression shows
+    up as a shift in ``http_request_db_queries``. Queries outside a
+    request (background jobs, reconciliation) are counted separately. AI
+    calls are timed with ``ai_call``. Gauges and counters owned by other
+    services (executors, rate limiter, circuit breaker, caches) are read
+    from registered collectors when the endpoint is scraped.
+    """
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Request latency by route", LATENCY_BUCKETS
+        )
+        self.request_queries = Histogram(
+            "http_request_db_queries", "SQL statements executed per request", QUERY_BUCKETS
+        )
+        self.request_db_seconds = Histogram(
+            "http_request_db_seconds", "Time spent in SQL statements per request", LATENCY_BUCKETS
+        )
+        self.ai_duration = Histogram(
+            "ai_call_duration_seconds", "Duration of generate_content calls", AI_BUCKETS
+        )
+        self.background_queries = 0
+        self.background_db_seconds = 0.0
+        self._collectors: List[Collector] = []
+        self._installed = False
+
+    def reset(self) -> None:
+        for histogram in (self.request_duration, self.request_queries, self.request_db_seconds, self.ai_duration):
+            histogram.reset()
+        self.background_queries = 0
+        self.background_db_seconds = 0.0
+
+    # ---- SQL ----
+
+    def install_sql_hooks(self) -> None:
+        if self._installed:
+            return
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+        self._installed = True
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        starts = conn.info.get("metrics_query_start")
+        elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+        stats = _request_stats.get()
+        if stats is None:
+            self.background_queries += 1
+            self.background_db_seconds += elapsed
+        else:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    # ---- AI ----
+
+    @contextmanager
+    def ai_call(self, call: str) -> Iterator[None]:
+        """Time a model call; safe to use from executor threads."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.ai_duration.observe(time.perf_counter() - start, call=call, outcome=outcome)
+
+    # ---- exposition ----
+
+    def register(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in (self.request_duration, self.request_queries, self.request_db_seconds, self.ai_duration):
+            lines.extend(histogram.render())
+        families = [
+            ("db_background_queries_total", "counter", "SQL statements executed outside HTTP requests",
+             [((), self.background_queries)]),
+            ("db_background_seconds_total", "counter", "Time spent in SQL statements outside HTTP requests",
+             [((), self.background_db_seconds)]),
+        ]
+        for collector in self._collectors:
+            families.extend(collector())
+        # Collectors may contribute samples to the same family (e.g. one per executor)
+        merged: Dict[str, Tuple[str, str, List[Tuple[Labels, float]]]] = {}
+        for name, kind, help, samples in families:
+            merged.setdefault(name, (kind, help, []))[2].extend(samples)
+        for name, (kind, help, samples) in merged.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def executor_collector(name: str, executor: Callable[[], Optional[Executor]]) -> Collector:
+    """Queue depth, threads/processes and capacity of a concurrent.futures pool (None when not started)."""
+    def collect():
+        pool = executor()
+        if pool is None:
+            queued, workers = 0, 0
+        elif isinstance(pool, ThreadPoolExecutor):
+            queued, workers = pool._work_queue.qsize(), len(pool._threads)
+        else:
+            queued, workers = len(getattr(pool, "_pending_work_items", ())), len(getattr(pool, "_processes", None) or ())
+        labels = (("executor", name),)
+        capacity = getattr(pool, "_max_workers", 0) if pool is not None else 0
+        return [
+            ("executor_queued_tasks", "gauge", "Tasks submitted and not yet started", [(labels, queued)]),
+            ("executor_workers", "gauge", "Threads or processes started", [(labels, workers)]),
+            ("executor_max_workers", "gauge", "Pool capacity", [(labels, capacity)]),
+        ]
+
+    return collect
+
+
+class MetricsMiddleware:
+    """Per-request latency, status and SQL accounting into ``metrics``."""
+
+    def __init__(self, app: ASGIApp, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_stats.reset(token)
+            route = route_path(scope) if scope.get("route") is not None else "unmatched"
+            self.registry.request_duration.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=str(status)
+            )
+            self.registry.request_queries.observe(stats.queries, route=route)
+            self.registry.request_db_seconds.observe(stats.db_seconds, route=route)
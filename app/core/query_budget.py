@@ -0,0 +1,97 @@
+from typing import Callable, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More SQL statements than the budget allows; lists the statements for the failure report."""
+
+    def __init__(self, label: str, budget: int, statements: List[str]):
+        self.label = label
+        self.budget = budget
+        self.statements = statements
+        listing = "\n".join(f"  {i}. {statement}" for i, statement in enumerate(statements, 1))
+        super().__init__(f"{label}: {len(statements)} SQL statements, budget is {budget}\n{listing}")
+
+
+class QueryCounter:
+    """Statements executed in the current context while the counter is active."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+_active: ContextVar[Tuple[QueryCounter, ...]] = ContextVar("query_counters", default=())
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    for counter in _active.get():
+        counter.statements.append(" ".join(statement.split()))
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Count the statements executed by this task (and the SQLAlchemy greenlets
+    it drives) until the block exits. Counters nest; concurrent requests do
+    not see each other's statements.
+    """
+    counter = QueryCounter()
+    token = _active.set(_active.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def max_queries(budget: int, label: str = "block", strict: bool = True) -> Iterator[QueryCounter]:
+    """``count_queries`` that fails (or only logs, if not ``strict``) when ``budget`` is exceeded."""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > budget:
+        error = QueryBudgetExceeded(label, budget, counter.statements)
+        if strict:
+            raise error
+        logger.warning(str(error))
+
+
+def query_budget(budget: int, strict: Optional[bool] = None) -> Callable:
+    """
+    Decorator for async handlers: at most ``budget`` statements per call.
+
+    Only the body of the handler is counted; dependencies (``get_db``,
+    ``get_current_active_user``) have already run. Over budget, the
+    handler raises ``QueryBudgetExceeded`` when ``strict`` (default
+    ``settings.QUERY_BUDGET_STRICT``, enabled by the test suite) and
+    otherwise logs a warning with the statements, so an N+1 is visible in
+    production logs without failing the request.
+    """
+    def decorator(func: Callable) -> Callable:
+        label = func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            enforce = settings.QUERY_BUDGET_STRICT if strict is None else strict
+            with max_queries(budget, label, enforce):
+                return await func(*args, **kwargs)
+
+        wrapper.query_budget = budget
+        return wrapper
+
+    return decorator
@@ -0,0 +1,24 @@
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes via orjson; types it does not know (Pydantic models, Decimal...) go through jsonable_encoder."""
+    return orjson.dumps(content, default=jsonable_encoder, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson, for endpoints that return plain rows
+    (see the ``get_rows`` CRUD projections) and skip response_model
+    validation. Routes with a response_model keep FastAPI's default class,
+    which already serializes them to bytes through Pydantic.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,21 @@
+from starlette.types import Scope
+
+
+def route_path(scope: Scope) -> str:
+    """
+    Path template of the route that handled the request ("/api/v1/spaces/{space_id}"),
+    or the raw path when no route matched. Routes of included routers only know
+    their own path, so the include prefix is taken from the request path.
+    """
+    path = scope.get("path", "")
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    regex = getattr(route, "path_regex", None)
+    if template is None or regex is None:
+        return path
+    if regex.match(path):
+        return template
+    for i, char in enumerate(path):
+        if char == "/" and i and regex.match(path[i:]):
+            return path[:i] + template
+    return template
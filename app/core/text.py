@@ -0,0 +1,65 @@
+from collections import deque
+from typing import Dict, Hashable, Iterator, List, Tuple
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace ("Auditorío  Principal" -> "auditorio principal")."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE.sub(" ", stripped.lower()).strip()
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: after ``build`` every occurrence of every pattern is
+    found in a single pass over the text. Patterns map to arbitrary keys.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[Hashable, int]]] = [[]]
+
+    def add(self, pattern: str, key: Hashable) -> None:
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((key, len(pattern)))
+
+    def build(self) -> "AhoCorasick":
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[Hashable, int, int]]:
+        """Yield (key, start, end) for every pattern occurrence in ``text``."""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for key, length in self._output[state]:
+                yield key, i + 1 - length, i + 1
@@ -0,0 +1,68 @@
+"""hot filter indexes
+
+Revision ID: 0002_hot_filter_indexes
+Revises: 0001_initial
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_filter_indexes'
+down_revision = '0001_initial'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) matched to the filters and sort orders used in
+# app/db/crud.py and the analytics routes.
+INDEXES = [
+    ('ix_spaces_estado', 'spaces', ['estado']),
+    ('ix_spaces_tipo', 'spaces', ['tipo']),
+    ('ix_resources_estado', 'resources', ['estado']),
+    ('ix_resources_categoria_id', 'resources', ['categoria_id']),
+    ('ix_assignments_estado', 'assignments', ['estado']),
+    ('ix_assignments_fecha', 'assignments', ['fecha']),
+    ('ix_assignments_room_id_fecha', 'assignments', ['room_id', 'fecha']),
+    ('ix_usage_data_fecha', 'usage_data', ['fecha']),
+    ('ix_usage_data_space_id_fecha', 'usage_data', ['space_id', 'fecha']),
+    ('ix_usage_data_resource_id_fecha', 'usage_data', ['resource_id', 'fecha']),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at']),
+    ('ix_notifications_user_id_leida', 'notifications', ['user_id', 'leida']),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {ix['name'] for ix in inspector.get_indexes(table)}
+
+
+def _is_covered(inspector, table, name, columns):
+    """True if the index exists by name or another index already has the same columns
+    (MySQL creates one implicitly for every foreign key)."""
+    for ix in inspector.get_indexes(table):
+        if ix['name'] == name or ix['column_names'] == columns:
+            return True
+    return False
+
+
+def upgrade():
+    # spaces, usage_data and notifications are created by init_db() rather than
+    # 0001_initial, so only touch tables that exist and skip indexes that
+    # create_all() already built from the models.
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for name, table, columns in INDEXES:
+        if table not in tables or _is_covered(inspector, table, name, columns):
+            continue
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for name, table, columns in reversed(INDEXES):
+        if table not in tables or name not in _existing_indexes(inspector, table):
+            continue
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,48 @@
+"""notifications unread index
+
+Revision ID: 0003_notifications_unread_index
+Revises: 0002_hot_filter_indexes
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_notifications_unread_index'
+down_revision = '0002_hot_filter_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _index_names(inspector):
+    return {ix['name'] for ix in inspector.get_indexes('notifications')}
+
+
+def upgrade():
+    # (user_id, leida, created_at) serves both the unread page, ordered by
+    # created_at, and the unread counter; it supersedes (user_id, leida).
+    inspector = sa.inspect(op.get_bind())
+    if 'notifications' not in inspector.get_table_names():
+        return
+
+    names = _index_names(inspector)
+    if 'ix_notifications_user_id_leida_created_at' not in names:
+        op.create_index(
+            'ix_notifications_user_id_leida_created_at',
+            'notifications',
+            ['user_id', 'leida', 'created_at']
+        )
+    if 'ix_notifications_user_id_leida' in names:
+        op.drop_index('ix_notifications_user_id_leida', table_name='notifications')
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'notifications' not in inspector.get_table_names():
+        return
+
+    names = _index_names(inspector)
+    if 'ix_notifications_user_id_leida' not in names:
+        op.create_index('ix_notifications_user_id_leida', 'notifications', ['user_id', 'leida'])
+    if 'ix_notifications_user_id_leida_created_at' in names:
+        op.drop_index('ix_notifications_user_id_leida_created_at', table_name='notifications')
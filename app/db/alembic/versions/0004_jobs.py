@@ -0,0 +1,48 @@
+"""jobs
+
+Revision ID: 0004_jobs
+Revises: 0003_notifications_unread_index
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_jobs'
+down_revision = '0003_notifications_unread_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # init_db() may already have created the table from the models
+    if 'jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    # ### commands auto generated ###
+    op.create_table('jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=100), nullable=False),
+        sa.Column('estado', sa.String(length=50), nullable=False, server_default='pendiente'),
+        sa.Column('parametros', sa.JSON(), nullable=True),
+        sa.Column('resultado', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('progreso', sa.Float(), nullable=True, server_default='0'),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_jobs_user', ondelete='CASCADE'),
+        mysql_engine='InnoDB', mysql_charset='utf8mb4'
+    )
+    op.create_index('ix_jobs_estado', 'jobs', ['estado'])
+    op.create_index('ix_jobs_user_id_created_at', 'jobs', ['user_id', 'created_at'])
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # ### commands auto generated ###
+    op.drop_index('ix_jobs_user_id_created_at', table_name='jobs')
+    op.drop_index('ix_jobs_estado', table_name='jobs')
+    op.drop_table('jobs')
+    # ### end Alembic commands ###
@@ -0,0 +1,33 @@
+"""jobs worker and heartbeat
+
+Revision ID: 0005_jobs_heartbeat
+Revises: 0004_jobs
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_jobs_heartbeat'
+down_revision = '0004_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # init_db() may already have created the columns from the models
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('jobs')}
+
+    # ### commands auto generated ###
+    if 'worker_id' not in columns:
+        op.add_column('jobs', sa.Column('worker_id', sa.String(length=100), nullable=True))
+    if 'heartbeat_at' not in columns:
+        op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # ### commands auto generated ###
+    op.drop_column('jobs', 'heartbeat_at')
+    op.drop_column('jobs', 'worker_id')
+    # ### end Alembic commands ###
@@ -1,16 +1,24 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy import select, insert, update, delete, func, and_, or_
 from sqlalchemy.orm import selectinload
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta
 
 from app.db.models import (
     User, Space, Resource, Assignment, Category, 
-    AIModel, UsageData, Notification, NotificationSettings
+    AIModel, UsageData, Notification, NotificationSettings, Job
 )
+from app.db.versions import table_versions
+from app.db.space_metrics import space_metrics
 from app.core.security import get_password_hash
 
 
+async def _rows(db: AsyncSession, statement) -> List[Dict[str, Any]]:
+    """Result rows as plain dicts, without building ORM objects; for read-only lists."""
+    result = await db.execute(statement)
+    return [dict(row) for row in result.mappings()]
+
+
 class UserCRUD:
     @staticmethod
     async def create(db: AsyncSession, user_data: dict) -> User:
@@ -58,6 +66,8 @@ class SpaceCRUD:
         db.add(space)
         await db.flush()
         await db.refresh(space)
+        table_versions.bump_on_commit(db, Space.__tablename__)
+        space_metrics.space_saved(db, space)
         return space
 
     @staticmethod
@@ -65,11 +75,22 @@ class SpaceCRUD:
         result = await db.execute(select(Space).where(Space.id == space_id))
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_by_ids(db: AsyncSession, space_ids: List[int]) -> List[Space]:
+        """Existing spaces among ``space_ids``, in the order given, with one query."""
+        result = await db.execute(select(Space).where(Space.id.in_(space_ids)))
+        by_id = {space.id: space for space in result.scalars()}
+        return [by_id[space_id] for space_id in space_ids if space_id in by_id]
+
     @staticmethod
     async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Space]:
         result = await db.execute(select(Space).offset(skip).limit(limit))
         return result.scalars().all()
 
+    @staticmethod
+    async def get_rows(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        return await _rows(db, select(Space.__table__).offset(skip).limit(limit))
+
     @staticmethod
     async def get_available(db: AsyncSession) -> List[Space]:
         result = await db.execute(select(Space).where(Space.estado == "disponible"))
@@ -79,11 +100,17 @@ class SpaceCRUD:
     async def update(db: AsyncSession, space_id: int, **kwargs) -> Optional[Space]:
         kwargs['updated_at'] = datetime.utcnow()
         await db.execute(update(Space).where(Space.id == space_id).values(**kwargs))
-        return await SpaceCRUD.get_by_id(db, space_id)
+        table_versions.bump_on_commit(db, Space.__tablename__)
+        space = await SpaceCRUD.get_by_id(db, space_id)
+        space_metrics.space_saved(db, space)
+        return space
 
     @staticmethod
     async def delete(db: AsyncSession, space_id: int) -> bool:
         result = await db.execute(delete(Space).where(Space.id == space_id))
+        table_versions.bump_on_commit(db, Space.__tablename__)
+        if result.rowcount:
+            space_metrics.space_removed(db, space_id)
         return result.rowcount > 0
 
 
@@ -94,6 +121,8 @@ class ResourceCRUD:
         db.add(resource)
         await db.flush()
         await db.refresh(resource)
+        table_versions.bump_on_commit(db, Resource.__tablename__)
+        space_metrics.resources_changed(db, 1)
         return resource
 
     @staticmethod
@@ -101,11 +130,22 @@ class ResourceCRUD:
         result = await db.execute(select(Resource).where(Resource.id == resource_id))
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_by_ids(db: AsyncSession, resource_ids: List[int]) -> List[Resource]:
+        """Existing resources among ``resource_ids``, in the order given, with one query."""
+        result = await db.execute(select(Resource).where(Resource.id.in_(resource_ids)))
+        by_id = {resource.id: resource for resource in result.scalars()}
+        return [by_id[resource_id] for resource_id in resource_ids if resource_id in by_id]
+
     @staticmethod
     async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Resource]:
         result = await db.execute(select(Resource).offset(skip).limit(limit))
         return result.scalars().all()
 
+    @staticmethod
+    async def get_rows(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        return await _rows(db, select(Resource.__table__).offset(skip).limit(limit))
+
     @staticmethod
     async def get_by_category(db: AsyncSession, categoria_id: int) -> List[Resource]:
         result = await db.execute(select(Resource).where(Resource.categoria_id == categoria_id))
@@ -115,11 +155,15 @@ class ResourceCRUD:
     async def update(db: AsyncSession, resource_id: int, **kwargs) -> Optional[Resource]:
         kwargs['updated_at'] = datetime.utcnow()
         await db.execute(update(Resource).where(Resource.id == resource_id).values(**kwargs))
+        table_versions.bump_on_commit(db, Resource.__tablename__)
         return await ResourceCRUD.get_by_id(db, resource_id)
 
     @staticmethod
     async def delete(db: AsyncSession, resource_id: int) -> bool:
         result = await db.execute(delete(Resource).where(Resource.id == resource_id))
+        table_versions.bump_on_commit(db, Resource.__tablename__)
+        if result.rowcount:
+            space_metrics.resources_changed(db, -1)
         return result.rowcount > 0
 
 
@@ -130,6 +174,8 @@ class AssignmentCRUD:
         db.add(assignment)
         await db.flush()
         await db.refresh(assignment)
+        table_versions.bump_on_commit(db, Assignment.__tablename__)
+        space_metrics.assignment_saved(db, assignment)
         return assignment
 
     @staticmethod
@@ -147,15 +193,93 @@ class AssignmentCRUD:
         result = await db.execute(select(Assignment).where(Assignment.estado == "activo"))
         return result.scalars().all()
 
+    @staticmethod
+    async def get_rows(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        estado: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        query = select(Assignment.__table__)
+        if estado is not None:
+            query = query.where(Assignment.estado == estado)
+        return await _rows(db, query.offset(skip).limit(limit))
+
+    @staticmethod
+    async def get_overlapping(
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        room_ids: Optional[List[int]] = None
+    ) -> List[Assignment]:
+        """Active assignments whose [fecha, fecha_fin) interval intersects [start, end)."""
+        conditions = [
+            Assignment.estado == "activo",
+            Assignment.fecha < end,
+            or_(
+                Assignment.fecha_fin > start,
+                and_(Assignment.fecha_fin.is_(None), Assignment.fecha >= start)
+            )
+        ]
+        if room_ids is not None:
+            conditions.append(Assignment.room_id.in_(room_ids))
+        result = await db.execute(select(Assignment).where(and_(*conditions)))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_demand(db: AsyncSession, start: datetime, end: datetime) -> List[Tuple]:
+        """(room_id, fecha, fecha_fin) tuples of the non-cancelled assignments starting in [start, end)."""
+        result = await db.execute(
+            select(Assignment.room_id, Assignment.fecha, Assignment.fecha_fin)
+            .where(and_(Assignment.fecha >= start, Assignment.fecha < end, Assignment.estado != "cancelado"))
+            .order_by(Assignment.fecha)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_intervals(
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        room_id: Optional[int] = None,
+        open_ended_hours: float = 2.0
+    ) -> List[Tuple]:
+        """
+        (room_id, fecha, fecha_fin) tuples of the non-cancelled assignments
+        that may overlap [start, end), sorted by room and fecha. Assignments
+        without fecha_fin are included from ``open_ended_hours`` before start.
+        """
+        conditions = [
+            Assignment.estado != "cancelado",
+            Assignment.fecha < end,
+            or_(
+                Assignment.fecha_fin > start,
+                and_(Assignment.fecha_fin.is_(None), Assignment.fecha >= start - timedelta(hours=open_ended_hours))
+            )
+        ]
+        if room_id is not None:
+            conditions.append(Assignment.room_id == room_id)
+        result = await db.execute(
+            select(Assignment.room_id, Assignment.fecha, Assignment.fecha_fin).where(and_(*conditions))
+        )
+        # Sorted here: ORDER BY room_id makes SQLite walk the whole room_id/fecha index
+        return sorted(result.all(), key=lambda row: (row[0], row[1]))
+
     @staticmethod
     async def update(db: AsyncSession, assignment_id: int, **kwargs) -> Optional[Assignment]:
         # Remove updated_at since it doesn't exist in the table
         await db.execute(update(Assignment).where(Assignment.id == assignment_id).values(**kwargs))
-        return await AssignmentCRUD.get_by_id(db, assignment_id)
+        table_versions.bump_on_commit(db, Assignment.__tablename__)
+        assignment = await AssignmentCRUD.get_by_id(db, assignment_id)
+        space_metrics.assignment_saved(db, assignment)
+        return assignment
 
     @staticmethod
     async def delete(db: AsyncSession, assignment_id: int) -> bool:
         result = await db.execute(delete(Assignment).where(Assignment.id == assignment_id))
+        table_versions.bump_on_commit(db, Assignment.__tablename__)
+        if result.rowcount:
+            space_metrics.assignment_removed(db, assignment_id)
         return result.rowcount > 0
 
 
@@ -166,6 +290,7 @@ class CategoryCRUD:
         db.add(category)
         await db.flush()
         await db.refresh(category)
+        table_versions.bump_on_commit(db, Category.__tablename__)
         return category
 
     @staticmethod
@@ -181,11 +306,13 @@ class CategoryCRUD:
     @staticmethod
     async def update(db: AsyncSession, category_id: int, **kwargs) -> Optional[Category]:
         await db.execute(update(Category).where(Category.id == category_id).values(**kwargs))
+        table_versions.bump_on_commit(db, Category.__tablename__)
         return await CategoryCRUD.get_by_id(db, category_id)
 
     @staticmethod
     async def delete(db: AsyncSession, category_id: int) -> bool:
         result = await db.execute(delete(Category).where(Category.id == category_id))
+        table_versions.bump_on_commit(db, Category.__tablename__)
         return result.rowcount > 0
 
 
@@ -216,6 +343,7 @@ class UsageDataCRUD:
         db.add(usage)
         await db.flush()
         await db.refresh(usage)
+        table_versions.bump_on_commit(db, UsageData.__tablename__)
         return usage
 
     @staticmethod
@@ -247,6 +375,33 @@ class UsageDataCRUD:
         )
         return result.scalars().all()
 
+    @staticmethod
+    async def get_series(
+        db: AsyncSession,
+        start_date: datetime,
+        end_date: datetime,
+        space_id: Optional[int] = None
+    ) -> List[Tuple]:
+        """(space_id, resource_id, fecha, uso) tuples of the range, without building ORM objects."""
+        conditions = [UsageData.fecha >= start_date, UsageData.fecha <= end_date]
+        if space_id is not None:
+            conditions.append(UsageData.space_id == space_id)
+        result = await db.execute(
+            select(UsageData.space_id, UsageData.resource_id, UsageData.fecha, UsageData.uso)
+            .where(and_(*conditions))
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_new_rows(db: AsyncSession, after_id: int, start_date: datetime) -> List[Tuple]:
+        """(id, space_id, resource_id, fecha, uso) tuples added after ``after_id`` and dated from ``start_date``."""
+        result = await db.execute(
+            select(UsageData.id, UsageData.space_id, UsageData.resource_id, UsageData.fecha, UsageData.uso)
+            .where(and_(UsageData.id > after_id, UsageData.fecha >= start_date))
+            .order_by(UsageData.id)
+        )
+        return result.all()
+
 
 class NotificationCRUD:
     @staticmethod
@@ -258,10 +413,18 @@ class NotificationCRUD:
         return notification
 
     @staticmethod
-    async def get_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 50) -> List[Notification]:
+    async def get_by_user(
+        db: AsyncSession,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 50,
+        unread_only: bool = False
+    ) -> List[Notification]:
+        query = select(Notification).where(Notification.user_id == user_id)
+        if unread_only:
+            query = query.where(Notification.leida == False)
         result = await db.execute(
-            select(Notification)
-            .where(Notification.user_id == user_id)
+            query
             .order_by(Notification.created_at.desc())
             .offset(skip)
             .limit(limit)
@@ -269,14 +432,70 @@ class NotificationCRUD:
         return result.scalars().all()
 
     @staticmethod
-    async def mark_as_read(db: AsyncSession, notification_id: int) -> bool:
+    async def count_unread(db: AsyncSession, user_id: int) -> int:
+        result = await db.execute(
+            select(func.count(Notification.id))
+            .where(and_(Notification.user_id == user_id, Notification.leida == False))
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    async def mark_as_read(db: AsyncSession, notification_id: int, user_id: int) -> bool:
         result = await db.execute(
             update(Notification)
-            .where(Notification.id == notification_id)
+            .where(and_(Notification.id == notification_id, Notification.user_id == user_id))
             .values(leida=True)
         )
         return result.rowcount > 0
 
+    @staticmethod
+    async def mark_many_as_read(
+        db: AsyncSession,
+        user_id: int,
+        notification_ids: Optional[List[int]] = None,
+        before: Optional[datetime] = None
+    ) -> int:
+        conditions = [Notification.user_id == user_id, Notification.leida == False]
+        if notification_ids is not None:
+            conditions.append(Notification.id.in_(notification_ids))
+        if before is not None:
+            conditions.append(Notification.created_at <= before)
+        result = await db.execute(
+            update(Notification)
+            .where(and_(*conditions))
+            .values(leida=True)
+        )
+        return result.rowcount
+
+    @staticmethod
+    async def create_many(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert ``rows`` with one statement and return their ids, in the same order.
+
+        Every row needs a ``created_at`` and a distinct (user_id, created_at)
+        pair: without RETURNING (MySQL) the ids are read back with one SELECT
+        on that key, taking the newest row of each pair.
+        """
+        if not rows:
+            return []
+        if db.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await db.execute(
+                insert(Notification).returning(Notification.id, sort_by_parameter_order=True), rows
+            )
+            return list(result.scalars())
+        await db.execute(insert(Notification).values(rows))
+        result = await db.execute(
+            select(Notification.id, Notification.user_id, Notification.created_at).where(and_(
+                Notification.user_id.in_({row["user_id"] for row in rows}),
+                Notification.created_at.in_({row["created_at"] for row in rows})
+            ))
+        )
+        ids: Dict[Tuple[int, datetime], int] = {}
+        for notification_id, user_id, created_at in result:
+            key = (user_id, created_at)
+            ids[key] = max(ids.get(key, 0), notification_id)
+        return [ids[(row["user_id"], row["created_at"])] for row in rows]
+
 
 class NotificationSettingsCRUD:
     @staticmethod
@@ -286,6 +505,15 @@ class NotificationSettingsCRUD:
         )
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_by_users(db: AsyncSession, user_ids: List[int]) -> Dict[int, NotificationSettings]:
+        if not user_ids:
+            return {}
+        result = await db.execute(
+            select(NotificationSettings).where(NotificationSettings.user_id.in_(user_ids))
+        )
+        return {s.user_id: s for s in result.scalars().all()}
+
     @staticmethod
     async def create_or_update(db: AsyncSession, user_id: int, **kwargs) -> NotificationSettings:
         existing = await NotificationSettingsCRUD.get_by_user(db, user_id)
@@ -303,3 +531,70 @@ class NotificationSettingsCRUD:
             await db.flush()
             await db.refresh(settings)
             return settings
+
+
+class JobCRUD:
+    @staticmethod
+    async def create(db: AsyncSession, **kwargs) -> Job:
+        job = Job(**kwargs)
+        db.add(job)
+        await db.flush()
+        await db.refresh(job)
+        return job
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, job_id: int) -> Optional[Job]:
+        result = await db.execute(select(Job).where(Job.id == job_id))
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 50) -> List[Job]:
+        result = await db.execute(
+            select(Job)
+            .where(Job.user_id == user_id)
+            .order_by(Job.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_by_estado(db: AsyncSession, estado: str) -> List[Job]:
+        result = await db.execute(select(Job).where(Job.estado == estado).order_by(Job.id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def update(db: AsyncSession, job_id: int, **kwargs) -> Optional[Job]:
+        await db.execute(update(Job).where(Job.id == job_id).values(**kwargs))
+        return await JobCRUD.get_by_id(db, job_id)
+
+    @staticmethod
+    async def claim(db: AsyncSession, job_id: int, worker_id: str, now: datetime) -> bool:
+        """Move a pending job to en_proceso for ``worker_id``; False if another worker got it first."""
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.estado == "pendiente")
+            .values(estado="en_proceso", worker_id=worker_id, started_at=now, heartbeat_at=now, progreso=0.0)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    async def heartbeat(db: AsyncSession, job_id: int, worker_id: str, now: datetime, progreso: float) -> None:
+        await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.worker_id == worker_id, Job.estado == "en_proceso")
+            .values(heartbeat_at=now, progreso=progreso)
+        )
+
+    @staticmethod
+    async def fail_stale(db: AsyncSession, before: datetime, error: str, now: datetime) -> int:
+        """Fail en_proceso jobs whose worker has not sent a heartbeat since ``before``."""
+        result = await db.execute(
+            update(Job)
+            .where(
+                Job.estado == "en_proceso",
+                or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < before)
+            )
+            .values(estado="error", error=error, finished_at=now)
+        )
+        return result.rowcount
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -37,12 +37,12 @@ class Space(Base):
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     nombre = Column(String(200), nullable=False)
-    tipo = Column(String(100), nullable=False)
+    tipo = Column(String(100), nullable=False, index=True)
     capacidad = Column(Integer, nullable=False)
     ubicacion = Column(String(255), nullable=True)
     descripcion = Column(Text, nullable=True)
     caracteristicas = Column(JSON, nullable=True)
-    estado = Column(String(50), default="disponible")
+    estado = Column(String(50), default="disponible", index=True)
     imagen_url = Column(String(500), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -56,8 +56,8 @@ class Resource(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     nombre = Column(String(200), nullable=False)
     tipo = Column(String(100), nullable=False)
-    estado = Column(String(50), default="disponible")
-    categoria_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    estado = Column(String(50), default="disponible", index=True)
+    categoria_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
     caracteristicas = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -73,14 +73,18 @@ class Assignment(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     room_id = Column(Integer, nullable=False)  # Referencias a rooms table
     resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False)
-    fecha = Column(DateTime(timezone=True), nullable=False)
+    fecha = Column(DateTime(timezone=True), nullable=False, index=True)
     fecha_fin = Column(DateTime(timezone=True), nullable=True)
-    estado = Column(String(50), default="activo")
+    estado = Column(String(50), default="activo", index=True)
     notas = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     resource = relationship("Resource", back_populates="assignments")
 
+    __table_args__ = (
+        Index("ix_assignments_room_id_fecha", "room_id", "fecha"),
+    )
+
 
 class AIModel(Base):
     __tablename__ = "ai_models"
@@ -101,7 +105,7 @@ class UsageData(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     space_id = Column(Integer, ForeignKey("spaces.id"), nullable=True)
     resource_id = Column(Integer, ForeignKey("resources.id"), nullable=True)
-    fecha = Column(DateTime(timezone=True), nullable=False)
+    fecha = Column(DateTime(timezone=True), nullable=False, index=True)
     uso = Column(Float, default=0.0)
     metricas = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -109,6 +113,11 @@ class UsageData(Base):
     space = relationship("Space", back_populates="usage_data")
     resource = relationship("Resource", back_populates="usage_data")
 
+    __table_args__ = (
+        Index("ix_usage_data_space_id_fecha", "space_id", "fecha"),
+        Index("ix_usage_data_resource_id_fecha", "resource_id", "fecha"),
+    )
+
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -123,6 +132,11 @@ class Notification(Base):
 
     user = relationship("User", back_populates="notifications")
 
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+        Index("ix_notifications_user_id_leida_created_at", "user_id", "leida", "created_at"),
+    )
+
 
 class NotificationSettings(Base):
     __tablename__ = "notification_settings"
@@ -138,3 +152,25 @@ class NotificationSettings(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="notification_settings")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tipo = Column(String(100), nullable=False)
+    estado = Column(String(50), default="pendiente", nullable=False, index=True)
+    parametros = Column(JSON, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progreso = Column(Float, default=0.0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    worker_id = Column(String(100), nullable=True)  # queue that claimed the job
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+    )
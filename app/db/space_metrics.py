@@ -0,0 +1,271 @@
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from itertools import islice
+import asyncio
+import logging
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.db.models import Assignment, Resource, Space
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVO = "activo"
+
+_PENDING = "space_metrics_pending"
+
+
+@dataclass
+class SpaceEntry:
+    nombre: str
+    tipo: str
+    capacidad: int
+    estado: str
+
+
+class SpaceMetrics:
+    """
+    Materialized space-utilization counters kept in process.
+
+    Loaded once from the database and then maintained by the CRUD write
+    paths: per-space active assignment counts, per-type space counts, total
+    and used capacity, occupied spaces and assigned resources. Reads are
+    O(1).
+
+    The write hooks only record the change in ``session.info``; it is applied
+    once the transaction commits and dropped on rollback, like
+    ``table_versions``. Writes made by another process leave the counters
+    slightly off; a periodic reconciliation rebuilds them from the database
+    and logs the drift it corrected.
+
+    Changes are ignored until the store is loaded, since loading reads
+    everything anyway.
+    """
+
+    def __init__(self):
+        self.reset()
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self) -> None:
+        self.loaded = False
+        self.spaces: Dict[int, SpaceEntry] = {}
+        self.active_by_space: Dict[int, int] = {}
+        self.active_by_resource: Dict[int, int] = {}
+        self.type_counts: Dict[str, int] = {}
+        self.total_capacity = 0
+        self.used_capacity = 0  # sum over spaces of min(active assignments, capacidad)
+        self.occupied = 0  # spaces with active assignments or not "disponible"
+        self.resource_count = 0
+        self._assignments: Dict[int, Tuple[int, int]] = {}  # active assignment id -> (room_id, resource_id)
+
+    # ---- reads ----
+
+    @property
+    def space_count(self) -> int:
+        return len(self.spaces)
+
+    @property
+    def assigned_resources(self) -> int:
+        return len(self.active_by_resource)
+
+    def assignments_of(self, space_id: int) -> int:
+        return self.active_by_space.get(space_id, 0)
+
+    def first_spaces(self, n: int) -> List[Tuple[int, SpaceEntry]]:
+        return list(islice(self.spaces.items(), n))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "spaces": self.space_count,
+            "total_capacity": self.total_capacity,
+            "used_capacity": self.used_capacity,
+            "occupied": self.occupied,
+            "type_counts": dict(self.type_counts),
+            "active_assignments": len(self._assignments),
+            "assigned_resources": self.assigned_resources,
+            "resources": self.resource_count
+        }
+
+    # ---- incremental maintenance ----
+
+    def _space_terms(self, space_id: int) -> Tuple[int, int]:
+        """(used capacity, occupied) contributed by one space."""
+        entry = self.spaces.get(space_id)
+        if entry is None:
+            return 0, 0
+        active = self.assignments_of(space_id)
+        return min(active, entry.capacidad), int(active > 0 or entry.estado != "disponible")
+
+    def _update_space(self, space_id: int, change) -> None:
+        used, occupied = self._space_terms(space_id)
+        change()
+        new_used, new_occupied = self._space_terms(space_id)
+        self.used_capacity += new_used - used
+        self.occupied += new_occupied - occupied
+
+    def _on_commit(self, db: AsyncSession, apply, *args) -> None:
+        # Values are captured now: the ORM objects may be expired by the commit
+        db.info.setdefault(_PENDING, []).append((apply, args))
+
+    def space_saved(self, db: AsyncSession, space: Any) -> None:
+        """Space created or updated."""
+        if space is None:
+            return
+        entry = SpaceEntry(space.nombre, space.tipo or "Sin tipo", space.capacidad or 0, space.estado or "disponible")
+        self._on_commit(db, self._space_saved, space.id, entry)
+
+    def space_removed(self, db: AsyncSession, space_id: int) -> None:
+        self._on_commit(db, self._space_removed, space_id)
+
+    def assignment_saved(self, db: AsyncSession, assignment: Any) -> None:
+        """Assignment created or updated: moves it between spaces/resources and in or out of "activo"."""
+        if assignment is None:
+            return
+        self._on_commit(
+            db, self._assignment_saved, assignment.id, assignment.estado, assignment.room_id, assignment.resource_id
+        )
+
+    def assignment_removed(self, db: AsyncSession, assignment_id: int) -> None:
+        self._on_commit(db, self._assignment_removed, assignment_id)
+
+    def resources_changed(self, db: AsyncSession, delta: int) -> None:
+        self._on_commit(db, self._resources_changed, delta)
+
+    def _space_saved(self, space_id: int, entry: SpaceEntry) -> None:
+        if not self.loaded:
+            return
+
+        def change():
+            old = self.spaces.get(space_id)
+            if old is not None:
+                self.total_capacity -= old.capacidad
+                self._count_type(old.tipo, -1)
+            self.spaces[space_id] = entry
+            self.total_capacity += entry.capacidad
+            self._count_type(entry.tipo, 1)
+
+        self._update_space(space_id, change)
+
+    def _space_removed(self, space_id: int) -> None:
+        if not self.loaded or space_id not in self.spaces:
+            return
+
+        def change():
+            old = self.spaces.pop(space_id)
+            self.total_capacity -= old.capacidad
+            self._count_type(old.tipo, -1)
+
+        self._update_space(space_id, change)
+
+    def _count_type(self, tipo: str, delta: int) -> None:
+        count = self.type_counts.get(tipo, 0) + delta
+        if count > 0:
+            self.type_counts[tipo] = count
+        else:
+            self.type_counts.pop(tipo, None)
+
+    @staticmethod
+    def _bump(counts: Dict[int, int], key: int, delta: int) -> None:
+        count = counts.get(key, 0) + delta
+        if count > 0:
+            counts[key] = count
+        else:
+            counts.pop(key, None)
+
+    def _assignment_saved(self, assignment_id: int, estado: str, room_id: int, resource_id: int) -> None:
+        if not self.loaded:
+            return
+        self._assignment_removed(assignment_id)
+        if estado != ACTIVO:
+            return
+        self._assignments[assignment_id] = (room_id, resource_id)
+        self._update_space(room_id, lambda: self._bump(self.active_by_space, room_id, 1))
+        self._bump(self.active_by_resource, resource_id, 1)
+
+    def _assignment_removed(self, assignment_id: int) -> None:
+        if not self.loaded or assignment_id not in self._assignments:
+            return
+        room_id, resource_id = self._assignments.pop(assignment_id)
+        self._update_space(room_id, lambda: self._bump(self.active_by_space, room_id, -1))
+        self._bump(self.active_by_resource, resource_id, -1)
+
+    def _resources_changed(self, delta: int) -> None:
+        if self.loaded:
+            self.resource_count += delta
+
+    # ---- loading and reconciliation ----
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild every counter from the database."""
+        spaces = (await db.execute(
+            select(Space.id, Space.nombre, Space.tipo, Space.capacidad, Space.estado).order_by(Space.id)
+        )).all()
+        assignments = (await db.execute(
+            select(Assignment.id, Assignment.room_id, Assignment.resource_id).where(Assignment.estado == ACTIVO)
+        )).all()
+        resource_count = (await db.execute(select(func.count(Resource.id)))).scalar_one()
+
+        before = self.snapshot() if self.loaded else None
+        self.reset()
+        for space_id, nombre, tipo, capacidad, estado in spaces:
+            self.spaces[space_id] = SpaceEntry(nombre, tipo or "Sin tipo", capacidad or 0, estado or "disponible")
+            self.total_capacity += capacidad or 0
+            self._count_type(tipo or "Sin tipo", 1)
+        for assignment_id, room_id, resource_id in assignments:
+            self._assignments[assignment_id] = (room_id, resource_id)
+            self._bump(self.active_by_space, room_id, 1)
+            self._bump(self.active_by_resource, resource_id, 1)
+        for space_id in self.spaces:
+            used, occupied = self._space_terms(space_id)
+            self.used_capacity += used
+            self.occupied += occupied
+        self.resource_count = resource_count
+        self.loaded = True
+
+        if before is not None and before != self.snapshot():
+            logger.warning(f"Space metrics drift corrected: {before} -> {self.snapshot()}")
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self.loaded:
+            await self.load(db)
+
+    async def _reconcile_forever(self, session_factory: async_sessionmaker, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as db:
+                    await self.load(db)
+            except Exception as e:
+                logger.error(f"Space metrics reconciliation failed: {e}")
+
+    async def start(self, session_factory: Optional[async_sessionmaker] = None, interval: float = 300.0) -> None:
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        async with session_factory() as db:
+            await self.load(db)
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_forever(session_factory, interval), name="space-metrics")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+space_metrics = SpaceMetrics()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for apply, args in session.info.pop(_PENDING, []):
+        apply(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
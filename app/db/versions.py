@@ -0,0 +1,49 @@
+from collections import defaultdict
+from typing import Dict, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+_PENDING = "table_versions_pending"
+
+
+class TableVersions:
+    """
+    In-process change counters per table, bumped by the CRUD layer on every
+    write. Caches derived from table contents compare the version they were
+    built at instead of re-reading or re-hashing the rows.
+
+    CRUD writes go through ``bump_on_commit``: the tables are remembered in
+    ``session.info`` and bumped only once the transaction commits (dropped
+    on rollback), so a version never moves ahead of the rows other sessions
+    can read.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = defaultdict(int)
+
+    def bump(self, table: str) -> int:
+        self._versions[table] += 1
+        return self._versions[table]
+
+    def bump_on_commit(self, db: AsyncSession, table: str) -> None:
+        db.info.setdefault(_PENDING, set()).add(table)
+
+    def get(self, table: str) -> int:
+        return self._versions[table]
+
+
+table_versions = TableVersions()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    tables: Set[str] = session.info.pop(_PENDING, set())
+    for table in tables:
+        table_versions.bump(table)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
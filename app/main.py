@@ -1,17 +1,42 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from contextlib import asynccontextmanager
+import asyncio
+import hmac
 
 from app.config import settings
 from app.db.session import init_db
-from app.api.v1 import auth, spaces, resources, assignments, analytics, notifications, chatbot
+from app.api.v1 import auth, spaces, resources, assignments, analytics, notifications, chatbot, jobs
+from app.services.jobs import job_queue
+from app.services.ai_client import ai_client
+from app.services.rate_limit import RateLimitExceeded
+from app.core.http_cache import NotModified
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import MetricsMiddleware, metrics
+from app.services.monitoring import register_service_metrics
+from app.services.simulator import scenario_simulator
+from app.db.space_metrics import space_metrics
+from app.services.reference_data import reference_data
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
     await seed_initial_data()
+    reference_data.load_configured()
+    await job_queue.start()
+    await space_metrics.start(interval=settings.SPACE_METRICS_RECONCILE_SECONDS)
+    warm_up = None
+    if settings.AI_WARMUP and ai_client.available:
+        # Background task so startup is not delayed
+        warm_up = asyncio.create_task(ai_client.warm_up(chatbot.executor))
     yield
+    if warm_up and not warm_up.done():
+        warm_up.cancel()
+    await job_queue.stop()
+    await space_metrics.stop()
+    scenario_simulator.shutdown()
 
 
 app = FastAPI(
@@ -46,6 +71,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+if settings.METRICS_ENABLED:
+    metrics.install_sql_hooks()
+    register_service_metrics(metrics, chatbot.executor)
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": exc.cache_control})
+
 
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(spaces.router, prefix="/api/v1")
@@ -54,6 +103,7 @@ app.include_router(assignments.router, prefix="/api/v1")
 app.include_router(analytics.router, prefix="/api/v1")
 app.include_router(notifications.router, prefix="/api/v1")
 app.include_router(chatbot.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
 
 
 @app.get("/", tags=["Root"])
@@ -73,6 +123,29 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get(
+    "/metrics",
+    tags=["Health"],
+    response_class=PlainTextResponse,
+    include_in_schema=settings.METRICS_ENABLED and bool(settings.METRICS_TOKEN)
+)
+async def prometheus_metrics(request: Request):
+    """
+    Request latency, SQL, AI and executor metrics in Prometheus text format.
+
+    Routes, breaker state and cache stats are not public: the endpoint only
+    exists when METRICS_TOKEN is configured, and requires it as a Bearer token.
+    """
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    # Header values are latin-1 decoded; compare raw bytes so any input is a 401, never a 500
+    provided = request.headers.get("authorization", "").encode("latin-1")
+    expected = f"Bearer {settings.METRICS_TOKEN}".encode("utf-8")
+    if not hmac.compare_digest(provided, expected):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 async def seed_initial_data():
     """Seed initial data if database is empty."""
     from app.db.session import AsyncSessionLocal
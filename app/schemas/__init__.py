@@ -9,3 +9,4 @@ from app.schemas.usage_data import *
 from app.schemas.notification import *
 from app.schemas.auth import *
 from app.schemas.analytics import *
+from app.schemas.job import *
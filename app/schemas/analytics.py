@@ -26,10 +26,30 @@ class EfficiencyMetrics(BaseModel):
 class PredictionResult(BaseModel):
     predictions: List[Dict[str, Any]]
     confidence: float
+    insights: List[str] = []
     model_used: str
     generated_at: datetime
 
 
+class PatternAnalysisResult(BaseModel):
+    patterns: List[Dict[str, Any]]
+    trends: List[str]
+    anomalies: List[Dict[str, Any]]
+    resumen: str = ""
+    rows_ingested: int = 0
+    analyzed_at: datetime
+
+
+class SpaceUtilizationResult(BaseModel):
+    bucket: str
+    start_date: datetime
+    end_date: datetime
+    spaces: List[Dict[str, Any]]
+    heatmap: Dict[str, Any]
+    weekly_profile: List[List[float]]
+    generated_at: datetime
+
+
 class SimulationRequest(BaseModel):
     scenario_name: str
     parameters: Dict[str, Any]
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+from app.schemas.assignment import OptimizationRequest
+
+
+class JobCreate(BaseModel):
+    tipo: str
+    parametros: Dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    id: int
+    user_id: int
+    tipo: str
+    estado: str
+    parametros: Optional[Dict[str, Any]] = None
+    resultado: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progreso: Optional[float] = 0.0
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OptimizationJobParams(OptimizationRequest):
+    use_ai: bool = True
+
+
+class PredictionJobParams(BaseModel):
+    days_ahead: int = Field(7, ge=1, le=90)
+    use_ai: bool = False
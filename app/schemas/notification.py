@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -23,6 +23,20 @@ class NotificationResponse(NotificationBase):
         from_attributes = True
 
 
+class NotificationBulkRead(BaseModel):
+    ids: Optional[List[int]] = None
+    before: Optional[datetime] = None
+
+
+class NotificationBulkReadResponse(BaseModel):
+    message: str
+    updated: int
+
+
+class UnreadCountResponse(BaseModel):
+    unread: int
+
+
 class NotificationSettingsBase(BaseModel):
     email_enabled: bool = True
     push_enabled: bool = True
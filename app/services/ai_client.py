@@ -0,0 +1,165 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from concurrent.futures import Executor
+import asyncio
+import json
+import logging
+import threading
+
+import google.generativeai as genai
+
+from app.config import settings
+from app.core.metrics import metrics
+from app.services.circuit_breaker import AIUnavailableError, ai_breaker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_content(call: str, model, *args, **kwargs):
+    """Blocking ``model.generate_content`` timed into ``ai_call_duration_seconds`` as ``call``."""
+    with metrics.ai_call(call):
+        return model.generate_content(*args, **kwargs)
+
+
+class AIClientRegistry:
+    """
+    Process-wide Gemini client.
+
+    ``genai.configure`` rebuilds the SDK's transport on every call, so it is run
+    once and GenerativeModel handles are cached by model name, generation
+    config and system instruction. Every request then reuses the same client
+    and its open connections.
+    """
+
+    def __init__(self):
+        self._configured = False
+        self._models: Dict[Tuple[str, str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return bool(settings.GEMINI_API_KEY)
+
+    def configure(self) -> bool:
+        if not self.available:
+            return False
+        with self._lock:
+            if not self._configured:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                self._configured = True
+        return True
+
+    def get_model(
+        self,
+        model_name: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        system_instruction: Optional[str] = None
+    ):
+        """Cached GenerativeModel, or None when no API key is configured."""
+        if not self.configure():
+            return None
+        model_name = model_name or settings.GEMINI_MODEL
+        key = (model_name, json.dumps(generation_config or {}, sort_keys=True), system_instruction or "")
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = genai.GenerativeModel(
+                        model_name,
+                        generation_config=generation_config,
+                        system_instruction=system_instruction
+                    )
+                    self._models[key] = model
+        return model
+
+    async def warm_up(self, executor: Optional[Executor] = None, timeout: float = 10.0) -> bool:
+        """Open the connection with a one-token request so the first user call doesn't pay for it."""
+        model = self.get_model()
+        if model is None:
+            return False
+        loop = asyncio.get_event_loop()
+        try:
+            await asyncio.wait_for(
+                loop.run_in_executor(
+                    executor,
+                    lambda: generate_content("warm_up", model, "ping", generation_config={"max_output_tokens": 1})
+                ),
+                timeout=timeout
+            )
+            logger.info(f"AI client warmed up ({settings.GEMINI_MODEL})")
+            return True
+        except Exception as e:
+            logger.warning(f"AI warm-up failed: {e}")
+            return False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._configured = False
+
+
+_STREAM_END = object()
+
+
+async def stream_text(model, prompt: str, executor: Optional[Executor] = None) -> AsyncIterator[str]:
+    """
+    Yield text chunks of a streamed completion as they arrive.
+
+    The SDK's streaming iterator is blocking, so it is consumed in ``executor``
+    and chunks are handed to the event loop through a queue. Closing the
+    generator (e.g. the client disconnected) stops the producer at the next chunk.
+    The stream is admitted and its outcome recorded by ``ai_breaker``; only
+    errors count against it, since a long answer is not a slow dependency.
+    A stream closed or cancelled before it ends records nothing and only
+    releases the half-open probe slot.
+    """
+    probe = ai_breaker.allow()
+    recorded = False
+    loop = asyncio.get_event_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            with metrics.ai_call("stream"):
+                for chunk in model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        break
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunk without text parts (e.g. finish or safety metadata)
+                        continue
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+
+    loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=ai_breaker.call_timeout)
+            except asyncio.TimeoutError:
+                recorded = True
+                ai_breaker.record(True)
+                raise AIUnavailableError(f"{ai_breaker.name} dejó de responder durante el streaming")
+            if item is _STREAM_END:
+                recorded = True
+                ai_breaker.record(False)
+                break
+            if isinstance(item, Exception):
+                recorded = True
+                ai_breaker.record(True)
+                raise item
+            yield item
+    finally:
+        stop.set()
+        if not recorded:
+            ai_breaker.release(probe)
+
+
+ai_client = AIClientRegistry()
@@ -2,34 +2,46 @@ import os
 import json
 import logging
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
-import google.generativeai as genai
 from pydantic import BaseModel
 
 from app.config import settings
+from app.services.ai_json import generate_json
+from app.services.ai_client import ai_client
+from app.services.circuit_breaker import last_good
+from app.services.optimizer import optimizer
+from app.services.pattern_analysis import UsagePatternAnalyzer, rows_from_records
+from app.services.simulator import (
+    SEMESTER_DAYS, demand_from_bookings, inventory_from, scenario_simulator, synthetic_demand
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini once at module level
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-else:
+if not settings.GEMINI_API_KEY:
     logger.warning("GEMINI_API_KEY not configured. AI features will be limited.")
 
 
 def get_gemini_model(model_name: str = "gemini-2.0-flash"):
-    """Get configured Gemini model instance."""
-    if not settings.GEMINI_API_KEY:
-        return None
+    """Get the shared Gemini model instance from the process-wide registry."""
     try:
-        return genai.GenerativeModel(model_name)
+        return ai_client.get_model(model_name)
     except Exception as e:
         logger.error(f"Error creating Gemini model: {e}")
         return None
 
 
+def _from_last_good(endpoint: str, error: Exception, key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Last successful result of ``endpoint``, marked as degraded, if there is one."""
+    cached = last_good.get(endpoint, key)
+    if cached is None:
+        return None
+    value, stored_at = cached
+    logger.warning(f"AI unavailable for {endpoint} ({error}), serving result from {stored_at.isoformat()}")
+    return {**value, "degraded": True, "cached_at": stored_at.isoformat()}
+
+
 class PredictionResponse(BaseModel):
     predictions: List[Dict[str, Any]]
     confidence: float
@@ -83,24 +95,17 @@ Genera predicciones en formato JSON con la siguiente estructura:
 Responde SOLO con el JSON válido."""
 
     try:
-        response = model.generate_content(prompt)
-        
-        if response.text:
-            result = json.loads(response.text)
-            result["model_used"] = "gemini-2.0-flash"
-            result["generated_at"] = datetime.utcnow().isoformat()
-            return result
-        
-        return {
-            "predictions": [],
-            "confidence": 0.0,
-            "message": "No response from AI model",
-            "model_used": "gemini-2.0-flash",
-            "generated_at": datetime.utcnow().isoformat()
-        }
+        result = (await generate_json(model, prompt, PredictionResponse, endpoint="predictions")).model_dump()
+        result["model_used"] = "gemini-2.0-flash"
+        result["generated_at"] = datetime.utcnow().isoformat()
+        last_good.put("predictions", result)
+        return result
 
     except Exception as e:
         logger.error(f"Error generating predictions: {e}")
+        cached = _from_last_good("predictions", e)
+        if cached:
+            return cached
         return {
             "predictions": [],
             "confidence": 0.0,
@@ -110,6 +115,38 @@ Responde SOLO con el JSON válido."""
         }
 
 
+class ForecastNarrative(BaseModel):
+    insights: List[str]
+
+
+async def narrate_forecast(forecast: Dict[str, Any]) -> Optional[List[str]]:
+    """Insights written by the model for a locally computed forecast; None if the AI is not available."""
+    model = get_gemini_model()
+    if not model:
+        return None
+
+    summary = [
+        {k: p.get(k) for k in ("entity_type", "entity_id", "nombre", "predicted_usage", "lower", "upper", "factors")}
+        for p in forecast.get("predictions", [])[:20]
+    ]
+    prompt = f"""Estas son predicciones de uso de espacios y recursos calculadas con modelos estadísticos (intervalos al 95%).
+No modifiques los números: redacta entre 3 y 5 observaciones útiles para el administrador.
+
+Predicciones:
+{json.dumps(summary, indent=2, ensure_ascii=False, default=str)}
+
+Observaciones calculadas:
+{json.dumps(forecast.get("insights", []), ensure_ascii=False)}
+
+Responde SOLO con JSON: {{"insights": ["observación 1", "observación 2"]}}"""
+
+    try:
+        return (await generate_json(model, prompt, ForecastNarrative, endpoint="predictions-narrative")).insights
+    except Exception as e:
+        logger.error(f"Error narrating forecast: {e}")
+        return None
+
+
 async def optimize_space_allocation(data: Dict[str, Any]) -> Dict[str, Any]:
     model = get_gemini_model()
     
@@ -150,159 +187,67 @@ Genera recomendaciones de optimización en formato JSON:
 Responde SOLO con el JSON válido."""
 
     try:
-        response = model.generate_content(prompt)
-        
-        if response.text:
-            return json.loads(response.text)
-        
-        return {
-            "recomendaciones": [],
-            "score_optimizacion": 0.0,
-            "mensaje": "No response from AI model",
-            "asignaciones_sugeridas": []
-        }
+        return await generate_json(model, prompt, endpoint="optimize-allocation")
 
     except Exception as e:
-        logger.error(f"Error optimizing allocation: {e}")
-        return {
-            "recomendaciones": [],
-            "score_optimizacion": 0.0,
-            "mensaje": f"Error: {str(e)}",
-            "asignaciones_sugeridas": []
-        }
+        # The local optimizer handles the same input without the AI
+        logger.error(f"Error optimizing allocation, using local optimizer: {e}")
+        try:
+            result = optimizer.optimize_assignments(
+                spaces=data.get("spaces", []),
+                resources=data.get("resources", []),
+                existing_assignments=data.get("existing_assignments", []),
+                criteria=data.get("criteria")
+            )
+        except Exception as local_error:
+            logger.error(f"Local optimizer failed too: {local_error}")
+            return {
+                "recomendaciones": [],
+                "score_optimizacion": 0.0,
+                "mensaje": f"Error: {str(e)}",
+                "asignaciones_sugeridas": []
+            }
+        result["degraded"] = True
+        return result
 
 
 async def analyze_usage_patterns(data: Dict[str, Any]) -> Dict[str, Any]:
-    model = get_gemini_model()
-    
-    if not model:
-        return {
-            "patterns": [],
-            "trends": [],
-            "anomalies": [],
-            "message": "AI service not configured. Please set GEMINI_API_KEY."
-        }
-
-    prompt = f"""Analiza los patrones de uso en los siguientes datos de espacios y recursos:
-
-{json.dumps(data, indent=2, default=str)}
-
-Identifica patrones, tendencias y anomalías. Responde en formato JSON:
-{{
-    "patterns": [
-        {{
-            "nombre": "nombre del patrón",
-            "descripcion": "descripción detallada",
-            "frecuencia": "diaria/semanal/mensual",
-            "entidades_afectadas": ["space_1", "resource_2"]
-        }}
-    ],
-    "trends": [
-        "tendencia 1",
-        "tendencia 2"
-    ],
-    "anomalies": [
-        {{
-            "tipo": "tipo de anomalía",
-            "descripcion": "descripción",
-            "severidad": "alta/media/baja",
-            "fecha_detectada": "fecha"
-        }}
-    ],
-    "resumen": "resumen del análisis"
-}}
-
-Responde SOLO con el JSON válido."""
-
-    try:
-        response = model.generate_content(prompt)
-        
-        if response.text:
-            return json.loads(response.text)
-        
-        return {
-            "patterns": [],
-            "trends": [],
-            "anomalies": [],
-            "message": "No response from AI model"
-        }
-
-    except Exception as e:
-        logger.error(f"Error analyzing patterns: {e}")
-        return {
-            "patterns": [],
-            "trends": [],
-            "anomalies": [],
-            "message": f"Error: {str(e)}"
-        }
+    """
+    Patterns, trends and anomalies of the usage records in ``data``, computed
+    locally (see UsagePatternAnalyzer); no AI call is needed.
+    """
+    data = data or {}
+    records = data.get("historical_usage") or data.get("usage_history") or data.get("usage_data") or []
+    analyzer = UsagePatternAnalyzer()
+    analyzer.ingest(rows_from_records(records))
+    result = analyzer.analyze()
+    result["model_used"] = "local-analysis"
+    return result
 
 
 async def simulate_scenario(scenario: Dict[str, Any], current_data: Dict[str, Any]) -> Dict[str, Any]:
-    model = get_gemini_model()
-    
-    if not model:
-        return {
-            "scenario_name": scenario.get("scenario_name", "Unknown"),
-            "results": {},
-            "impact_analysis": {},
-            "recommendations": [],
-            "message": "AI service not configured. Please set GEMINI_API_KEY."
-        }
-
-    prompt = f"""Simula el siguiente escenario y analiza su impacto en el sistema de gestión de espacios:
-
-Escenario a simular:
-{json.dumps(scenario, indent=2, default=str)}
-
-Datos actuales del sistema:
-{json.dumps(current_data, indent=2, default=str)}
-
-Analiza el impacto y proporciona resultados en formato JSON:
-{{
-    "scenario_name": "{scenario.get('scenario_name', 'Simulation')}",
-    "results": {{
-        "espacios_afectados": <numero>,
-        "recursos_afectados": <numero>,
-        "cambio_eficiencia": <porcentaje>,
-        "cambio_capacidad": <porcentaje>
-    }},
-    "impact_analysis": {{
-        "positivo": ["impacto positivo 1", "impacto positivo 2"],
-        "negativo": ["impacto negativo 1"],
-        "neutro": ["impacto neutro 1"]
-    }},
-    "recommendations": [
-        "recomendación 1",
-        "recomendación 2"
-    ],
-    "viabilidad": "alta/media/baja"
-}}
-
-Responde SOLO con el JSON válido."""
-
-    try:
-        response = model.generate_content(prompt)
-        
-        if response.text:
-            result = json.loads(response.text)
-            result["simulated_at"] = datetime.utcnow().isoformat()
-            return result
-        
-        return {
-            "scenario_name": scenario.get("scenario_name", "Unknown"),
-            "results": {},
-            "impact_analysis": {},
-            "recommendations": [],
-            "message": "No response from AI model"
-        }
-
-    except Exception as e:
-        logger.error(f"Error simulating scenario: {e}")
-        return {
-            "scenario_name": scenario.get("scenario_name", "Unknown"),
-            "results": {},
-            "impact_analysis": {},
-            "recommendations": [],
-            "message": f"Error: {str(e)}"
-        }
-
+    """
+    Simulate a scenario locally with the discrete-event simulator. Without
+    dated assignments in ``current_data`` a synthetic semester of demand is
+    generated from the given spaces.
+    """
+    current_data = current_data or {}
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=SEMESTER_DAYS)
+    inventory = inventory_from(current_data.get("spaces") or [])
+    bookings = [
+        (a.get("space_id", a.get("room_id")), a.get("fecha"), a.get("fecha_fin"))
+        for a in current_data.get("assignments") or [] if isinstance(a, dict)
+    ]
+    demand = demand_from_bookings(bookings, inventory, start, end)
+    if not len(demand):
+        demand = synthetic_demand(inventory, start, end)
+
+    parameters = {"changes": scenario.get("changes") or [], **(scenario.get("parameters") or {})}
+    result = await scenario_simulator.run(inventory, demand, parameters, start)
+    return {
+        "scenario_name": scenario.get("scenario_name", "Unknown"),
+        **result,
+        "simulated_at": datetime.utcnow().isoformat(),
+        "model_used": "local-simulation"
+    }
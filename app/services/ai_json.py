@@ -0,0 +1,161 @@
+from typing import Any, Dict, Optional, Type, Union
+from collections import defaultdict
+from concurrent.futures import Executor
+import asyncio
+import json
+import logging
+
+from pydantic import BaseModel, ValidationError
+
+from app.services.ai_client import generate_content
+from app.services.circuit_breaker import ai_breaker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+REPAIR_PROMPT = """Tu respuesta anterior no se pudo interpretar como JSON válido ({error}).
+
+Respuesta anterior:
+{text}
+
+Devuelve ÚNICAMENTE el objeto JSON corregido, sin texto adicional ni bloques de código."""
+
+
+class AIResponseParseError(json.JSONDecodeError):
+    """The model's reply could not be decoded or validated after the allowed repairs."""
+
+
+class ParseMetrics:
+    """Per-endpoint counters of AI JSON decoding outcomes."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "parsed": 0, "repaired": 0, "failed": 0}
+        )
+
+    def record(self, endpoint: str, outcome: str) -> None:
+        counts = self._counts[endpoint]
+        counts["requests"] += 1
+        counts[outcome] += 1
+
+    def failure_rate(self, endpoint: Optional[str] = None) -> float:
+        counts = [self._counts[endpoint]] if endpoint else list(self._counts.values())
+        requests = sum(c["requests"] for c in counts)
+        return sum(c["failed"] for c in counts) / requests if requests else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            endpoint: {**counts, "failure_rate": round(self.failure_rate(endpoint), 4)}
+            for endpoint, counts in self._counts.items()
+        }
+
+    def reset(self) -> None:
+        self._counts.clear()
+
+
+parse_metrics = ParseMetrics()
+
+
+def _first_balanced(text: str) -> Optional[str]:
+    """Return the first balanced {...} or [...] block, skipping brackets inside strings."""
+    start = next((i for i, c in enumerate(text) if c in "{["), None)
+    if start is None:
+        return None
+    closing = {"{": "}", "[": "]"}
+    stack = []
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in closing:
+            stack.append(closing[c])
+        elif c in "}]":
+            if not stack or stack.pop() != c:
+                return None
+            if not stack:
+                return text[start:i + 1]
+    return None
+
+
+def extract_json(text: str) -> Any:
+    """
+    Decode the JSON payload of a model reply, tolerating code fences and prose
+    before or after the first JSON object.
+    """
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    block = _first_balanced(text)
+    if block is None:
+        raise AIResponseParseError("No se encontró un objeto JSON en la respuesta", text, 0)
+    try:
+        return json.loads(block)
+    except json.JSONDecodeError as e:
+        raise AIResponseParseError(e.msg, text, text.find(block) + e.pos)
+
+
+def decode(text: str, schema: Optional[Type[BaseModel]] = None) -> Union[BaseModel, Any]:
+    """extract_json plus validation into ``schema`` when given."""
+    data = extract_json(text)
+    if schema is None:
+        return data
+    try:
+        return schema.model_validate(data)
+    except ValidationError as e:
+        raise AIResponseParseError(f"Estructura inválida: {e.errors()[0]['msg']}", text, 0)
+
+
+def _generate_text(model, prompt: str, endpoint: str = "default") -> str:
+    """Ask for JSON output; models without JSON mode get the plain request."""
+    try:
+        response = generate_content(endpoint, model, prompt, generation_config=JSON_GENERATION_CONFIG)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"JSON response mode not available, falling back to plain text: {e}")
+        response = generate_content(endpoint, model, prompt)
+    return response.text if response else ""
+
+
+async def generate_json(
+    model,
+    prompt: str,
+    schema: Optional[Type[BaseModel]] = None,
+    endpoint: str = "default",
+    executor: Optional[Executor] = None,
+    max_repairs: int = 1
+) -> Union[BaseModel, Any]:
+    """
+    Run ``model.generate_content`` in ``executor`` and decode the reply as JSON
+    (validated into ``schema`` if provided). If decoding fails the model is
+    asked to fix its own output, at most ``max_repairs`` times, before
+    AIResponseParseError is raised. Outcomes are counted in ``parse_metrics``.
+    Model calls go through ``ai_breaker``, so a failing or open circuit raises
+    AIUnavailableError instead.
+    """
+    loop = asyncio.get_event_loop()
+    text = await ai_breaker.call(lambda: loop.run_in_executor(executor, _generate_text, model, prompt, endpoint))
+
+    for attempt in range(max_repairs + 1):
+        try:
+            result = decode(text, schema)
+            parse_metrics.record(endpoint, "repaired" if attempt else "parsed")
+            return result
+        except AIResponseParseError as e:
+            if attempt == max_repairs:
+                parse_metrics.record(endpoint, "failed")
+                logger.error(f"AI response for {endpoint} could not be decoded: {e.msg}")
+                raise
+            logger.warning(f"AI response for {endpoint} is not valid JSON ({e.msg}), asking for a repair")
+            repair = REPAIR_PROMPT.format(error=e.msg, text=(text or "")[:4000])
+            text = await ai_breaker.call(lambda: loop.run_in_executor(executor, _generate_text, model, repair, endpoint))
@@ -0,0 +1,201 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import uuid
+
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for Spanish text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Summarizer(previous_summary, turns) -> new summary
+Summarizer = Callable[[str, List[Tuple[str, str]]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def space_line(space: Any) -> str:
+    """Compact one-line description of a space used as the assistant's catalogue entry."""
+    caracteristicas = space.caracteristicas or []
+    if isinstance(caracteristicas, dict):
+        caracteristicas = [k for k, v in caracteristicas.items() if v]
+    return (
+        f"{space.id}|{space.nombre}|{space.tipo}|{space.capacidad}|"
+        f"{space.ubicacion or '-'}|{space.estado}|{', '.join(map(str, caracteristicas))}"
+    )
+
+
+def extractive_summary(previous: str, turns: List[Tuple[str, str]], max_chars: int = 160) -> str:
+    """Summary without a model call: the gist of each folded turn, truncated."""
+    lines = [previous] if previous else []
+    for question, answer in turns:
+        lines.append(f"- Usuario: {question[:max_chars]} / Asistente: {answer[:max_chars]}")
+    return "\n".join(lines)
+
+
+@dataclass
+class ChatSession:
+    id: str
+    user_id: int
+    catalogue: Dict[int, str] = field(default_factory=dict)  # state pinned at the head of the prompt
+    known: Dict[int, str] = field(default_factory=dict)  # state the model has seen, deltas included
+    pending: Optional[Dict[int, str]] = None  # state sent in the turn awaiting a reply
+    turns: List[Tuple[str, str]] = field(default_factory=list)  # (user message, assistant reply)
+    summary: str = ""
+    last_used: datetime = field(default_factory=datetime.utcnow)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ChatSessionStore:
+    """
+    Server-side memory for /chatbot/chat conversations, kept in an in-process LRU.
+
+    The static assistant rules go in the model's system instruction (a cached
+    model handle), the space catalogue is pinned once per session in compact
+    form, and later turns carry only the spaces that changed since the model
+    last saw them. When the prompt exceeds ``token_budget`` the oldest turns
+    are folded into a running summary and the pinned catalogue is rebased to
+    the current state, so the history stays bounded.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 500,
+        token_budget: int = 4000,
+        ttl: timedelta = timedelta(hours=1),
+        keep_turns: int = 2
+    ):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.ttl = ttl
+        self.keep_turns = keep_turns
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_or_create(self, session_id: Optional[str], user_id: int) -> ChatSession:
+        """Existing session of this user, or a new one if the id is unknown, expired or foreign."""
+        now = datetime.utcnow()
+        session = self._sessions.get(session_id) if session_id else None
+        if session and session.user_id == user_id and now - session.last_used <= self.ttl:
+            self._sessions.move_to_end(session.id)
+        else:
+            session = ChatSession(id=uuid.uuid4().hex, user_id=user_id)
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        session.last_used = now
+        return session
+
+    def delete(self, session_id: str, user_id: int) -> bool:
+        session = self._sessions.get(session_id)
+        if not session or session.user_id != user_id:
+            return False
+        del self._sessions[session_id]
+        return True
+
+    def _space_delta(self, session: ChatSession, current: Dict[int, str]) -> str:
+        changed = [line for sid, line in current.items() if session.known.get(sid) != line]
+        removed = [str(sid) for sid in session.known if sid not in current]
+        if not changed and not removed:
+            return ""
+        parts = ["Actualización de espacios desde el último mensaje (id|nombre|tipo|capacidad|ubicación|estado|características):"]
+        parts.extend(f"* {line}" for line in changed)
+        if removed:
+            parts.append(f"Eliminados: {', '.join(removed)}")
+        return "\n".join(parts)
+
+    def _head(self, session: ChatSession, user_label: str) -> str:
+        head = (
+            f"Usuario actual: {user_label}\n"
+            f"Espacios del sistema (total: {len(session.catalogue)}; id|nombre|tipo|capacidad|ubicación|estado|características):\n"
+            + "\n".join(session.catalogue.values())
+        )
+        if session.summary:
+            head += f"\n\nResumen de la conversación anterior:\n{session.summary}"
+        return head
+
+    def _contents(self, session: ChatSession, user_label: str, message: str) -> List[Dict[str, Any]]:
+        contents = [
+            {"role": "user", "parts": [self._head(session, user_label)]},
+            {"role": "model", "parts": ["Entendido."]},
+        ]
+        for question, answer in session.turns:
+            contents.append({"role": "user", "parts": [question]})
+            contents.append({"role": "model", "parts": [answer]})
+        contents.append({"role": "user", "parts": [message]})
+        return contents
+
+    @staticmethod
+    def prompt_tokens(contents: List[Dict[str, Any]]) -> int:
+        return sum(estimate_tokens(part) for item in contents for part in item["parts"])
+
+    async def prepare_turn(
+        self,
+        session: ChatSession,
+        message: str,
+        spaces: List[Any],
+        user_label: str,
+        context: Optional[str] = None,
+        summarizer: Optional[Summarizer] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Build the Gemini ``contents`` for the next turn. Returns them together
+        with the user message as it should be stored once the reply arrives.
+        The space state sent counts as known only after ``record_turn``; if the
+        call fails, the next turn sends the same delta again.
+        """
+        current = {space.id: space_line(space) for space in spaces}
+        if not session.catalogue:
+            session.catalogue = dict(current)
+            session.known = dict(current)
+
+        delta = self._space_delta(session, current)
+        session.pending = current
+        turn_message = message
+        if context:
+            turn_message = f"Contexto adicional: {context}\n\n{turn_message}"
+        if delta:
+            turn_message = f"{delta}\n\n{turn_message}"
+
+        contents = self._contents(session, user_label, turn_message)
+        if self.prompt_tokens(contents) > self.token_budget and len(session.turns) > self.keep_turns:
+            folded = session.turns[:-self.keep_turns]
+            session.turns = session.turns[-self.keep_turns:]
+            summarize = summarizer or (lambda previous, turns: _async_value(extractive_summary(previous, turns)))
+            try:
+                session.summary = await summarize(session.summary, folded)
+            except Exception as e:
+                logger.warning(f"Chat summarization failed, using extractive summary: {e}")
+                session.summary = extractive_summary(session.summary, folded)
+            # Rebase: the pinned catalogue absorbs the deltas of the folded turns
+            session.catalogue = dict(current)
+            turn_message = message if not context else f"Contexto adicional: {context}\n\n{message}"
+            contents = self._contents(session, user_label, turn_message)
+
+        return contents, turn_message
+
+    def record_turn(self, session: ChatSession, turn_message: str, reply: str) -> None:
+        if session.pending is not None:
+            session.known, session.pending = session.pending, None
+        session.turns.append((turn_message, reply))
+        session.last_used = datetime.utcnow()
+
+
+async def _async_value(value):
+    return value
+
+
+chat_sessions = ChatSessionStore(
+    max_sessions=settings.CHAT_SESSIONS_MAX,
+    token_budget=settings.CHAT_TOKEN_BUDGET
+)
@@ -0,0 +1,205 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict, deque
+from datetime import datetime
+import asyncio
+import logging
+import math
+import time
+
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class AIUnavailableError(Exception):
+    """The AI call failed, timed out or was not attempted because the circuit is open."""
+
+    def __init__(self, message: str, retry_after: int = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(AIUnavailableError):
+    """Fail-fast rejection while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker around calls to an external dependency.
+
+    The outcome of the last ``window`` calls is kept; once at least
+    ``min_calls`` have been seen and the share of failed or slow calls reaches
+    ``failure_rate``, the circuit opens and calls fail immediately for
+    ``open_seconds``. After that a single probe call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    A probe that ends without an outcome (cancelled, or a stream closed
+    by the client) is released so the next call can probe; a probe that
+    is never released stops blocking others after ``call_timeout``.
+    Every call is also bounded by ``call_timeout`` so a hanging dependency
+    doesn't hold the request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 15.0,
+        call_timeout: float = 30.0,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.call_timeout = call_timeout
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = failed or slow
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._stats = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.open_seconds - (self.clock() - self._opened_at)))
+
+    def allow(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns True
+        when the call is the half-open probe; pass it to ``release`` if the
+        call ends without being recorded.
+        """
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and (
+            not self._probe_in_flight or self.clock() - self._probe_started >= self.call_timeout
+        ):
+            if self._probe_in_flight:
+                logger.warning(f"Circuit {self.name} probe lost, letting another one through")
+            self._state = HALF_OPEN
+            self._probe_in_flight = True
+            self._probe_started = self.clock()
+            return True
+        self._stats["rejected"] += 1
+        raise CircuitOpenError(
+            f"Servicio {self.name} no disponible temporalmente", self.retry_after()
+        )
+
+    def release(self, probe: bool) -> None:
+        """Give back the probe slot of a call that ended without an outcome."""
+        if probe and self._state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record(self, failed: bool, duration: float = 0.0) -> None:
+        slow = not failed and duration >= self.slow_call_seconds
+        self._stats["calls"] += 1
+        self._stats["failures"] += int(failed)
+        self._stats["slow"] += int(slow)
+
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+            if failed or slow:
+                self._open()
+            else:
+                logger.info(f"Circuit {self.name} closed after successful probe")
+                self._state = CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append(failed or slow)
+        if (
+            self._state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds}s")
+
+    async def call(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``factory()`` through the breaker; failures surface as AIUnavailableError."""
+        probe = self.allow()
+        start = self.clock()
+        try:
+            result = await asyncio.wait_for(factory(), timeout=self.call_timeout)
+        except asyncio.TimeoutError:
+            self.record(True)
+            raise AIUnavailableError(f"{self.name} no respondió en {self.call_timeout}s")
+        except Exception as e:
+            self.record(True)
+            raise AIUnavailableError(f"Error en {self.name}: {e}") from e
+        except BaseException:
+            # Cancelled: no outcome to record, but the probe slot must not stay taken
+            self.release(probe)
+            raise
+        self.record(False, self.clock() - start)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "name": self.name,
+            "state": state,
+            "retry_after": self.retry_after() if state == OPEN else 0,
+            "window_failure_rate": round(sum(self._outcomes) / len(self._outcomes), 4) if self._outcomes else 0.0,
+            **self._stats
+        }
+
+    def reset(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._probe_in_flight = False
+        for key in self._stats:
+            self._stats[key] = 0
+
+
+class LastGoodCache:
+    """Last successful AI result per (endpoint, key), served while the AI is unavailable."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, datetime]]" = OrderedDict()
+
+    def put(self, endpoint: str, value: Any, key: Hashable = None) -> None:
+        self._entries[(endpoint, key)] = (value, datetime.utcnow())
+        self._entries.move_to_end((endpoint, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, endpoint: str, key: Hashable = None) -> Optional[Tuple[Any, datetime]]:
+        return self._entries.get((endpoint, key))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+ai_breaker = CircuitBreaker(
+    "Gemini",
+    failure_rate=settings.AI_BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.AI_SLOW_CALL_SECONDS,
+    call_timeout=settings.AI_CALL_TIMEOUT,
+    open_seconds=settings.AI_BREAKER_OPEN_SECONDS
+)
+
+last_good = LastGoodCache()
@@ -0,0 +1,263 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEASON = 7
+HISTORY_DAYS = 8 * SEASON
+METHODS = ("seasonal_naive", "holt_winters", "dow_profile")
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+EntityKey = Tuple[str, int]  # ("space" | "resource", id)
+
+
+class UsageSeries:
+    """Daily usage matrix (entities × days) and day-of-week × hour profile built from UsageData rows."""
+
+    def __init__(self, keys: List[EntityKey], daily: np.ndarray, profile: np.ndarray, start: date):
+        self.keys = keys
+        self.daily = daily
+        self.profile = profile
+        self.start = start
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Optional[int], Optional[int], datetime, float]], start: date, days: int) -> "UsageSeries":
+        """
+        ``rows`` are ``(space_id, resource_id, fecha, uso)``. A row counts for
+        its space and for its resource. The daily value is the mean ``uso`` of
+        the day; days without rows count as 0.
+        """
+        index: Dict[EntityKey, int] = {}
+        ent, day, hour, value = [], [], [], []
+        for space_id, resource_id, fecha, uso in rows:
+            offset = (fecha.date() - start).days
+            if not 0 <= offset < days:
+                continue
+            for key in (("space", space_id), ("resource", resource_id)):
+                if key[1] is None:
+                    continue
+                ent.append(index.setdefault(key, len(index)))
+                day.append(offset)
+                hour.append(fecha.hour)
+                value.append(uso or 0.0)
+
+        n = len(index)
+        ent_a, day_a, hour_a = np.array(ent, dtype=int), np.array(day, dtype=int), np.array(hour, dtype=int)
+        value_a = np.array(value, dtype=float)
+
+        sums = np.zeros((n, days))
+        counts = np.zeros((n, days))
+        np.add.at(sums, (ent_a, day_a), value_a)
+        np.add.at(counts, (ent_a, day_a), 1)
+        daily = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+        dow_a = (start.weekday() + day_a) % SEASON
+        profile_sums = np.zeros((n, SEASON, 24))
+        profile_counts = np.zeros((n, SEASON, 24))
+        np.add.at(profile_sums, (ent_a, dow_a, hour_a), value_a)
+        np.add.at(profile_counts, (ent_a, dow_a, hour_a), 1)
+        profile = np.divide(profile_sums, profile_counts, out=np.zeros_like(profile_sums), where=profile_counts > 0)
+
+        keys = sorted(index, key=index.get)
+        return cls(keys, daily, profile, start)
+
+
+def seasonal_naive(y: np.ndarray, horizon: int) -> np.ndarray:
+    """Each future day repeats the same weekday of the last observed week."""
+    last_week = y[:, -SEASON:]
+    return last_week[:, np.arange(horizon) % SEASON]
+
+
+def dow_profile(y: np.ndarray, start_dow: int, horizon: int) -> np.ndarray:
+    """Mean of each weekday over the whole history."""
+    days = y.shape[1]
+    dows = (start_dow + np.arange(days)) % SEASON
+    means = np.stack([y[:, dows == d].mean(axis=1) if (dows == d).any() else np.zeros(len(y)) for d in range(SEASON)], axis=1)
+    return means[:, (start_dow + days + np.arange(horizon)) % SEASON]
+
+
+def holt_winters(
+    y: np.ndarray,
+    horizon: int,
+    alpha: float = 0.3,
+    beta: float = 0.05,
+    gamma: float = 0.2,
+    phi: float = 0.9
+) -> np.ndarray:
+    """Additive Holt-Winters with damped trend and weekly seasonality, run for all entities at once."""
+    n, days = y.shape
+    level = y[:, :SEASON].mean(axis=1)
+    if days >= 2 * SEASON:
+        trend = (y[:, SEASON:2 * SEASON].mean(axis=1) - level) / SEASON
+    else:
+        trend = np.zeros(n)
+    season = y[:, :SEASON] - level[:, None]
+
+    for t in range(days):
+        s = season[:, t % SEASON]
+        new_level = alpha * (y[:, t] - s) + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        season[:, t % SEASON] = gamma * (y[:, t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    k = np.arange(1, horizon + 1)
+    damped = phi * (1 - phi ** k) / (1 - phi)
+    return level[:, None] + damped[None, :] * trend[:, None] + season[:, (days + k - 1) % SEASON]
+
+
+def _all_methods(y: np.ndarray, start_dow: int, horizon: int) -> np.ndarray:
+    """Forecasts of every method, shape (methods, entities, horizon)."""
+    return np.stack([
+        seasonal_naive(y, horizon),
+        holt_winters(y, horizon),
+        dow_profile(y, start_dow, horizon)
+    ])
+
+
+class UsageForecaster:
+    """
+    Local usage forecaster for spaces and resources.
+
+    Three forecasts are computed for every entity at once: seasonal-naive,
+    Holt-Winters with weekly seasonality and a day-of-week profile. They are
+    blended with weights inverse to their error on the last observed week
+    (backtest), and the spread of the blended backtest errors gives the
+    confidence interval, widened with the horizon. Results are cached for the
+    current day.
+    """
+
+    def __init__(self, z: float = 1.96):
+        self.z = z
+        self._cache_day: Optional[date] = None
+        self._cache: Dict[Hashable, Dict[str, Any]] = {}
+
+    def cached(self, key: Hashable, today: date) -> Optional[Dict[str, Any]]:
+        if self._cache_day != today:
+            self._cache_day = today
+            self._cache.clear()
+        return self._cache.get(key)
+
+    def store(self, key: Hashable, today: date, result: Dict[str, Any]) -> None:
+        if self._cache_day == today:
+            self._cache[key] = result
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def forecast(
+        self,
+        series: UsageSeries,
+        horizon: int,
+        names: Optional[Dict[EntityKey, str]] = None
+    ) -> Dict[str, Any]:
+        names = names or {}
+        y = series.daily
+        if not series.keys:
+            return {"predictions": [], "confidence": 0.0, "insights": ["No hay datos de uso históricos para predecir"]}
+
+        n, days = y.shape
+        start_dow = series.start.weekday()
+        first_day = series.start + timedelta(days=days)
+
+        # Backtest sobre la última semana para ponderar los métodos y estimar el error
+        if days >= 3 * SEASON:
+            backtest = _all_methods(y[:, :-SEASON], start_dow, SEASON)
+            actual = y[:, -SEASON:]
+            mae = np.abs(backtest - actual[None]).mean(axis=2)  # (methods, entities)
+            weights = 1.0 / (mae + 1e-6)
+            weights /= weights.sum(axis=0, keepdims=True)
+            residuals = (weights[:, :, None] * backtest).sum(axis=0) - actual
+            sigma = np.sqrt((residuals ** 2).mean(axis=1))
+            scale = np.maximum(y.mean(axis=1), 1e-6)
+            confidence = np.clip(1 - np.abs(residuals).mean(axis=1) / scale, 0.0, 1.0)
+        else:
+            weights = np.full((len(METHODS), n), 1.0 / len(METHODS))
+            sigma = y.std(axis=1)
+            confidence = np.full(n, 0.5)
+
+        forecasts = _all_methods(y, start_dow, horizon)
+        blended = np.clip((weights[:, :, None] * forecasts).sum(axis=0), 0.0, None)
+        width = self.z * sigma[:, None] * np.sqrt(1 + np.arange(horizon) / SEASON)[None, :]
+        lower = np.clip(blended - width, 0.0, None)
+        upper = blended + width
+
+        future_dows = (first_day.weekday() + np.arange(horizon)) % SEASON
+        last_week = y[:, -SEASON:].mean(axis=1)
+        next_week = blended[:, :min(SEASON, horizon)].mean(axis=1)
+
+        predictions = []
+        for i, (entity_type, entity_id) in enumerate(series.keys):
+            dow_means = y[i].reshape(-1)[:days - days % SEASON].reshape(-1, SEASON).mean(axis=0) if days >= SEASON else None
+            factors = [f"Método principal: {METHODS[int(weights[:, i].argmax())].replace('_', '-')}"]
+            if dow_means is not None and dow_means.max() > 0:
+                peak_dow = (start_dow + int(dow_means.argmax())) % SEASON
+                factors.append(f"Mayor uso los {DIAS[peak_dow]}")
+            change = (next_week[i] - last_week[i]) / last_week[i] * 100 if last_week[i] > 0 else 0.0
+            if abs(change) >= 5:
+                factors.append(f"Tendencia {'creciente' if change > 0 else 'decreciente'} ({change:+.0f}% próxima semana)")
+
+            predictions.append({
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "nombre": names.get((entity_type, entity_id)),
+                "predicted_usage": round(float(blended[i].mean()), 2),
+                "lower": round(float(lower[i].mean()), 2),
+                "upper": round(float(upper[i].mean()), 2),
+                "period": f"próximos {horizon} días",
+                "confidence": round(float(confidence[i]), 3),
+                "factors": factors,
+                "daily": [
+                    {
+                        "fecha": (first_day + timedelta(days=k)).isoformat(),
+                        "predicted_usage": round(float(blended[i, k]), 2),
+                        "lower": round(float(lower[i, k]), 2),
+                        "upper": round(float(upper[i, k]), 2),
+                        "horas_pico": [int(h) for h in np.argsort(series.profile[i, future_dows[k]])[::-1][:3]
+                                       if series.profile[i, future_dows[k], h] > 0]
+                    }
+                    for k in range(horizon)
+                ]
+            })
+
+        predictions.sort(key=lambda p: -p["predicted_usage"])
+        return {
+            "predictions": predictions,
+            "confidence": round(float(confidence.mean()), 3),
+            "insights": self._insights(predictions, last_week, next_week, series.keys, names)
+        }
+
+    @staticmethod
+    def _insights(
+        predictions: List[Dict[str, Any]],
+        last_week: np.ndarray,
+        next_week: np.ndarray,
+        keys: List[EntityKey],
+        names: Dict[EntityKey, str]
+    ) -> List[str]:
+        def label(i: int) -> str:
+            entity_type, entity_id = keys[i]
+            return names.get(keys[i]) or f"{'Espacio' if entity_type == 'space' else 'Recurso'} {entity_id}"
+
+        insights = []
+        top = predictions[0]
+        insights.append(
+            f"Mayor uso previsto: {top['nombre'] or top['entity_id']} con {top['predicted_usage']:.1f} de uso diario promedio"
+        )
+        change = np.divide(next_week - last_week, last_week, out=np.zeros_like(last_week), where=last_week > 0)
+        if len(change) and change.max() >= 0.1:
+            i = int(change.argmax())
+            insights.append(f"{label(i)} aumentaría su uso un {change[i] * 100:.0f}% la próxima semana")
+        if len(change) and change.min() <= -0.1:
+            i = int(change.argmin())
+            insights.append(f"{label(i)} reduciría su uso un {-change[i] * 100:.0f}% la próxima semana")
+        idle = int((next_week < 1e-6).sum())
+        if idle:
+            insights.append(f"{idle} elementos sin uso previsto la próxima semana")
+        return insights
+
+
+forecaster = UsageForecaster()
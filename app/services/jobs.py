@@ -0,0 +1,288 @@
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Type
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db.crud import JobCRUD, UserCRUD
+from app.db.models import Job
+from app.services.notifications import NotificationService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Job estados
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+ERROR = "error"
+
+# handler(db, user, parametros) -> JSON-serializable result
+JobHandler = Callable[[AsyncSession, Any, Dict[str, Any]], Awaitable[Any]]
+
+
+class _Progress:
+    def __init__(self):
+        self.value = 0.0
+        self.changed = asyncio.Event()
+
+
+_progress: ContextVar[Optional[_Progress]] = ContextVar("job_progress", default=None)
+
+
+def report_progress(fraction: float) -> None:
+    """
+    Report how much of the current job is done (0..1). The job's heartbeat
+    writes it to ``jobs.progreso`` right away. Outside a job (or from
+    executor threads, which do not inherit the context) it does nothing.
+    """
+    progress = _progress.get()
+    if progress is not None:
+        progress.value = min(max(float(fraction), 0.0), 0.99)
+        progress.changed.set()
+
+
+@dataclass
+class JobType:
+    handler: JobHandler
+    params_model: Optional[Type[BaseModel]] = None
+    titulo: str = ""
+    roles: Optional[List[str]] = None
+    ai_group: Optional[str] = None  # rate-limit group charged when a job of this type is submitted
+
+
+class JobQueue:
+    """
+    Background job runner for long AI and optimization workloads.
+
+    Jobs are persisted in the ``jobs`` table by the HTTP handler, their ids are
+    queued here and picked up by in-process asyncio workers, each of which uses
+    its own DB session. Results (or the error) are written back to the row and
+    the owner is notified through NotificationService, which also pushes to the
+    notification stream.
+
+    Several processes may share the table: a job is claimed with a single
+    conditional UPDATE, so only one worker runs it. While it runs, the worker
+    refreshes ``heartbeat_at`` (and ``progreso``, see ``report_progress``)
+    every ``heartbeat_seconds``; jobs whose heartbeat is older than
+    ``stale_seconds`` belong to a dead process and are marked as failed.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        session_factory: Optional[async_sessionmaker] = None,
+        heartbeat_seconds: float = 15.0,
+        stale_seconds: float = 90.0
+    ):
+        self.workers = workers
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._session_factory = session_factory
+        self._types: Dict[str, JobType] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def session_factory(self) -> async_sessionmaker:
+        if self._session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    def register(
+        self,
+        tipo: str,
+        handler: JobHandler,
+        params_model: Optional[Type[BaseModel]] = None,
+        titulo: str = "",
+        roles: Optional[List[str]] = None,
+        ai_group: Optional[str] = None
+    ) -> None:
+        self._types[tipo] = JobType(
+            handler=handler,
+            params_model=params_model,
+            titulo=titulo or tipo,
+            roles=roles,
+            ai_group=ai_group
+        )
+
+    @property
+    def types(self) -> List[str]:
+        return sorted(self._types)
+
+    def get_type(self, tipo: str) -> Optional[JobType]:
+        return self._types.get(tipo)
+
+    def validate(self, tipo: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        """Check the job type exists and its parameters parse. Raises KeyError / ValidationError."""
+        job_type = self._types[tipo]
+        if job_type.params_model is None:
+            return parametros
+        return job_type.params_model(**parametros).model_dump(mode="json")
+
+    async def submit(self, db: AsyncSession, user_id: int, tipo: str, parametros: Dict[str, Any]) -> Job:
+        """Persist a new job and queue it. Commits so workers can see the row."""
+        job = await JobCRUD.create(
+            db,
+            user_id=user_id,
+            tipo=tipo,
+            estado=PENDIENTE,
+            parametros=parametros,
+            progreso=0.0
+        )
+        await db.commit()
+        self._queue.put_nowait(job.id)
+        logger.info(f"Job {job.id} ({tipo}) queued for user {user_id}")
+        return job
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await self._recover()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._reaper(), name="job-reaper"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _fail_stale(self, db: AsyncSession) -> int:
+        now = datetime.utcnow()
+        failed = await JobCRUD.fail_stale(
+            db,
+            now - timedelta(seconds=self.stale_seconds),
+            "Interrumpido: el proceso que ejecutaba la tarea dejó de responder",
+            now
+        )
+        if failed:
+            logger.warning(f"Marked {failed} stale job(s) as failed")
+        return failed
+
+    async def _recover(self) -> None:
+        """Requeue pending jobs and fail the ones whose worker stopped sending heartbeats."""
+        async with self.session_factory() as db:
+            await self._fail_stale(db)
+            pending = await JobCRUD.get_by_estado(db, PENDIENTE)
+            await db.commit()
+        for job in pending:
+            self._queue.put_nowait(job.id)
+
+    async def _reaper(self) -> None:
+        while True:
+            await asyncio.sleep(self.stale_seconds)
+            try:
+                async with self.session_factory() as db:
+                    await self._fail_stale(db)
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Job reaper failed: {e}")
+
+    async def _heartbeat(self, job_id: int, progress: _Progress) -> None:
+        """Refresh heartbeat_at and progreso until cancelled, immediately when progress is reported."""
+        while True:
+            try:
+                await asyncio.wait_for(progress.changed.wait(), timeout=self.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                pass
+            progress.changed.clear()
+            try:
+                async with self.session_factory() as db:
+                    await JobCRUD.heartbeat(db, job_id, self.worker_id, datetime.utcnow(), progress.value)
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Heartbeat of job {job_id} failed: {e}")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker {index} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def run(self, job_id: int) -> Optional[Job]:
+        """Execute one job to completion. Exposed for tests and synchronous callers."""
+        async with self.session_factory() as db:
+            claimed = await JobCRUD.claim(db, job_id, self.worker_id, datetime.utcnow())
+            await db.commit()
+            job = await JobCRUD.get_by_id(db, job_id)
+            if not claimed:
+                # Unknown id, or already taken by another worker
+                return job
+
+            tipo, user_id, parametros = job.tipo, job.user_id, job.parametros or {}
+            job_type = self._types.get(tipo)
+            progress = _Progress()
+            token = _progress.set(progress)
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, progress))
+
+            try:
+                try:
+                    if job_type is None:
+                        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+                    user = await UserCRUD.get_by_id(db, user_id)
+                    result = await job_type.handler(db, user, parametros)
+                finally:
+                    heartbeat.cancel()
+                    await asyncio.gather(heartbeat, return_exceptions=True)
+                    _progress.reset(token)
+                if isinstance(result, BaseModel):
+                    result = result.model_dump(mode="json")
+                await db.commit()
+                job = await JobCRUD.update(
+                    db, job_id,
+                    estado=COMPLETADO,
+                    resultado=result,
+                    progreso=1.0,
+                    finished_at=datetime.utcnow()
+                )
+                mensaje = f"La tarea '{job_type.titulo}' #{job_id} ha finalizado"
+            except Exception as e:
+                await db.rollback()
+                detail = getattr(e, "detail", None) or str(e)
+                logger.error(f"Job {job_id} ({tipo}) failed: {detail}")
+                job = await JobCRUD.update(
+                    db, job_id,
+                    estado=ERROR,
+                    error=str(detail),
+                    finished_at=datetime.utcnow()
+                )
+                mensaje = f"La tarea #{job_id} falló: {detail}"
+
+            await NotificationService.send_notification(
+                db,
+                user_id=user_id,
+                titulo="Tarea en segundo plano",
+                mensaje=mensaje,
+                tipo="job"
+            )
+            await db.commit()
+            return job
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    heartbeat_seconds=settings.JOB_HEARTBEAT_SECONDS,
+    stale_seconds=settings.JOB_STALE_SECONDS
+)
@@ -0,0 +1,64 @@
+from typing import List, Tuple
+
+from app.core.compression import compression_stats
+from app.core.http_cache import response_cache
+from app.core.metrics import Collector, Labels, Metrics, executor_collector
+from app.services.ai_json import parse_metrics
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, ai_breaker
+from app.services.jobs import job_queue
+from app.services.occupancy import occupancy_engine
+from app.services.rate_limit import ai_limiter
+from app.services.simulator import scenario_simulator
+
+Family = Tuple[str, str, str, List[Tuple[Labels, float]]]
+
+
+def ai_metrics() -> List[Family]:
+    limiter = ai_limiter.snapshot()
+    breaker = ai_breaker.snapshot()
+    parsing = parse_metrics.snapshot()
+    return [
+        ("ai_rate_limit_allowed_total", "counter", "AI calls admitted by the rate limiter",
+         [((("group", group),), counts["allowed"]) for group, counts in limiter["groups"].items()]),
+        ("ai_rate_limit_rejected_total", "counter", "AI calls rejected by the rate limiter",
+         [((("group", group), ("reason", reason)), count)
+          for group, counts in limiter["groups"].items() for reason, count in counts["rejected"].items()]),
+        ("ai_in_flight", "gauge", "AI calls holding a concurrency slot",
+         [((("function", function),), count) for function, count in limiter["in_flight"].items()]),
+        ("ai_breaker_state", "gauge", "1 for the current circuit breaker state",
+         [((("name", breaker["name"]), ("state", state)), int(breaker["state"] == state))
+          for state in (CLOSED, OPEN, HALF_OPEN)]),
+        *[
+            (f"ai_breaker_{key}_total", "counter", f"Circuit breaker {key.replace('_', ' ')}",
+             [((("name", breaker["name"]),), breaker[key])])
+            for key in ("calls", "failures", "slow", "rejected", "opened")
+        ],
+        ("ai_json_responses_total", "counter", "AI JSON responses by decoding outcome",
+         [((("endpoint", endpoint), ("outcome", outcome)), counts[outcome])
+          for endpoint, counts in parsing.items() for outcome in ("parsed", "repaired", "failed")]),
+    ]
+
+
+def cache_metrics() -> List[Family]:
+    return [
+        ("http_cache_lookups_total", "counter", "Catalogue body cache lookups",
+         [((("result", result),), count) for result, count in response_cache.stats.items()]),
+        ("occupancy_cache_days_total", "counter", "Occupancy engine day lookups",
+         [((("result", result),), count) for result, count in occupancy_engine.stats.items()]),
+        ("http_response_bytes_total", "counter", "Response bytes before compression",
+         [((("route", path),), entry[2]) for path, entry in compression_stats.routes.items()]),
+        ("http_response_sent_bytes_total", "counter", "Response bytes sent after compression",
+         [((("route", path),), entry[3]) for path, entry in compression_stats.routes.items()]),
+        ("job_queue_pending", "gauge", "Background jobs waiting for a worker", [((), job_queue.pending)]),
+    ]
+
+
+def register_service_metrics(registry: Metrics, ai_executor) -> None:
+    collectors: List[Collector] = [
+        ai_metrics,
+        cache_metrics,
+        executor_collector("ai", lambda: ai_executor),
+        executor_collector("simulation", lambda: scenario_simulator._pool),
+    ]
+    for collector in collectors:
+        registry.register(collector)
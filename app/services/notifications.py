@@ -1,18 +1,112 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
+import asyncio
 import logging
+import time
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from app.db.crud import NotificationCRUD, NotificationSettingsCRUD
-from app.db.models import Notification
+from app.db.models import Notification, NotificationSettings
+from app.schemas.notification import NotificationResponse
+from app.services import pubsub
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class UnreadCounter:
+    """
+    Per-user unread notification counts kept in process memory.
+
+    A count is seeded from a single COUNT query the first time it is read, then
+    adjusted by the write paths. Entries expire after ``ttl`` seconds so changes
+    made by other workers are picked up.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._counts: Dict[int, Tuple[int, float]] = {}
+
+    async def get(self, db: AsyncSession, user_id: int) -> int:
+        now = time.monotonic()
+        entry = self._counts.get(user_id)
+        if entry and now - entry[1] < self.ttl:
+            return entry[0]
+
+        count = await NotificationCRUD.count_unread(db, user_id)
+        self._counts[user_id] = (count, now)
+        return count
+
+    def increment(self, user_id: int, amount: int = 1) -> None:
+        entry = self._counts.get(user_id)
+        if entry:
+            self._counts[user_id] = (max(0, entry[0] + amount), entry[1])
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        if user_id is None:
+            self._counts.clear()
+        else:
+            self._counts.pop(user_id, None)
+
+
+unread_counter = UnreadCounter()
+
+_OUTBOX = "notifications_outbox"
+_deliveries: Set[asyncio.Task] = set()
+
+
+def _queue_publish(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    """Push ``payload`` to its user's stream once ``db`` commits (dropped on rollback)."""
+    db.info.setdefault(_OUTBOX, []).append(payload)
+
+
+async def _deliver(payloads: List[Dict[str, Any]]) -> None:
+    for payload in payloads:
+        await pubsub.hub.publish(pubsub.user_channel(payload["user_id"]), payload)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_outbox(session: Session) -> None:
+    payloads = session.info.pop(_OUTBOX, None)
+    if not payloads:
+        return
+    for payload in payloads:
+        unread_counter.increment(payload["user_id"])
+    task = asyncio.get_running_loop().create_task(_deliver(payloads))
+    _deliveries.add(task)
+    task.add_done_callback(_deliveries.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_outbox(session: Session) -> None:
+    session.info.pop(_OUTBOX, None)
+
+
+# Notification tipo -> NotificationSettings flag that can mute it
+ALERT_PREFERENCES = {
+    "assignment": "assignment_alerts",
+    "usage": "usage_alerts",
+    "optimization": "optimization_alerts",
+}
+
+
+def _alerts_enabled(settings: Optional[NotificationSettings], tipo: str) -> bool:
+    flag = ALERT_PREFERENCES.get(tipo)
+    if not settings or not flag:
+        return True
+    return bool(getattr(settings, flag))
+
+
 class NotificationService:
     
+    @staticmethod
+    async def publish_created(db: AsyncSession, notification: Notification) -> None:
+        """Once ``db`` commits, update the unread counter and push the notification to its user's stream."""
+        _queue_publish(db, NotificationResponse.model_validate(notification).model_dump(mode="json"))
+
     @staticmethod
     async def send_notification(
         db: AsyncSession,
@@ -23,16 +117,9 @@ class NotificationService:
     ) -> Optional[Notification]:
         settings = await NotificationSettingsCRUD.get_by_user(db, user_id)
         
-        if settings:
-            if tipo == "assignment" and not settings.assignment_alerts:
-                logger.info(f"Assignment alerts disabled for user {user_id}")
-                return None
-            if tipo == "usage" and not settings.usage_alerts:
-                logger.info(f"Usage alerts disabled for user {user_id}")
-                return None
-            if tipo == "optimization" and not settings.optimization_alerts:
-                logger.info(f"Optimization alerts disabled for user {user_id}")
-                return None
+        if not _alerts_enabled(settings, tipo):
+            logger.info(f"{tipo.capitalize()} alerts disabled for user {user_id}")
+            return None
         
         notification = await NotificationCRUD.create(
             db,
@@ -41,10 +128,47 @@ class NotificationService:
             mensaje=mensaje,
             tipo=tipo
         )
+        await NotificationService.publish_created(db, notification)
         
         logger.info(f"Notification sent to user {user_id}: {titulo}")
         return notification
 
+    @staticmethod
+    async def send_bulk_notification(
+        db: AsyncSession,
+        user_ids: List[int],
+        titulo: str,
+        mensaje: str,
+        tipo: str = "info"
+    ) -> List[int]:
+        """
+        Fan out the same notification to many users.
+
+        Preferences for every recipient are loaded with one query and all eligible
+        rows are written with one multi-row INSERT (with RETURNING where the
+        database supports it). Recipients are pushed the new rows, with their ids, after the commit.
+        Returns the notified user ids.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        settings_by_user = await NotificationSettingsCRUD.get_by_users(db, user_ids)
+        
+        recipients = [
+            uid for uid in user_ids
+            if _alerts_enabled(settings_by_user.get(uid), tipo)
+        ]
+        # Whole seconds: the batch is looked up by created_at where DATETIME drops microseconds
+        created_at = datetime.utcnow().replace(microsecond=0)
+        rows = [
+            {"user_id": uid, "titulo": titulo, "mensaje": mensaje, "tipo": tipo, "leida": False, "created_at": created_at}
+            for uid in recipients
+        ]
+        ids = await NotificationCRUD.create_many(db, rows)
+        for notification_id, row in zip(ids, rows):
+            _queue_publish(db, NotificationResponse(id=notification_id, **row).model_dump(mode="json"))
+        
+        logger.info(f"Notification sent to {len(recipients)} of {len(user_ids)} users: {titulo}")
+        return recipients
+
     @staticmethod
     async def send_assignment_notification(
         db: AsyncSession,
@@ -106,19 +230,35 @@ class NotificationService:
         limit: int = 50,
         unread_only: bool = False
     ) -> List[Notification]:
-        notifications = await NotificationCRUD.get_by_user(db, user_id, skip, limit)
-        
-        if unread_only:
-            notifications = [n for n in notifications if not n.leida]
-        
-        return notifications
+        return await NotificationCRUD.get_by_user(db, user_id, skip, limit, unread_only=unread_only)
+
+    @staticmethod
+    async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+        return await unread_counter.get(db, user_id)
+
+    @staticmethod
+    async def mark_notifications_read(
+        db: AsyncSession,
+        user_id: int,
+        notification_ids: Optional[List[int]] = None,
+        before: Optional[datetime] = None
+    ) -> int:
+        updated = await NotificationCRUD.mark_many_as_read(db, user_id, notification_ids, before)
+        if updated:
+            unread_counter.invalidate(user_id)
+        return updated
 
     @staticmethod
     async def mark_notification_read(
         db: AsyncSession,
-        notification_id: int
+        notification_id: int,
+        user_id: int
     ) -> bool:
-        return await NotificationCRUD.mark_as_read(db, notification_id)
+        """Mark one of ``user_id``'s notifications as read; False if it doesn't exist or isn't theirs."""
+        success = await NotificationCRUD.mark_as_read(db, notification_id, user_id)
+        if success:
+            unread_counter.invalidate(user_id)
+        return success
 
 
 notification_service = NotificationService()
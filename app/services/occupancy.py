@@ -0,0 +1,236 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+import logging
+
+import numpy as np
+
+from app.services.simulator import DEFAULT_DURATION_HOURS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUCKET_HOURS = {"hour": 1, "day": 24, "week": 7 * 24}
+MAX_BUCKETS = 2000
+
+# Per room and cached day: row 0 occupied seconds, row 1 sum of uso, row 2 UsageData rows, per hour
+DayCell = np.ndarray
+
+
+def align(moment: datetime, bucket: str, up: bool = False) -> datetime:
+    """Start of the ``bucket`` containing ``moment`` (weeks start on Monday), or the next boundary if ``up``."""
+    if bucket == "hour":
+        floor = moment.replace(minute=0, second=0, microsecond=0)
+    else:
+        floor = datetime.combine(moment.date(), time.min)
+        if bucket == "week":
+            floor -= timedelta(days=floor.weekday())
+    if up and floor < moment:
+        floor += timedelta(hours=BUCKET_HOURS[bucket])
+    return floor
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+class OccupancyEngine:
+    """
+    Time-bucketed occupancy of spaces from assignment intervals and UsageData.
+
+    Assignments come sorted by (room, fecha) and are swept once: overlapping
+    intervals of a room are merged, and each merged interval adds its seconds
+    to the hours it covers. Results are cached per day and room as 24-hour
+    rows, so hour, day and week buckets and the heatmaps are all aggregated
+    from the same cache and only days never seen before are read from the
+    database. The cache is dropped when the assignments or usage_data table
+    version changes.
+    """
+
+    def __init__(self, max_days: int = 800):
+        self.max_days = max_days
+        self._version: Optional[Hashable] = None
+        self._days: "OrderedDict[date, Dict[int, DayCell]]" = OrderedDict()
+        self._complete: Set[date] = set()  # days computed for every room
+        self._by_room: Dict[int, Set[date]] = {}  # days computed for a single room
+        self.stats = {"hits": 0, "misses": 0}
+
+    def clear(self) -> None:
+        self._days.clear()
+        self._complete.clear()
+        self._by_room.clear()
+
+    def validate(self, version: Hashable) -> None:
+        if version != self._version:
+            self._version = version
+            self.clear()
+
+    def missing_days(self, first: date, last: date, space_id: Optional[int] = None) -> List[date]:
+        """
+        Days of ``first``..``last`` not cached yet. Cached days of the range are
+        marked as recently used, so folding in the missing ones cannot evict
+        them; the range itself must not exceed ``max_days``.
+        """
+        days = [first + timedelta(days=d) for d in range((last - first).days + 1)]
+        if len(days) > self.max_days:
+            raise ValueError(f"Period of {len(days)} days exceeds the occupancy cache ({self.max_days} days)")
+        for day in days:
+            if day in self._days:
+                self._days.move_to_end(day)
+        cached = self._complete | (self._by_room.get(space_id, set()) if space_id is not None else set())
+        missing = [d for d in days if d not in cached]
+        self.stats["hits"] += len(days) - len(missing)
+        self.stats["misses"] += len(missing)
+        return missing
+
+    def add(
+        self,
+        intervals: Iterable[Tuple[int, datetime, Optional[datetime]]],
+        usage: Iterable[Tuple[Optional[int], Any, datetime, float]],
+        first: date,
+        last: date,
+        space_id: Optional[int] = None
+    ) -> None:
+        """
+        Fold the days ``first``..``last`` into the cache. ``intervals`` are
+        ``(room_id, fecha, fecha_fin)`` sorted by room and fecha; ``usage``
+        rows are ``(space_id, resource_id, fecha, uso)``.
+        """
+        start = datetime.combine(first, time.min)
+        end = datetime.combine(last + timedelta(days=1), time.min)
+        days = [first + timedelta(days=d) for d in range((last - first).days + 1)]
+        for day in days:
+            cells = self._days.setdefault(day, {})
+            for room in ([space_id] if space_id is not None else list(cells)):
+                cells.pop(room, None)
+
+        room, merged_start, merged_end = None, None, None
+        for room_id, fecha, fecha_fin in intervals:
+            fecha = _naive(fecha)
+            fecha_fin = _naive(fecha_fin) if fecha_fin else fecha + timedelta(hours=DEFAULT_DURATION_HOURS)
+            if room_id == room and fecha <= merged_end:
+                merged_end = max(merged_end, fecha_fin)
+                continue
+            if room is not None:
+                self._spread(room, merged_start, merged_end, start, end)
+            room, merged_start, merged_end = room_id, fecha, fecha_fin
+        if room is not None:
+            self._spread(room, merged_start, merged_end, start, end)
+
+        for row_space, _, fecha, uso in usage:
+            fecha = _naive(fecha)
+            if row_space is None or not start <= fecha < end:
+                continue
+            cell = self._cell(row_space, fecha.date())
+            cell[1, fecha.hour] += uso or 0.0
+            cell[2, fecha.hour] += 1
+
+        if space_id is None:
+            self._complete.update(days)
+        else:
+            self._by_room.setdefault(space_id, set()).update(days)
+        for day in days:
+            self._days.move_to_end(day)
+        while len(self._days) > self.max_days:
+            evicted, _ = self._days.popitem(last=False)
+            self._complete.discard(evicted)
+            for room_days in self._by_room.values():
+                room_days.discard(evicted)
+
+    def _cell(self, room_id: int, day: date) -> DayCell:
+        cells = self._days.setdefault(day, {})
+        if room_id not in cells:
+            cells[room_id] = np.zeros((3, 24))
+        return cells[room_id]
+
+    def _spread(self, room_id: int, begin: datetime, finish: datetime, start: datetime, end: datetime) -> None:
+        """Add the seconds of [begin, finish) that fall in [start, end) to the hours they cover."""
+        begin, finish = max(begin, start), min(finish, end)
+        hour = begin.replace(minute=0, second=0, microsecond=0)
+        while hour < finish:
+            next_hour = hour + timedelta(hours=1)
+            seconds = (min(finish, next_hour) - max(begin, hour)).total_seconds()
+            if seconds > 0:
+                self._cell(room_id, hour.date())[0, hour.hour] += seconds
+            hour = next_hour
+
+    def hourly(self, room_ids: Sequence[int], start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(occupied seconds, uso sum, uso count) per room and hour of [start, end), from the cache."""
+        first = datetime.combine(start.date(), time.min)
+        days = -(-(end - first) // timedelta(days=1))
+        data = np.zeros((3, len(room_ids), days * 24))
+        index = {room_id: i for i, room_id in enumerate(room_ids)}
+        for d in range(days):
+            cells = self._days.get(first.date() + timedelta(days=d), {})
+            for room_id, cell in cells.items():
+                if room_id in index:
+                    data[:, index[room_id], d * 24:(d + 1) * 24] = cell
+        offset = start.hour
+        hours = int((end - start) // timedelta(hours=1))
+        data = data[:, :, offset:offset + hours]
+        return data[0], data[1], data[2]
+
+    def report(
+        self,
+        spaces: Sequence[Any],
+        start: datetime,
+        end: datetime,
+        bucket: str
+    ) -> Dict[str, Any]:
+        """Per-space bucket series, a spaces × buckets heatmap and a weekday × hour occupancy profile."""
+        width = BUCKET_HOURS[bucket]
+        room_ids = [s.id for s in spaces]
+        seconds, uso_sum, uso_count = self.hourly(room_ids, start, end)
+        hours = seconds.shape[1]
+        n_buckets = hours // width
+
+        occupied = seconds.reshape(len(room_ids), n_buckets, width).sum(axis=2)
+        occupancy = occupied / (width * 3600)
+        usage_sum = uso_sum.reshape(len(room_ids), n_buckets, width).sum(axis=2)
+        usage_count = uso_count.reshape(len(room_ids), n_buckets, width).sum(axis=2)
+        bucket_starts = [start + timedelta(hours=b * width) for b in range(n_buckets)]
+
+        dow_hour = ((start.weekday() * 24 + np.arange(hours)) % (7 * 24))
+        profile_seconds = np.zeros(7 * 24)
+        np.add.at(profile_seconds, dow_hour, seconds.sum(axis=0))
+        slots = np.bincount(dow_hour, minlength=7 * 24) * max(len(room_ids), 1) * 3600
+        profile = np.divide(profile_seconds, slots, out=np.zeros(7 * 24), where=slots > 0).reshape(7, 24)
+
+        result_spaces = []
+        for i, space in enumerate(spaces):
+            by_hour = np.bincount(dow_hour % 24, weights=seconds[i], minlength=24)
+            total_usage = usage_count[i].sum()
+            result_spaces.append({
+                "space_id": space.id,
+                "nombre": space.nombre,
+                "tipo": space.tipo,
+                "capacidad": space.capacidad,
+                "ocupacion_media": round(float(occupied[i].sum() / (hours * 3600)), 4) if hours else 0.0,
+                "horas_ocupadas": round(float(occupied[i].sum() / 3600), 2),
+                "hora_pico": int(by_hour.argmax()) if by_hour.any() else None,
+                "uso_medio": round(float(usage_sum[i].sum() / total_usage), 3) if total_usage else None,
+                "buckets": [
+                    {
+                        "inicio": bucket_starts[b].isoformat(),
+                        "ocupacion": round(float(occupancy[i, b]), 4),
+                        "uso": round(float(usage_sum[i, b] / usage_count[i, b]), 3) if usage_count[i, b] else None
+                    }
+                    for b in range(n_buckets)
+                ]
+            })
+
+        return {
+            "bucket": bucket,
+            "start_date": start,
+            "end_date": end,
+            "spaces": result_spaces,
+            "heatmap": {
+                "buckets": [b.isoformat() for b in bucket_starts],
+                "space_ids": room_ids,
+                "values": np.round(occupancy, 4).tolist()
+            },
+            "weekly_profile": np.round(profile, 4).tolist()
+        }
+
+
+occupancy_engine = OccupancyEngine()
@@ -2,6 +2,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import random
 
+from app.services.reference_data import reference_data
+
 
 class SpaceOptimizer:
     
@@ -56,19 +58,7 @@ class SpaceOptimizer:
         space_type = space.get("tipo", "").lower()
         resource_type = resource.get("tipo", "").lower()
         
-        compatibility_matrix = {
-            "office": ["computadora", "mobiliario", "equipo de oficina"],
-            "oficina": ["computadora", "mobiliario", "equipo de oficina"],
-            "conference": ["proyector", "pizarra", "sistema de videoconferencia"],
-            "sala de reuniones": ["proyector", "pizarra", "sistema de videoconferencia"],
-            "laboratory": ["equipo científico", "instrumentos", "computadora"],
-            "laboratorio": ["equipo científico", "instrumentos", "computadora"],
-            "classroom": ["proyector", "computadora", "pizarra"],
-            "auditorium": ["sistema de audio", "proyector", "iluminación"],
-            "auditorio": ["sistema de audio", "proyector", "iluminación"]
-        }
-        
-        compatible_resources = compatibility_matrix.get(space_type, [])
+        compatible_resources = reference_data.compatible_resources(space_type)
         
         if resource_type in compatible_resources:
             return 1.0
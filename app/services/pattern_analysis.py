@@ -0,0 +1,389 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEASON = 7
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+EntityKey = Tuple[str, int]  # ("space" | "resource", id)
+UsageRow = Tuple[Optional[int], Optional[int], Optional[int], datetime, float]  # (id, space_id, resource_id, fecha, uso)
+
+
+def _parse_fecha(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def rows_from_records(records: Iterable[Dict[str, Any]], base: Optional[datetime] = None) -> List[UsageRow]:
+    """
+    Usage rows from loosely shaped dicts: ``fecha``/``date``/``timestamp`` or
+    day/week indexes relative to ``base``, and ``uso``/``usage``. Records
+    without space or resource count for a single anonymous space (id 0).
+    """
+    base = base or datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    rows = []
+    for record in records or []:
+        if not isinstance(record, dict):
+            continue
+        fecha = _parse_fecha(record.get("fecha") or record.get("date") or record.get("timestamp"))
+        if fecha is None and isinstance(record.get("day"), int):
+            fecha = base + timedelta(days=record["day"])
+        if fecha is None and isinstance(record.get("week"), int):
+            fecha = base + timedelta(weeks=record["week"])
+        if fecha is None:
+            continue
+        uso = record.get("uso", record.get("usage", 0.0))
+        space_id, resource_id = record.get("space_id"), record.get("resource_id")
+        if space_id is None and resource_id is None:
+            space_id = 0
+        rows.append((None, space_id, resource_id, fecha.replace(tzinfo=None), float(uso or 0.0)))
+    return rows
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int = 20) -> np.ndarray:
+    """Deterministic k-means (farthest-point initialisation); returns the label of each row."""
+    centers = [x[int(np.argmax(x.max(axis=1)))]]
+    for _ in range(1, k):
+        distance = np.min([((x - c) ** 2).sum(axis=1) for c in centers], axis=0)
+        centers.append(x[int(np.argmax(distance))])
+    centers = np.array(centers)
+    labels = np.zeros(len(x), dtype=int)
+    for _ in range(iterations):
+        labels = ((x[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+        new_centers = np.array([x[labels == j].mean(axis=0) if (labels == j).any() else centers[j] for j in range(k)])
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    return labels
+
+
+class UsagePatternAnalyzer:
+    """
+    Local pattern and anomaly detection over UsageData.
+
+    Rows are folded into per-entity (day × hour) sums and counts over a sliding
+    window of ``window_days``, so each ingestion batch only adds its own rows
+    and the window slides by shifting columns. ``analyze`` works on those
+    aggregates: a moving-average trend plus weekday season decomposition,
+    anomalies flagged by both a robust (MAD) z-score of the residual and a
+    rolling z-score against the previous ``rolling_days``, clusters of
+    peak-hour/weekday profiles and chronically under-used spaces.
+    """
+
+    def __init__(
+        self,
+        window_days: int = 8 * SEASON,
+        rolling_days: int = 2 * SEASON,
+        z_threshold: float = 3.0,
+        mad_threshold: float = 3.5,
+        underuse_ratio: float = 0.25,
+        max_clusters: int = 3
+    ):
+        self.window_days = window_days
+        self.rolling_days = rolling_days
+        self.z_threshold = z_threshold
+        self.mad_threshold = mad_threshold
+        self.underuse_ratio = underuse_ratio
+        self.max_clusters = max_clusters
+        self.reset()
+
+    def reset(self) -> None:
+        self._index: Dict[EntityKey, int] = {}
+        self._keys: List[EntityKey] = []
+        self._sums = np.zeros((0, self.window_days, 24))
+        self._counts = np.zeros((0, self.window_days, 24))
+        self.window_end: Optional[date] = None
+        self.last_id = 0
+        self.rows_ingested = 0
+
+    @property
+    def window_start(self) -> Optional[date]:
+        if self.window_end is None:
+            return None
+        return self.window_end - timedelta(days=self.window_days - 1)
+
+    def advance_to(self, day: date) -> None:
+        """Slide the window so it ends at ``day``, dropping the days that fall out."""
+        if self.window_end is None:
+            self.window_end = day
+            return
+        shift = (day - self.window_end).days
+        if shift <= 0:
+            return
+        if shift >= self.window_days:
+            self._sums[:] = 0
+            self._counts[:] = 0
+        else:
+            self._sums = np.roll(self._sums, -shift, axis=1)
+            self._counts = np.roll(self._counts, -shift, axis=1)
+            self._sums[:, -shift:] = 0
+            self._counts[:, -shift:] = 0
+        self.window_end = day
+
+    def ingest(self, rows: Iterable[UsageRow]) -> int:
+        """Add a batch of rows. Rows with an id already seen are skipped; returns the rows added."""
+        rows = [r for r in rows if r[0] is None or r[0] > self.last_id]
+        if not rows:
+            return 0
+        latest = max(r[3].date() for r in rows)
+        if self.window_end is None or latest > self.window_end:
+            self.advance_to(latest)
+        start = self.window_start
+
+        ent, day, hour, value = [], [], [], []
+        for row_id, space_id, resource_id, fecha, uso in rows:
+            offset = (fecha.date() - start).days
+            if not 0 <= offset < self.window_days:
+                continue
+            for key in (("space", space_id), ("resource", resource_id)):
+                if key[1] is None:
+                    continue
+                if key not in self._index:
+                    self._index[key] = len(self._keys)
+                    self._keys.append(key)
+                ent.append(self._index[key])
+                day.append(offset)
+                hour.append(fecha.hour)
+                value.append(uso or 0.0)
+
+        grow = len(self._keys) - len(self._sums)
+        if grow > 0:
+            pad = np.zeros((grow, self.window_days, 24))
+            self._sums = np.concatenate([self._sums, pad])
+            self._counts = np.concatenate([self._counts, pad.copy()])
+
+        index = (np.array(ent, dtype=int), np.array(day, dtype=int), np.array(hour, dtype=int))
+        np.add.at(self._sums, index, np.array(value, dtype=float))
+        np.add.at(self._counts, index, 1)
+
+        ids = [r[0] for r in rows if r[0] is not None]
+        if ids:
+            self.last_id = max(self.last_id, max(ids))
+        self.rows_ingested += len(rows)
+        return len(rows)
+
+    def analyze(
+        self,
+        names: Optional[Dict[EntityKey, str]] = None,
+        space_ids: Optional[Iterable[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Patterns, trends and anomalies in the PatternAnalysisResponse shape.
+        ``space_ids`` lists every known space so that spaces without any usage
+        are reported as under-used too.
+        """
+        names = names or {}
+        unused = sorted(set(space_ids or []) - {i for t, i in self._keys if t == "space"})
+        day_counts = self._counts.sum(axis=2)
+        observed_days = np.flatnonzero(day_counts.any(axis=0)) if len(self._keys) else np.array([], dtype=int)
+        if not len(observed_days):
+            patterns = [self._underuse_pattern([("space", i) for i in unused], names)] if unused else []
+            return {"patterns": patterns, "trends": [], "anomalies": [], "resumen": "Sin datos de uso para analizar"}
+
+        first, last = int(observed_days[0]), int(observed_days[-1])
+        sums = self._sums[:, first:last + 1]
+        counts = self._counts[:, first:last + 1]
+        daily = np.divide(sums.sum(axis=2), counts.sum(axis=2), out=np.zeros(sums.shape[:2]), where=counts.sum(axis=2) > 0)
+        start = self.window_start + timedelta(days=first)
+        dows = (start.weekday() + np.arange(daily.shape[1])) % SEASON
+
+        trend, season, resid = self._decompose(daily, dows)
+        anomalies = self._anomalies(daily, trend + season, resid, start, names)
+        trends = self._trends(trend, names)
+        patterns = self._profile_clusters(sums, counts, start, names)
+
+        underused = self._underused(daily) + [("space", i) for i in unused]
+        if underused:
+            patterns.append(self._underuse_pattern(underused, names))
+
+        return {
+            "patterns": patterns,
+            "trends": trends,
+            "anomalies": anomalies,
+            "resumen": (
+                f"{len(self._keys)} elementos analizados en {daily.shape[1]} días: "
+                f"{len(anomalies)} anomalías, {len(trends)} tendencias, {len(underused)} espacios subutilizados"
+            )
+        }
+
+    @staticmethod
+    def _decompose(daily: np.ndarray, dows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """STL-like split: centred 7-day moving average as trend, weekday medians of the remainder as season."""
+        days = daily.shape[1]
+        if days >= SEASON:
+            # Full-week windows only; the edges take the nearest full-window value
+            # so a partial week doesn't leak the weekday pattern into the trend
+            centred = sliding_window_view(daily, SEASON, axis=1).mean(axis=2)
+            trend = np.pad(centred, ((0, 0), (SEASON // 2, SEASON // 2)), mode="edge")
+        else:
+            trend = np.repeat(np.median(daily, axis=1, keepdims=True), days, axis=1)
+        detrended = daily - trend
+        by_dow = np.zeros((len(daily), SEASON))
+        for d in range(SEASON):
+            mask = dows == d
+            if mask.any():
+                by_dow[:, d] = np.median(detrended[:, mask], axis=1)
+        by_dow -= by_dow.mean(axis=1, keepdims=True)
+        season = by_dow[:, dows] if days >= SEASON else np.zeros_like(daily)
+        return trend, season, daily - trend - season
+
+    def _label(self, key: EntityKey, names: Dict[EntityKey, str]) -> str:
+        entity_type, entity_id = key
+        return names.get(key) or f"{'Espacio' if entity_type == 'space' else 'Recurso'} {entity_id}"
+
+    def _anomalies(
+        self,
+        daily: np.ndarray,
+        expected: np.ndarray,
+        resid: np.ndarray,
+        start: date,
+        names: Dict[EntityKey, str]
+    ) -> List[Dict[str, Any]]:
+        floor = 0.05 * np.abs(daily).mean(axis=1, keepdims=True) + 1e-9
+
+        median = np.median(resid, axis=1, keepdims=True)
+        mad = 1.4826 * np.median(np.abs(resid - median), axis=1, keepdims=True)
+        robust_z = (resid - median) / np.maximum(mad, floor)
+        flagged = np.abs(robust_z) > self.mad_threshold
+
+        days = daily.shape[1]
+        if days > self.rolling_days:
+            windows = sliding_window_view(daily[:, :-1], self.rolling_days, axis=1)  # previous days of each t
+            mean = windows.mean(axis=2)
+            std = windows.std(axis=2)
+            rolling_z = np.zeros_like(daily)
+            rolling_z[:, self.rolling_days:] = (daily[:, self.rolling_days:] - mean) / np.maximum(std, floor)
+            # Before a full rolling window exists only the robust score can be used
+            flagged[:, self.rolling_days:] &= np.abs(rolling_z[:, self.rolling_days:]) > self.z_threshold
+
+        anomalies = []
+        for i, t in zip(*np.nonzero(flagged)):
+            z = float(robust_z[i, t])
+            severity = "alta" if abs(z) > 2 * self.mad_threshold else "media" if abs(z) > 1.3 * self.mad_threshold else "baja"
+            key = self._keys[i]
+            anomalies.append({
+                "tipo": "pico de uso" if z > 0 else "caída de uso",
+                "descripcion": (
+                    f"{self._label(key, names)}: uso de {daily[i, t]:.2f} frente a {max(expected[i, t], 0):.2f} esperado"
+                ),
+                "severidad": severity,
+                "fecha_detectada": (start + timedelta(days=int(t))).isoformat(),
+                "entity_type": key[0],
+                "entity_id": key[1],
+                "valor": round(float(daily[i, t]), 3),
+                "esperado": round(float(max(expected[i, t], 0)), 3),
+                "z": round(z, 2)
+            })
+        anomalies.sort(key=lambda a: -abs(a["z"]))
+        return anomalies[:20]
+
+    def _trends(self, trend: np.ndarray, names: Dict[EntityKey, str], min_change: float = 10.0) -> List[str]:
+        recent = trend[:, -4 * SEASON:]
+        days = recent.shape[1]
+        if days < 2 * SEASON:
+            return []
+        x = np.arange(days) - (days - 1) / 2
+        slope = (recent * x).sum(axis=1) / (x ** 2).sum()
+        level = recent.mean(axis=1)
+        weekly = np.divide(slope * SEASON * 100, level, out=np.zeros_like(level), where=level > 1e-9)
+
+        trends = []
+        total_level = level.sum()
+        if total_level > 1e-9:
+            total = slope.sum() * SEASON * 100 / total_level
+            direction = "creciente" if total > 0 else "decreciente"
+            trends.append(f"Uso total {direction if abs(total) >= 2 else 'estable'} ({total:+.1f}% por semana)")
+        for i in np.argsort(-np.abs(weekly))[:5]:
+            if abs(weekly[i]) < min_change:
+                break
+            trends.append(
+                f"{self._label(self._keys[i], names)}: uso {'creciente' if weekly[i] > 0 else 'decreciente'} "
+                f"({weekly[i]:+.0f}% por semana)"
+            )
+        return trends
+
+    def _profile_clusters(
+        self,
+        sums: np.ndarray,
+        counts: np.ndarray,
+        start: date,
+        names: Dict[EntityKey, str]
+    ) -> List[Dict[str, Any]]:
+        hour_totals = sums.sum(axis=1)
+        dows = (start.weekday() + np.arange(sums.shape[1])) % SEASON
+        dow_totals = np.stack([sums[:, dows == d].sum(axis=(1, 2)) for d in range(SEASON)], axis=1)
+        active = hour_totals.sum(axis=1) > 0
+        if not active.any():
+            return []
+
+        hours = hour_totals[active] / hour_totals[active].sum(axis=1, keepdims=True)
+        weekdays = dow_totals[active] / dow_totals[active].sum(axis=1, keepdims=True)
+        keys = [k for k, a in zip(self._keys, active) if a]
+        labels = _kmeans(np.hstack([hours, weekdays]), min(self.max_clusters, len(keys)))
+
+        patterns = []
+        for j in np.unique(labels):
+            members = labels == j
+            hour_profile = hours[members].mean(axis=0)
+            dow_profile = weekdays[members].mean(axis=0)
+            peak_hours = sorted(int(h) for h in np.argsort(hour_profile)[::-1][:3] if hour_profile[h] > 0)
+            peak_hour = int(np.argmax(hour_profile))
+            franja = "matutino" if peak_hour < 12 else "vespertino" if peak_hour < 18 else "nocturno"
+            weekend_share = dow_profile[5:].sum()
+            if weekend_share < 0.1:
+                dias = "de lunes a viernes"
+            elif weekend_share > 0.5:
+                dias = "en fin de semana"
+            else:
+                dias = "toda la semana"
+            top_days = [DIAS[d] for d in np.argsort(dow_profile)[::-1][:2] if dow_profile[d] > 0]
+            patterns.append({
+                "nombre": f"Uso {franja} {dias}",
+                "descripcion": (
+                    f"Horas pico {', '.join(f'{h}:00' for h in peak_hours)}; "
+                    f"días de mayor uso: {', '.join(top_days)}"
+                ),
+                "frecuencia": "semanal",
+                "entidades_afectadas": [f"{k[0]}_{k[1]}" for k, m in zip(keys, members) if m],
+                "horas_pico": peak_hours
+            })
+        return patterns
+
+    def _underused(self, daily: np.ndarray) -> List[EntityKey]:
+        weeks = daily.shape[1] // SEASON
+        spaces = np.array([k[0] == "space" for k in self._keys])
+        if weeks < 2 or not spaces.any():
+            return []
+        weeks = min(weeks, 4)
+        weekly = daily[:, -weeks * SEASON:].reshape(len(daily), weeks, SEASON).mean(axis=2)
+        typical = np.median(daily[spaces].mean(axis=1))
+        below = (weekly < self.underuse_ratio * typical).sum(axis=1) >= max(2, weeks - 1)
+        return [k for k, b, s in zip(self._keys, below, spaces) if b and s]
+
+    def _underuse_pattern(self, keys: List[EntityKey], names: Dict[EntityKey, str]) -> Dict[str, Any]:
+        return {
+            "nombre": "Subutilización crónica",
+            "descripcion": (
+                f"{len(keys)} espacios con uso por debajo del {self.underuse_ratio * 100:.0f}% del uso típico "
+                f"la mayoría de las últimas semanas: {', '.join(self._label(k, names) for k in keys[:10])}"
+            ),
+            "frecuencia": "semanal",
+            "entidades_afectadas": [f"{k[0]}_{k[1]}" for k in keys]
+        }
+
+
+usage_patterns = UsagePatternAnalyzer()
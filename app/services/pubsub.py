@@ -0,0 +1,68 @@
+from typing import Dict, Any, Set, AsyncIterator
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PubSubHub(ABC):
+    """
+    Publish/subscribe interface used for server push.
+
+    Channels are plain strings (e.g. ``user:42``). Implementations backed by a
+    broker (Redis, NATS...) only need to provide ``publish`` and ``subscribe``.
+    """
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]) -> int:
+        """Deliver ``message`` to the subscribers of ``channel``; returns how many received it."""
+
+    @abstractmethod
+    def subscribe(self, channel: str):
+        """Async context manager yielding an ``asyncio.Queue`` of the channel's messages."""
+
+
+class InProcessHub(PubSubHub):
+    """
+    Hub that delivers messages to subscribers of the same process through
+    bounded asyncio queues. When a slow subscriber's queue is full the oldest
+    message is dropped so publishers never block.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> int:
+        queues = list(self._subscribers.get(channel, ()))
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+                logger.warning(f"Subscriber queue full on {channel}, dropping oldest message")
+            queue.put_nowait(message)
+        return len(queues)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers[channel].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[channel].discard(queue)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._subscribers.get(channel, ()))
+
+
+hub: PubSubHub = InProcessHub()
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
@@ -0,0 +1,170 @@
+from typing import Callable, Dict, Optional, Tuple
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import logging
+import math
+import time
+
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket: ``burst`` calls at once, refilled at ``per_minute`` calls per minute."""
+    per_minute: float
+    burst: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is rejected; ``retry_after`` is in whole seconds."""
+
+    def __init__(self, detail: str, retry_after: int, reason: str):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class RateLimitStore(ABC):
+    """
+    Storage for token buckets.
+
+    The in-process store is enough for a single worker. Deployments running
+    several workers need a shared implementation (e.g. a Redis script doing
+    the same refill-and-take atomically) that provides ``consume`` and ``reset``.
+    """
+
+    @abstractmethod
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens from ``key``. Returns 0 if allowed, otherwise seconds until it would be."""
+
+    @abstractmethod
+    async def reset(self) -> None:
+        """Forget every bucket."""
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated_at)
+
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        now = self.clock()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.refill_per_second)
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, limit)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (cost - tokens) / limit.refill_per_second
+
+    def _prune(self, now: float, limit: RateLimit) -> None:
+        # Idle buckets would be full again anyway; dropping them loses nothing
+        idle = limit.burst / limit.refill_per_second
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= idle]:
+            del self._buckets[key]
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+
+class RateLimiter:
+    """
+    Rate limiting for the AI endpoints.
+
+    Every call is charged to a per-user bucket of its endpoint group and to a
+    global bucket of that group (protects the Gemini quota). On top of that
+    each AI function has a cap on concurrent calls so a burst cannot tie up
+    the whole AI thread pool; excess calls are rejected instead of queued.
+    """
+
+    def __init__(
+        self,
+        user_limit: RateLimit,
+        global_limit: RateLimit,
+        max_concurrency: int,
+        store: Optional[RateLimitStore] = None,
+        group_limits: Optional[Dict[str, RateLimit]] = None,
+        enabled: bool = True
+    ):
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.max_concurrency = max_concurrency
+        self.store = store or InMemoryRateLimitStore()
+        self.group_limits = group_limits or {}
+        self.enabled = enabled
+        self._active: Dict[str, int] = defaultdict(int)
+        self._allowed: Dict[str, int] = defaultdict(int)
+        self._rejected: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _reject(self, group: str, reason: str, detail: str, wait: float) -> RateLimitExceeded:
+        self._rejected[group][reason] += 1
+        logger.warning(f"Rate limit ({reason}) on {group}: {detail}")
+        return RateLimitExceeded(detail, max(1, math.ceil(wait)), reason)
+
+    async def check(self, group: str, user_key) -> None:
+        """Charge one call of ``user_key`` to ``group``; raises RateLimitExceeded if over a limit."""
+        if not self.enabled:
+            return
+        wait = await self.store.consume(f"{group}:user:{user_key}", self.group_limits.get(group, self.user_limit))
+        if wait:
+            raise self._reject(group, "user", "Demasiadas solicitudes de IA. Intente de nuevo en unos segundos.", wait)
+        wait = await self.store.consume(f"{group}:global", self.global_limit)
+        if wait:
+            raise self._reject(group, "global", "El servicio de IA está saturado. Intente de nuevo en unos segundos.", wait)
+        self._allowed[group] += 1
+
+    @asynccontextmanager
+    async def concurrency(self, function: str, group: str = "default"):
+        """Hold one of the ``max_concurrency`` slots of ``function`` while the block runs."""
+        if self.enabled and self._active[function] >= self.max_concurrency:
+            raise self._reject(group, "concurrency", f"Hay demasiadas solicitudes de {function} en curso.", 1)
+        self._active[function] += 1
+        try:
+            yield
+        finally:
+            self._active[function] -= 1
+
+    @asynccontextmanager
+    async def guard(self, group: str, user_key, function: str):
+        await self.check(group, user_key)
+        async with self.concurrency(function, group):
+            yield
+
+    def snapshot(self) -> Dict[str, Dict]:
+        groups = set(self._allowed) | set(self._rejected)
+        return {
+            "groups": {
+                group: {"allowed": self._allowed[group], "rejected": dict(self._rejected[group])}
+                for group in sorted(groups)
+            },
+            "in_flight": {name: count for name, count in self._active.items() if count}
+        }
+
+    async def reset(self) -> None:
+        await self.store.reset()
+        self._allowed.clear()
+        self._rejected.clear()
+
+
+ai_limiter = RateLimiter(
+    user_limit=RateLimit(per_minute=settings.AI_RATE_LIMIT_PER_MINUTE, burst=settings.AI_RATE_LIMIT_BURST),
+    global_limit=RateLimit(
+        per_minute=settings.AI_GLOBAL_RATE_LIMIT_PER_MINUTE,
+        burst=settings.AI_GLOBAL_RATE_LIMIT_PER_MINUTE
+    ),
+    max_concurrency=settings.AI_MAX_CONCURRENCY,
+    enabled=settings.RATE_LIMIT_ENABLED
+)
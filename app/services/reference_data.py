@@ -0,0 +1,200 @@
+from typing import Any, Dict, List, Optional
+import copy
+import hashlib
+import json
+import logging
+
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Constantes de referencia para cálculos de espacio
+# IMPORTANTE: 
+# - PC/Computador: YA INCLUYE escritorio y silla (estación de trabajo completa)
+# - Pupitre: YA INCLUYE mesa y silla (todo en uno)
+# - Proyector: Va en el TECHO, no ocupa espacio en el suelo
+# - Pantalla/Pizarra: Va en la PARED, espacio frontal mínimo para visibilidad
+ESPACIO_REFERENCIA = {
+    # Estación de trabajo completa (PC + escritorio + silla + espacio circulación)
+    "computador": {"area": 2.5, "min_separacion": 0.8, "incluye": ["escritorio", "silla"], "descripcion": "Estación completa con escritorio y silla"},
+    "pc": {"area": 2.5, "min_separacion": 0.8, "incluye": ["escritorio", "silla"], "descripcion": "Estación completa con escritorio y silla"},
+    
+    # Mobiliario educativo individual
+    "pupitre": {"area": 1.0, "min_separacion": 0.5, "incluye": ["mesa", "silla"], "descripcion": "Pupitre unipersonal (mesa+silla integradas)"},
+    "silla": {"area": 0.5, "min_separacion": 0.3, "descripcion": "Silla individual sin mesa"},
+    "escritorio_estudiante": {"area": 1.2, "min_separacion": 0.5, "descripcion": "Mesa individual sin silla"},
+    "mesa_trabajo": {"area": 2.0, "min_separacion": 0.6, "descripcion": "Mesa de trabajo compartida"},
+    
+    # Equipo audiovisual (mayoría NO ocupa espacio en suelo)
+    "proyector": {"area": 0.0, "min_separacion": 0, "ubicacion": "techo", "descripcion": "Proyector en techo - no ocupa suelo"},
+    "pantalla": {"area": 0.5, "min_separacion": 2.0, "ubicacion": "pared", "descripcion": "Pantalla en pared - espacio frontal para visibilidad"},
+    "televisor": {"area": 0.3, "min_separacion": 1.5, "ubicacion": "pared", "descripcion": "TV en pared o soporte"},
+    "video_beam": {"area": 0.0, "min_separacion": 0, "ubicacion": "techo", "descripcion": "Video beam en techo"},
+    
+    # Espacio instructor/docente
+    "escritorio_profesor": {"area": 2.5, "min_separacion": 1.0, "descripcion": "Escritorio docente con silla"},
+    "pizarra": {"area": 0.0, "min_separacion": 2.5, "ubicacion": "pared", "descripcion": "Pizarra en pared - requiere espacio frontal"},
+    
+    # Laboratorio
+    "mesa_laboratorio": {"area": 3.5, "min_separacion": 1.0, "descripcion": "Mesa de laboratorio para 2 personas"},
+    "equipo_laboratorio": {"area": 1.5, "min_separacion": 0.8, "descripcion": "Equipo de laboratorio en mesa"},
+    
+    # Estacionamiento (m² por espacio - dimensiones reales)
+    "vehiculo": {"area": 11.25, "min_separacion": 0.6, "descripcion": "Espacio vehicular estándar 2.5m x 4.5m"},
+    "motocicleta": {"area": 1.4, "min_separacion": 0.3, "descripcion": "Espacio moto 0.7m x 2m"},
+    "vehiculo_discapacitado": {"area": 15.75, "min_separacion": 0.6, "descripcion": "Espacio PMR 3.5m x 4.5m"},
+    
+    # Oficina
+    "escritorio_oficina": {"area": 3.5, "min_separacion": 0.8, "descripcion": "Puesto de trabajo oficina completo"},
+    "archivador": {"area": 0.6, "min_separacion": 0.5, "descripcion": "Archivador vertical"},
+    
+    # Auditorio/Sala de eventos
+    "butaca": {"area": 0.6, "min_separacion": 0.1, "descripcion": "Butaca fija de auditorio"},
+    "silla_plegable": {"area": 0.5, "min_separacion": 0.2, "descripcion": "Silla plegable para eventos"},
+}
+
+
+# Fracción utilizable de cada tipo de espacio (el resto son pasillos y circulación)
+TIPOS_ESPACIO = [
+    {"id": "aula", "nombre": "Aula de clases", "factor_utilizacion": 0.70},
+    {"id": "laboratorio", "nombre": "Laboratorio de cómputo", "factor_utilizacion": 0.65},
+    {"id": "parqueadero", "nombre": "Parqueadero", "factor_utilizacion": 0.75},  # Incluye carriles de circulación
+    {"id": "auditorio", "nombre": "Auditorio", "factor_utilizacion": 0.80},
+    {"id": "oficina", "nombre": "Oficina", "factor_utilizacion": 0.65},
+    {"id": "sala_conferencias", "nombre": "Sala de conferencias", "factor_utilizacion": 0.75},
+]
+DEFAULT_FACTOR_UTILIZACION = 0.70
+
+NORMATIVAS = {
+    "aula": {
+        "m2_por_estudiante_minimo": 1.5,
+        "ancho_pasillo_minimo": 1.2,
+        "distancia_pizarra_primera_fila": 2.0
+    },
+    "laboratorio": {
+        "m2_por_puesto_minimo": 2.0,
+        "separacion_equipos": 0.8,
+        "ventilacion_requerida": True
+    },
+    "parqueadero": {
+        "ancho_vehiculo_estandar": 2.5,
+        "largo_vehiculo_estandar": 5.0,
+        "ancho_discapacitado": 3.6,
+        "ancho_carril_circulacion": 6.0
+    }
+}
+
+# Tipos de recurso compatibles con cada tipo de espacio (SpaceOptimizer)
+COMPATIBILIDAD_RECURSOS = {
+    "office": ["computadora", "mobiliario", "equipo de oficina"],
+    "oficina": ["computadora", "mobiliario", "equipo de oficina"],
+    "conference": ["proyector", "pizarra", "sistema de videoconferencia"],
+    "sala de reuniones": ["proyector", "pizarra", "sistema de videoconferencia"],
+    "laboratory": ["equipo científico", "instrumentos", "computadora"],
+    "laboratorio": ["equipo científico", "instrumentos", "computadora"],
+    "classroom": ["proyector", "computadora", "pizarra"],
+    "auditorium": ["sistema de audio", "proyector", "iluminación"],
+    "auditorio": ["sistema de audio", "proyector", "iluminación"]
+}
+
+DEFAULT_REFERENCE_DATA = {
+    "elementos_referencia": ESPACIO_REFERENCIA,
+    "tipos_espacio": TIPOS_ESPACIO,
+    "normativas": NORMATIVAS,
+    "compatibilidad_recursos": COMPATIBILIDAD_RECURSOS
+}
+
+CACHE_CONTROL = "private, max-age=86400"
+
+
+def _validate(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        raise ValueError("Reference data must be a JSON object")
+    for key, default in DEFAULT_REFERENCE_DATA.items():
+        if not isinstance(data.get(key), type(default)):
+            raise ValueError(f"{key} must be a JSON {'array' if isinstance(default, list) else 'object'}")
+
+    for name, element in data["elementos_referencia"].items():
+        area = element.get("area") if isinstance(element, dict) else None
+        if isinstance(area, bool) or not isinstance(area, (int, float)) or area < 0:
+            raise ValueError(f"elementos_referencia.{name}.area must be a non-negative number")
+    for tipo in data["tipos_espacio"]:
+        factor = tipo.get("factor_utilizacion") if isinstance(tipo, dict) else None
+        if not isinstance(tipo, dict) or not isinstance(tipo.get("id"), str) or not tipo["id"] or not isinstance(factor, (int, float)) or not 0 < factor <= 1:
+            raise ValueError(f"tipos_espacio entry {tipo!r} needs an id and a factor_utilizacion in (0, 1]")
+    for space_type, resource_types in data["compatibilidad_recursos"].items():
+        if not isinstance(resource_types, list) or not all(isinstance(r, str) for r in resource_types):
+            raise ValueError(f"compatibilidad_recursos.{space_type} must be a list of resource types")
+
+    return {key: copy.deepcopy(data[key]) for key in DEFAULT_REFERENCE_DATA}
+
+
+class ReferenceData:
+    """
+    Static reference data for space calculations: element areas, utilization
+    factors per space type, regulations and the space/resource compatibility
+    matrix used by SpaceOptimizer.
+
+    The payload served by /chatbot/space-reference-data is serialized once
+    per load, and its strong ETag and ``version`` are a hash of that body,
+    so they are identical across processes and restarts and only change
+    when the data does. ``reload`` swaps in a JSON file with the same shape
+    as the payload after validating it; a file that fails validation leaves
+    the current data in place.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.load(data, source="default")
+
+    def load(self, data: Any, source: str = "api") -> str:
+        data = _validate(data)
+        body = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        version = hashlib.sha256(body).hexdigest()[:16]
+        payload = {"version": version, **data}
+
+        # Attributes are swapped without awaiting, so readers never see a mix of two versions
+        self.data = data
+        self.version = version
+        self.source = source
+        self.etag = f'"{version}"'
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.factores_utilizacion = {t["id"].lower(): t["factor_utilizacion"] for t in data["tipos_espacio"]}
+        self.compatibilidad = {k.lower(): [r.lower() for r in v] for k, v in data["compatibilidad_recursos"].items()}
+        return version
+
+    def reload(self, path: Optional[str] = None) -> str:
+        """Load ``path`` (default ``settings.REFERENCE_DATA_FILE``); raises ValueError if it is unusable."""
+        path = path or settings.REFERENCE_DATA_FILE
+        if not path:
+            raise ValueError("REFERENCE_DATA_FILE is not configured")
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Cannot read reference data from {path}: {e}") from e
+        version = self.load(data, source=path)
+        logger.info(f"Reference data {version} loaded from {path}")
+        return version
+
+    def load_configured(self) -> None:
+        """At startup: load REFERENCE_DATA_FILE if set, keeping the defaults if it is unusable."""
+        if not settings.REFERENCE_DATA_FILE:
+            return
+        try:
+            self.reload()
+        except ValueError as e:
+            logger.error(f"Reference data file ignored: {e}")
+
+    @property
+    def elementos(self) -> Dict[str, Dict[str, Any]]:
+        return self.data["elementos_referencia"]
+
+    def factor(self, tipo_espacio: str) -> float:
+        return self.factores_utilizacion.get(tipo_espacio.lower(), DEFAULT_FACTOR_UTILIZACION)
+
+    def compatible_resources(self, space_type: str) -> List[str]:
+        return self.compatibilidad.get(space_type.lower(), [])
+
+
+reference_data = ReferenceData(DEFAULT_REFERENCE_DATA)
@@ -0,0 +1,279 @@
+from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
+from datetime import date, time, datetime, timedelta
+import re
+
+from app.core.text import normalize_text
+from app.services.reservation_engine import EQUIPMENT_SYNONYMS, SPACE_TYPE_SYNONYMS
+
+
+UNITS = {
+    "cero": 0, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11, "doce": 12,
+    "trece": 13, "catorce": 14, "quince": 15, "dieciseis": 16, "diecisiete": 17,
+    "dieciocho": 18, "diecinueve": 19, "veinte": 20, "veintiuno": 21, "veintiun": 21,
+    "veintiuna": 21, "veintidos": 22, "veintitres": 23, "veinticuatro": 24,
+    "veinticinco": 25, "veintiseis": 26, "veintisiete": 27, "veintiocho": 28,
+    "veintinueve": 29,
+}
+TENS = {
+    "treinta": 30, "cuarenta": 40, "cincuenta": 50, "sesenta": 60,
+    "setenta": 70, "ochenta": 80, "noventa": 90,
+}
+HUNDREDS = {
+    "cien": 100, "ciento": 100, "doscientos": 200, "doscientas": 200,
+    "trescientos": 300, "trescientas": 300, "cuatrocientos": 400, "quinientos": 500,
+}
+
+WEEKDAYS = {
+    "lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3,
+    "viernes": 4, "sabado": 5, "domingo": 6,
+}
+MONTHS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10,
+    "noviembre": 11, "diciembre": 12,
+}
+
+# Words that follow a head count ("20 estudiantes", "para 30 personas")
+PEOPLE_WORDS = (
+    "personas|estudiantes|alumnos|alumnas|asistentes|participantes|invitados|"
+    "integrantes|miembros|docentes|profesores|puestos|cupos|gente"
+)
+
+# Number words are rewritten as digits before matching; a lone "un"/"una"/"uno"
+# is left alone since it is usually an article ("un aula").
+_NUMBER_WORD = "|".join(sorted([*UNITS, *TENS, *HUNDREDS], key=len, reverse=True))
+_NUMERAL_RE = re.compile(
+    rf"\b((?:{_NUMBER_WORD})(?:\s+(?:y\s+)?(?:{_NUMBER_WORD}))*)\b"
+)
+
+_DAY_PART = r"am|pm|a\.\s?m\.|p\.\s?m\.|de la manana|de la tarde|de la noche"
+_MERIDIEM = rf"({_DAY_PART}|h|hrs|horas)"
+_STRICT_MERIDIEM = rf"({_DAY_PART})"
+_HOUR = r"(\d{1,2})(?:[:.h](\d{2}))?"
+_RANGE_RE = re.compile(
+    rf"\b(?:(?:de|desde|entre)\s+(?:las?\s+)?)?{_HOUR}\s*{_MERIDIEM}?\s*(?:a|hasta|y|-)\s*(?:las?\s+)?{_HOUR}\s*{_MERIDIEM}?(?![\w:])(?!\s*(?:{PEOPLE_WORDS}))"
+)
+_SINGLE_RE = re.compile(
+    rf"\b(?:a\s+las?|desde\s+las?|a\s+partir\s+de\s+las?)\s+{_HOUR}\s*{_MERIDIEM}?(?!\w)|\b{_HOUR}\s*{_STRICT_MERIDIEM}(?!\w)|\b(\d{{1,2}}):(\d{{2}})\b"
+)
+_DURATION_RE = re.compile(r"\b(?:por|durante)\s+(\d{1,2})\s*(?:horas?|h)\b")
+_CAPACITY_RES = [
+    re.compile(rf"\b(\d{{1,4}})\s+(?:\w+\s+)?(?:{PEOPLE_WORDS})\b"),
+    re.compile(r"\bcapacidad\s+(?:de|para|minima\s+de)?\s*(\d{1,4})\b"),
+    re.compile(r"\bpara\s+(\d{1,4})\b(?!\s*(?:am|pm|h\b|horas?|:))"),
+]
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_SLASH_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_MONTH_DATE_RE = re.compile(rf"\b(\d{{1,2}})\s+de\s+({'|'.join(MONTHS)})(?:\s+(?:de|del)\s+(\d{{4}}))?\b")
+_WEEKDAY_RE = re.compile(rf"\b({'|'.join(WEEKDAYS)})\b")
+
+
+def _phrase_pattern(words: List[str]) -> re.Pattern:
+    phrases = sorted({normalize_text(w.replace("_", " ")) for w in words}, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(p) for p in phrases) + r")(?:es|s)?\b")
+
+
+def _blank(text: str, match: re.Match) -> str:
+    """Replace a consumed span with spaces so later patterns cannot reuse it."""
+    return text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+
+
+def _words_to_number(words: str) -> Optional[int]:
+    total = 0
+    for token in words.split():
+        if token == "y":
+            continue
+        if token in HUNDREDS:
+            total += HUNDREDS[token]
+        elif token in TENS:
+            total += TENS[token]
+        elif token in UNITS:
+            total += UNITS[token]
+        else:
+            return None
+    return total
+
+
+def _to_24h(hour: int, minute: int, meridiem: Optional[str]) -> Optional[time]:
+    if meridiem:
+        meridiem = meridiem.replace(".", "").replace(" ", "")
+        if meridiem in ("pm", "delatarde", "delanoche") and hour < 12:
+            hour += 12
+        elif meridiem in ("am", "delamanana") and hour == 12:
+            hour = 0
+    elif 1 <= hour <= 6:
+        # Sin indicador, "a las 3" se entiende como horario de tarde
+        hour += 12
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+    return time(hour, minute)
+
+
+@dataclass
+class ParsedRequest:
+    capacidad: Optional[int] = None
+    fecha: Optional[date] = None
+    hora_inicio: Optional[time] = None
+    hora_fin: Optional[time] = None
+    equipamiento: List[str] = field(default_factory=list)
+    tipo_espacio: Optional[str] = None
+
+    @property
+    def is_complete(self) -> bool:
+        """True when the request can be served without asking the LLM."""
+        return bool(self.capacidad and self.fecha and self.hora_inicio)
+
+
+class ReservationRequestParser:
+    """
+    Rule-based parser for Spanish reservation requests such as
+    "Necesito un aula para veinte estudiantes con proyector el lunes de 8 a 10am".
+
+    Extracts head count (digits or word numerals), date (ISO, dd/mm, "15 de marzo",
+    hoy/mañana/pasado mañana, weekdays), time range, equipment and space type.
+    Equipment and type vocabularies are the ones used by the reservation ranker,
+    so parsed values match space ``caracteristicas`` and ``tipo`` directly.
+    """
+
+    def __init__(self):
+        self._equipment = [
+            (canonical, _phrase_pattern([canonical, *words]))
+            for canonical, words in EQUIPMENT_SYNONYMS.items()
+        ]
+        self._types = [
+            (canonical, _phrase_pattern([canonical, *words]))
+            for canonical, words in SPACE_TYPE_SYNONYMS.items()
+        ]
+
+    def parse(self, text: str, today: Optional[date] = None) -> ParsedRequest:
+        today = today or datetime.utcnow().date()
+        normalized = self._numerals_to_digits(normalize_text(text))
+
+        # Fechas explícitas y duraciones se retiran antes de buscar horas y capacidad
+        fecha, normalized = self._extract_explicit_date(normalized, today)
+        duracion, normalized = self._extract_duration(normalized)
+        hora_inicio, hora_fin, normalized = self._extract_times(normalized)
+        if hora_inicio and not hora_fin and duracion:
+            end = datetime.combine(date.min, hora_inicio) + timedelta(hours=duracion)
+            if end.date() == date.min:
+                hora_fin = end.time()
+        if fecha is None:
+            fecha = self._extract_relative_date(normalized, today)
+
+        return ParsedRequest(
+            capacidad=self._extract_capacity(normalized),
+            fecha=fecha,
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            equipamiento=self._extract_vocabulary(normalized, self._equipment),
+            tipo_espacio=next(iter(self._extract_vocabulary(normalized, self._types)), None)
+        )
+
+    def parse_time(self, value: Optional[str]) -> Optional[time]:
+        """Parse a single hour such as "08:00", "8am", "2:30 pm" or "14h"."""
+        if not value:
+            return None
+        match = re.fullmatch(rf"\s*{_HOUR}\s*{_MERIDIEM}?\s*", normalize_text(value))
+        if not match:
+            return None
+        return _to_24h(int(match.group(1)), int(match.group(2) or 0), match.group(3) or "h")
+
+    def _numerals_to_digits(self, text: str) -> str:
+        def replace(match: re.Match) -> str:
+            words = match.group(1)
+            if words in ("un", "una", "uno"):
+                return words
+            number = _words_to_number(words)
+            return str(number) if number is not None else words
+        return _NUMERAL_RE.sub(replace, text)
+
+    def _extract_times(self, text: str) -> Tuple[Optional[time], Optional[time], str]:
+        hora_inicio = hora_fin = None
+        match = _RANGE_RE.search(text)
+        if match:
+            h1, m1, mer1, h2, m2, mer2 = match.groups()
+            end_mer = mer2 or mer1
+            hora_fin = _to_24h(int(h2), int(m2 or 0), end_mer)
+            start_mer = mer1
+            if not start_mer and end_mer:
+                # "de 2 a 4pm" -> ambos en la tarde; "de 10 a 2pm" -> 10 de la mañana
+                start_mer = end_mer if int(h1) <= int(h2) else "am"
+            hora_inicio = _to_24h(int(h1), int(m1 or 0), start_mer)
+            if not (hora_inicio and hora_fin and hora_fin > hora_inicio):
+                hora_inicio = hora_fin = None
+        if hora_inicio is None:
+            match = _SINGLE_RE.search(text)
+            if match:
+                groups = match.groups()
+                hour, minute, meridiem = next(
+                    (groups[i], groups[i + 1], groups[i + 2] if i < 6 else "h")
+                    for i in (0, 3, 6) if groups[i] is not None
+                )
+                hora_inicio = _to_24h(int(hour), int(minute or 0), meridiem)
+        if hora_inicio:
+            text = _blank(text, match)
+        return hora_inicio, hora_fin, text
+
+    def _extract_duration(self, text: str) -> Tuple[Optional[int], str]:
+        match = _DURATION_RE.search(text)
+        if not match:
+            return None, text
+        return int(match.group(1)), _blank(text, match)
+
+    def _extract_explicit_date(self, text: str, today: date) -> Tuple[Optional[date], str]:
+        for pattern in (_ISO_DATE_RE, _MONTH_DATE_RE, _SLASH_DATE_RE):
+            match = pattern.search(text)
+            if not match:
+                continue
+            try:
+                if pattern is _ISO_DATE_RE:
+                    fecha = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+                elif pattern is _MONTH_DATE_RE:
+                    fecha = self._with_year(today, MONTHS[match.group(2)], int(match.group(1)), match.group(3))
+                else:
+                    fecha = self._with_year(today, int(match.group(2)), int(match.group(1)), match.group(3))
+            except ValueError:
+                continue
+            return fecha, _blank(text, match)
+        return None, text
+
+    def _extract_relative_date(self, text: str, today: date) -> Optional[date]:
+        text = re.sub(r"\bde la (manana|tarde|noche)\b", " ", text)
+        if re.search(r"\bpasado manana\b", text):
+            return today + timedelta(days=2)
+        if re.search(r"\bmanana\b", text):
+            return today + timedelta(days=1)
+        if re.search(r"\bhoy\b", text):
+            return today
+        match = _WEEKDAY_RE.search(text)
+        if match:
+            days_ahead = (WEEKDAYS[match.group(1)] - today.weekday()) % 7 or 7
+            return today + timedelta(days=days_ahead)
+        return None
+
+    def _with_year(self, today: date, month: int, day: int, year: Optional[str]) -> date:
+        if year:
+            year_value = int(year)
+            return date(year_value + 2000 if year_value < 100 else year_value, month, day)
+        candidate = date(today.year, month, day)
+        return candidate if candidate >= today else date(today.year + 1, month, day)
+
+    def _extract_capacity(self, text: str) -> Optional[int]:
+        for pattern in _CAPACITY_RES:
+            match = pattern.search(text)
+            if match:
+                return int(match.group(1))
+        return None
+
+    def _extract_vocabulary(self, text: str, vocabulary) -> List[str]:
+        found = []
+        for canonical, pattern in vocabulary:
+            match = pattern.search(text)
+            if match:
+                found.append((match.start(), canonical))
+        return [canonical for _, canonical in sorted(found)]
+
+
+request_parser = ReservationRequestParser()
@@ -0,0 +1,145 @@
+from typing import List, Dict, Any, Optional, Set
+from dataclasses import dataclass, field
+
+from app.core.text import normalize_text
+
+
+# Requested equipment -> words that identify it in space.caracteristicas
+EQUIPMENT_SYNONYMS = {
+    "proyector": ["proyector", "video beam", "videobeam", "video_beam"],
+    "computador": ["computador", "computadora", "ordenador", "pc", "laboratorio informatica"],
+    "pizarra": ["pizarra", "tablero"],
+    "videoconferencia": ["videoconferencia"],
+    "sonido": ["sonido", "audio", "parlantes"],
+    "aire acondicionado": ["aire acondicionado"],
+    "wifi": ["wifi", "wi-fi", "internet", "fibra"],
+    "televisor": ["televisor", "tv", "pantalla"],
+    "microscopio": ["microscopio"],
+    "accesibilidad": ["accesibilidad", "rampa"],
+}
+
+# Preferred space type -> values of space.tipo that satisfy it
+SPACE_TYPE_SYNONYMS = {
+    "aula": ["aula", "classroom", "salon"],
+    "laboratorio": ["laboratorio", "laboratory", "lab"],
+    "auditorio": ["auditorio", "auditorium"],
+    "oficina": ["oficina", "office"],
+    "sala de reuniones": ["sala de reuniones", "sala conferencias", "sala de conferencias", "conference"],
+}
+
+
+def _canonical(term: str, synonyms: Dict[str, List[str]]) -> str:
+    """Map a free-form term to its canonical key, matching synonyms on whole words."""
+    term = normalize_text(term.replace("_", " "))
+    padded = f" {term} "
+    for canonical, words in synonyms.items():
+        if any(f" {normalize_text(w.replace('_', ' '))} " in padded for w in [canonical, *words]):
+            return canonical
+    return term
+
+
+@dataclass
+class RankedSpace:
+    space: Dict[str, Any]
+    score: float
+    eficiencia: float
+    equipamiento_cubierto: List[str] = field(default_factory=list)
+    equipamiento_faltante: List[str] = field(default_factory=list)
+    tipo_coincide: bool = True
+
+
+class ReservationRanker:
+    """
+    Deterministic space ranking for reservations whose requirements are already
+    structured (capacity, equipment, type, slot), so no LLM call is needed.
+
+    A space is eligible when it fits the group and is free in the requested
+    slot. Eligible spaces are scored on capacity efficiency, equipment coverage
+    of ``caracteristicas`` and type match.
+    """
+
+    def __init__(self):
+        self.weights = {
+            "capacity_efficiency": 0.5,
+            "equipment_coverage": 0.3,
+            "type_match": 0.2
+        }
+        # Occupancy band considered optimal (people / capacity)
+        self.optimal_band = (0.6, 0.9)
+
+    def _capacity_score(self, needed: int, capacity: int, capacidad_maxima: Optional[int]) -> float:
+        efficiency = needed / capacity
+        low, high = self.optimal_band
+        if low <= efficiency <= high:
+            score = 1.0
+        elif efficiency > high:
+            score = 0.9
+        else:
+            score = efficiency / low
+        if capacidad_maxima and capacity > capacidad_maxima:
+            score *= 0.5
+        return score
+
+    def _features(self, space: Dict[str, Any]) -> Set[str]:
+        caracteristicas = space.get("caracteristicas") or []
+        if isinstance(caracteristicas, dict):
+            caracteristicas = [k for k, v in caracteristicas.items() if v]
+        return {_canonical(str(c), EQUIPMENT_SYNONYMS) for c in caracteristicas}
+
+    def rank(
+        self,
+        spaces: List[Dict[str, Any]],
+        capacidad_minima: int,
+        equipamiento: Optional[List[str]] = None,
+        tipo_espacio: Optional[str] = None,
+        capacidad_maxima: Optional[int] = None,
+        occupied_space_ids: Optional[Set[int]] = None
+    ) -> List[RankedSpace]:
+        occupied_space_ids = occupied_space_ids or set()
+        requested = list(dict.fromkeys(_canonical(e, EQUIPMENT_SYNONYMS) for e in (equipamiento or []) if e))
+        tipo = _canonical(tipo_espacio, SPACE_TYPE_SYNONYMS) if tipo_espacio else None
+
+        ranked = []
+        for space in spaces:
+            capacity = space.get("capacidad") or 0
+            if capacity < capacidad_minima or capacity <= 0 or space.get("id") in occupied_space_ids:
+                continue
+
+            capacity_score = self._capacity_score(capacidad_minima, capacity, capacidad_maxima)
+
+            features = self._features(space)
+            cubierto = [e for e in requested if e in features]
+            coverage = len(cubierto) / len(requested) if requested else 1.0
+
+            tipo_coincide = tipo is None or _canonical(space.get("tipo", ""), SPACE_TYPE_SYNONYMS) == tipo
+            type_score = 1.0 if tipo_coincide else 0.3
+
+            score = (
+                capacity_score * self.weights["capacity_efficiency"]
+                + coverage * self.weights["equipment_coverage"]
+                + type_score * self.weights["type_match"]
+            )
+            ranked.append(RankedSpace(
+                space=space,
+                score=round(score, 3),
+                eficiencia=round(capacidad_minima / capacity * 100, 1),
+                equipamiento_cubierto=cubierto,
+                equipamiento_faltante=[e for e in requested if e not in features],
+                tipo_coincide=tipo_coincide
+            ))
+
+        ranked.sort(key=lambda r: (-r.score, r.space.get("capacidad", 0), r.space.get("id", 0)))
+        return ranked
+
+    def explain(self, ranked: RankedSpace) -> str:
+        partes = [f"Eficiencia de capacidad del {ranked.eficiencia}%"]
+        if ranked.equipamiento_cubierto:
+            partes.append(f"cuenta con {', '.join(ranked.equipamiento_cubierto)}")
+        if ranked.equipamiento_faltante:
+            partes.append(f"no cuenta con {', '.join(ranked.equipamiento_faltante)}")
+        if not ranked.tipo_coincide:
+            partes.append(f"es de tipo {ranked.space.get('tipo')}, distinto al solicitado")
+        return f"{ranked.space.get('nombre')}: " + "; ".join(partes) + f" (puntuación {ranked.score:.2f})"
+
+
+reservation_ranker = ReservationRanker()
@@ -0,0 +1,479 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+import asyncio
+import heapq
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from app.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEMESTER_DAYS = 18 * 7
+OPEN_HOUR, CLOSE_HOUR = 7, 21
+DEFAULT_OCCUPANCY = 0.8  # share of the booked room assumed to be needed; assignments carry no headcount
+DEFAULT_DURATION_HOURS = 2.0
+METRICS = ("tasa_rechazo", "utilizacion", "desperdicio_capacidad")
+MIN_EFFECT = 0.005  # differences under half a percentage point are reported as no change
+
+
+@dataclass
+class SimSpace:
+    id: Any
+    tipo: str
+    capacidad: int
+    closures: List[Tuple[float, float]] = field(default_factory=list)  # [start, end) in hours from the horizon start
+
+
+@dataclass
+class Demand:
+    """Booking requests as parallel arrays; times are hours from the horizon start."""
+    start: np.ndarray
+    duration: np.ndarray
+    size: np.ndarray
+    tipo: np.ndarray
+    horizon_hours: float
+    origen: str
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+
+def _naive(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return None
+
+
+def inventory_from(spaces: Iterable[Dict[str, Any]]) -> List[SimSpace]:
+    """Simulated inventory from space dicts; spaces under maintenance stay closed for the whole horizon."""
+    inventory = []
+    for space in spaces:
+        closures = [(0.0, math.inf)] if space.get("estado") == "mantenimiento" else []
+        inventory.append(SimSpace(
+            id=space.get("id"),
+            tipo=space.get("tipo") or "aula",
+            capacidad=int(space.get("capacidad") or 0),
+            closures=closures
+        ))
+    return inventory
+
+
+def demand_from_bookings(
+    bookings: Iterable[Tuple[Any, datetime, Optional[datetime]]],
+    inventory: List[SimSpace],
+    start: datetime,
+    end: datetime,
+    occupancy: float = DEFAULT_OCCUPANCY
+) -> Demand:
+    """Replay demand from ``(space_id, fecha, fecha_fin)`` bookings inside [start, end)."""
+    by_id = {s.id: s for s in inventory}
+    horizon = (end - start).total_seconds() / 3600
+    rows = []
+    for space_id, fecha, fecha_fin in bookings:
+        space, fecha, fecha_fin = by_id.get(space_id), _naive(fecha), _naive(fecha_fin)
+        if space is None or fecha is None:
+            continue
+        offset = (fecha - start).total_seconds() / 3600
+        duration = (fecha_fin - fecha).total_seconds() / 3600 if fecha_fin else DEFAULT_DURATION_HOURS
+        if 0 <= offset < horizon and duration > 0:
+            rows.append((offset, min(duration, CLOSE_HOUR - OPEN_HOUR), max(1, round(space.capacidad * occupancy)), space.tipo))
+    return _demand(rows, horizon, "historica")
+
+
+def synthetic_demand(
+    inventory: List[SimSpace],
+    start: datetime,
+    end: datetime,
+    bookings_per_day: float = 3.0,
+    seed: int = 0
+) -> Demand:
+    """
+    Weekday demand shaped after the current inventory: each space gets
+    Poisson(``bookings_per_day``) bookings per weekday between 7:00 and 19:00,
+    lasting 1-3 hours, for groups of 40-100% of its capacity.
+    """
+    rng = np.random.default_rng(seed)
+    days = (end - start).days
+    weekdays = [d for d in range(days) if (start + timedelta(days=d)).weekday() < 5]
+    rows = []
+    for space in inventory:
+        if space.capacidad <= 0:
+            continue
+        counts = rng.poisson(bookings_per_day, len(weekdays))
+        for day, count in zip(weekdays, counts):
+            hours = rng.integers(OPEN_HOUR, CLOSE_HOUR - 2, count)
+            durations = rng.choice([1.0, 2.0, 2.0, 3.0], count)
+            sizes = np.maximum(1, np.round(space.capacidad * rng.uniform(0.4, 1.0, count)))
+            rows.extend((day * 24 + h, d, s, space.tipo) for h, d, s in zip(hours, durations, sizes))
+    return _demand(rows, days * 24.0, "sintetica")
+
+
+def _demand(rows: List[Tuple[float, float, float, str]], horizon: float, origen: str) -> Demand:
+    if not rows:
+        empty = np.zeros(0)
+        return Demand(empty, empty, empty, np.zeros(0, dtype=object), horizon, origen)
+    start, duration, size, tipo = zip(*rows)
+    return Demand(
+        np.array(start, dtype=float), np.array(duration, dtype=float),
+        np.array(size, dtype=float), np.array(tipo, dtype=object), horizon, origen
+    )
+
+
+def apply_changes(
+    inventory: List[SimSpace],
+    changes: Sequence[Dict[str, Any]],
+    start: datetime
+) -> Tuple[List[SimSpace], List[str], List[Dict[str, Any]]]:
+    """
+    Scenario inventory. Supported ``type`` values: add_space (tipo, capacidad,
+    cantidad), remove_space (space_id), increase_capacity / decrease_capacity
+    (amount as a fraction; every space without space_id), set_capacity
+    (space_id, capacidad) and close_space (space_id, desde, hasta). Returns
+    the new inventory, the applied changes described and the ignored ones.
+    """
+    spaces = [replace(s, closures=list(s.closures)) for s in inventory]
+    applied, ignored = [], []
+
+    def targets(change):
+        if change.get("space_id") is None:
+            return spaces
+        return [s for s in spaces if s.id == change["space_id"]]
+
+    for change in changes or []:
+        kind = change.get("type") if isinstance(change, dict) else None
+        if kind == "add_space":
+            count = int(change.get("cantidad", 1))
+            tipo = change.get("tipo") or "aula"
+            for n in range(count):
+                spaces.append(SimSpace(id=f"nuevo-{len(applied)}-{n}", tipo=tipo, capacidad=int(change.get("capacidad", 30))))
+            applied.append(f"{count} espacio(s) nuevo(s) de tipo {tipo} con capacidad {change.get('capacidad', 30)}")
+        elif kind == "remove_space" and targets(change) and change.get("space_id") is not None:
+            spaces = [s for s in spaces if s.id != change["space_id"]]
+            applied.append(f"Espacio {change['space_id']} eliminado")
+        elif kind in ("increase_capacity", "decrease_capacity") and targets(change):
+            amount = float(change.get("amount", 0.0)) * (1 if kind == "increase_capacity" else -1)
+            for s in targets(change):
+                s.capacidad = max(0, round(s.capacidad * (1 + amount)))
+            applied.append(f"Capacidad {amount * 100:+.0f}% en {change.get('space_id', 'todos los espacios')}")
+        elif kind == "set_capacity" and targets(change) and change.get("capacidad") is not None:
+            for s in targets(change):
+                s.capacidad = int(change["capacidad"])
+            applied.append(f"Capacidad de {change.get('space_id', 'todos los espacios')} fijada en {change['capacidad']}")
+        elif kind == "close_space" and targets(change):
+            desde, hasta = _naive(change.get("desde")), _naive(change.get("hasta"))
+            window = (
+                (desde - start).total_seconds() / 3600 if desde else 0.0,
+                (hasta - start).total_seconds() / 3600 if hasta else math.inf
+            )
+            for s in targets(change):
+                s.closures.append(window)
+            applied.append(f"Cierre de {change.get('space_id', 'todos los espacios')}"
+                           + (f" del {desde.date()} al {hasta.date()}" if desde and hasta else ""))
+        else:
+            ignored.append(change)
+    return spaces, applied, ignored
+
+
+def _closed(closures: List[Tuple[float, float]], start: float, end: float) -> bool:
+    return any(c_start < end and start < c_end for c_start, c_end in closures)
+
+
+def simulate_once(inventory: List[SimSpace], demand: Demand, seed: int, growth: float = 0.0, jitter: float = 0.5) -> Dict[str, Any]:
+    """
+    One replication. Every booking is replayed once plus Poisson(``growth``)
+    extra copies (a negative growth drops bookings with that probability),
+    with its start jittered by ``jitter`` hours and its group size by ~15%;
+    requests are then served in time order (events: arrival, release) by the
+    smallest free space of the same type that fits and is not closed.
+    """
+    rng = np.random.default_rng(seed)
+    if growth >= 0:
+        copies = 1 + rng.poisson(growth, len(demand))
+    else:
+        copies = rng.binomial(1, max(0.0, 1.0 + growth), len(demand))
+    index = np.repeat(np.arange(len(demand)), copies)
+    starts = np.clip(demand.start[index] + rng.normal(0.0, jitter, len(index)), 0.0, demand.horizon_hours)
+    sizes = np.maximum(1.0, np.round(demand.size[index] * rng.lognormal(0.0, 0.15, len(index))))
+    durations = demand.duration[index]
+    tipos = demand.tipo[index]
+    order = np.argsort(starts, kind="stable")
+
+    capacities = [s.capacidad for s in inventory]
+    closures = [s.closures for s in inventory]
+    free: Dict[str, List[Tuple[int, int]]] = {}
+    for i, s in enumerate(inventory):
+        if s.capacidad > 0:
+            insort(free.setdefault(s.tipo, []), (s.capacidad, i))
+    busy: List[Tuple[float, str, int]] = []
+    booked_hours = np.zeros(len(inventory))
+    requested: Dict[str, int] = {}
+    rejected: Dict[str, int] = {}
+    seat_hours = capacity_hours = 0.0
+
+    for k in order.tolist():
+        start, duration, size, tipo = starts[k], durations[k], sizes[k], tipos[k]
+        end = start + duration
+        while busy and busy[0][0] <= start:
+            _, busy_tipo, i = heapq.heappop(busy)
+            insort(free[busy_tipo], (capacities[i], i))
+        requested[tipo] = requested.get(tipo, 0) + 1
+        candidates = free.get(tipo)
+        position = bisect_left(candidates, (size, -1)) if candidates else 0
+        while candidates and position < len(candidates) and closures[candidates[position][1]] \
+                and _closed(closures[candidates[position][1]], start, end):
+            position += 1
+        if not candidates or position >= len(candidates):
+            rejected[tipo] = rejected.get(tipo, 0) + 1
+            continue
+        capacity, i = candidates.pop(position)
+        heapq.heappush(busy, (end, tipo, i))
+        booked_hours[i] += duration
+        seat_hours += size * duration
+        capacity_hours += capacity * duration
+
+    available = np.array([_available_hours(c, demand.horizon_hours) for c in closures])
+    available[np.array(capacities) <= 0] = 0.0
+    by_tipo: Dict[str, List[int]] = {}
+    for i, s in enumerate(inventory):
+        by_tipo.setdefault(s.tipo, []).append(i)
+    total = sum(requested.values())
+    return {
+        "solicitudes": total,
+        "tasa_rechazo": sum(rejected.values()) / total if total else 0.0,
+        "utilizacion": float(booked_hours.sum() / available.sum()) if available.sum() else 0.0,
+        "desperdicio_capacidad": float(1 - seat_hours / capacity_hours) if capacity_hours else 0.0,
+        "rechazo_por_tipo": {t: rejected.get(t, 0) / n for t, n in requested.items()},
+        "utilizacion_por_tipo": {
+            t: float(booked_hours[idx].sum() / available[idx].sum()) if available[idx].sum() else 0.0
+            for t, idx in by_tipo.items()
+        }
+    }
+
+
+def _available_hours(closures: List[Tuple[float, float]], horizon: float) -> float:
+    """Opening hours (7:00-21:00 every day) in the horizon, minus closures, approximated pro rata."""
+    closed = sum(max(0.0, min(end, horizon) - max(start, 0.0)) for start, end in closures)
+    return max(0.0, horizon - closed) * (CLOSE_HOUR - OPEN_HOUR) / 24
+
+
+def run_replications(
+    base: List[SimSpace],
+    scenario: List[SimSpace],
+    demand: Demand,
+    seeds: Sequence[int],
+    growth: float
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Current and scenario inventory under the same random demand (common random numbers)."""
+    return [(simulate_once(base, demand, seed, growth), simulate_once(scenario, demand, seed, growth)) for seed in seeds]
+
+
+def _stats(values: Sequence[float]) -> Dict[str, Any]:
+    values = np.asarray(values, dtype=float)
+    half = 1.96 * values.std(ddof=1) / math.sqrt(len(values)) if len(values) > 1 else 0.0
+    mean = float(values.mean()) if len(values) else 0.0
+    return {"media": round(mean, 4), "ic95": [round(mean - half, 4), round(mean + half, 4)]}
+
+
+def _mean_by_tipo(runs: List[Dict[str, Any]], key: str) -> Dict[str, float]:
+    tipos = sorted({t for run in runs for t in run[key]})
+    return {t: round(float(np.mean([run[key].get(t, 0.0) for run in runs])), 4) for t in tipos}
+
+
+class ScenarioSimulator:
+    """
+    Discrete-event Monte Carlo simulator for /analytics/simulate.
+
+    Historical (or synthetic) booking demand is replayed against the current
+    inventory and against the scenario inventory with the same random
+    numbers, so differences are due to the scenario and not to noise; a
+    demand growth applies to both sides.
+    Replications are spread over a process pool when the workload is large
+    enough to pay for it.
+    """
+
+    def __init__(self, replications: int = 20, workers: int = 0, parallel_threshold: int = 200_000):
+        self.replications = replications
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def run(
+        self,
+        inventory: List[SimSpace],
+        demand: Demand,
+        parameters: Dict[str, Any],
+        start: datetime,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Simulate ``parameters['changes']`` and return ``{results, impact_analysis, recommendations}``.
+        ``progress`` is called with the share of replications done after each batch.
+        """
+        began = time.perf_counter()
+        replications = max(2, min(int(parameters.get("replications", self.replications)), 500))
+        growth = float(parameters.get("demand_growth", 0.0))
+        seed = int(parameters.get("seed", 42))
+        scenario, applied, ignored = apply_changes(inventory, parameters.get("changes") or [], start)
+
+        seeds = [seed + r for r in range(replications)]
+        loop = asyncio.get_running_loop()
+        workload = len(demand) * replications * 2
+        done = 0
+
+        async def replicate(executor, chunk):
+            nonlocal done
+            part = await loop.run_in_executor(executor, run_replications, inventory, scenario, demand, chunk, growth)
+            done += len(chunk)
+            if progress is not None:
+                progress(done / replications)
+            return part
+
+        if self.workers > 1 and workload >= self.parallel_threshold:
+            chunks = [seeds[w::self.workers] for w in range(self.workers) if seeds[w::self.workers]]
+            parts = await asyncio.gather(*(replicate(self.pool, chunk) for chunk in chunks))
+            runs = [run for part in parts for run in part]
+        elif progress is not None:
+            # Batches only to report progress; replications are independent per seed
+            step = max(1, -(-replications // 4))
+            runs = []
+            for i in range(0, replications, step):
+                runs.extend(await replicate(None, seeds[i:i + step]))
+        else:
+            runs = await replicate(None, seeds)
+
+        result = self._summarize(inventory, scenario, demand, runs, growth, applied, ignored)
+        result["results"]["duracion_segundos"] = round(time.perf_counter() - began, 3)
+        return result
+
+    def _summarize(
+        self,
+        inventory: List[SimSpace],
+        scenario: List[SimSpace],
+        demand: Demand,
+        runs: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        growth: float,
+        applied: List[str],
+        ignored: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        base_runs = [b for b, _ in runs]
+        scenario_runs = [s for _, s in runs]
+        deltas = {m: _stats([s[m] - b[m] for b, s in runs]) for m in METRICS}
+        seats_before = sum(s.capacidad for s in inventory)
+        seats_after = sum(s.capacidad for s in scenario)
+        before = {s.id: (s.capacidad, s.closures) for s in inventory}
+        affected = sum(1 for s in scenario if before.get(s.id) != (s.capacidad, s.closures)) \
+            + len(set(before) - {s.id for s in scenario})
+
+        escenario = {m: _stats([r[m] for r in scenario_runs]) for m in METRICS}
+        rechazo_por_tipo = _mean_by_tipo(scenario_runs, "rechazo_por_tipo")
+        utilizacion_por_tipo = _mean_by_tipo(scenario_runs, "utilizacion_por_tipo")
+        rejection = escenario["tasa_rechazo"]["media"]
+        results = {
+            "replicaciones": len(runs),
+            "demanda": {
+                "origen": demand.origen,
+                "reservas": len(demand),
+                "solicitudes_simuladas": round(float(np.mean([r["solicitudes"] for r in scenario_runs])), 1),
+                "crecimiento": growth,
+                "horas": demand.horizon_hours
+            },
+            "actual": {m: _stats([r[m] for r in base_runs]) for m in METRICS},
+            "escenario": escenario,
+            "diferencia": deltas,
+            "espacios_afectados": affected,
+            "cambio_capacidad": round((seats_after - seats_before) / seats_before * 100, 2) if seats_before else 0.0,
+            "cambio_eficiencia": round(deltas["utilizacion"]["media"] * 100, 2),
+            "cambio_tasa_rechazo": round(deltas["tasa_rechazo"]["media"] * 100, 2),
+            "rechazo_por_tipo": rechazo_por_tipo,
+            "utilizacion_por_tipo": utilizacion_por_tipo,
+            "cambios_aplicados": applied,
+            "cambios_ignorados": ignored,
+            "viabilidad": "alta" if rejection < 0.02 else "media" if rejection < 0.1 else "baja"
+        }
+        return {
+            "results": results,
+            "impact_analysis": self._impact(deltas),
+            "recommendations": self._recommendations(escenario, deltas, rechazo_por_tipo, utilizacion_por_tipo)
+        }
+
+    @staticmethod
+    def _impact(deltas: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+        impact = {"positivo": [], "negativo": [], "neutro": []}
+        labels = {
+            "tasa_rechazo": ("tasa de rechazo de reservas", -1),
+            "utilizacion": ("utilización de los espacios", 1),
+            "desperdicio_capacidad": ("capacidad desperdiciada", -1)
+        }
+        for metric, (label, better) in labels.items():
+            mean = deltas[metric]["media"]
+            low, high = deltas[metric]["ic95"]
+            text = f"{label}: {mean * 100:+.1f} puntos (IC95% {low * 100:+.1f} a {high * 100:+.1f})"
+            if low <= 0 <= high or abs(mean) < MIN_EFFECT:
+                impact["neutro"].append(f"Sin cambio significativo en la {text}")
+            elif mean * better > 0:
+                impact["positivo"].append(f"Mejora la {text}")
+            else:
+                impact["negativo"].append(f"Empeora la {text}")
+        return impact
+
+    @staticmethod
+    def _recommendations(
+        escenario: Dict[str, Dict[str, Any]],
+        deltas: Dict[str, Dict[str, Any]],
+        rechazo_por_tipo: Dict[str, float],
+        utilizacion_por_tipo: Dict[str, float]
+    ) -> List[str]:
+        recommendations = []
+        for tipo, rate in sorted(rechazo_por_tipo.items(), key=lambda item: -item[1]):
+            if rate > 0.05:
+                recommendations.append(
+                    f"Agregar espacios de tipo {tipo}: se rechazaría el {rate * 100:.0f}% de sus reservas"
+                )
+        for tipo, usage in sorted(utilizacion_por_tipo.items(), key=lambda item: item[1]):
+            if usage < 0.3:
+                recommendations.append(
+                    f"Los espacios de tipo {tipo} quedarían al {usage * 100:.0f}% de uso; considere reasignar o cerrar alguno"
+                )
+        waste = escenario["desperdicio_capacidad"]["media"]
+        if waste > 0.4:
+            recommendations.append(
+                f"El {waste * 100:.0f}% de los puestos reservados quedaría vacío: priorice espacios más pequeños para grupos reducidos"
+            )
+        if deltas["tasa_rechazo"]["ic95"][0] > 0 and deltas["tasa_rechazo"]["media"] >= MIN_EFFECT:
+            recommendations.append("El escenario aumenta los rechazos de reservas; compense la capacidad antes de aplicarlo")
+        if not recommendations:
+            recommendations.append("El escenario es viable con la demanda simulada")
+        return recommendations
+
+
+scenario_simulator = ScenarioSimulator(
+    replications=settings.SIMULATION_REPLICATIONS,
+    workers=settings.SIMULATION_WORKERS
+)
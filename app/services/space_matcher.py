@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.core.text import AhoCorasick, normalize_text
+from app.db.versions import table_versions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SpaceNameMatcher:
+    """
+    Finds which spaces are mentioned in a text (e.g. an assistant reply).
+
+    Space names are normalized (lowercase, no accents) into one Aho–Corasick
+    automaton, so a reply is scanned once regardless of how many spaces exist.
+    The automaton is rebuilt only when the ``spaces`` table version changes
+    or the number of spaces differs from the one it was built from.
+    Matches must fall on word boundaries ("Aula 1" is not found in "Aula 101").
+    """
+
+    def __init__(self):
+        self._automaton: Optional[AhoCorasick] = None
+        self._built_for: Optional[Tuple[int, int]] = None
+        self.builds = 0
+
+    def _ensure(self, spaces: List[Any]) -> AhoCorasick:
+        signature = (table_versions.get("spaces"), len(spaces))
+        if self._automaton is None or self._built_for != signature:
+            automaton = AhoCorasick()
+            for space in spaces:
+                automaton.add(normalize_text(space.nombre), space.id)
+            self._automaton = automaton.build()
+            self._built_for = signature
+            self.builds += 1
+        return self._automaton
+
+    def find(self, text: str, spaces: List[Any]) -> List[Any]:
+        """Spaces from ``spaces`` whose name occurs in ``text``, in order of first mention."""
+        if not text or not spaces:
+            return []
+        automaton = self._ensure(spaces)
+        normalized = normalize_text(text)
+        found: Dict[int, None] = {}
+        for space_id, start, end in automaton.iter_matches(normalized):
+            if start > 0 and normalized[start - 1].isalnum():
+                continue
+            if end < len(normalized) and normalized[end].isalnum():
+                continue
+            found.setdefault(space_id, None)
+        by_id = {space.id: space for space in spaces}
+        return [by_id[space_id] for space_id in found if space_id in by_id]
+
+
+space_matcher = SpaceNameMatcher()
@@ -7,9 +7,20 @@ from app.main import app
 from app.db.base import Base
 from app.db.session import get_db
 from app.db.crud import UserCRUD
+from app.core.security import get_password_hash
+from app.services.rate_limit import ai_limiter
+from app.services.circuit_breaker import ai_breaker, last_good
+from app.db.space_metrics import space_metrics
+from app.core.http_cache import response_cache
+from app.core.metrics import metrics
+from app.core import query_budget
+from app.config import settings
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
+# Los handlers con @query_budget fallan en los tests en lugar de solo registrar un aviso
+settings.QUERY_BUDGET_STRICT = True
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -44,8 +55,15 @@ async def test_db():
 async def client(test_db):
     async def override_get_db():
         yield test_db
+        await test_db.commit()
     
     app.dependency_overrides[get_db] = override_get_db
+    await ai_limiter.reset()
+    ai_breaker.reset()
+    last_good.clear()
+    space_metrics.reset()
+    response_cache.clear()
+    metrics.reset()
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -54,14 +72,27 @@ async def client(test_db):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def max_queries():
+    """
+    Presupuesto de sentencias SQL para una llamada completa (dependencias incluidas):
+
+        with max_queries(2):
+            await client.get("/api/v1/spaces", headers=auth_headers)
+    """
+    return query_budget.max_queries
+
+
 @pytest.fixture(scope="function")
 async def auth_headers(test_db, client):
     await UserCRUD.create(
         test_db,
-        username="testadmin",
-        password="testpass123",
-        email="testadmin@example.com",
-        rol="admin"
+        {
+            "username": "testadmin",
+            "password_hash": get_password_hash("testpass123"),
+            "email": "testadmin@example.com",
+            "rol": "admin"
+        }
     )
     await test_db.commit()
     
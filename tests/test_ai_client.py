@@ -0,0 +1,51 @@
+"""
+Tests del registro de clientes de IA
+"""
+import pytest
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services import ai_client as ai_client_module
+from app.services.ai_client import AIClientRegistry
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    calls = {"configure": 0, "models": 0}
+
+    class FakeModel:
+        def __init__(self, name, generation_config=None, system_instruction=None):
+            calls["models"] += 1
+            self.name = name
+            self.generation_config = generation_config
+
+        def generate_content(self, prompt, generation_config=None):
+            return SimpleNamespace(text="pong")
+
+    def configure(api_key=None):
+        calls["configure"] += 1
+
+    monkeypatch.setattr(ai_client_module, "genai", SimpleNamespace(configure=configure, GenerativeModel=FakeModel))
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    return calls
+
+
+def test_registry_without_api_key(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", None)
+    assert AIClientRegistry().get_model() is None
+
+
+def test_registry_configures_once_and_caches_models(fake_genai):
+    registry = AIClientRegistry()
+
+    first = registry.get_model("gemini-2.0-flash")
+    assert registry.get_model("gemini-2.0-flash") is first
+    json_model = registry.get_model("gemini-2.0-flash", {"response_mime_type": "application/json"})
+
+    assert json_model is not first
+    assert fake_genai == {"configure": 1, "models": 2}
+
+
+@pytest.mark.asyncio
+async def test_warm_up(fake_genai):
+    assert await AIClientRegistry().warm_up() is True
@@ -0,0 +1,90 @@
+"""
+Tests del decodificador compartido de respuestas JSON de la IA
+"""
+import pytest
+from types import SimpleNamespace
+from typing import List
+from pydantic import BaseModel
+
+from app.services.ai_json import (
+    AIResponseParseError,
+    decode,
+    extract_json,
+    generate_json,
+    parse_metrics
+)
+
+
+class Item(BaseModel):
+    nombre: str
+    capacidad: int
+
+
+class Payload(BaseModel):
+    items: List[Item] = []
+
+
+class FakeModel:
+    """Modelo que devuelve respuestas predefinidas y registra las llamadas"""
+
+    def __init__(self, *replies, json_mode=True):
+        self.replies = list(replies)
+        self.json_mode = json_mode
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None):
+        if generation_config is not None and not self.json_mode:
+            raise TypeError("generation_config not supported")
+        self.calls.append((prompt, generation_config))
+        return SimpleNamespace(text=self.replies.pop(0))
+
+
+def test_extract_json_with_fences_and_prose():
+    text = 'Claro, aquí está:\n```json\n{"a": {"b": "texto con } llave"}, "c": [1, 2]}\n```\nEspero que ayude.'
+    assert extract_json(text) == {"a": {"b": "texto con } llave"}, "c": [1, 2]}
+
+
+def test_extract_json_without_object_raises():
+    with pytest.raises(AIResponseParseError):
+        extract_json("No puedo ayudar con eso")
+
+
+def test_decode_validates_schema():
+    payload = decode('{"items": [{"nombre": "Aula 1", "capacidad": 30}]}', Payload)
+    assert payload.items[0].capacidad == 30
+
+    with pytest.raises(AIResponseParseError):
+        decode('{"items": [{"nombre": "Aula 1"}]}', Payload)
+
+
+@pytest.mark.asyncio
+async def test_generate_json_repairs_once_and_records_metrics():
+    parse_metrics.reset()
+    model = FakeModel("respuesta truncada {\"items\": [", '{"items": []}')
+
+    result = await generate_json(model, "prompt", Payload, endpoint="test")
+
+    assert result == Payload(items=[])
+    assert len(model.calls) == 2
+    assert model.calls[0][1] == {"response_mime_type": "application/json"}
+    assert parse_metrics.snapshot()["test"]["repaired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_json_gives_up_after_bounded_repairs():
+    parse_metrics.reset()
+    model = FakeModel("nada", "tampoco", "nunca")
+
+    with pytest.raises(AIResponseParseError):
+        await generate_json(model, "prompt", endpoint="test", max_repairs=1)
+
+    assert len(model.calls) == 2
+    assert parse_metrics.failure_rate("test") == 1.0
+
+
+@pytest.mark.asyncio
+async def test_generate_json_without_json_mode():
+    model = FakeModel('{"ok": true}', json_mode=False)
+
+    assert await generate_json(model, "prompt", endpoint="test") == {"ok": True}
+    assert model.calls[0][1] is None
@@ -2,23 +2,27 @@ import pytest
 from httpx import AsyncClient
 
 from app.db.crud import UserCRUD
+from app.core.security import get_password_hash
 
 
 @pytest.mark.asyncio
-async def test_login_success(test_db, client):
+async def test_login_success(test_db, client, max_queries):
     await UserCRUD.create(
         test_db,
-        username="loginuser",
-        password="password123",
-        email="login@example.com",
-        rol="standard"
+        {
+            "username": "loginuser",
+            "password_hash": get_password_hash("password123"),
+            "email": "login@example.com",
+            "rol": "standard"
+        }
     )
     await test_db.commit()
     
-    response = await client.post(
-        "/api/v1/auth/login",
-        data={"username": "loginuser", "password": "password123"}
-    )
+    with max_queries(1):
+        response = await client.post(
+            "/api/v1/auth/login",
+            data={"username": "loginuser", "password": "password123"}
+        )
     
     assert response.status_code == 200
     data = response.json()
@@ -39,13 +43,15 @@ async def test_login_invalid_credentials(client):
 
 
 @pytest.mark.asyncio
-async def test_refresh_token(test_db, client):
+async def test_refresh_token(test_db, client, max_queries):
     await UserCRUD.create(
         test_db,
-        username="refreshuser",
-        password="password123",
-        email="refresh@example.com",
-        rol="standard"
+        {
+            "username": "refreshuser",
+            "password_hash": get_password_hash("password123"),
+            "email": "refresh@example.com",
+            "rol": "standard"
+        }
     )
     await test_db.commit()
     
@@ -55,10 +61,11 @@ async def test_refresh_token(test_db, client):
     )
     refresh_token = login_response.json()["refresh_token"]
     
-    response = await client.post(
-        "/api/v1/auth/refresh",
-        json={"refresh_token": refresh_token}
-    )
+    with max_queries(1):
+        response = await client.post(
+            "/api/v1/auth/refresh",
+            json={"refresh_token": refresh_token}
+        )
     
     assert response.status_code == 200
     data = response.json()
@@ -67,11 +74,29 @@ async def test_refresh_token(test_db, client):
 
 
 @pytest.mark.asyncio
-async def test_logout(test_db, client, auth_headers):
-    response = await client.post(
-        "/api/v1/auth/logout",
-        headers=auth_headers
-    )
+async def test_logout(test_db, client, auth_headers, max_queries):
+    with max_queries(0):
+        response = await client.post(
+            "/api/v1/auth/logout",
+            headers=auth_headers
+        )
     
     assert response.status_code == 200
     assert response.json()["message"] == "Successfully logged out"
+
+
+@pytest.mark.asyncio
+async def test_register_query_budget(client, max_queries):
+    # Comprobación de username y email, INSERT y refresh del usuario creado
+    with max_queries(4):
+        response = await client.post(
+            "/api/v1/auth/register",
+            json={
+                "username": "budgetuser",
+                "email": "budget@example.com",
+                "password": "password123",
+                "rol": "standard"
+            }
+        )
+    
+    assert response.status_code == 201
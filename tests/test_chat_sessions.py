@@ -0,0 +1,159 @@
+"""
+Tests de la memoria de conversación del chat
+"""
+import pytest
+from types import SimpleNamespace
+
+from app.config import settings
+from app.db.crud import SpaceCRUD
+from app.services.ai_client import ai_client
+from app.services.chat_sessions import ChatSessionStore
+
+
+def _space(space_id, nombre, capacidad=30, estado="disponible"):
+    return SimpleNamespace(
+        id=space_id, nombre=nombre, tipo="aula", capacidad=capacidad,
+        ubicacion="Bloque A", estado=estado, caracteristicas=["proyector"]
+    )
+
+
+class ChatModel:
+    """Modelo falso que guarda el contenido recibido en cada llamada"""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, contents, **kwargs):
+        self.calls.append(contents)
+        return SimpleNamespace(text=f"Respuesta {len(self.calls)}")
+
+
+def test_lru_evicts_least_recently_used_session():
+    store = ChatSessionStore(max_sessions=2)
+    first = store.get_or_create(None, user_id=1)
+    second = store.get_or_create(None, user_id=1)
+    assert store.get_or_create(first.id, user_id=1) is first
+
+    store.get_or_create(None, user_id=1)
+
+    assert len(store) == 2
+    assert store.get_or_create(second.id, user_id=1) is not second
+
+
+def test_sessions_are_isolated_per_user():
+    store = ChatSessionStore()
+    session = store.get_or_create(None, user_id=1)
+
+    assert store.get_or_create(session.id, user_id=2).id != session.id
+    assert not store.delete(session.id, user_id=2)
+    assert store.delete(session.id, user_id=1)
+
+
+@pytest.mark.asyncio
+async def test_only_changed_spaces_are_sent_after_first_turn():
+    store = ChatSessionStore()
+    session = store.get_or_create(None, user_id=1)
+    spaces = [_space(1, "Aula 101"), _space(2, "Aula 102")]
+
+    contents, message = await store.prepare_turn(session, "hola", spaces, "Ana")
+    assert "Aula 102" in contents[0]["parts"][0]
+    assert message == "hola"
+    store.record_turn(session, message, "Hola")
+
+    contents, message = await store.prepare_turn(session, "¿y ahora?", spaces, "Ana")
+    assert message == "¿y ahora?"
+    store.record_turn(session, message, "Igual")
+
+    spaces[1] = _space(2, "Aula 102", estado="mantenimiento")
+    contents, message = await store.prepare_turn(session, "¿cambió algo?", spaces, "Ana")
+    assert "mantenimiento" in message
+    assert "Aula 101" not in message
+    assert "mantenimiento" not in contents[0]["parts"][0]
+
+
+@pytest.mark.asyncio
+async def test_delta_is_resent_when_the_reply_fails():
+    store = ChatSessionStore()
+    session = store.get_or_create(None, user_id=1)
+    spaces = [_space(1, "Aula 101")]
+    contents, message = await store.prepare_turn(session, "hola", spaces, "Ana")
+    store.record_turn(session, message, "Hola")
+
+    spaces[0] = _space(1, "Aula 101", estado="mantenimiento")
+    contents, message = await store.prepare_turn(session, "¿cambió algo?", spaces, "Ana")
+    assert "mantenimiento" in message
+    # La llamada al modelo falla: no se registra el turno
+
+    contents, message = await store.prepare_turn(session, "¿y ahora?", spaces, "Ana")
+    assert "mantenimiento" in message
+    store.record_turn(session, message, "Está en mantenimiento")
+
+    contents, message = await store.prepare_turn(session, "¿algo más?", spaces, "Ana")
+    assert message == "¿algo más?"
+
+
+@pytest.mark.asyncio
+async def test_long_conversation_stays_within_token_budget():
+    store = ChatSessionStore(token_budget=600, keep_turns=2)
+    session = store.get_or_create(None, user_id=1)
+    spaces = [_space(i, f"Aula {i}") for i in range(1, 6)]
+    summaries = []
+
+    async def summarizer(previous, turns):
+        summaries.append(len(turns))
+        return "Resumen breve"
+
+    for turn in range(30):
+        contents, message = await store.prepare_turn(
+            session, f"Pregunta {turn} " + "detalle " * 20, spaces, "Ana", summarizer=summarizer
+        )
+        assert store.prompt_tokens(contents) <= store.token_budget
+        store.record_turn(session, message, "respuesta " * 40)
+
+    assert summaries
+    assert len(session.turns) < 10
+    assert "Resumen breve" in contents[0]["parts"][0]
+
+
+@pytest.mark.asyncio
+async def test_failed_summarizer_falls_back_to_extractive_summary():
+    store = ChatSessionStore(token_budget=100, keep_turns=1)
+    session = store.get_or_create(None, user_id=1)
+
+    async def broken(previous, turns):
+        raise RuntimeError("sin cuota")
+
+    for turn in range(4):
+        contents, message = await store.prepare_turn(session, f"Pregunta {turn}", [], "Ana", summarizer=broken)
+        store.record_turn(session, message, "respuesta " * 30)
+
+    assert "Usuario: Pregunta 0" in session.summary
+
+
+@pytest.mark.asyncio
+async def test_chat_endpoint_continues_session(test_db, client, auth_headers, monkeypatch):
+    await SpaceCRUD.create(test_db, nombre="Aula 305", tipo="aula", capacidad=30, estado="disponible")
+    await test_db.commit()
+
+    model = ChatModel()
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_client, "get_model", lambda *args, **kwargs: model)
+
+    first = await client.post("/api/v1/chatbot/chat", json={"message": "Hola"}, headers=auth_headers)
+    assert first.status_code == 200
+    session_id = first.json()["session_id"]
+
+    second = await client.post(
+        "/api/v1/chatbot/chat",
+        json={"message": "¿Y mañana?", "session_id": session_id},
+        headers=auth_headers
+    )
+
+    assert second.json()["session_id"] == session_id
+    history = model.calls[-1]
+    assert [item["role"] for item in history] == ["user", "model", "user", "model", "user"]
+    assert history[-1]["parts"] == ["¿Y mañana?"]
+    assert "Aula 305" not in history[-1]["parts"][0]
+
+    deleted = await client.delete(f"/api/v1/chatbot/chat/sessions/{session_id}", headers=auth_headers)
+    assert deleted.status_code == 204
@@ -0,0 +1,65 @@
+"""
+Tests del chat con respuesta en streaming (SSE)
+"""
+import json
+import pytest
+from types import SimpleNamespace
+
+from app.config import settings
+from app.db.crud import SpaceCRUD
+from app.services.ai_client import ai_client, stream_text
+
+
+class StreamingModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_content(self, prompt, stream=False):
+        assert stream
+        return iter(SimpleNamespace(text=c) for c in self.chunks)
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_text_yields_chunks():
+    model = StreamingModel(["Hola", ", ", "mundo"])
+    assert [c async for c in stream_text(model, "prompt")] == ["Hola", ", ", "mundo"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_sends_tokens_then_done(test_db, client, auth_headers, monkeypatch):
+    await SpaceCRUD.create(test_db, nombre="Aula 305", tipo="aula", capacidad=30, estado="disponible")
+    await test_db.commit()
+
+    chunks = ["Te recomiendo el ", "Aula 305", ".\n\nPreguntas sugeridas:\n", "- ¿Qué espacios tienen proyector hoy?"]
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_client, "get_model", lambda *args, **kwargs: StreamingModel(chunks))
+
+    response = await client.post(
+        "/api/v1/chatbot/chat/stream",
+        json={"message": "¿Dónde doy clase a 25 personas?"},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [e for e, _ in events] == ["token"] * len(chunks) + ["done"]
+    assert "".join(d["text"] for e, d in events if e == "token") == "".join(chunks)
+    done = events[-1][1]
+    assert [s["nombre"] for s in done["spaces_mentioned"]] == ["Aula 305"]
+    assert done["suggestions"] == ["¿Qué espacios tienen proyector hoy?"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_requires_ai_configured(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", None)
+    response = await client.post("/api/v1/chatbot/chat/stream", json={"message": "Hola"}, headers=auth_headers)
+    assert response.status_code == 503
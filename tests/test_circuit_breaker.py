@@ -0,0 +1,234 @@
+"""
+Tests del circuit breaker de la IA y de los modos degradados
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from app.config import settings
+from app.db.crud import SpaceCRUD
+from app.services import ai_client as ai_client_module, ai_gemini
+from app.services.ai_client import ai_client
+from app.services.circuit_breaker import (
+    AIUnavailableError,
+    CircuitBreaker,
+    CircuitOpenError,
+    ai_breaker,
+    last_good
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, *args, **kwargs):
+        self.calls += 1
+        raise RuntimeError("503 Service Unavailable")
+
+
+async def _ok():
+    return "ok"
+
+
+async def _fail():
+    raise RuntimeError("boom")
+
+
+def _breaker(clock, **kwargs):
+    return CircuitBreaker("test", window=10, min_calls=4, failure_rate=0.5, open_seconds=30, clock=clock, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_opens_on_error_rate_and_fails_fast():
+    breaker = _breaker(FakeClock())
+
+    assert await breaker.call(_ok) == "ok"
+    assert await breaker.call(_ok) == "ok"
+    for _ in range(2):
+        with pytest.raises(AIUnavailableError):
+            await breaker.call(_fail)
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as exc:
+        await breaker.call(_ok)
+    assert exc.value.retry_after == 30
+    assert breaker.snapshot()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        with pytest.raises(AIUnavailableError):
+            await breaker.call(_fail)
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    with pytest.raises(AIUnavailableError):
+        await breaker.call(_fail)
+    assert breaker.state == "open"
+
+    clock.now += 30
+    assert await breaker.call(_ok) == "ok"
+    assert breaker.state == "closed"
+
+
+async def _open_then_half_open(breaker, clock):
+    for _ in range(4):
+        with pytest.raises(AIUnavailableError):
+            await breaker.call(_fail)
+    clock.now += 30
+    assert breaker.state == "half_open"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_slot():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    await _open_then_half_open(breaker, clock)
+
+    task = asyncio.create_task(breaker.call(lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == "half_open"
+    assert await breaker.call(_ok) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_closed_stream_releases_half_open_slot(monkeypatch):
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    await _open_then_half_open(breaker, clock)
+    monkeypatch.setattr(ai_client_module, "ai_breaker", breaker)
+
+    class Model:
+        def generate_content(self, prompt, stream=False):
+            return iter(SimpleNamespace(text=c) for c in ["uno", "dos"])
+
+    stream = ai_client_module.stream_text(Model(), "prompt")
+    assert await stream.__anext__() == "uno"
+    await stream.aclose()  # el cliente SSE se desconectó
+
+    assert await breaker.call(_ok) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_lost_probe_stops_blocking_after_call_timeout():
+    clock = FakeClock()
+    breaker = _breaker(clock, call_timeout=10)
+    await _open_then_half_open(breaker, clock)
+
+    assert breaker.allow() is True  # sonda que nunca registra resultado
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    clock.now += 10
+    assert await breaker.call(_ok) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_slow_calls_count_as_failures():
+    clock = FakeClock()
+    breaker = _breaker(clock, slow_call_seconds=5)
+
+    async def slow():
+        clock.now += 6
+        return "tarde"
+
+    for _ in range(4):
+        assert await breaker.call(slow) == "tarde"
+
+    assert breaker.state == "open"
+    assert breaker.snapshot()["slow"] == 4
+
+
+@pytest.mark.asyncio
+async def test_call_timeout_releases_the_caller():
+    breaker = CircuitBreaker("test", call_timeout=0.05)
+
+    with pytest.raises(AIUnavailableError):
+        await breaker.call(lambda: asyncio.sleep(1))
+
+    assert breaker.snapshot()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_optimize_allocation_falls_back_to_local_optimizer(monkeypatch):
+    model = BrokenModel()
+    monkeypatch.setattr(ai_gemini, "get_gemini_model", lambda *args, **kwargs: model)
+    ai_breaker.reset()
+    data = {
+        "spaces": [{"id": 1, "nombre": "Aula 1", "tipo": "aula", "capacidad": 30, "estado": "disponible", "caracteristicas": []}],
+        "resources": [{"id": 7, "nombre": "Proyector", "tipo": "proyector", "estado": "disponible", "caracteristicas": {}}],
+        "existing_assignments": []
+    }
+
+    result = await ai_gemini.optimize_space_allocation(data)
+
+    assert result["degraded"] is True
+    assert result["model_used"] == "local-optimizer"
+    ai_breaker.reset()
+
+
+@pytest.mark.asyncio
+async def test_predictions_serve_last_good_result(monkeypatch):
+    model = BrokenModel()
+    monkeypatch.setattr(ai_gemini, "get_gemini_model", lambda *args, **kwargs: model)
+    last_good.put("predictions", {"predictions": [{"entity_id": 1}], "confidence": 0.8, "insights": []})
+
+    result = await ai_gemini.generate_predictions({})
+
+    assert result["degraded"] is True
+    assert result["predictions"] == [{"entity_id": 1}]
+    last_good.clear()
+    ai_breaker.reset()
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_model_and_uses_local_search(test_db, client, auth_headers, monkeypatch):
+    await SpaceCRUD.create(test_db, nombre="Laboratorio 2", tipo="laboratorio", capacidad=25,
+                           caracteristicas=["computadores"], estado="disponible")
+    await SpaceCRUD.create(test_db, nombre="Auditorio", tipo="auditorio", capacidad=200, estado="disponible")
+    await test_db.commit()
+
+    model = BrokenModel()
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_client, "get_model", lambda *args, **kwargs: model)
+    for _ in range(ai_breaker.min_calls):
+        ai_breaker.record(True)
+    assert ai_breaker.state == "open"
+
+    response = await client.post(
+        "/api/v1/chatbot/quick-search",
+        params={"query": "laboratorio con computadores para 20 personas"},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["model_used"] == "local-ranking"
+    assert data["matching_spaces"][0]["nombre"] == "Laboratorio 2"
+    assert model.calls == 0
+
+    chat = await client.post("/api/v1/chatbot/chat", json={"message": "hola"}, headers=auth_headers)
+    assert chat.status_code == 503
+    assert int(chat.headers["Retry-After"]) >= 1
+
+    status = await client.get("/api/v1/chatbot/ai-status", headers=auth_headers)
+    assert status.json()["state"] == "open"
@@ -0,0 +1,120 @@
+"""
+Tests de la compresión de respuestas (gzip/brotli) y medición de bytes ahorrados
+"""
+import zlib
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, CompressionStats, choose_encoding, compression_stats
+from app.db.crud import ResourceCRUD
+from app.db.models import Assignment, Space
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("*") == ("br" if compression.brotli else "gzip")
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+
+
+def _streaming_app(stats):
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            for i in range(3):
+                yield f"data: {i}\n\n" * 200
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/export")
+    async def export():
+        async def stream():
+            for i in range(3):
+                yield ("fila;" * 500 + "\n").encode()
+        return StreamingResponse(stream(), media_type="text/csv")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500, stats=stats)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_streams_are_flushed_per_chunk_and_sse_is_untouched():
+    stats = CompressionStats()
+    transport = ASGITransport(app=_streaming_app(stats))
+    headers = {"Accept-Encoding": "gzip"}
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        small = await client.get("/small", headers=headers)
+        assert "content-encoding" not in small.headers
+
+        events = await client.get("/events", headers=headers)
+        assert "content-encoding" not in events.headers
+        assert events.text.startswith("data: 0")
+
+        async with client.stream("GET", "/export", headers=headers) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            # Each raw chunk decodes on its own: nothing is held back waiting for the next one
+            chunks = [decoder.decompress(raw) async for raw in response.aiter_raw()]
+            assert all(chunks[:3])
+            assert b"".join(chunks) == ("fila;" * 500 + "\n").encode() * 3
+
+    assert stats.routes["/export"][1] == 1
+    assert stats.routes["/events"][1] == 0
+
+
+@pytest.mark.asyncio
+async def test_bytes_saved_on_largest_endpoints(test_db, client, auth_headers):
+    resource = await ResourceCRUD.create(test_db, nombre="Proyector", tipo="equipo", estado="disponible")
+    await test_db.execute(insert(Space), [
+        {"nombre": f"Aula {i}", "tipo": "aula", "capacidad": 30, "ubicacion": f"Bloque {i % 5}",
+         "caracteristicas": {"proyector": True}, "estado": "disponible"}
+        for i in range(1000)
+    ])
+    start = datetime(2026, 3, 2, 8)
+    await test_db.execute(insert(Assignment), [
+        {"room_id": 1 + i % 50, "resource_id": resource.id, "fecha": start + timedelta(hours=i),
+         "fecha_fin": start + timedelta(hours=i + 2), "estado": "activo"}
+        for i in range(1000)
+    ])
+    await test_db.commit()
+    compression_stats.reset()
+
+    gzip_headers = {**auth_headers, "Accept-Encoding": "gzip"}
+    spaces = await client.get("/api/v1/spaces", headers=gzip_headers, params={"limit": 1000})
+    await client.get("/api/v1/assignments", headers=gzip_headers, params={"limit": 1000})
+    await client.get("/api/v1/analytics/space-utilization", headers=gzip_headers, params={
+        "bucket": "hour", "start_date": "2026-03-02T00:00:00", "end_date": "2026-03-09T00:00:00"
+    })
+    identity = await client.get("/api/v1/spaces", headers={**auth_headers, "Accept-Encoding": "identity"}, params={"limit": 1000})
+
+    assert spaces.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in spaces.headers["vary"]
+    assert spaces.json() == identity.json()
+    assert "content-encoding" not in identity.headers
+
+    largest = compression_stats.largest(3)
+    assert {path for path, _, _ in largest} == {
+        "/api/v1/spaces", "/api/v1/assignments", "/api/v1/analytics/space-utilization"
+    }
+    for path, original, sent in largest:
+        assert sent < original * 0.25, f"{path}: {original} -> {sent} bytes"
+    assert compression_stats.bytes_saved() > 200_000
+
+
+@pytest.mark.asyncio
+async def test_small_responses_are_sent_as_is(client):
+    response = await client.get("/health", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "healthy"}
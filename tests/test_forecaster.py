@@ -0,0 +1,172 @@
+"""
+Tests del pronosticador local de uso
+"""
+import time as timer
+import pytest
+import numpy as np
+from datetime import date, datetime, timedelta
+
+from app.db.crud import SpaceCRUD, UsageDataCRUD
+from app.services.forecaster import (
+    HISTORY_DAYS,
+    UsageForecaster,
+    UsageSeries,
+    dow_profile,
+    holt_winters,
+    seasonal_naive
+)
+
+START = date(2026, 1, 5)  # lunes
+WEEKLY = np.array([60.0, 70.0, 80.0, 70.0, 50.0, 10.0, 0.0])
+
+
+def _series(values: np.ndarray, keys=None) -> UsageSeries:
+    keys = keys or [("space", i + 1) for i in range(len(values))]
+    return UsageSeries(keys, values, np.zeros((len(values), 7, 24)), START)
+
+
+def _weekly(n_entities=3, weeks=8, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.tile(WEEKLY, weeks)[None, :] * (1 + 0.2 * np.arange(n_entities))[:, None]
+    return np.clip(base + rng.normal(0, noise, base.shape), 0, None)
+
+
+def test_from_rows_builds_daily_means_and_hour_profile():
+    rows = [
+        (1, 7, datetime(2026, 1, 5, 9), 40.0),
+        (1, None, datetime(2026, 1, 5, 10), 60.0),
+        (2, None, datetime(2026, 1, 6, 14), 30.0),
+        (2, None, datetime(2025, 12, 1, 14), 99.0),  # fuera de la ventana
+    ]
+
+    series = UsageSeries.from_rows(rows, START, 14)
+
+    assert series.keys == [("space", 1), ("resource", 7), ("space", 2)]
+    assert series.daily[0, 0] == 50.0
+    assert series.daily[1, 0] == 40.0
+    assert series.daily[2, 1] == 30.0
+    assert series.daily.sum() == 120.0
+    assert series.profile[0, 0, 10] == 60.0
+
+
+def test_methods_reproduce_a_pure_weekly_pattern():
+    y = _weekly()
+    horizon = 10
+    expected = np.tile(WEEKLY, 2)[:horizon][None, :] * (1 + 0.2 * np.arange(3))[:, None]
+
+    np.testing.assert_allclose(seasonal_naive(y, horizon), expected)
+    np.testing.assert_allclose(dow_profile(y, START.weekday(), horizon), expected)
+    np.testing.assert_allclose(holt_winters(y, horizon), expected, atol=1.0)
+
+
+def test_holt_winters_follows_trend():
+    days = np.arange(HISTORY_DAYS)
+    y = (20 + 0.5 * days + 5 * np.sin(2 * np.pi * days / 7))[None, :]
+    future = 20 + 0.5 * (HISTORY_DAYS + np.arange(7))
+
+    hw_error = np.abs(holt_winters(y, 7)[0] - future - 5 * np.sin(2 * np.pi * (HISTORY_DAYS + np.arange(7)) / 7)).mean()
+    profile_error = np.abs(dow_profile(y, 0, 7)[0] - future).mean()
+
+    assert hw_error < profile_error
+
+
+def test_forecast_blends_methods_with_intervals():
+    forecaster = UsageForecaster()
+    series = _series(_weekly(noise=3.0))
+
+    result = forecaster.forecast(series, 14, names={("space", 1): "Aula 101"})
+
+    assert len(result["predictions"]) == 3
+    prediction = next(p for p in result["predictions"] if p["entity_id"] == 1)
+    assert prediction["nombre"] == "Aula 101"
+    assert len(prediction["daily"]) == 14
+    truth = np.tile(WEEKLY, 2)[:14]
+    daily = prediction["daily"]
+    assert np.abs(np.array([d["predicted_usage"] for d in daily]) - truth).mean() < 6
+    covered = sum(d["lower"] <= t <= d["upper"] for d, t in zip(daily, truth))
+    assert covered >= 12
+    assert daily[7]["upper"] - daily[7]["lower"] > daily[0]["upper"] - daily[0]["lower"]
+    assert 0.5 < result["confidence"] <= 1.0
+    assert "Mayor uso los miércoles" in prediction["factors"]
+    assert result["insights"]
+
+
+def test_forecast_without_history():
+    result = UsageForecaster().forecast(_series(np.zeros((0, HISTORY_DAYS)), keys=[]), 7)
+
+    assert result["predictions"] == []
+    assert result["confidence"] == 0.0
+
+
+def test_daily_cache_expires_with_the_day():
+    forecaster = UsageForecaster()
+    today = date(2026, 3, 4)
+    forecaster.store("k", today, {"predictions": []})
+    forecaster.cached("k", today)
+    forecaster.store("k", today, {"predictions": []})
+
+    assert forecaster.cached("k", today) == {"predictions": []}
+    assert forecaster.cached("k", today + timedelta(days=1)) is None
+
+
+def test_forecast_benchmark(record_property):
+    forecaster = UsageForecaster()
+    series = _series(_weekly(n_entities=300, noise=5.0))
+
+    start = timer.perf_counter()
+    forecaster.forecast(series, 90)
+    elapsed_ms = (timer.perf_counter() - start) * 1000
+
+    # Tiempo informativo (junit/--junitxml); no decide el resultado en CI
+    record_property("elapsed_ms", round(elapsed_ms, 1))
+
+
+@pytest.mark.asyncio
+async def test_predictions_endpoint_uses_local_forecast(test_db, client, auth_headers, monkeypatch):
+    space = await SpaceCRUD.create(test_db, nombre="Aula 101", tipo="aula", capacidad=30, estado="disponible")
+    today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+    for offset in range(1, 29):
+        fecha = today - timedelta(days=offset)
+        await UsageDataCRUD.create(test_db, space_id=space.id, fecha=fecha, uso=float(WEEKLY[fecha.weekday()]))
+    await test_db.commit()
+
+    calls = []
+    original = UsageDataCRUD.get_series
+
+    async def counting(*args, **kwargs):
+        calls.append(1)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(UsageDataCRUD, "get_series", counting)
+
+    response = await client.get("/api/v1/analytics/predictions?days_ahead=14", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["model_used"] == "local-forecast"
+    assert data["predictions"][0]["nombre"] == "Aula 101"
+    assert len(data["predictions"][0]["daily"]) == 14
+    assert data["insights"]
+
+    await client.get("/api/v1/analytics/predictions?days_ahead=14", headers=auth_headers)
+    assert len(calls) == 1
+
+    await UsageDataCRUD.create(test_db, space_id=space.id, fecha=today, uso=50.0)
+    await test_db.commit()
+    await client.get("/api/v1/analytics/predictions?days_ahead=14", headers=auth_headers)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_predictions_name_spaces_beyond_the_first_hundred(test_db, client, auth_headers):
+    for i in range(100):
+        await SpaceCRUD.create(test_db, nombre=f"Relleno {i}", tipo="aula", capacidad=10, estado="disponible")
+    space = await SpaceCRUD.create(test_db, nombre="Aula 201", tipo="aula", capacidad=30, estado="disponible")
+    today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+    for offset in range(1, 29):
+        fecha = today - timedelta(days=offset)
+        await UsageDataCRUD.create(test_db, space_id=space.id, fecha=fecha, uso=float(WEEKLY[fecha.weekday()]))
+    await test_db.commit()
+
+    response = await client.get("/api/v1/analytics/predictions?days_ahead=7", headers=auth_headers)
+
+    assert response.json()["predictions"][0]["nombre"] == "Aula 201"
@@ -0,0 +1,125 @@
+"""
+Tests de ETag y GET condicional en los endpoints de catálogo
+"""
+import pytest
+from fastapi import Request
+from sqlalchemy import event
+
+from app.db.crud import CategoryCRUD, SpaceCRUD
+from app.core.http_cache import ResponseCache
+from app.db.versions import table_versions
+
+
+class _Statements:
+    def __init__(self, db):
+        self.engine = db.bind.sync_engine
+        self.seen = []
+
+    def _listener(self, conn, cursor, statement, *args):
+        self.seen.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._listener)
+        return self.seen
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._listener)
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_304_without_queries(test_db, client, auth_headers):
+    await SpaceCRUD.create(test_db, nombre="Aula 1", tipo="aula", capacidad=30, estado="disponible")
+    await test_db.commit()
+
+    first = await client.get("/api/v1/spaces", headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()[0]["nombre"] == "Aula 1"
+
+    with _Statements(test_db) as statements:
+        revalidated = await client.get("/api/v1/spaces", headers={**auth_headers, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+    assert statements == []
+
+    # Other query parameters are a different representation
+    paged = await client.get("/api/v1/spaces", headers={**auth_headers, "If-None-Match": etag}, params={"limit": 5})
+    assert paged.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_write_changes_the_etag(test_db, client, auth_headers):
+    space = await SpaceCRUD.create(test_db, nombre="Aula 1", tipo="aula", capacidad=30, estado="disponible")
+    await test_db.commit()
+    url = f"/api/v1/spaces/{space.id}"
+    etag = (await client.get(url, headers=auth_headers)).headers["etag"]
+
+    await SpaceCRUD.update(test_db, space.id, capacidad=40)
+    await test_db.commit()
+    response = await client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["capacidad"] == 40
+
+
+@pytest.mark.asyncio
+async def test_cached_body_is_served_without_queries(test_db, client, auth_headers):
+    await CategoryCRUD.create(test_db, nombre="Audiovisual")
+    await test_db.commit()
+    first = await client.get("/api/v1/resources/categories", headers=auth_headers)
+
+    with _Statements(test_db) as statements:
+        second = await client.get("/api/v1/resources/categories", headers=auth_headers)
+
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    # Only the user lookup of get_current_active_user remains
+    assert not [s for s in statements if "FROM categories" in s]
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests_still_require_a_token(client, auth_headers):
+    first = await client.get("/api/v1/chatbot/space-reference-data", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert etag.startswith("W/")  # compressed, so the ETag is weak
+
+    assert (await client.get("/api/v1/chatbot/space-reference-data", headers={"If-None-Match": etag})).status_code == 401
+    revalidated = await client.get(
+        "/api/v1/chatbot/space-reference-data", headers={**auth_headers, "If-None-Match": f'{etag}, "otro"'}
+    )
+    assert revalidated.status_code == 304
+
+
+def _request(path):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    for path in ("/a", "/b"):
+        etag, _ = cache.lookup(_request(path), "spaces")
+        cache.store(_request(path), etag, {"path": path})
+
+    assert cache.lookup(_request("/a"), "spaces")[1] is not None
+    etag, _ = cache.lookup(_request("/c"), "spaces")
+    cache.store(_request("/c"), etag, {"path": "/c"})
+
+    assert cache.lookup(_request("/b"), "spaces")[1] is None
+    assert cache.lookup(_request("/a"), "spaces")[1].body == b'{"path":"/a"}'
+
+
+@pytest.mark.asyncio
+async def test_table_version_moves_only_on_commit(test_db):
+    before = table_versions.get("spaces")
+    space = await SpaceCRUD.create(test_db, nombre="Aula 9", tipo="aula", capacidad=20, estado="disponible")
+    # Escrito pero sin confirmar: otras sesiones aún leen las filas antiguas
+    assert table_versions.get("spaces") == before
+    await test_db.commit()
+    assert table_versions.get("spaces") == before + 1
+
+    await SpaceCRUD.update(test_db, space.id, capacidad=25)
+    await test_db.rollback()
+    await test_db.commit()
+    assert table_versions.get("spaces") == before + 1
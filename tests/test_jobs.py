@@ -0,0 +1,194 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.v1 import analytics
+from app.db.crud import JobCRUD, NotificationCRUD, SpaceCRUD, UsageDataCRUD
+from app.services.jobs import JobQueue, job_queue, report_progress, COMPLETADO, EN_PROCESO, ERROR, PENDIENTE
+
+
+@pytest.mark.asyncio
+async def test_submit_job_returns_immediately(client, auth_headers):
+    response = await client.post(
+        "/api/v1/jobs",
+        json={"tipo": "predictions", "parametros": {"days_ahead": 14}},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 202
+    data = response.json()
+    assert data["estado"] == PENDIENTE
+    assert data["parametros"] == {"days_ahead": 14, "use_ai": False}
+
+    response = await client.get(f"/api/v1/jobs/{data['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["tipo"] == "predictions"
+
+
+@pytest.mark.asyncio
+async def test_submit_job_validates_type_and_parameters(client, auth_headers):
+    response = await client.post(
+        "/api/v1/jobs",
+        json={"tipo": "unknown", "parametros": {}},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+    response = await client.post(
+        "/api/v1/jobs",
+        json={"tipo": "predictions", "parametros": {"days_ahead": 500}},
+        headers=auth_headers
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_job_queue_runs_and_persists_result(test_db, client, auth_headers):
+    queue = JobQueue(
+        workers=1,
+        session_factory=async_sessionmaker(test_db.bind, class_=AsyncSession, expire_on_commit=False)
+    )
+
+    async def double(db, user, parametros):
+        return {"value": parametros["value"] * 2, "user": user.username}
+
+    async def fail(db, user, parametros):
+        raise ValueError("boom")
+
+    queue.register("double", double)
+    queue.register("fail", fail)
+
+    me = (await client.get("/api/v1/auth/me", headers=auth_headers)).json()
+    ok = await queue.submit(test_db, me["id"], "double", {"value": 21})
+    broken = await queue.submit(test_db, me["id"], "fail", {})
+
+    ok_id, broken_id = ok.id, broken.id
+    await queue.run(ok_id)
+    await queue.run(broken_id)
+    test_db.expire_all()
+
+    ok = await JobCRUD.get_by_id(test_db, ok_id)
+    assert ok.estado == COMPLETADO
+    assert ok.resultado == {"value": 42, "user": "testadmin"}
+    assert ok.progreso == 1.0
+
+    broken = await JobCRUD.get_by_id(test_db, broken_id)
+    assert broken.estado == ERROR
+    assert broken.error == "boom"
+
+    notifications = await NotificationCRUD.get_by_user(test_db, me["id"])
+    assert {n.tipo for n in notifications} == {"job"}
+    assert len(notifications) == 2
+
+
+def _queue(test_db, **kwargs):
+    return JobQueue(
+        workers=1,
+        session_factory=async_sessionmaker(test_db.bind, class_=AsyncSession, expire_on_commit=False),
+        **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_job_is_claimed_by_one_worker_only(test_db, client, auth_headers):
+    runs = []
+
+    async def slow(db, user, parametros):
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    first, second = _queue(test_db), _queue(test_db)
+    for queue in (first, second):
+        queue.register("slow", slow)
+    me = (await client.get("/api/v1/auth/me", headers=auth_headers)).json()
+    job_id = (await first.submit(test_db, me["id"], "slow", {})).id
+
+    await asyncio.gather(first.run(job_id), second.run(job_id))
+
+    assert len(runs) == 1
+    test_db.expire_all()
+    assert (await JobCRUD.get_by_id(test_db, job_id)).estado == COMPLETADO
+
+
+@pytest.mark.asyncio
+async def test_recovery_only_fails_jobs_without_heartbeat(test_db, client, auth_headers):
+    me = (await client.get("/api/v1/auth/me", headers=auth_headers)).json()
+    now = datetime.utcnow()
+    alive = await JobCRUD.create(
+        test_db, user_id=me["id"], tipo="x", estado=EN_PROCESO, worker_id="otro", heartbeat_at=now
+    )
+    dead = await JobCRUD.create(
+        test_db, user_id=me["id"], tipo="x", estado=EN_PROCESO, worker_id="caido",
+        heartbeat_at=now - timedelta(minutes=10)
+    )
+    alive_id, dead_id = alive.id, dead.id
+    await test_db.commit()
+
+    await _queue(test_db, stale_seconds=90)._recover()
+
+    test_db.expire_all()
+    assert (await JobCRUD.get_by_id(test_db, alive_id)).estado == EN_PROCESO
+    assert (await JobCRUD.get_by_id(test_db, dead_id)).estado == ERROR
+
+
+@pytest.mark.asyncio
+async def test_handlers_report_intermediate_progress(test_db, client, auth_headers):
+    queue = _queue(test_db, heartbeat_seconds=60)
+    seen = []
+
+    async def halves(db, user, parametros):
+        report_progress(0.5)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            async with queue.session_factory() as other:
+                job = await JobCRUD.get_by_id(other, parametros["id"])
+            if job.progreso == 0.5:
+                seen.append(job.progreso)
+                break
+        return {}
+
+    queue.register("halves", halves)
+    me = (await client.get("/api/v1/auth/me", headers=auth_headers)).json()
+    job_id = (await queue.submit(test_db, me["id"], "halves", {})).id
+    await JobCRUD.update(test_db, job_id, parametros={"id": job_id})
+    await test_db.commit()
+
+    await queue.run(job_id)
+
+    assert seen == [0.5]
+    test_db.expire_all()
+    assert (await JobCRUD.get_by_id(test_db, job_id)).progreso == 1.0
+
+
+@pytest.mark.asyncio
+async def test_predictions_job_does_not_call_gemini_by_default(test_db, client, auth_headers, monkeypatch):
+    space = await SpaceCRUD.create(test_db, nombre="Aula Job", tipo="aula", capacidad=30, estado="disponible")
+    today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+    for offset in range(1, 29):
+        await UsageDataCRUD.create(test_db, space_id=space.id, fecha=today - timedelta(days=offset), uso=50.0)
+    await test_db.commit()
+
+    narrated = []
+
+    async def narrate(forecast):
+        narrated.append(forecast)
+        return ["narrado"]
+
+    monkeypatch.setattr(analytics, "narrate_forecast", narrate)
+    queue = _queue(test_db)
+    queue.register("predictions", job_queue.get_type("predictions").handler)
+    me = (await client.get("/api/v1/auth/me", headers=auth_headers)).json()
+    parametros = job_queue.validate("predictions", {"days_ahead": 5})
+    job_id = (await queue.submit(test_db, me["id"], "predictions", parametros)).id
+
+    await queue.run(job_id)
+
+    test_db.expire_all()
+    job = await JobCRUD.get_by_id(test_db, job_id)
+    assert job.estado == COMPLETADO
+    assert job.resultado["model_used"] == "local-forecast"
+    assert job.resultado["predictions"]
+    assert narrated == []
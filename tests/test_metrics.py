@@ -0,0 +1,89 @@
+"""
+Tests de la instrumentación de peticiones y del endpoint /metrics
+"""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.core.metrics import Histogram, Metrics, executor_collector, metrics
+from app.db.crud import SpaceCRUD
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", (0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.1, route="/a")
+    histogram.observe(3.0, route="/a")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 3.15',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_ai_timer_records_outcome():
+    registry = Metrics()
+    with registry.ai_call("chat"):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.ai_call("chat"):
+            raise RuntimeError("quota")
+
+    assert registry.ai_duration.count(call="chat", outcome="ok") == 1
+    assert registry.ai_duration.count(call="chat", outcome="error") == 1
+
+
+def test_executor_gauges_share_one_family():
+    registry = Metrics()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pool.submit(lambda: None).result()
+        registry.register(executor_collector("ai", lambda: pool))
+        registry.register(executor_collector("idle", lambda: None))
+        text = registry.render()
+
+    assert text.count("# TYPE executor_max_workers gauge") == 1
+    assert 'executor_max_workers{executor="ai"} 2' in text
+    assert 'executor_workers{executor="idle"} 0' in text
+
+
+@pytest.mark.asyncio
+async def test_queries_are_counted_per_route(test_db, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secreto")
+    space = await SpaceCRUD.create(test_db, nombre="Aula 1", tipo="aula", capacidad=30, estado="disponible")
+    await test_db.commit()
+    metrics.reset()
+
+    await client.get("/api/v1/spaces", headers=auth_headers)
+    await client.get(f"/api/v1/spaces/{space.id}", headers=auth_headers)
+    await client.get(f"/api/v1/spaces/{space.id}", headers=auth_headers)
+
+    # get_current_active_user + the list query; the second detail request is served from the body cache
+    assert metrics.request_queries.total(route="/api/v1/spaces") == 2
+    assert metrics.request_queries.count(route="/api/v1/spaces/{space_id}") == 2
+    assert metrics.request_queries.total(route="/api/v1/spaces/{space_id}") == 3
+    assert metrics.request_duration.count(method="GET", route="/api/v1/spaces/{space_id}", status="200") == 2
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_db_queries_count{route="/api/v1/spaces/{space_id}"} 2' in body
+    assert "# TYPE ai_breaker_state gauge" in body
+    assert 'executor_max_workers{executor="ai"} 3' in body
+
+
+@pytest.mark.asyncio
+async def test_metrics_token(client, monkeypatch):
+    # Sin token configurado el endpoint no existe
+    assert (await client.get("/metrics")).status_code == 404
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secreto")
+
+    assert (await client.get("/metrics")).status_code == 401
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer sécreto".encode()})).status_code == 401
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer secreto"})).status_code == 200
@@ -0,0 +1,218 @@
+import asyncio
+import pytest
+from datetime import datetime
+from httpx import AsyncClient
+
+from app.core.query_budget import count_queries
+from app.db.crud import UserCRUD, NotificationCRUD, NotificationSettingsCRUD
+from app.services.notifications import notification_service, unread_counter
+from app.services import pubsub
+
+
+async def _create_notifications(test_db, username, total, read_every=2):
+    user = await UserCRUD.get_by_username(test_db, username)
+    for i in range(total):
+        await NotificationCRUD.create(
+            test_db,
+            user_id=user.id,
+            titulo=f"Aviso {i}",
+            mensaje="Mensaje de prueba",
+            leida=(i % read_every == 0)
+        )
+    await test_db.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_unread_only_returns_full_page(test_db, client, auth_headers):
+    unread_counter.invalidate()
+    await _create_notifications(test_db, "testadmin", 10)
+
+    response = await client.get(
+        "/api/v1/notifications",
+        params={"unread_only": True, "limit": 5},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 5
+    assert all(not n["leida"] for n in data)
+
+
+@pytest.mark.asyncio
+async def test_unread_count(test_db, client, auth_headers):
+    unread_counter.invalidate()
+    user = await _create_notifications(test_db, "testadmin", 6)
+
+    response = await client.get("/api/v1/notifications/unread-count", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"unread": 3}
+
+    await client.post(
+        "/api/v1/notifications",
+        json={"user_id": user.id, "titulo": "Nuevo", "mensaje": "Sin leer"},
+        headers=auth_headers
+    )
+    response = await client.get("/api/v1/notifications/unread-count", headers=auth_headers)
+    assert response.json() == {"unread": 4}
+
+    unread = await NotificationCRUD.get_by_user(test_db, user.id, unread_only=True)
+    await client.put(f"/api/v1/notifications/{unread[0].id}/read", headers=auth_headers)
+    response = await client.get("/api/v1/notifications/unread-count", headers=auth_headers)
+    assert response.json() == {"unread": 3}
+
+
+@pytest.mark.asyncio
+async def test_mark_as_read_is_scoped_to_owner(test_db, client, auth_headers):
+    unread_counter.invalidate()
+    admin = await UserCRUD.get_by_username(test_db, "testadmin")
+    other = await UserCRUD.create(
+        test_db,
+        {"username": "otro", "email": "otro@example.com", "password_hash": "x", "rol": "standard"}
+    )
+    ajena = await NotificationCRUD.create(test_db, user_id=other.id, titulo="Ajena", mensaje="No es tuya")
+    propia = await NotificationCRUD.create(test_db, user_id=admin.id, titulo="Propia", mensaje="Sí es tuya")
+    ajena_id, propia_id, other_id = ajena.id, propia.id, other.id
+    await test_db.commit()
+    await unread_counter.get(test_db, other_id)
+
+    response = await client.put(f"/api/v1/notifications/{ajena_id}/read", headers=auth_headers)
+    assert response.status_code == 404
+    assert await NotificationCRUD.count_unread(test_db, other_id) == 1
+
+    response = await client.put(f"/api/v1/notifications/{propia_id}/read", headers=auth_headers)
+    assert response.status_code == 200
+    # Marcar una notificación propia no vacía los contadores de los demás usuarios
+    assert other_id in unread_counter._counts
+
+
+@pytest.mark.asyncio
+async def test_bulk_mark_as_read(test_db, client, auth_headers):
+    unread_counter.invalidate()
+    user = await _create_notifications(test_db, "testadmin", 6)
+    unread = await NotificationCRUD.get_by_user(test_db, user.id, unread_only=True)
+
+    response = await client.put(
+        "/api/v1/notifications/read",
+        json={"ids": [unread[0].id, unread[1].id]},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["updated"] == 2
+
+    response = await client.put(
+        "/api/v1/notifications/read",
+        json={"before": "2999-01-01T00:00:00"},
+        headers=auth_headers
+    )
+    assert response.json()["updated"] == 1
+
+    response = await client.get("/api/v1/notifications/unread-count", headers=auth_headers)
+    assert response.json() == {"unread": 0}
+
+
+@pytest.mark.asyncio
+async def test_bulk_mark_as_read_requires_criteria(client, auth_headers):
+    response = await client.put("/api/v1/notifications/read", json={}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_send_bulk_notification_respects_preferences(test_db):
+    users = []
+    for i in range(3):
+        users.append(await UserCRUD.create(test_db, {
+            "username": f"fanout{i}",
+            "password_hash": "x",
+            "email": f"fanout{i}@example.com"
+        }))
+    await NotificationSettingsCRUD.create_or_update(test_db, users[1].id, optimization_alerts=False)
+
+    notified = await notification_service.send_bulk_notification(
+        test_db,
+        [u.id for u in users],
+        titulo="Horario publicado",
+        mensaje="El nuevo horario está disponible",
+        tipo="optimization"
+    )
+
+    assert notified == [users[0].id, users[2].id]
+    assert len(await NotificationCRUD.get_by_user(test_db, users[0].id)) == 1
+    assert await NotificationCRUD.get_by_user(test_db, users[1].id) == []
+
+
+@pytest.mark.asyncio
+async def test_send_notification_publishes_to_user_channel(test_db):
+    user = await UserCRUD.create(test_db, {
+        "username": "streamuser",
+        "password_hash": "x",
+        "email": "stream@example.com"
+    })
+
+    async with pubsub.hub.subscribe(pubsub.user_channel(user.id)) as queue:
+        await notification_service.send_notification(
+            test_db, user.id, titulo="Reserva confirmada", mensaje="Aula 101"
+        )
+        await asyncio.sleep(0)
+        assert queue.empty()  # nada se publica antes del commit
+        await test_db.commit()
+        message = await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert message["user_id"] == user.id
+    assert message["titulo"] == "Reserva confirmada"
+    assert message["leida"] is False
+    assert pubsub.hub.subscriber_count(pubsub.user_channel(user.id)) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_notification_pushes_real_ids_after_commit(test_db):
+    users = []
+    for i in range(2):
+        users.append(await UserCRUD.create(test_db, {
+            "username": f"bulkpush{i}",
+            "password_hash": "x",
+            "email": f"bulkpush{i}@example.com"
+        }))
+    user_ids = [u.id for u in users]
+    await test_db.commit()
+
+    async with pubsub.hub.subscribe(pubsub.user_channel(user_ids[0])) as queue:
+        await notification_service.send_bulk_notification(test_db, user_ids, titulo="Descartada", mensaje="x")
+        await test_db.rollback()
+        await notification_service.send_bulk_notification(test_db, user_ids, titulo="Aviso", mensaje="Mensaje")
+        await test_db.commit()
+        message = await asyncio.wait_for(queue.get(), timeout=1)
+        await asyncio.sleep(0)
+        assert queue.empty()
+
+    stored = await NotificationCRUD.get_by_user(test_db, user_ids[0])
+    assert [n.titulo for n in stored] == ["Aviso"]
+    assert message["id"] == stored[0].id
+    assert message["titulo"] == "Aviso"
+
+
+@pytest.mark.asyncio
+async def test_create_many_without_returning_uses_one_insert(test_db, monkeypatch):
+    users = []
+    for i in range(3):
+        users.append(await UserCRUD.create(test_db, {
+            "username": f"multirow{i}",
+            "password_hash": "x",
+            "email": f"multirow{i}@example.com"
+        }))
+    # Como MySQL: sin INSERT ... RETURNING
+    monkeypatch.setattr(test_db.bind.dialect, "insert_executemany_returning_sort_by_parameter_order", False)
+    created_at = datetime.utcnow().replace(microsecond=0)
+    rows = [
+        {"user_id": u.id, "titulo": "Aviso", "mensaje": "x", "tipo": "info", "leida": False, "created_at": created_at}
+        for u in reversed(users)
+    ]
+
+    with count_queries() as counter:
+        ids = await NotificationCRUD.create_many(test_db, rows)
+
+    assert counter.count == 2  # un INSERT de varias filas y un SELECT de los ids
+    for notification_id, user in zip(ids, reversed(users)):
+        [stored] = await NotificationCRUD.get_by_user(test_db, user.id)
+        assert stored.id == notification_id
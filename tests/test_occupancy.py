@@ -0,0 +1,132 @@
+"""
+Tests del motor de ocupación por intervalos de tiempo (/analytics/space-utilization)
+"""
+import pytest
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from app.db.crud import AssignmentCRUD, ResourceCRUD, SpaceCRUD, UsageDataCRUD
+from app.services.occupancy import OccupancyEngine, align, occupancy_engine
+
+MONDAY = datetime(2026, 3, 2)
+ROOM = SimpleNamespace(id=1, nombre="Aula 1", tipo="aula", capacidad=30)
+
+
+def test_align_to_bucket_boundaries():
+    moment = datetime(2026, 3, 4, 15, 40)
+
+    assert align(moment, "hour") == datetime(2026, 3, 4, 15)
+    assert align(moment, "day", up=True) == datetime(2026, 3, 5)
+    assert align(moment, "week") == MONDAY
+
+
+def test_overlaps_are_merged_and_midnight_is_split():
+    engine = OccupancyEngine()
+    engine.add([
+        (1, datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 11)),
+        (1, datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 12)),
+        (1, datetime(2026, 3, 2, 23, 30), datetime(2026, 3, 3, 1)),
+        (1, datetime(2026, 3, 3, 8), None),
+    ], [], date(2026, 3, 2), date(2026, 3, 3))
+
+    report = engine.report([ROOM], MONDAY, datetime(2026, 3, 4), "day")
+    days = report["spaces"][0]["buckets"]
+
+    assert report["spaces"][0]["horas_ocupadas"] == 6.5  # 3 h merged + 0.5 h + 1 h + 2 h open-ended
+    assert [d["ocupacion"] for d in days] == [round(3.5 / 24, 4), round(3 / 24, 4)]
+
+    hours = engine.report([ROOM], datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 13), "hour")
+    assert hours["heatmap"]["values"] == [[1.0, 1.0, 1.0, 0.0]]
+
+
+def test_usage_is_merged_and_profile_covers_the_week():
+    engine = OccupancyEngine()
+    engine.add(
+        [(1, datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 10))],
+        [(1, None, datetime(2026, 3, 2, 9, 15), 40.0), (1, None, datetime(2026, 3, 2, 9, 45), 60.0)],
+        date(2026, 3, 2), date(2026, 3, 8)
+    )
+
+    report = engine.report([ROOM], MONDAY, datetime(2026, 3, 9), "week")
+
+    assert report["spaces"][0]["buckets"] == [{"inicio": "2026-03-02T00:00:00", "ocupacion": round(1 / 168, 4), "uso": 50.0}]
+    assert report["spaces"][0]["hora_pico"] == 9
+    assert len(report["weekly_profile"]) == 7 and report["weekly_profile"][0][9] == 1.0
+
+
+def test_only_missing_days_are_recomputed():
+    engine = OccupancyEngine()
+    engine.validate(("v", 1))
+    engine.add([], [], date(2026, 3, 2), date(2026, 3, 4))
+
+    assert engine.missing_days(date(2026, 3, 1), date(2026, 3, 5)) == [date(2026, 3, 1), date(2026, 3, 5)]
+    assert engine.missing_days(date(2026, 3, 2), date(2026, 3, 4), space_id=7) == []
+
+    engine.validate(("v", 2))
+    assert len(engine.missing_days(date(2026, 3, 2), date(2026, 3, 4))) == 3
+
+
+def test_days_of_the_period_are_not_evicted_by_the_fill():
+    engine = OccupancyEngine(max_days=5)
+    engine.add([(1, datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 19))], [], date(2026, 3, 2), date(2026, 3, 3))
+    engine.add([], [], date(2026, 3, 10), date(2026, 3, 12))
+
+    # 2 y 3 de marzo son los más antiguos de la caché, pero forman parte del periodo pedido
+    missing = engine.missing_days(date(2026, 3, 2), date(2026, 3, 4))
+    engine.add([], [], missing[0], missing[-1])
+    report = engine.report([ROOM], MONDAY, datetime(2026, 3, 5), "day")
+
+    assert missing == [date(2026, 3, 4)]
+    assert report["spaces"][0]["horas_ocupadas"] == 10.0
+    with pytest.raises(ValueError):
+        engine.missing_days(date(2026, 3, 1), date(2026, 3, 6))
+
+
+@pytest.mark.asyncio
+async def test_space_utilization_endpoint(test_db, client, auth_headers):
+    occupancy_engine.clear()
+    resource = await ResourceCRUD.create(test_db, nombre="Recurso", tipo="general", estado="disponible")
+    aula = await SpaceCRUD.create(test_db, nombre="Aula 1", tipo="aula", capacidad=30, estado="disponible")
+    await SpaceCRUD.create(test_db, nombre="Lab 1", tipo="laboratorio", capacidad=20, estado="disponible")
+    await AssignmentCRUD.create(
+        test_db, room_id=aula.id, resource_id=resource.id,
+        fecha=datetime(2026, 3, 2, 8), fecha_fin=datetime(2026, 3, 2, 14), estado="activo"
+    )
+    await UsageDataCRUD.create(test_db, space_id=aula.id, fecha=datetime(2026, 3, 2, 9), uso=75.0)
+    await test_db.commit()
+    params = {"bucket": "day", "start_date": "2026-03-02T00:00:00", "end_date": "2026-03-05T00:00:00"}
+
+    response = await client.get("/api/v1/analytics/space-utilization", headers=auth_headers, params=params)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["heatmap"]["buckets"] == ["2026-03-02T00:00:00", "2026-03-03T00:00:00", "2026-03-04T00:00:00"]
+    assert body["heatmap"]["values"][0] == [0.25, 0.0, 0.0]
+    assert body["heatmap"]["values"][1] == [0.0, 0.0, 0.0]
+    assert body["spaces"][0]["buckets"][0]["uso"] == 75.0
+
+    # A new assignment bumps the table version and invalidates the cached days
+    await AssignmentCRUD.create(
+        test_db, room_id=aula.id, resource_id=resource.id,
+        fecha=datetime(2026, 3, 3, 8), fecha_fin=datetime(2026, 3, 3, 20), estado="activo"
+    )
+    await test_db.commit()
+    filtered = await client.get(
+        "/api/v1/analytics/space-utilization", headers=auth_headers, params={**params, "space_id": aula.id}
+    )
+    assert filtered.json()["heatmap"] == {
+        "buckets": body["heatmap"]["buckets"], "space_ids": [aula.id], "values": [[0.25, 0.5, 0.0]]
+    }
+
+    missing = await client.get("/api/v1/analytics/space-utilization", headers=auth_headers, params={"space_id": 999})
+    assert missing.status_code == 404
+    too_many = await client.get(
+        "/api/v1/analytics/space-utilization", headers=auth_headers,
+        params={"bucket": "hour", "start_date": "2025-01-01T00:00:00", "end_date": "2026-01-01T00:00:00"}
+    )
+    assert too_many.status_code == 400
+    too_long = await client.get(
+        "/api/v1/analytics/space-utilization", headers=auth_headers,
+        params={"bucket": "week", "start_date": "2020-01-06T00:00:00", "end_date": "2026-01-05T00:00:00"}
+    )
+    assert too_long.status_code == 400
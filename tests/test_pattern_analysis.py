@@ -0,0 +1,158 @@
+"""
+Tests de la detección local de patrones y anomalías de uso
+"""
+import time as timer
+import pytest
+import numpy as np
+from datetime import date, datetime, timedelta
+
+from app.db.crud import SpaceCRUD, UsageDataCRUD
+from app.services.ai_gemini import analyze_usage_patterns
+from app.services.pattern_analysis import UsagePatternAnalyzer, rows_from_records, usage_patterns
+
+START = date(2026, 1, 5)  # lunes
+WEEKLY = np.array([60.0, 70.0, 80.0, 70.0, 50.0, 10.0, 5.0])
+
+
+def _rows(space_id, days=56, hours=(9, 10, 11), level=1.0, noise=2.0, seed=0, overrides=None, slope=0.0):
+    rng = np.random.default_rng(seed + space_id)
+    overrides = overrides or {}
+    rows = []
+    for d in range(days):
+        day = START + timedelta(days=d)
+        value = overrides.get(d, WEEKLY[day.weekday()] * level + slope * d + rng.normal(0, noise))
+        for h in hours:
+            rows.append((None, space_id, None, datetime.combine(day, datetime.min.time()).replace(hour=h), max(value, 0.0)))
+    return rows
+
+
+def test_detects_spike_without_false_positives():
+    analyzer = UsagePatternAnalyzer()
+    analyzer.ingest(_rows(1) + _rows(2, overrides={40: 300.0}) + _rows(3))
+
+    anomalies = analyzer.analyze()["anomalies"]
+
+    assert [(a["entity_id"], a["fecha_detectada"]) for a in anomalies] == [(2, (START + timedelta(days=40)).isoformat())]
+    assert anomalies[0]["tipo"] == "pico de uso"
+    assert anomalies[0]["severidad"] == "alta"
+
+
+def test_detects_growing_trend():
+    analyzer = UsagePatternAnalyzer()
+    analyzer.ingest(_rows(1) + _rows(2, slope=3.0))
+
+    trends = analyzer.analyze(names={("space", 2): "Aula 202"})["trends"]
+
+    assert trends[0].startswith("Uso total creciente")
+    assert any(t.startswith("Aula 202: uso creciente") for t in trends)
+    assert not any("Espacio 1" in t for t in trends)
+
+
+def test_clusters_peak_hour_and_weekday_profiles():
+    analyzer = UsagePatternAnalyzer(max_clusters=2)
+    morning = _rows(1) + _rows(2)
+    evening = [
+        (None, space_id, None, fecha.replace(hour=19), 40.0)
+        for space_id in (3, 4)
+        for fecha in (datetime(2026, 1, 10) + timedelta(weeks=w, days=d) for w in range(8) for d in (0, 1))
+    ]
+    analyzer.ingest(morning + evening)
+
+    patterns = {p["nombre"]: p for p in analyzer.analyze()["patterns"]}
+
+    assert patterns["Uso matutino de lunes a viernes"]["entidades_afectadas"] == ["space_1", "space_2"]
+    assert patterns["Uso nocturno en fin de semana"]["entidades_afectadas"] == ["space_3", "space_4"]
+
+
+def test_reports_chronically_underused_spaces():
+    analyzer = UsagePatternAnalyzer()
+    analyzer.ingest(_rows(1) + _rows(2) + _rows(3, level=0.05, noise=0.1))
+
+    patterns = analyzer.analyze(space_ids=[1, 2, 3, 9])["patterns"]
+    underuse = next(p for p in patterns if p["nombre"] == "Subutilización crónica")
+
+    assert underuse["entidades_afectadas"] == ["space_3", "space_9"]
+
+
+def test_incremental_ingestion_matches_single_batch():
+    rows = [(i + 1,) + r[1:] for i, r in enumerate(_rows(1, overrides={30: 250.0}) + _rows(2))]
+    whole = UsagePatternAnalyzer()
+    whole.ingest(rows)
+
+    incremental = UsagePatternAnalyzer()
+    for batch in range(0, len(rows), 50):
+        incremental.ingest(rows[batch:batch + 50])
+    assert incremental.ingest(rows[:10]) == 0
+
+    assert incremental.analyze() == whole.analyze()
+    assert incremental.last_id == len(rows)
+
+
+def test_window_slides_out_old_days():
+    analyzer = UsagePatternAnalyzer(window_days=14)
+    analyzer.ingest([(None, 1, None, datetime(2026, 1, 5, 9), 99.0)])
+    analyzer.advance_to(date(2026, 1, 25))
+
+    assert analyzer.analyze()["resumen"] == "Sin datos de uso para analizar"
+
+
+@pytest.mark.asyncio
+async def test_analyze_usage_patterns_accepts_loose_records():
+    result = await analyze_usage_patterns({
+        "usage_history": [{"day": d, "usage": 0.7 if d != 10 else 0.05} for d in range(28)]
+    })
+
+    assert result["model_used"] == "local-analysis"
+    assert [a["tipo"] for a in result["anomalies"]] == ["caída de uso"]
+    assert len(rows_from_records([{"date": "2025-11-01", "usage": 1}, {"otra": 1}])) == 1
+
+
+def test_analysis_benchmark(record_property):
+    analyzer = UsagePatternAnalyzer()
+    analyzer.ingest([row for space_id in range(1, 301) for row in _rows(space_id, hours=(10,))])
+
+    start = timer.perf_counter()
+    analyzer.analyze()
+    elapsed_ms = (timer.perf_counter() - start) * 1000
+
+    # Tiempo informativo (junit/--junitxml); no decide el resultado en CI
+    record_property("elapsed_ms", round(elapsed_ms, 1))
+
+
+@pytest.mark.asyncio
+async def test_patterns_endpoint_reads_only_new_rows(test_db, client, auth_headers):
+    usage_patterns.reset()
+    space = await SpaceCRUD.create(test_db, nombre="Aula 101", tipo="aula", capacidad=30, estado="disponible")
+    today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+    for offset in range(1, 22):
+        await UsageDataCRUD.create(test_db, space_id=space.id, fecha=today - timedelta(days=offset), uso=50.0)
+    await test_db.commit()
+
+    first = await client.get("/api/v1/analytics/patterns", headers=auth_headers)
+    assert first.status_code == 200
+    assert first.json()["rows_ingested"] == 21
+
+    await UsageDataCRUD.create(test_db, space_id=space.id, fecha=today, uso=400.0)
+    await test_db.commit()
+    second = (await client.get("/api/v1/analytics/patterns", headers=auth_headers)).json()
+
+    assert second["rows_ingested"] == 1
+    assert second["anomalies"][0]["descripcion"].startswith("Aula 101")
+    usage_patterns.reset()
+
+
+@pytest.mark.asyncio
+async def test_patterns_endpoint_checks_spaces_beyond_the_first_hundred(test_db, client, auth_headers):
+    usage_patterns.reset()
+    spaces = [
+        await SpaceCRUD.create(test_db, nombre=f"Aula {i}", tipo="aula", capacidad=30, estado="disponible")
+        for i in range(101)
+    ]
+    last_id = spaces[-1].id
+    await test_db.commit()
+
+    body = (await client.get("/api/v1/analytics/patterns", headers=auth_headers)).json()
+
+    underused = next(p for p in body["patterns"] if p["nombre"] == "Subutilización crónica")
+    assert f"space_{last_id}" in underused["entidades_afectadas"]
+    usage_patterns.reset()
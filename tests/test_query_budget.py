@@ -0,0 +1,77 @@
+"""
+Tests del presupuesto de sentencias SQL por llamada (detección de N+1)
+"""
+import logging
+import pytest
+from sqlalchemy import select
+
+from app.core.query_budget import QueryBudgetExceeded, count_queries, query_budget
+from app.db.crud import ResourceCRUD, SpaceCRUD
+from app.db.models import Space
+
+
+@pytest.mark.asyncio
+async def test_decorator_fails_over_budget(test_db):
+    @query_budget(1, strict=True)
+    async def per_id_lookup(ids):
+        return [await SpaceCRUD.get_by_id(test_db, i) for i in ids]
+
+    assert per_id_lookup.query_budget == 1
+    await per_id_lookup([1])
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        await per_id_lookup([1, 2, 3])
+
+    assert excinfo.value.budget == 1
+    assert len(excinfo.value.statements) == 3
+    assert "3 SQL statements, budget is 1" in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_decorator_only_logs_when_not_strict(test_db, caplog):
+    @query_budget(0, strict=False)
+    async def lookup():
+        return await SpaceCRUD.get_by_id(test_db, 1)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_budget"):
+        assert await lookup() is None
+
+    assert "budget is 0" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_counters_nest(test_db):
+    with count_queries() as outer:
+        await test_db.execute(select(Space))
+        with count_queries() as inner:
+            await test_db.execute(select(Space))
+
+    assert (outer.count, inner.count) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_optimize_loads_requested_ids_in_one_query(test_db, client, auth_headers, max_queries):
+    spaces = [
+        await SpaceCRUD.create(test_db, nombre=f"Aula {i}", tipo="aula", capacidad=30, ubicacion="Piso 1", estado="disponible")
+        for i in range(5)
+    ]
+    resources = [
+        await ResourceCRUD.create(test_db, nombre=f"Proyector {i}", tipo="proyector", estado="disponible")
+        for i in range(5)
+    ]
+    await test_db.commit()
+
+    # Usuario, espacios, recursos y asignaciones, sin depender del número de IDs pedidos
+    with max_queries(4):
+        response = await client.post(
+            "/api/v1/assignments/optimize",
+            json={
+                "space_ids": [s.id for s in reversed(spaces)] + [9999],
+                "resource_ids": [r.id for r in resources]
+            },
+            headers=auth_headers
+        )
+
+    assert response.status_code == 200
+    assert [s.id for s in await SpaceCRUD.get_by_ids(test_db, [spaces[2].id, 9999, spaces[0].id])] == [
+        spaces[2].id, spaces[0].id
+    ]
@@ -0,0 +1,149 @@
+"""
+Regresión de planes de consulta: ejecuta EXPLAIN QUERY PLAN sobre cada consulta
+filtrada de app/db/crud.py y falla si alguna termina en un recorrido completo.
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from app.db.crud import (
+    UserCRUD, SpaceCRUD, ResourceCRUD, AssignmentCRUD, CategoryCRUD,
+    UsageDataCRUD, NotificationCRUD, NotificationSettingsCRUD
+)
+
+NOW = datetime(2026, 1, 15, 12, 0, 0)
+
+# Consultas CRUD que deben resolverse siempre con un índice.
+CRUD_QUERIES = {
+    "UserCRUD.get_by_id": lambda db: UserCRUD.get_by_id(db, 1),
+    "UserCRUD.get_by_username": lambda db: UserCRUD.get_by_username(db, "planuser"),
+    "UserCRUD.get_by_email": lambda db: UserCRUD.get_by_email(db, "plan@example.com"),
+    "SpaceCRUD.get_by_id": lambda db: SpaceCRUD.get_by_id(db, 1),
+    "SpaceCRUD.get_by_ids": lambda db: SpaceCRUD.get_by_ids(db, [1, 2, 3]),
+    "SpaceCRUD.get_available": lambda db: SpaceCRUD.get_available(db),
+    "ResourceCRUD.get_by_id": lambda db: ResourceCRUD.get_by_id(db, 1),
+    "ResourceCRUD.get_by_ids": lambda db: ResourceCRUD.get_by_ids(db, [1, 2, 3]),
+    "ResourceCRUD.get_by_category": lambda db: ResourceCRUD.get_by_category(db, 1),
+    "AssignmentCRUD.get_by_id": lambda db: AssignmentCRUD.get_by_id(db, 1),
+    "AssignmentCRUD.get_active": lambda db: AssignmentCRUD.get_active(db),
+    "AssignmentCRUD.get_rows[estado]": lambda db: AssignmentCRUD.get_rows(db, limit=None, estado="activo"),
+    "AssignmentCRUD.get_overlapping": lambda db: AssignmentCRUD.get_overlapping(
+        db, NOW - timedelta(hours=2), NOW
+    ),
+    "AssignmentCRUD.get_overlapping[room_ids]": lambda db: AssignmentCRUD.get_overlapping(
+        db, NOW - timedelta(hours=2), NOW, room_ids=[1, 2, 3]
+    ),
+    "AssignmentCRUD.get_demand": lambda db: AssignmentCRUD.get_demand(
+        db, NOW - timedelta(days=126), NOW
+    ),
+    "AssignmentCRUD.get_intervals": lambda db: AssignmentCRUD.get_intervals(
+        db, NOW - timedelta(days=30), NOW
+    ),
+    "AssignmentCRUD.get_intervals[room_id]": lambda db: AssignmentCRUD.get_intervals(
+        db, NOW - timedelta(days=30), NOW, room_id=1
+    ),
+    "CategoryCRUD.get_by_id": lambda db: CategoryCRUD.get_by_id(db, 1),
+    "UsageDataCRUD.get_by_space": lambda db: UsageDataCRUD.get_by_space(db, 1),
+    "UsageDataCRUD.get_by_resource": lambda db: UsageDataCRUD.get_by_resource(db, 1),
+    "UsageDataCRUD.get_by_date_range": lambda db: UsageDataCRUD.get_by_date_range(
+        db, NOW - timedelta(days=30), NOW
+    ),
+    "UsageDataCRUD.get_series": lambda db: UsageDataCRUD.get_series(
+        db, NOW - timedelta(days=56), NOW
+    ),
+    "UsageDataCRUD.get_series[space_id]": lambda db: UsageDataCRUD.get_series(
+        db, NOW - timedelta(days=30), NOW, space_id=1
+    ),
+    "UsageDataCRUD.get_new_rows": lambda db: UsageDataCRUD.get_new_rows(
+        db, 10, NOW - timedelta(days=56)
+    ),
+    "NotificationCRUD.get_by_user": lambda db: NotificationCRUD.get_by_user(db, 1),
+    "NotificationCRUD.get_by_user[unread_only]": lambda db: NotificationCRUD.get_by_user(
+        db, 1, unread_only=True
+    ),
+    "NotificationCRUD.count_unread": lambda db: NotificationCRUD.count_unread(db, 1),
+    "NotificationCRUD.mark_as_read": lambda db: NotificationCRUD.mark_as_read(db, 1, 1),
+    "NotificationSettingsCRUD.get_by_user": lambda db: NotificationSettingsCRUD.get_by_user(db, 1),
+}
+
+
+@pytest.fixture(scope="function")
+async def seeded_db(test_db):
+    user = await UserCRUD.create(test_db, {
+        "username": "planuser",
+        "password_hash": "x",
+        "email": "plan@example.com",
+        "rol": "admin"
+    })
+    category = await CategoryCRUD.create(test_db, nombre="Plan Category")
+    for i in range(20):
+        space = await SpaceCRUD.create(
+            test_db,
+            nombre=f"Aula {i}",
+            tipo="aula" if i % 2 else "laboratorio",
+            capacidad=20 + i,
+            estado="disponible" if i % 3 else "mantenimiento"
+        )
+        resource = await ResourceCRUD.create(
+            test_db,
+            nombre=f"Recurso {i}",
+            tipo="proyector",
+            estado="disponible",
+            categoria_id=category.id
+        )
+        await AssignmentCRUD.create(
+            test_db,
+            room_id=space.id,
+            resource_id=resource.id,
+            fecha=NOW - timedelta(days=i),
+            estado="activo" if i % 2 else "finalizado"
+        )
+        await UsageDataCRUD.create(
+            test_db,
+            space_id=space.id,
+            resource_id=resource.id,
+            fecha=NOW - timedelta(days=i),
+            uso=0.5
+        )
+        await NotificationCRUD.create(
+            test_db,
+            user_id=user.id,
+            titulo=f"Aviso {i}",
+            mensaje="Mensaje",
+            leida=bool(i % 2)
+        )
+    await test_db.commit()
+    return test_db
+
+
+async def _capture_statements(db, call):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        await call(db)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def _explain(db, statement, parameters):
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[-1] for row in result.fetchall()]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query_name", sorted(CRUD_QUERIES))
+async def test_crud_query_uses_index(seeded_db, query_name):
+    statements = await _capture_statements(seeded_db, CRUD_QUERIES[query_name])
+    assert statements, f"{query_name} did not emit any SQL"
+
+    for statement, parameters in statements:
+        plan = await _explain(seeded_db, statement, parameters)
+        full_scans = [step for step in plan if step.startswith("SCAN ")]
+        assert not full_scans, f"{query_name} does a full scan: {plan}\n{statement}"
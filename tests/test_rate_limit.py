@@ -0,0 +1,143 @@
+"""
+Tests de la limitación de solicitudes a los endpoints de IA
+"""
+import pytest
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services.ai_client import ai_client
+from app.services.rate_limit import (
+    InMemoryRateLimitStore,
+    RateLimit,
+    RateLimiter,
+    RateLimitExceeded,
+    ai_limiter
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(clock, per_minute=60, burst=2, global_per_minute=600, max_concurrency=2):
+    return RateLimiter(
+        user_limit=RateLimit(per_minute=per_minute, burst=burst),
+        global_limit=RateLimit(per_minute=global_per_minute, burst=global_per_minute),
+        max_concurrency=max_concurrency,
+        store=InMemoryRateLimitStore(clock=clock)
+    )
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+
+    await limiter.check("chat", 1)
+    await limiter.check("chat", 1)
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.check("chat", 1)
+    assert exc.value.reason == "user"
+    assert exc.value.retry_after == 1
+
+    clock.now += 1.0
+    await limiter.check("chat", 1)
+
+
+@pytest.mark.asyncio
+async def test_buckets_are_keyed_by_user_and_group():
+    limiter = _limiter(FakeClock(), burst=1)
+
+    await limiter.check("chat", 1)
+    await limiter.check("chat", 2)
+    await limiter.check("ai", 1)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.check("chat", 1)
+
+    assert limiter.snapshot()["groups"]["chat"] == {"allowed": 2, "rejected": {"user": 1}}
+
+
+@pytest.mark.asyncio
+async def test_global_bucket_is_shared_by_all_users():
+    limiter = _limiter(FakeClock(), burst=5, global_per_minute=2)
+
+    await limiter.check("ai", 1)
+    await limiter.check("ai", 2)
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.check("ai", 3)
+    assert exc.value.reason == "global"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_rejects_without_queueing():
+    limiter = _limiter(FakeClock(), max_concurrency=1)
+
+    async with limiter.concurrency("quick_search"):
+        with pytest.raises(RateLimitExceeded) as exc:
+            async with limiter.concurrency("quick_search"):
+                pass
+        assert exc.value.reason == "concurrency"
+        async with limiter.concurrency("chat"):
+            assert limiter.snapshot()["in_flight"] == {"quick_search": 1, "chat": 1}
+
+    assert limiter.snapshot()["in_flight"] == {}
+
+
+@pytest.mark.asyncio
+async def test_endpoint_returns_429_with_retry_after(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(ai_limiter, "user_limit", RateLimit(per_minute=1, burst=1))
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", None)
+
+    first = await client.post("/api/v1/chatbot/chat", json={"message": "hola"}, headers=auth_headers)
+    second = await client.post("/api/v1/chatbot/chat", json={"message": "hola"}, headers=auth_headers)
+
+    assert first.status_code == 503
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+
+    metrics = await client.get("/api/v1/chatbot/rate-limit-metrics", headers=auth_headers)
+    assert metrics.json()["groups"]["chat"]["rejected"] == {"user": 1}
+
+
+@pytest.mark.asyncio
+async def test_ai_jobs_are_charged_to_the_ai_bucket(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(ai_limiter, "user_limit", RateLimit(per_minute=1, burst=1))
+    parametros = {"periodo_academico": "2026-1", "fecha_inicio": "2026-02-02", "fecha_fin": "2026-06-05", "materias": []}
+
+    first = await client.post(
+        "/api/v1/jobs", json={"tipo": "generate_schedule", "parametros": parametros}, headers=auth_headers
+    )
+    second = await client.post(
+        "/api/v1/jobs", json={"tipo": "generate_schedule", "parametros": parametros}, headers=auth_headers
+    )
+
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert ai_limiter.snapshot()["groups"]["ai"] == {"allowed": 1, "rejected": {"user": 1}}
+
+    # Los trabajos sin IA no consumen el cupo
+    other = await client.post("/api/v1/jobs", json={"tipo": "predictions", "parametros": {}}, headers=auth_headers)
+    assert other.status_code == 202
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_concurrency_slot_until_finished(client, auth_headers, monkeypatch):
+    seen = []
+
+    class Model:
+        def generate_content(self, prompt, stream=False):
+            seen.append(ai_limiter.snapshot()["in_flight"].get("chat_stream"))
+            return iter([SimpleNamespace(text="Hola")])
+
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_client, "get_model", lambda *args, **kwargs: Model())
+
+    response = await client.post("/api/v1/chatbot/chat/stream", json={"message": "hola"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert seen == [1]
+    assert ai_limiter.snapshot()["in_flight"] == {}
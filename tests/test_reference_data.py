@@ -0,0 +1,89 @@
+"""
+Tests de los datos de referencia versionados (/chatbot/space-reference-data)
+"""
+import json
+import pytest
+
+from app.config import settings
+from app.services.optimizer import optimizer
+from app.services.reference_data import DEFAULT_REFERENCE_DATA, ReferenceData, reference_data
+
+
+@pytest.fixture
+def restore_reference_data():
+    yield
+    reference_data.load(DEFAULT_REFERENCE_DATA, source="default")
+
+
+def test_version_depends_only_on_content():
+    first = ReferenceData(DEFAULT_REFERENCE_DATA)
+    second = ReferenceData(json.loads(json.dumps(DEFAULT_REFERENCE_DATA)))
+
+    assert first.etag == second.etag == f'"{first.version}"'
+    assert json.loads(first.body)["version"] == first.version
+    assert first.factor("Laboratorio") == 0.65
+    assert first.factor("bodega") == 0.70
+
+
+def test_invalid_data_is_rejected():
+    data = ReferenceData(DEFAULT_REFERENCE_DATA)
+    broken = {**DEFAULT_REFERENCE_DATA, "tipos_espacio": [{"id": "aula", "factor_utilizacion": 1.5}]}
+
+    with pytest.raises(ValueError):
+        data.load(broken)
+    with pytest.raises(ValueError):
+        data.load({"elementos_referencia": {}})
+    assert data.factor("aula") == 0.70
+
+
+def test_space_type_ids_are_case_insensitive():
+    data = ReferenceData({**DEFAULT_REFERENCE_DATA, "tipos_espacio": [{"id": "Aula", "factor_utilizacion": 0.5}]})
+
+    assert data.factor("aula") == data.factor("AULA") == 0.5
+    with pytest.raises(ValueError):
+        data.load({**DEFAULT_REFERENCE_DATA, "tipos_espacio": [{"id": 3, "factor_utilizacion": 0.5}]})
+
+
+@pytest.mark.asyncio
+async def test_endpoint_serves_precomputed_body(client, auth_headers):
+    response = await client.get(
+        "/api/v1/chatbot/space-reference-data", headers={**auth_headers, "Accept-Encoding": "identity"}
+    )
+
+    assert response.status_code == 200
+    assert response.content == reference_data.body
+    assert response.headers["etag"] == reference_data.etag
+    assert "max-age" in response.headers["cache-control"]
+    assert response.json()["elementos_referencia"]["vehiculo"]["area"] == 11.25
+
+    revalidated = await client.get(
+        "/api/v1/chatbot/space-reference-data", headers={**auth_headers, "If-None-Match": reference_data.etag}
+    )
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_admin_hot_reload(client, auth_headers, tmp_path, monkeypatch, restore_reference_data):
+    old_etag = reference_data.etag
+    data = json.loads(reference_data.body)
+    data["tipos_espacio"][0]["factor_utilizacion"] = 0.5
+    data["compatibilidad_recursos"]["aula"] = ["proyector"]
+    path = tmp_path / "reference.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    monkeypatch.setattr(settings, "REFERENCE_DATA_FILE", str(path))
+
+    reloaded = await client.post("/api/v1/chatbot/space-reference-data/reload", headers=auth_headers)
+
+    assert reloaded.status_code == 200
+    assert reloaded.json()["version"] != old_etag.strip('"')
+    assert reference_data.factor("aula") == 0.5
+    assert optimizer._calculate_compatibility_score({"tipo": "Aula"}, {"tipo": "Proyector"}) == 1.0
+    stale = await client.get(
+        "/api/v1/chatbot/space-reference-data", headers={**auth_headers, "If-None-Match": old_etag}
+    )
+    assert stale.status_code == 200 and stale.json()["tipos_espacio"][0]["factor_utilizacion"] == 0.5
+
+    path.write_text("{not json", encoding="utf-8")
+    failed = await client.post("/api/v1/chatbot/space-reference-data/reload", headers=auth_headers)
+    assert failed.status_code == 400
+    assert reference_data.factor("aula") == 0.5
@@ -0,0 +1,102 @@
+import time as timer
+import pytest
+from datetime import date, time
+
+from app.services.reference_data import ESPACIO_REFERENCIA
+from app.db.crud import SpaceCRUD
+from app.services.request_parser import request_parser
+
+TODAY = date(2026, 3, 4)  # miércoles
+
+# Corpus de referencia: (descripción, campos esperados). Sirve como prueba de
+# exactitud y como carga para la medición de rendimiento.
+CORPUS = [
+    ("Necesito un aula para veinte estudiantes con proyector para el lunes de 8 a 10am",
+     dict(capacidad=20, fecha=date(2026, 3, 9), hora_inicio=time(8), hora_fin=time(10),
+          equipamiento=["proyector"], tipo_espacio="aula")),
+    ("Busco un laboratorio de informática con capacidad para 30 personas",
+     dict(capacidad=30, fecha=None, hora_inicio=None, tipo_espacio="laboratorio")),
+    ("Requiero un auditorio grande para una conferencia el viernes",
+     dict(capacidad=None, fecha=date(2026, 3, 6), tipo_espacio="auditorio")),
+    ("Sala de reuniones para 8 personas mañana a las 3 de la tarde por 2 horas",
+     dict(capacidad=8, fecha=date(2026, 3, 5), hora_inicio=time(15), hora_fin=time(17),
+          tipo_espacio="sala de reuniones")),
+    ("Aula con video beam para 35 alumnos el 2026-03-10 de 14:00 a 16:00",
+     dict(capacidad=35, fecha=date(2026, 3, 10), hora_inicio=time(14), hora_fin=time(16),
+          equipamiento=["proyector"], tipo_espacio="aula")),
+    ("Reunión de 10 a 2pm el 15 de marzo para doce personas",
+     dict(capacidad=12, fecha=date(2026, 3, 15), hora_inicio=time(10), hora_fin=time(14))),
+    ("Salón para treinta y cinco estudiantes pasado mañana a las ocho de la mañana",
+     dict(capacidad=35, fecha=date(2026, 3, 6), hora_inicio=time(8), hora_fin=None, tipo_espacio="aula")),
+    ("Laboratorio con computadores y pizarra hoy de 2 a 4, 25 estudiantes",
+     dict(capacidad=25, fecha=TODAY, hora_inicio=time(14), hora_fin=time(16),
+          equipamiento=["computador", "pizarra"], tipo_espacio="laboratorio")),
+    ("Necesito un espacio el 12/03 desde las 9",
+     dict(capacidad=None, fecha=date(2026, 3, 12), hora_inicio=time(9))),
+    ("Oficina para 4 personas con televisor",
+     dict(capacidad=4, fecha=None, equipamiento=["televisor"], tipo_espacio="oficina")),
+    ("Auditorio para ciento veinte asistentes con sonido y proyector el martes de 6 a 9 pm",
+     dict(capacidad=120, fecha=date(2026, 3, 10), hora_inicio=time(18), hora_fin=time(21),
+          equipamiento=["sonido", "proyector"], tipo_espacio="auditorio")),
+    ("Aula para 40 estudiantes el miércoles a las 7:30 am",
+     dict(capacidad=40, fecha=date(2026, 3, 11), hora_inicio=time(7, 30))),
+    ("Algo tranquilo para estudiar",
+     dict(capacidad=None, fecha=None, hora_inicio=None, equipamiento=[], tipo_espacio=None)),
+]
+
+
+@pytest.mark.parametrize("text,expected", CORPUS, ids=[c[0][:40] for c in CORPUS])
+def test_parse_corpus(text, expected):
+    parsed = request_parser.parse(text, today=TODAY)
+
+    for field_name, value in expected.items():
+        assert getattr(parsed, field_name) == value, field_name
+
+
+def test_parse_time():
+    assert request_parser.parse_time("08:00") == time(8)
+    assert request_parser.parse_time("2:30 pm") == time(14, 30)
+    assert request_parser.parse_time("10AM") == time(10)
+    assert request_parser.parse_time("14h") == time(14)
+    assert request_parser.parse_time("mañana") is None
+
+
+def test_equipment_vocabulary_covers_reference_data():
+    for key in ("proyector", "video_beam", "pantalla", "televisor", "pizarra", "computador", "pc"):
+        assert request_parser.parse(f"aula con {key.replace('_', ' ')}", today=TODAY).equipamiento, key
+    assert "video_beam" in ESPACIO_REFERENCIA
+
+
+def test_parse_corpus_benchmark(record_property):
+    rounds = 50
+    start = timer.perf_counter()
+    for _ in range(rounds):
+        for text, _expected in CORPUS:
+            request_parser.parse(text, today=TODAY)
+    per_request_ms = (timer.perf_counter() - start) * 1000 / (rounds * len(CORPUS))
+
+    # Tiempo informativo (junit/--junitxml); no decide el resultado en CI
+    record_property("per_request_ms", round(per_request_ms, 3))
+
+
+@pytest.mark.asyncio
+async def test_smart_reservation_parses_description_locally(test_db, client, auth_headers):
+    space = await SpaceCRUD.create(
+        test_db, nombre="Aula 201", tipo="aula", capacidad=25,
+        caracteristicas=["proyector"], estado="disponible"
+    )
+    await test_db.commit()
+
+    response = await client.post(
+        "/api/v1/chatbot/smart-reservation",
+        json={
+            "descripcion": "Necesito un aula para veinte estudiantes con proyector el 2026-03-09 de 8 a 10am",
+            "crear_reserva": False
+        },
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["model_used"] == "local-ranking"
+    assert data["espacio_seleccionado"]["id"] == space.id
@@ -0,0 +1,82 @@
+import pytest
+from datetime import datetime
+
+from app.db.crud import SpaceCRUD, ResourceCRUD, AssignmentCRUD
+from app.services.reservation_engine import reservation_ranker
+
+
+SPACES = [
+    {"id": 1, "nombre": "Auditorio", "tipo": "auditorio", "capacidad": 120, "caracteristicas": ["Proyector", "Sonido"]},
+    {"id": 2, "nombre": "Aula 101", "tipo": "aula", "capacidad": 30, "caracteristicas": ["Video Beam", "Pizarra"]},
+    {"id": 3, "nombre": "Aula 102", "tipo": "aula", "capacidad": 25, "caracteristicas": ["Pizarra"]},
+    {"id": 4, "nombre": "Sala 1", "tipo": "sala_conferencias", "capacidad": 12, "caracteristicas": []},
+]
+
+
+def test_rank_prefers_efficient_capacity_and_equipment():
+    ranked = reservation_ranker.rank(SPACES, capacidad_minima=20, equipamiento=["proyector"], tipo_espacio="aula")
+
+    assert [r.space["id"] for r in ranked] == [2, 3, 1]
+    assert ranked[0].equipamiento_cubierto == ["proyector"]
+    assert ranked[1].equipamiento_faltante == ["proyector"]
+    assert ranked[0].eficiencia == 66.7
+
+
+def test_rank_excludes_small_and_occupied_spaces():
+    ranked = reservation_ranker.rank(SPACES, capacidad_minima=20, occupied_space_ids={2})
+
+    ids = [r.space["id"] for r in ranked]
+    assert 2 not in ids
+    assert 4 not in ids
+
+
+def test_rank_matches_type_synonyms():
+    ranked = reservation_ranker.rank(SPACES, capacidad_minima=10, tipo_espacio="Sala de reuniones")
+
+    assert ranked[0].space["id"] == 4
+    assert ranked[0].tipo_coincide
+
+
+@pytest.mark.asyncio
+async def test_smart_reservation_structured_request_skips_ai(test_db, client, auth_headers):
+    resource = await ResourceCRUD.create(test_db, nombre="Recurso", tipo="general", estado="disponible")
+    busy = await SpaceCRUD.create(
+        test_db, nombre="Aula Ocupada", tipo="aula", capacidad=28,
+        caracteristicas=["proyector"], estado="disponible"
+    )
+    free = await SpaceCRUD.create(
+        test_db, nombre="Aula Libre", tipo="aula", capacidad=30,
+        caracteristicas=["proyector"], estado="disponible"
+    )
+    await SpaceCRUD.create(test_db, nombre="Auditorio", tipo="auditorio", capacidad=150, estado="disponible")
+    await AssignmentCRUD.create(
+        test_db,
+        room_id=busy.id,
+        resource_id=resource.id,
+        fecha=datetime(2026, 3, 2, 9, 0),
+        fecha_fin=datetime(2026, 3, 2, 11, 0),
+        estado="activo"
+    )
+    await test_db.commit()
+
+    response = await client.post(
+        "/api/v1/chatbot/smart-reservation",
+        json={
+            "descripcion": "Clase de cálculo",
+            "capacidad_minima": 20,
+            "fecha_preferida": "2026-03-02",
+            "hora_inicio_preferida": "08:00",
+            "hora_fin_preferida": "10:00",
+            "equipamiento_requerido": ["proyector"],
+            "tipo_espacio_preferido": "aula"
+        },
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["model_used"] == "local-ranking"
+    assert data["espacio_seleccionado"]["id"] == free.id
+    assert data["reserva_creada"]["fecha_inicio"] == "2026-03-02T08:00:00"
+    assert data["reserva_creada"]["fecha_fin"] == "2026-03-02T10:00:00"
+    assert [a["nombre"] for a in data["alternativas"]] == ["Auditorio"]
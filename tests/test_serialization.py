@@ -0,0 +1,79 @@
+"""
+Tests de la serialización rápida de listados (proyección de filas + orjson)
+"""
+import json
+import time
+import pytest
+from datetime import datetime
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app.db.crud import AssignmentCRUD, ResourceCRUD, SpaceCRUD
+from app.db.models import Space
+from app.core.responses import dumps
+from app.schemas.space import SpaceResponse
+
+ROWS = 10_000
+
+
+def _space(i):
+    return {
+        "nombre": f"Aula {i}", "tipo": "aula" if i % 4 else "laboratorio", "capacidad": 20 + i % 30,
+        "ubicacion": f"Bloque {i % 5}", "caracteristicas": {"proyector": i % 2 == 0} if i % 3 else ["wifi", "tablero"],
+        "estado": "disponible", "created_at": datetime(2026, 1, 5, 8, 30, i % 60)
+    }
+
+
+@pytest.mark.asyncio
+async def test_projection_matches_response_model(test_db):
+    await test_db.execute(insert(Space), [_space(i) for i in range(50)])
+    await test_db.commit()
+
+    spaces = await SpaceCRUD.get_all(test_db, limit=50)
+    expected = json.loads(TypeAdapter(List[SpaceResponse]).dump_json(spaces))
+    projected = json.loads(dumps(await SpaceCRUD.get_rows(test_db, limit=50)))
+
+    assert projected == expected
+
+
+@pytest.mark.asyncio
+async def test_list_endpoints_return_rows(test_db, client, auth_headers):
+    resource = await ResourceCRUD.create(test_db, nombre="Proyector", tipo="equipo", estado="disponible")
+    space = await SpaceCRUD.create(test_db, **_space(1))
+    await AssignmentCRUD.create(test_db, room_id=space.id, resource_id=resource.id, fecha=datetime(2026, 3, 2, 9), estado="activo")
+    await AssignmentCRUD.create(test_db, room_id=space.id, resource_id=resource.id, fecha=datetime(2026, 3, 3, 9), estado="completado")
+    await test_db.commit()
+
+    spaces = (await client.get("/api/v1/spaces", headers=auth_headers, params={"limit": 1000})).json()
+    assignments = (await client.get("/api/v1/assignments", headers=auth_headers)).json()
+    active = (await client.get("/api/v1/assignments", headers=auth_headers, params={"active_only": True})).json()
+
+    assert spaces[0]["caracteristicas"] == {"proyector": False}
+    assert spaces[0]["created_at"] == "2026-01-05T08:30:01"
+    assert [a["estado"] for a in assignments] == ["activo", "completado"]
+    assert assignments[0]["fecha"] == "2026-03-02T09:00:00" and assignments[0]["fecha_fin"] is None
+    assert len(active) == 1
+
+
+@pytest.mark.asyncio
+async def test_serialization_benchmark_10k_rows(test_db, record_property):
+    await test_db.execute(insert(Space), [_space(i) for i in range(ROWS)])
+    await test_db.commit()
+    adapter = TypeAdapter(List[SpaceResponse])
+
+    start = time.perf_counter()
+    spaces = await SpaceCRUD.get_all(test_db, limit=ROWS)
+    model_body = adapter.dump_json(adapter.validate_python(spaces))
+    model_elapsed = time.perf_counter() - start
+    test_db.expunge_all()
+
+    start = time.perf_counter()
+    rows_body = dumps(await SpaceCRUD.get_rows(test_db, limit=ROWS))
+    rows_elapsed = time.perf_counter() - start
+
+    assert len(json.loads(rows_body)) == ROWS
+    assert json.loads(rows_body) == json.loads(model_body)
+    # Tiempos informativos (junit/--junitxml); no deciden el resultado en CI
+    record_property("rows_seconds", round(rows_elapsed, 4))
+    record_property("orm_pydantic_seconds", round(model_elapsed, 4))
@@ -0,0 +1,164 @@
+"""
+Tests del simulador de eventos discretos de /analytics/simulate
+"""
+import time as timer
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+from app.db.crud import AssignmentCRUD, ResourceCRUD, SpaceCRUD
+from app.services.simulator import (
+    SEMESTER_DAYS, Demand, ScenarioSimulator, SimSpace,
+    apply_changes, demand_from_bookings, simulate_once, synthetic_demand
+)
+
+START = datetime(2026, 1, 5)
+
+
+def _demand(rows, horizon=48.0):
+    start, duration, size, tipo = zip(*rows)
+    return Demand(
+        np.array(start, dtype=float), np.array(duration, dtype=float), np.array(size, dtype=float),
+        np.array(tipo, dtype=object), horizon, "historica"
+    )
+
+
+def _campus(n=100):
+    return [SimSpace(i, "aula" if i % 3 else "laboratorio", 20 + (i % 5) * 10) for i in range(1, n + 1)]
+
+
+def test_apply_changes():
+    inventory = [SimSpace(1, "aula", 30), SimSpace(2, "aula", 40), SimSpace(3, "laboratorio", 20)]
+
+    scenario, applied, ignored = apply_changes(inventory, [
+        {"type": "add_space", "tipo": "auditorio", "capacidad": 120, "cantidad": 2},
+        {"type": "remove_space", "space_id": 3},
+        {"type": "increase_capacity", "space_id": 1, "amount": 0.2},
+        {"type": "close_space", "space_id": 2, "desde": "2026-01-06", "hasta": "2026-01-07"},
+        {"type": "add_resources", "tipo": "proyector", "cantidad": 5}
+    ], START)
+
+    assert [(s.tipo, s.capacidad) for s in scenario] == [("aula", 36), ("aula", 40), ("auditorio", 120), ("auditorio", 120)]
+    assert scenario[1].closures == [(24.0, 48.0)]
+    assert len(applied) == 4
+    assert ignored == [{"type": "add_resources", "tipo": "proyector", "cantidad": 5}]
+    assert inventory[0].capacidad == 30 and inventory[1].closures == []
+
+
+def test_overlapping_bookings_are_rejected_and_best_fit_is_used():
+    inventory = [SimSpace(1, "aula", 50), SimSpace(2, "aula", 12)]
+    demand = _demand([(9, 2, 10, "aula"), (9.5, 2, 10, "aula"), (10, 1, 10, "aula"), (13, 1, 10, "laboratorio")])
+
+    result = simulate_once(inventory, demand, seed=0, jitter=0.0)
+
+    # 9:00 takes the 12-seat room, 9:30 the 50-seat one, 10:00 finds both busy; no laboratories exist
+    assert result["solicitudes"] == 4
+    assert result["tasa_rechazo"] == 0.5
+    assert result["rechazo_por_tipo"] == {"aula": 1 / 3, "laboratorio": 1.0}
+    assert 0 < result["desperdicio_capacidad"] < 1
+
+
+def test_closed_space_cannot_be_booked():
+    demand = _demand([(9, 2, 10, "aula"), (33, 2, 10, "aula")])
+
+    open_result = simulate_once([SimSpace(1, "aula", 20)], demand, seed=0, jitter=0.0)
+    closed_result = simulate_once([SimSpace(1, "aula", 20, closures=[(24.0, 48.0)])], demand, seed=0, jitter=0.0)
+
+    assert open_result["tasa_rechazo"] == 0.0
+    assert closed_result["tasa_rechazo"] == 0.5
+
+
+def test_demand_from_bookings_replays_assignments_in_period():
+    inventory = [SimSpace(1, "aula", 30)]
+    demand = demand_from_bookings([
+        (1, START + timedelta(hours=9), START + timedelta(hours=11)),
+        (1, START + timedelta(days=1, hours=9), None),
+        (1, START - timedelta(days=1), None),
+        (99, START + timedelta(hours=9), None)
+    ], inventory, START, START + timedelta(days=7))
+
+    assert demand.start.tolist() == [9.0, 33.0]
+    assert demand.duration.tolist() == [2.0, 2.0]
+    assert demand.size.tolist() == [24.0, 24.0]
+
+
+@pytest.mark.asyncio
+async def test_removing_spaces_under_load_is_reported_as_negative():
+    inventory = _campus(30)
+    demand = synthetic_demand(inventory, START, START + timedelta(days=28), bookings_per_day=5)
+    changes = [{"type": "remove_space", "space_id": i} for i in range(1, 11)]
+
+    result = await ScenarioSimulator(replications=5, workers=1).run(inventory, demand, {"changes": changes}, START)
+
+    assert result["results"]["espacios_afectados"] == 10
+    assert result["results"]["escenario"]["tasa_rechazo"]["media"] > result["results"]["actual"]["tasa_rechazo"]["media"]
+    assert any("tasa de rechazo" in text for text in result["impact_analysis"]["negativo"])
+    assert result["recommendations"]
+
+
+@pytest.mark.asyncio
+async def test_process_pool_matches_inline_run():
+    inventory = _campus(20)
+    demand = synthetic_demand(inventory, START, START + timedelta(days=14))
+    parameters = {"changes": [{"type": "add_space", "tipo": "aula", "capacidad": 40}], "replications": 4}
+
+    inline = await ScenarioSimulator(workers=1).run(inventory, demand, parameters, START)
+    simulator = ScenarioSimulator(workers=2, parallel_threshold=0)
+    try:
+        pooled = await simulator.run(inventory, demand, parameters, START)
+    finally:
+        simulator.shutdown()
+
+    for key in ("actual", "escenario", "diferencia"):
+        assert pooled["results"][key] == inline["results"][key]
+
+
+@pytest.mark.asyncio
+async def test_semester_benchmark(record_property):
+    inventory = _campus(100)
+    demand = synthetic_demand(inventory, START, START + timedelta(days=SEMESTER_DAYS))
+
+    start = timer.perf_counter()
+    result = await ScenarioSimulator(replications=20, workers=1).run(
+        inventory, demand, {"changes": [{"type": "remove_space", "space_id": 1}]}, START
+    )
+    elapsed = timer.perf_counter() - start
+
+    assert result["results"]["demanda"]["reservas"] > 20000
+    # Tiempo informativo (junit/--junitxml); no decide el resultado en CI
+    record_property("semester_seconds", round(elapsed, 2))
+
+
+@pytest.mark.asyncio
+async def test_simulate_endpoint_replays_assignments(test_db, client, auth_headers):
+    resource = await ResourceCRUD.create(test_db, nombre="Recurso", tipo="general", estado="disponible")
+    small = await SpaceCRUD.create(test_db, nombre="Aula 1", tipo="aula", capacidad=20, estado="disponible")
+    await SpaceCRUD.create(test_db, nombre="Aula 2", tipo="aula", capacidad=40, estado="disponible")
+    for day in range(10):
+        fecha = datetime(2026, 2, 2, 8) + timedelta(days=day)
+        await AssignmentCRUD.create(
+            test_db, room_id=small.id, resource_id=resource.id,
+            fecha=fecha, fecha_fin=fecha + timedelta(hours=2), estado="activo"
+        )
+    await test_db.commit()
+
+    response = await client.post("/api/v1/analytics/simulate", headers=auth_headers, json={
+        "scenario_name": "Cerrar Aula 2",
+        "parameters": {"changes": [{"type": "remove_space", "space_id": small.id}], "replications": 4},
+        "fecha_inicio": "2026-02-01T00:00:00",
+        "fecha_fin": "2026-03-01T00:00:00"
+    })
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results["demanda"] == {
+        "origen": "historica", "reservas": 10, "solicitudes_simuladas": results["demanda"]["solicitudes_simuladas"],
+        "crecimiento": 0.0, "horas": 672.0
+    }
+    assert results["actual"]["tasa_rechazo"]["media"] == 0.0
+    assert results["cambios_aplicados"] == [f"Espacio {small.id} eliminado"]
+
+    invalid = await client.post("/api/v1/analytics/simulate", headers=auth_headers, json={
+        "scenario_name": "Inválido", "parameters": {"replications": "muchas"}
+    })
+    assert invalid.status_code == 400
@@ -0,0 +1,45 @@
+"""
+Tests del buscador de espacios mencionados (Aho–Corasick)
+"""
+from types import SimpleNamespace
+
+from app.core.text import AhoCorasick
+from app.db.versions import table_versions
+from app.services.space_matcher import SpaceNameMatcher
+
+
+def _space(id, nombre):
+    return SimpleNamespace(id=id, nombre=nombre, tipo="aula", estado="disponible")
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick()
+    for word in ("he", "she", "his", "hers"):
+        automaton.add(word, word)
+    automaton.build()
+
+    matches = sorted((start, key) for key, start, _ in automaton.iter_matches("ushers"))
+    assert matches == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_matcher_is_accent_insensitive_and_respects_word_boundaries():
+    spaces = [_space(1, "Auditorio Principal"), _space(2, "Aula 1"), _space(3, "Aula 101"), _space(4, "Laboratorio de Química")]
+    matcher = SpaceNameMatcher()
+
+    found = matcher.find("Te sugiero el AULA 101 o el laboratorio de quimica; el auditorío  principal está ocupado.", spaces)
+
+    assert [s.id for s in found] == [3, 4, 1]
+
+
+def test_matcher_rebuilds_only_when_spaces_change():
+    spaces = [_space(1, "Sala Norte"), _space(2, "Sala Sur")]
+    matcher = SpaceNameMatcher()
+
+    matcher.find("sala norte", spaces)
+    matcher.find("sala sur", spaces)
+    assert matcher.builds == 1
+
+    table_versions.bump("spaces")
+    spaces.append(_space(3, "Sala Este"))
+    assert [s.id for s in matcher.find("la sala este", spaces)] == [3]
+    assert matcher.builds == 2
@@ -0,0 +1,125 @@
+"""
+Tests del almacén incremental de métricas de utilización de espacios
+"""
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+
+from app.db.crud import AssignmentCRUD, ResourceCRUD, SpaceCRUD
+from app.db.space_metrics import SpaceMetrics, space_metrics
+
+
+async def _fresh_snapshot(db):
+    metrics = SpaceMetrics()
+    await metrics.load(db)
+    return metrics.snapshot()
+
+
+@pytest.mark.asyncio
+async def test_incremental_updates_match_full_reload(test_db):
+    space_metrics.reset()
+    await space_metrics.load(test_db)
+
+    a = await SpaceCRUD.create(test_db, nombre="Aula A", tipo="aula", capacidad=2, estado="disponible")
+    b = await SpaceCRUD.create(test_db, nombre="Lab B", tipo="laboratorio", capacidad=20, estado="disponible")
+    c = await SpaceCRUD.create(test_db, nombre="Aula C", tipo="aula", capacidad=30, estado="mantenimiento")
+    r1 = await ResourceCRUD.create(test_db, nombre="Proyector", tipo="equipo", estado="disponible")
+    r2 = await ResourceCRUD.create(test_db, nombre="Portátil", tipo="equipo", estado="disponible")
+    fecha = datetime(2026, 3, 2, 9, 0)
+    assignments = [
+        await AssignmentCRUD.create(test_db, room_id=room, resource_id=r1.id, fecha=fecha, estado="activo")
+        for room in (a.id, a.id, a.id, b.id)
+    ]
+    await test_db.commit()
+    assert space_metrics.snapshot() == await _fresh_snapshot(test_db)
+    assert space_metrics.used_capacity == 3  # min(3, 2) + min(1, 20)
+
+    await AssignmentCRUD.update(test_db, assignments[0].id, estado="completado")
+    await AssignmentCRUD.update(test_db, assignments[1].id, room_id=b.id, resource_id=r2.id)
+    await AssignmentCRUD.update(test_db, assignments[0].id, estado="activo")
+    await AssignmentCRUD.delete(test_db, assignments[3].id)
+    await SpaceCRUD.update(test_db, b.id, capacidad=1, tipo="aula")
+    await SpaceCRUD.delete(test_db, c.id)
+    await ResourceCRUD.delete(test_db, r2.id)
+    await test_db.commit()
+
+    assert space_metrics.snapshot() == await _fresh_snapshot(test_db)
+    assert space_metrics.type_counts == {"aula": 2}
+    assert space_metrics.occupied == 2
+    space_metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_hooks_are_ignored_until_loaded(test_db):
+    metrics = SpaceMetrics()
+    space = await SpaceCRUD.create(test_db, nombre="Aula", tipo="aula", capacidad=10, estado="disponible")
+    metrics.space_saved(test_db, space)
+    await test_db.commit()
+
+    assert metrics.space_count == 0
+
+    await metrics.load(test_db)
+    assert metrics.space_count == 1 and metrics.total_capacity == 10
+
+
+@pytest.mark.asyncio
+async def test_changes_apply_on_commit_only(test_db):
+    space_metrics.reset()
+    await space_metrics.load(test_db)
+
+    await SpaceCRUD.create(test_db, nombre="Descartada", tipo="aula", capacidad=50, estado="disponible")
+    await ResourceCRUD.create(test_db, nombre="Proyector", tipo="equipo", estado="disponible")
+    assert space_metrics.space_count == 0  # nada cambia antes del commit
+    await test_db.rollback()
+    assert space_metrics.snapshot() == await _fresh_snapshot(test_db)
+
+    await SpaceCRUD.create(test_db, nombre="Aula", tipo="aula", capacidad=10, estado="disponible")
+    await test_db.commit()
+    assert space_metrics.total_capacity == 10
+    assert space_metrics.snapshot() == await _fresh_snapshot(test_db)
+    space_metrics.reset()
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_corrects_drift(test_db):
+    metrics = SpaceMetrics()
+    await SpaceCRUD.create(test_db, nombre="Aula", tipo="aula", capacidad=10, estado="disponible")
+    await metrics.load(test_db)
+
+    metrics.total_capacity += 99  # e.g. a write made by another process
+    metrics.type_counts["fantasma"] = 1
+    await metrics.load(test_db)
+
+    assert metrics.total_capacity == 10
+    assert metrics.type_counts == {"aula": 1}
+
+
+@pytest.mark.asyncio
+async def test_efficiency_reads_the_store(test_db, client, auth_headers):
+    space = await SpaceCRUD.create(test_db, nombre="Aula 1", tipo="aula", capacidad=4, estado="disponible")
+    await SpaceCRUD.create(test_db, nombre="Aula 2", tipo="aula", capacidad=4, estado="disponible")
+    resource = await ResourceCRUD.create(test_db, nombre="Proyector", tipo="equipo", estado="disponible")
+    await ResourceCRUD.create(test_db, nombre="Parlante", tipo="equipo", estado="disponible")
+    await test_db.commit()
+
+    first = await client.get("/api/v1/analytics/efficiency", headers=auth_headers)
+    assert first.json()["space_efficiency"] == 0.0
+
+    await AssignmentCRUD.create(
+        test_db, room_id=space.id, resource_id=resource.id, fecha=datetime(2026, 3, 2, 9), estado="activo"
+    )
+    await test_db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = await client.get("/api/v1/analytics/efficiency", headers=auth_headers)
+    finally:
+        event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+    body = response.json()
+    assert body["space_efficiency"] == 12.5
+    assert body["resource_efficiency"] == 50.0
+    assert body["metrics_by_space"][0]["asignaciones"] == 1
+    assert not [s for s in statements if "FROM spaces" in s or "FROM assignments" in s]
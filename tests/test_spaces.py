@@ -3,7 +3,7 @@ from httpx import AsyncClient
 
 
 @pytest.mark.asyncio
-async def test_create_space(client, auth_headers):
+async def test_create_space(client, auth_headers, max_queries):
     space_data = {
         "nombre": "Test Office",
         "tipo": "oficina",
@@ -13,11 +13,12 @@ async def test_create_space(client, auth_headers):
         "estado": "disponible"
     }
     
-    response = await client.post(
-        "/api/v1/spaces",
-        json=space_data,
-        headers=auth_headers
-    )
+    with max_queries(3):
+        response = await client.post(
+            "/api/v1/spaces",
+            json=space_data,
+            headers=auth_headers
+        )
     
     assert response.status_code == 201
     data = response.json()
@@ -27,7 +28,7 @@ async def test_create_space(client, auth_headers):
 
 
 @pytest.mark.asyncio
-async def test_get_spaces(client, auth_headers):
+async def test_get_spaces(client, auth_headers, max_queries):
     space_data = {
         "nombre": "List Test Office",
         "tipo": "oficina",
@@ -35,7 +36,8 @@ async def test_get_spaces(client, auth_headers):
     }
     await client.post("/api/v1/spaces", json=space_data, headers=auth_headers)
     
-    response = await client.get("/api/v1/spaces", headers=auth_headers)
+    with max_queries(2):
+        response = await client.get("/api/v1/spaces", headers=auth_headers)
     
     assert response.status_code == 200
     data = response.json()
@@ -44,7 +46,7 @@ async def test_get_spaces(client, auth_headers):
 
 
 @pytest.mark.asyncio
-async def test_get_space_by_id(client, auth_headers):
+async def test_get_space_by_id(client, auth_headers, max_queries):
     space_data = {
         "nombre": "Get By ID Office",
         "tipo": "oficina",
@@ -57,10 +59,11 @@ async def test_get_space_by_id(client, auth_headers):
     )
     space_id = create_response.json()["id"]
     
-    response = await client.get(
-        f"/api/v1/spaces/{space_id}",
-        headers=auth_headers
-    )
+    with max_queries(2):
+        response = await client.get(
+            f"/api/v1/spaces/{space_id}",
+            headers=auth_headers
+        )
     
     assert response.status_code == 200
     data = response.json()
@@ -69,7 +72,7 @@ async def test_get_space_by_id(client, auth_headers):
 
 
 @pytest.mark.asyncio
-async def test_update_space(client, auth_headers):
+async def test_update_space(client, auth_headers, max_queries):
     space_data = {
         "nombre": "Update Test Office",
         "tipo": "oficina",
@@ -86,11 +89,12 @@ async def test_update_space(client, auth_headers):
         "nombre": "Updated Office Name",
         "capacidad": 15
     }
-    response = await client.put(
-        f"/api/v1/spaces/{space_id}",
-        json=update_data,
-        headers=auth_headers
-    )
+    with max_queries(4):
+        response = await client.put(
+            f"/api/v1/spaces/{space_id}",
+            json=update_data,
+            headers=auth_headers
+        )
     
     assert response.status_code == 200
     data = response.json()
@@ -99,7 +103,7 @@ async def test_update_space(client, auth_headers):
 
 
 @pytest.mark.asyncio
-async def test_delete_space(client, auth_headers):
+async def test_delete_space(client, auth_headers, max_queries):
     space_data = {
         "nombre": "Delete Test Office",
         "tipo": "oficina",
@@ -112,10 +116,11 @@ async def test_delete_space(client, auth_headers):
     )
     space_id = create_response.json()["id"]
     
-    response = await client.delete(
-        f"/api/v1/spaces/{space_id}",
-        headers=auth_headers
-    )
+    with max_queries(3):
+        response = await client.delete(
+            f"/api/v1/spaces/{space_id}",
+            headers=auth_headers
+        )
     
     assert response.status_code == 204
     
@@ -127,7 +132,7 @@ async def test_delete_space(client, auth_headers):
 
 
 @pytest.mark.asyncio
-async def test_get_available_spaces(client, auth_headers):
+async def test_get_available_spaces(client, auth_headers, max_queries):
     space_data = {
         "nombre": "Available Test Office",
         "tipo": "oficina",
@@ -136,10 +141,11 @@ async def test_get_available_spaces(client, auth_headers):
     }
     await client.post("/api/v1/spaces", json=space_data, headers=auth_headers)
     
-    response = await client.get(
-        "/api/v1/spaces/available",
-        headers=auth_headers
-    )
+    with max_queries(2):
+        response = await client.get(
+            "/api/v1/spaces/available",
+            headers=auth_headers
+        )
     
     assert response.status_code == 200
     data = response.json()
@@ -149,7 +155,8 @@ async def test_get_available_spaces(client, auth_headers):
 
 
 @pytest.mark.asyncio
-async def test_unauthorized_access(client):
-    response = await client.get("/api/v1/spaces")
+async def test_unauthorized_access(client, max_queries):
+    with max_queries(0):
+        response = await client.get("/api/v1/spaces")
     
     assert response.status_code == 401